@@ -30,6 +30,9 @@ from app.services.admin_auth_service import (
 from app.core.admin_security import AdminSecurity, AdminTokenError
 from app.models.admin_audit_log import AuditAction, AuditSeverity
 from app.utils.admin_audit import AdminAuditLogger
+from app.services.principal_cache import (
+    PRINCIPAL_ADMIN, TokenRevokedError, get_principal_cache, load_admin_principal, token_version
+)
 
 logger = structlog.get_logger(__name__)
 security = HTTPBearer()
@@ -38,16 +41,13 @@ router = APIRouter()
 
 
 async def get_current_admin_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    credentials: HTTPAuthorizationCredentials = Depends(security)
 ):
     """
     Get current authenticated admin user from JWT token
     
     Args:
         credentials: HTTP Bearer credentials
-        db: Database session
-        auth_service: Admin authentication service
         
     Returns:
         AdminUser: Current authenticated admin user
@@ -56,35 +56,44 @@ async def get_current_admin_user(
         HTTPException: If authentication fails
     """
     try:
-        auth_service = authService(db)
         # Verify token
         token_payload = AdminSecurity.verify_token(credentials.credentials, "access")
         user_id = uuid.UUID(token_payload["sub"])
         
-        # Get user from database
-        admin_user = await auth_service.get_admin_user_by_id(user_id)
-        if not admin_user:
+        # Get user from the principal cache, loading it on a miss
+        principal = await get_principal_cache().resolve(
+            PRINCIPAL_ADMIN,
+            user_id,
+            token_version(token_payload),
+            load_admin_principal
+        )
+        if not principal:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="User not found"
             )
         
         # Check if user is active
-        if not admin_user.is_active:
+        if not principal.is_active:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Account is deactivated"
             )
         
         # Check if user is locked
-        if admin_user.is_locked:
+        if principal.is_locked:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Account is locked"
             )
         
-        return admin_user
+        return principal.user
         
+    except TokenRevokedError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token has been revoked"
+        )
     except AdminTokenError as e:
         logger.warning("Token verification failed", error=str(e))
         raise HTTPException(
@@ -234,15 +243,23 @@ async def refresh_token(
 @router.post("/logout")
 async def admin_logout(
     request: Request,
+    credentials: HTTPAuthorizationCredentials = Depends(security),
     current_user = Depends(get_current_admin_user)
 ):
     """
     Admin user logout
     
-    Note: In a stateless JWT system, logout is primarily for logging purposes.
-    In production, you might want to implement token blacklisting.
+    Revokes the access token until it expires.
     """
     try:
+        token_payload = AdminSecurity.verify_token(credentials.credentials, "access")
+        await get_principal_cache().revoke_token(
+            PRINCIPAL_ADMIN,
+            current_user.id,
+            token_version(token_payload),
+            token_payload["exp"]
+        )
+        
         # Log logout
         await audit_logger.log_action(
             admin_user_id=current_user.id,
@@ -42,6 +42,9 @@ from app.models.role import UserPermission
 from app.core.security import Security, AuthenticationError, TokenError
 from app.utils.jwt_handler import JWTHandler
 from app.models.user import User
+from app.services.principal_cache import (
+    PRINCIPAL_USER, TokenRevokedError, get_principal_cache, load_user_principal, token_version
+)
 
 logger = structlog.get_logger(__name__)
 security = HTTPBearer()
@@ -71,27 +74,36 @@ async def get_current_user(
         HTTPException: If authentication fails
     """
     try:
-        auth_service = authService(db)
         # Validate access token
         token_payload = JWTHandler.validate_access_token(credentials.credentials)
         user_id = uuid.UUID(token_payload["sub"])
         
-        # Get user from database
-        user = await auth_service.get_user_by_id(user_id)
-        if not user:
+        # Get user from the principal cache, loading it on a miss
+        principal = await get_principal_cache().resolve(
+            PRINCIPAL_USER,
+            user_id,
+            token_version(token_payload),
+            load_user_principal
+        )
+        if not principal:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="User not found"
             )
         
-        if not user.is_active:
+        if not principal.is_active:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="User account is deactivated"
             )
         
-        return user
+        return principal.user
         
+    except TokenRevokedError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token has been revoked"
+        )
     except TokenError as e:
         logger.warning("Token validation failed", error=str(e))
         raise HTTPException(
@@ -186,8 +198,9 @@ async def refresh_token(
 
 
 @router.post("/logout", response_model=AuthLogoutResponse)
-def logout(
+async def logout(
     request: AuthLogoutRequest,
+    credentials: HTTPAuthorizationCredentials = Depends(security),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -195,14 +208,21 @@ def logout(
     
     Args:
         request: Logout request
+        credentials: HTTP Bearer credentials
         current_user: Current authenticated user
         
     Returns:
         AuthLogoutResponse: Logout confirmation
     """
     try:
-        # In a production system, you would invalidate the refresh token
-        # For now, we'll just log the logout
+        # Revoke the access token until it expires
+        token_payload = JWTHandler.validate_access_token(credentials.credentials)
+        await get_principal_cache().revoke_token(
+            PRINCIPAL_USER,
+            current_user.id,
+            token_version(token_payload),
+            token_payload.get("exp")
+        )
         
         logger.info("User logged out", user_id=str(current_user.id))
         
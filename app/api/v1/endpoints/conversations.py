@@ -2,16 +2,20 @@
 Enhanced conversation management endpoints with state machine support
 """
 
-from typing import List, Optional
+import base64
+from datetime import datetime
+from typing import List, Optional, Tuple
 from uuid import UUID
 from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 import structlog
 
 from app.database import get_db
 from app.models.hotel import Hotel
 from app.models.guest import Guest
-from app.models.message import Conversation, Message, ConversationState, ConversationStatus
+from app.models.message import Conversation, Message, MessageType, ConversationState, ConversationStatus
 from app.services.message_processor import MessageProcessor
 from app.services.conversation_service import ConversationService
 from app.services.conversation_state_machine import ConversationStateMachine
@@ -28,71 +32,123 @@ logger = structlog.get_logger(__name__)
 router = APIRouter()
 
 
+def _encode_cursor(last_message_at: datetime, conversation_id: UUID) -> str:
+    """Encode a keyset pagination cursor for the conversations list"""
+    raw = f"{last_message_at.isoformat()}|{conversation_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    """Decode a cursor produced by _encode_cursor"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        timestamp, conversation_id = raw.split("|", 1)
+        return datetime.fromisoformat(timestamp), UUID(conversation_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from e
+
+
+def _conversation_list_query(hotel_id: str, status: Optional[str]):
+    """
+    Build the single-query conversation listing
+
+    The guest and the last message (by Conversation.last_message_id) are
+    joined and the unread count is read from the denormalized counter, so a
+    page costs one round trip and no aggregation over messages.
+    """
+    query = (
+        select(
+            Conversation.id,
+            Conversation.status,
+            Conversation.created_at,
+            Conversation.last_message_at,
+            Conversation.unread_count,
+            Guest.id.label("guest_id"),
+            Guest.name.label("guest_name"),
+            Guest.phone.label("guest_phone"),
+            Message.content.label("last_message_content"),
+            Message.message_type.label("last_message_type"),
+            Message.created_at.label("last_message_created_at")
+        )
+        .join(Guest, Guest.id == Conversation.guest_id)
+        .outerjoin(Message, Message.id == Conversation.last_message_id)
+        .where(Conversation.hotel_id == hotel_id)
+    )
+
+    if status:
+        query = query.where(Conversation.status == status)
+
+    return query
+
+
 @router.get("/conversations")
-def get_conversations(
+async def get_conversations(
     hotel_id: str,
     status: Optional[str] = Query(None, description="Filter by conversation status"),
     limit: int = Query(50, ge=1, le=100, description="Number of conversations to return"),
-    offset: int = Query(0, ge=0, description="Number of conversations to skip"),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="Cursor from the previous page's next_cursor"),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Get conversations for a hotel
     
-    Returns a list of conversations with basic information.
+    Returns a list of conversations with basic information, newest activity
+    first. Pages are keyed on (last_message_at, id): pass the returned
+    next_cursor to fetch the following page.
     """
     try:
         # Verify hotel exists
-        hotel = db.query(Hotel).filter(Hotel.id == hotel_id).first()
-        if not hotel:
+        hotel_exists = await db.scalar(select(Hotel.id).where(Hotel.id == hotel_id))
+        if not hotel_exists:
             raise HTTPException(status_code=404, detail="Hotel not found")
         
-        # Build query
-        query = db.query(Conversation).filter(Conversation.hotel_id == hotel_id)
+        query = _conversation_list_query(hotel_id, status)
+        
+        if cursor:
+            cursor_time, cursor_id = _decode_cursor(cursor)
+            query = query.where(
+                tuple_(Conversation.last_message_at, Conversation.id) < tuple_(cursor_time, cursor_id)
+            )
         
-        if status:
-            query = query.filter(Conversation.status == status)
+        # Fetch one extra row to know whether another page exists
+        rows = (await db.execute(
+            query.order_by(
+                Conversation.last_message_at.desc(),
+                Conversation.id.desc()
+            ).limit(limit + 1)
+        )).all()
         
-        # Get conversations with pagination
-        conversations = query.order_by(
-            Conversation.last_message_at.desc()
-        ).offset(offset).limit(limit).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
         
         # Format response
         result = []
-        for conv in conversations:
-            # Get last message
-            last_message = db.query(Message).filter(
-                Message.conversation_id == conv.id
-            ).order_by(Message.created_at.desc()).first()
-            
-            # Count unread messages (incoming messages without read status)
-            unread_count = db.query(Message).filter(
-                Message.conversation_id == conv.id,
-                Message.message_type == 'incoming',
-                Message.message_metadata['delivery_status'].astext != 'read'
-            ).count()
-            
+        for row in rows:
+            last_content = row.last_message_content
             conv_data = {
-                'id': str(conv.id),
+                'id': str(row.id),
                 'guest': {
-                    'id': str(conv.guest.id),
-                    'name': conv.guest.name,
-                    'phone_number': conv.guest.phone_number
+                    'id': str(row.guest_id),
+                    'name': row.guest_name,
+                    'phone_number': row.guest_phone
                 },
-                'status': conv.status,
-                'created_at': conv.created_at.isoformat(),
-                'last_message_at': conv.last_message_at.isoformat(),
-                'unread_count': unread_count,
+                'status': row.status,
+                'created_at': row.created_at.isoformat(),
+                'last_message_at': row.last_message_at.isoformat(),
+                'unread_count': row.unread_count,
                 'last_message': {
-                    'content': last_message.content[:100] + '...' if len(last_message.content) > 100 else last_message.content,
-                    'type': last_message.message_type.value,
-                    'created_at': last_message.created_at.isoformat()
-                } if last_message else None
+                    'content': last_content[:100] + '...' if len(last_content) > 100 else last_content,
+                    'type': row.last_message_type.value,
+                    'created_at': row.last_message_created_at.isoformat()
+                } if last_content is not None else None
             }
             
             result.append(conv_data)
         
+        next_cursor = None
+        if has_more and rows:
+            next_cursor = _encode_cursor(rows[-1].last_message_at, rows[-1].id)
+        
         logger.info("Retrieved conversations",
                    hotel_id=hotel_id,
                    count=len(result),
@@ -101,8 +157,8 @@ def get_conversations(
         return {
             'conversations': result,
             'total': len(result),
-            'offset': offset,
-            'limit': limit
+            'limit': limit,
+            'next_cursor': next_cursor
         }
         
     except HTTPException:
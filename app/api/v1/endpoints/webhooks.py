@@ -3,10 +3,10 @@ Webhook endpoints for Green API integration
 """
 
 from typing import Dict, Any, Optional
-from fastapi import APIRouter, Request, HTTPException, Depends, BackgroundTasks, Header
+from fastapi import APIRouter, Request, HTTPException, Depends, Header
 from fastapi.responses import JSONResponse
 import structlog
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import get_db
 from app.schemas.green_api import (
@@ -14,11 +14,13 @@ from app.schemas.green_api import (
     IncomingMessageWebhook, OutgoingMessageStatusWebhook
 )
 from app.utils.webhook_validator import validate_green_api_webhook
-from app.utils.signature_validator import validate_green_api_webhook_enhanced
-from app.core.webhook_config import GreenAPIWebhookConfig
+from app.utils.signature_validator import get_green_api_signature_validator
+from app.utils.webhook_payload import WebhookPayload, read_webhook_payload, verify_webhook_payload
 from app.utils.input_sanitizer import default_sanitizer
-from app.validators.security_validators import validate_safe_json, validate_content_type
-from app.services.webhook_processor import WebhookProcessor
+from app.validators.security_validators import validate_content_type
+from app.services.webhook_queue import get_webhook_queue
+from app.services.webhook_dedup import get_webhook_deduplicator
+from app.services.hotel_directory import get_hotel_directory
 from app.models.hotel import Hotel
 
 logger = structlog.get_logger(__name__)
@@ -26,19 +28,151 @@ logger = structlog.get_logger(__name__)
 router = APIRouter()
 
 
-async def get_hotel_by_instance_id(instance_id: str, db: Session) -> Optional[Hotel]:
-    """Get hotel by Green API instance ID"""
-    return db.query(Hotel).filter(
-        Hotel.green_api_instance_id == instance_id,
-        Hotel.is_active == True
-    ).first()
+async def get_hotel_by_instance_id(instance_id: str, db: AsyncSession) -> Optional[Hotel]:
+    """Get hotel by Green API instance ID, from the hotel directory"""
+    snapshot = await get_hotel_directory().resolve_instance(instance_id, db)
+    return snapshot.to_hotel() if snapshot is not None else None
+
+
+async def verify_hotel_webhook(
+    request: Request,
+    payload: WebhookPayload,
+    hotel: Hotel,
+    instance_id: str,
+    signature: Optional[str]
+) -> None:
+    """
+    Validate a webhook's signature with its hotel's webhook token
+
+    Nothing is checked again when the webhook security stage already
+    verified the payload for this hotel, or when the hotel has no token.
+    A correctly signed redelivery passes; deduplication answers it.
+
+    Raises:
+        HTTPException: If the signature is invalid
+    """
+    if not hotel.green_api_webhook_token or payload.verified_for(hotel.id):
+        return
+
+    # Use enhanced validation with timestamp and replay protection
+    validator = get_green_api_signature_validator()
+    timestamp_header = request.headers.get(validator.config.timestamp_header)
+    try:
+        result = await verify_webhook_payload(
+            payload,
+            validator,
+            hotel_id=hotel.id,
+            secret=hotel.green_api_webhook_token,
+            signature=signature,
+            timestamp_header=timestamp_header
+        )
+        if result['is_valid']:
+            return
+
+        logger.error("Enhanced webhook signature validation failed",
+                   hotel_id=hotel.id,
+                   instance_id=instance_id,
+                   timestamp=payload.timestamp(timestamp_header))
+
+    except Exception as e:
+        logger.error("Webhook validation error",
+                   hotel_id=hotel.id,
+                   instance_id=instance_id,
+                   error=str(e))
+
+    # Fallback to basic validation for backward compatibility
+    is_valid = validate_green_api_webhook(
+        body=payload.body,
+        signature=signature,
+        secret=hotel.green_api_webhook_token
+    )
+
+    if not is_valid:
+        logger.error("Fallback webhook signature validation failed",
+                   hotel_id=hotel.id,
+                   instance_id=instance_id)
+        raise HTTPException(status_code=401, detail="Invalid webhook signature")
+
+
+async def _release_claims(
+    hotel: Hotel,
+    message_id: Optional[str],
+    payload: Optional[WebhookPayload]
+) -> None:
+    """Release a delivery's dedup and replay claims so a redelivery is accepted"""
+    await get_webhook_deduplicator().release(hotel.id, message_id)
+    if payload is not None and payload.replay_key:
+        await get_green_api_signature_validator().release_replay_claim(payload.replay_key)
+
+
+async def enqueue_webhook(
+    hotel: Hotel,
+    parsed_webhook: WebhookData,
+    payload: Optional[WebhookPayload] = None
+) -> JSONResponse:
+    """
+    Hand a parsed webhook to the ingestion queue and build the HTTP response
+
+    Redelivered incoming messages are acknowledged without being queued.
+    A replayed delivery of any other webhook type has no message id to
+    deduplicate on, so it is acknowledged as a duplicate straight away.
+    When the queue is full the webhook is rejected with 503 so that
+    Green API redelivers it later instead of us buffering without bound;
+    its dedup and replay claims are released so the redelivery is accepted.
+    Both claims are also released when queueing fails unexpectedly.
+    """
+    if payload is not None and payload.replayed:
+        if parsed_webhook.typeWebhook != WebhookType.INCOMING_MESSAGE:
+            logger.info("Replayed webhook dropped",
+                       hotel_id=hotel.id,
+                       webhook_type=parsed_webhook.typeWebhook)
+            return JSONResponse(
+                status_code=200,
+                content={"status": "duplicate", "message": "Webhook already received"}
+            )
+        logger.info("Redelivered webhook passed to deduplication",
+                   hotel_id=hotel.id,
+                   webhook_type=parsed_webhook.typeWebhook)
+
+    message_id = None
+    if parsed_webhook.typeWebhook == WebhookType.INCOMING_MESSAGE:
+        message_id = parsed_webhook.idMessage
+        if not await get_webhook_deduplicator().claim(hotel.id, message_id):
+            logger.info("Duplicate webhook delivery dropped",
+                       hotel_id=hotel.id,
+                       green_api_message_id=message_id)
+            return JSONResponse(
+                status_code=200,
+                content={"status": "duplicate", "message": "Webhook already received"}
+            )
+
+    try:
+        submitted = get_webhook_queue().submit_webhook(hotel, parsed_webhook)
+    except Exception:
+        await _release_claims(hotel, message_id, payload)
+        raise
+
+    if not submitted:
+        await _release_claims(hotel, message_id, payload)
+        logger.warning("Webhook queue saturated, asking Green API to retry",
+                      hotel_id=hotel.id,
+                      webhook_type=parsed_webhook.typeWebhook)
+        return JSONResponse(
+            status_code=503,
+            content={"status": "busy", "message": "Webhook queue is full, retry later"},
+            headers={"Retry-After": "1"}
+        )
+
+    return JSONResponse(
+        status_code=200,
+        content={"status": "received", "message": "Webhook processed successfully"}
+    )
 
 
 @router.post("/green-api")
 async def receive_green_api_webhook(
     request: Request,
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     x_green_api_instance: Optional[str] = Header(None, alias="X-Green-API-Instance"),
     x_green_api_signature: Optional[str] = Header(None, alias="X-Green-API-Signature")
 ):
@@ -49,9 +183,6 @@ async def receive_green_api_webhook(
     It validates the webhook signature and routes the webhook to the appropriate processor.
     """
     try:
-        # Get raw body for signature validation
-        body = await request.body()
-        
         # Validate content type
         content_type = request.headers.get("Content-Type", "")
         try:
@@ -60,14 +191,16 @@ async def receive_green_api_webhook(
             logger.error("Invalid content type for webhook", content_type=content_type, error=str(e))
             raise HTTPException(status_code=400, detail="Invalid content type")
 
-        # Parse and sanitize JSON data
+        # Parsed and sanitized payload, read once (usually by the webhook security stage)
         try:
-            webhook_data = await request.json()
-            # Sanitize webhook data to prevent injection attacks
-            webhook_data = validate_safe_json(webhook_data)
+            payload = await read_webhook_payload(request)
         except Exception as e:
             logger.error("Failed to parse or sanitize webhook JSON", error=str(e))
             raise HTTPException(status_code=400, detail="Invalid JSON payload")
+        webhook_data = payload.data
+        if not isinstance(webhook_data, dict):
+            logger.error("Webhook payload is not a JSON object")
+            raise HTTPException(status_code=400, detail="Invalid JSON payload")
         
         # Extract instance data
         instance_data = webhook_data.get("instanceData", {})
@@ -84,42 +217,7 @@ async def receive_green_api_webhook(
             raise HTTPException(status_code=404, detail="Hotel not found")
         
         # Validate webhook signature if hotel has webhook token
-        if hotel.green_api_webhook_token:
-            # Use enhanced validation with timestamp and replay protection
-            try:
-                timestamp = webhook_data.get("timestamp")
-                is_valid = validate_green_api_webhook_enhanced(
-                    body=body,
-                    signature=x_green_api_signature,
-                    secret=hotel.green_api_webhook_token,
-                    timestamp=timestamp,
-                    config=GreenAPIWebhookConfig()
-                )
-
-                if not is_valid:
-                    logger.error("Enhanced webhook signature validation failed",
-                               hotel_id=hotel.id,
-                               instance_id=instance_id,
-                               timestamp=timestamp)
-                    raise HTTPException(status_code=401, detail="Invalid webhook signature")
-
-            except Exception as e:
-                logger.error("Webhook validation error",
-                           hotel_id=hotel.id,
-                           instance_id=instance_id,
-                           error=str(e))
-                # Fallback to basic validation for backward compatibility
-                is_valid = validate_green_api_webhook(
-                    body=body,
-                    signature=x_green_api_signature,
-                    secret=hotel.green_api_webhook_token
-                )
-
-                if not is_valid:
-                    logger.error("Fallback webhook signature validation failed",
-                               hotel_id=hotel.id,
-                               instance_id=instance_id)
-                    raise HTTPException(status_code=401, detail="Invalid webhook signature")
+        await verify_hotel_webhook(request, payload, hotel, instance_id, x_green_api_signature)
         
         # Extract webhook type
         webhook_type = webhook_data.get("typeWebhook")
@@ -143,19 +241,8 @@ async def receive_green_api_webhook(
                         error=str(e))
             raise HTTPException(status_code=400, detail=f"Invalid webhook data: {str(e)}")
         
-        # Process webhook asynchronously
-        processor = WebhookProcessor(db)
-        background_tasks.add_task(
-            processor.process_webhook,
-            hotel=hotel,
-            webhook_data=parsed_webhook
-        )
-        
-        # Return success response
-        return JSONResponse(
-            status_code=200,
-            content={"status": "received", "message": "Webhook processed successfully"}
-        )
+        # Process webhook asynchronously on the ingestion queue
+        return await enqueue_webhook(hotel, parsed_webhook, payload)
         
     except HTTPException:
         raise
@@ -168,8 +255,7 @@ async def receive_green_api_webhook(
 async def receive_green_api_webhook_with_instance(
     instance_id: str,
     request: Request,
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     x_green_api_signature: Optional[str] = Header(None, alias="X-Green-API-Signature")
 ):
     """
@@ -179,15 +265,16 @@ async def receive_green_api_webhook_with_instance(
     This is useful when Green API is configured to send webhooks to specific URLs.
     """
     try:
-        # Get raw body for signature validation
-        body = await request.body()
-        
-        # Parse JSON data
+        # Parsed and sanitized payload, read once (usually by the webhook security stage)
         try:
-            webhook_data = await request.json()
+            payload = await read_webhook_payload(request)
         except Exception as e:
             logger.error("Failed to parse webhook JSON", error=str(e))
             raise HTTPException(status_code=400, detail="Invalid JSON payload")
+        webhook_data = payload.data
+        if not isinstance(webhook_data, dict):
+            logger.error("Webhook payload is not a JSON object")
+            raise HTTPException(status_code=400, detail="Invalid JSON payload")
         
         # Find hotel by instance ID
         hotel = await get_hotel_by_instance_id(instance_id, db)
@@ -196,42 +283,7 @@ async def receive_green_api_webhook_with_instance(
             raise HTTPException(status_code=404, detail="Hotel not found")
         
         # Validate webhook signature if hotel has webhook token
-        if hotel.green_api_webhook_token:
-            # Use enhanced validation with timestamp and replay protection
-            try:
-                timestamp = webhook_data.get("timestamp")
-                is_valid = validate_green_api_webhook_enhanced(
-                    body=body,
-                    signature=x_green_api_signature,
-                    secret=hotel.green_api_webhook_token,
-                    timestamp=timestamp,
-                    config=GreenAPIWebhookConfig()
-                )
-
-                if not is_valid:
-                    logger.error("Enhanced webhook signature validation failed",
-                               hotel_id=hotel.id,
-                               instance_id=instance_id,
-                               timestamp=timestamp)
-                    raise HTTPException(status_code=401, detail="Invalid webhook signature")
-
-            except Exception as e:
-                logger.error("Webhook validation error",
-                           hotel_id=hotel.id,
-                           instance_id=instance_id,
-                           error=str(e))
-                # Fallback to basic validation for backward compatibility
-                is_valid = validate_green_api_webhook(
-                    body=body,
-                    signature=x_green_api_signature,
-                    secret=hotel.green_api_webhook_token
-                )
-
-                if not is_valid:
-                    logger.error("Fallback webhook signature validation failed",
-                               hotel_id=hotel.id,
-                               instance_id=instance_id)
-                    raise HTTPException(status_code=401, detail="Invalid webhook signature")
+        await verify_hotel_webhook(request, payload, hotel, instance_id, x_green_api_signature)
         
         # Extract webhook type
         webhook_type = webhook_data.get("typeWebhook")
@@ -255,19 +307,8 @@ async def receive_green_api_webhook_with_instance(
                         error=str(e))
             raise HTTPException(status_code=400, detail=f"Invalid webhook data: {str(e)}")
         
-        # Process webhook asynchronously
-        processor = WebhookProcessor(db)
-        background_tasks.add_task(
-            processor.process_webhook,
-            hotel=hotel,
-            webhook_data=parsed_webhook
-        )
-        
-        # Return success response
-        return JSONResponse(
-            status_code=200,
-            content={"status": "received", "message": "Webhook processed successfully"}
-        )
+        # Process webhook asynchronously on the ingestion queue
+        return await enqueue_webhook(hotel, parsed_webhook, payload)
         
     except HTTPException:
         raise
@@ -297,7 +338,7 @@ async def webhook_health_check():
 @router.get("/green-api/test/{instance_id}")
 async def test_webhook_endpoint(
     instance_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Test endpoint to verify webhook configuration
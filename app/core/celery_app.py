@@ -33,7 +33,8 @@ def create_celery_app() -> Celery:
             'app.tasks.analyze_message_sentiment',
             'app.tasks.send_staff_alert',
             'app.tasks.email_tasks',
-            'app.tasks.maintenance'
+            'app.tasks.maintenance',
+            'app.tasks.reconcile_counters'
         ]
     )
 
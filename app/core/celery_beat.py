@@ -161,6 +161,15 @@ class CeleryBeatConfig:
             }
         },
         
+        'reconcile-conversation-counters': {
+            'task': 'app.tasks.reconcile_counters.reconcile_conversation_counters_task',
+            'schedule': timedelta(hours=1),  # Every hour
+            'options': {
+                'queue': 'maintenance',
+                'priority': 2
+            }
+        },
+        
         # Metrics collection
         'collect-system-metrics': {
             'task': 'app.tasks.monitoring.collect_system_metrics',
@@ -2,7 +2,7 @@
 Circuit breaker configuration for different services
 """
 
-from typing import Dict
+from typing import Any, Dict
 from app.utils.circuit_breaker import CircuitBreakerConfig
 from app.core.config import settings
 
@@ -113,6 +113,25 @@ def get_circuit_breaker_config(service_name: str) -> CircuitBreakerConfig:
     return CIRCUIT_BREAKER_CONFIGS.get(service_name, CircuitBreakerConfig())
 
 
+def get_bulkhead_limits(service_name: str) -> Dict[str, Any]:
+    """
+    Get per-tenant bulkhead limits for an outbound provider
+    
+    Args:
+        service_name: Name of the provider's circuit breaker
+        
+    Returns:
+        Keyword arguments for get_bulkhead
+    """
+    prefix = {"green_api": "GREEN_API", "deepseek_api": "DEEPSEEK"}.get(service_name, service_name.upper())
+    return {
+        "max_concurrency": getattr(settings, f"{prefix}_MAX_CONCURRENCY", 100),
+        "max_concurrency_per_tenant": getattr(settings, f"{prefix}_TENANT_MAX_CONCURRENCY", 10),
+        "idle_ttl": float(getattr(settings, "BULKHEAD_IDLE_TTL_SECONDS", 600)),
+        "provider_min_tenants": getattr(settings, "BULKHEAD_PROVIDER_MIN_TENANTS", 2)
+    }
+
+
 def update_circuit_breaker_config(service_name: str, config: CircuitBreakerConfig) -> None:
     """
     Update circuit breaker configuration for a service
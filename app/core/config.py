@@ -59,6 +59,45 @@ class Settings(BaseSettings):
     CELERY_BROKER_URL: str = "redis://localhost:6379/0"
     CELERY_RESULT_BACKEND: str = "redis://localhost:6379/1"
     
+    # Webhook ingestion queue
+    WEBHOOK_QUEUE_MAX_SIZE: int = Field(default=10000, env="WEBHOOK_QUEUE_MAX_SIZE")
+    WEBHOOK_QUEUE_WORKERS: int = Field(default=8, env="WEBHOOK_QUEUE_WORKERS")
+    WEBHOOK_BATCH_ENABLED: bool = Field(default=True, env="WEBHOOK_BATCH_ENABLED")
+    WEBHOOK_BATCH_MAX_SIZE: int = Field(default=200, env="WEBHOOK_BATCH_MAX_SIZE")
+    WEBHOOK_BATCH_MAX_DELAY_MS: float = Field(default=5.0, env="WEBHOOK_BATCH_MAX_DELAY_MS")
+    WEBHOOK_BATCH_MAX_PENDING: int = Field(default=2000, env="WEBHOOK_BATCH_MAX_PENDING")
+    WEBHOOK_DEDUP_TTL_SECONDS: int = Field(default=86400, env="WEBHOOK_DEDUP_TTL_SECONDS")
+    WEBHOOK_DEDUP_LOCAL_SIZE: int = Field(default=50000, env="WEBHOOK_DEDUP_LOCAL_SIZE")
+
+    # In-process hotel directory (webhook and tenant resolution)
+    HOTEL_DIRECTORY_REFRESH_SECONDS: float = Field(default=30.0, env="HOTEL_DIRECTORY_REFRESH_SECONDS")
+    HOTEL_DIRECTORY_FULL_RELOAD_SECONDS: float = Field(default=600.0, env="HOTEL_DIRECTORY_FULL_RELOAD_SECONDS")
+    HOTEL_DIRECTORY_NEGATIVE_TTL_SECONDS: float = Field(default=5.0, env="HOTEL_DIRECTORY_NEGATIVE_TTL_SECONDS")
+    HOTEL_DIRECTORY_CHANNEL: str = Field(default="hotel_directory:invalidate", env="HOTEL_DIRECTORY_CHANNEL")
+
+    # Authenticated principal cache
+    PRINCIPAL_CACHE_TTL_SECONDS: float = Field(default=30.0, env="PRINCIPAL_CACHE_TTL_SECONDS")
+    PRINCIPAL_CACHE_NEGATIVE_TTL_SECONDS: float = Field(default=10.0, env="PRINCIPAL_CACHE_NEGATIVE_TTL_SECONDS")
+    PRINCIPAL_CACHE_MAX_SIZE: int = Field(default=10000, env="PRINCIPAL_CACHE_MAX_SIZE")
+    PRINCIPAL_CACHE_CHANNEL: str = Field(default="principal_cache:invalidate", env="PRINCIPAL_CACHE_CHANNEL")
+    
+    # Compiled trigger index
+    TRIGGER_INDEX_TTL_SECONDS: int = Field(default=60, env="TRIGGER_INDEX_TTL_SECONDS")
+    
+    # Conversation memory
+    CONVERSATION_MEMORY_LEGACY_FALLBACK: bool = Field(default=True, env="CONVERSATION_MEMORY_LEGACY_FALLBACK")
+    
+    # Per-hotel bulkheads for outbound providers
+    GREEN_API_MAX_CONCURRENCY: int = Field(default=100, env="GREEN_API_MAX_CONCURRENCY")
+    GREEN_API_TENANT_MAX_CONCURRENCY: int = Field(default=10, env="GREEN_API_TENANT_MAX_CONCURRENCY")
+    DEEPSEEK_MAX_CONCURRENCY: int = Field(default=50, env="DEEPSEEK_MAX_CONCURRENCY")
+    DEEPSEEK_TENANT_MAX_CONCURRENCY: int = Field(default=5, env="DEEPSEEK_TENANT_MAX_CONCURRENCY")
+    BULKHEAD_IDLE_TTL_SECONDS: int = Field(default=600, env="BULKHEAD_IDLE_TTL_SECONDS")
+    BULKHEAD_PROVIDER_MIN_TENANTS: int = Field(default=2, env="BULKHEAD_PROVIDER_MIN_TENANTS")
+    
+    # Single-frame ASGI request pipeline in place of the BaseHTTPMiddleware stack
+    REQUEST_PIPELINE_ENABLED: bool = Field(default=True, env="REQUEST_PIPELINE_ENABLED")
+    
     # Logging
     LOG_LEVEL: str = "INFO"
     LOG_FORMAT: str = "json"
@@ -79,6 +118,10 @@ class Settings(BaseSettings):
     DEEPSEEK_RETRY_DELAY: float = Field(default=1.0, env="DEEPSEEK_RETRY_DELAY")
     DEEPSEEK_CACHE_ENABLED: bool = Field(default=True, env="DEEPSEEK_CACHE_ENABLED")
     DEEPSEEK_CACHE_TTL: int = Field(default=3600, env="DEEPSEEK_CACHE_TTL")
+    # Near-duplicate tier: "off", "shadow" (measure paraphrase agreement) or "serve"
+    DEEPSEEK_SEMANTIC_CACHE_MODE: str = Field(default="shadow", env="DEEPSEEK_SEMANTIC_CACHE_MODE")
+    DEEPSEEK_SEMANTIC_CACHE_THRESHOLD: float = Field(default=0.85, env="DEEPSEEK_SEMANTIC_CACHE_THRESHOLD")
+    DEEPSEEK_SEMANTIC_CACHE_MAX_ENTRIES: int = Field(default=1000, env="DEEPSEEK_SEMANTIC_CACHE_MAX_ENTRIES")
 
     # Sentiment Analysis Configuration
     SENTIMENT_POSITIVE_THRESHOLD: float = Field(default=0.3, env="SENTIMENT_POSITIVE_THRESHOLD")
@@ -88,6 +131,11 @@ class Settings(BaseSettings):
     SENTIMENT_NOTIFY_ON_NEGATIVE: bool = Field(default=True, env="SENTIMENT_NOTIFY_ON_NEGATIVE")
     SENTIMENT_NOTIFY_ON_ATTENTION: bool = Field(default=True, env="SENTIMENT_NOTIFY_ON_ATTENTION")
     SENTIMENT_DEFAULT_LANGUAGE: str = Field(default="en", env="SENTIMENT_DEFAULT_LANGUAGE")
+    SENTIMENT_BATCH_MAX_MESSAGES: int = Field(default=10, env="SENTIMENT_BATCH_MAX_MESSAGES")
+    SENTIMENT_BATCH_MAX_TOKENS: int = Field(default=2000, env="SENTIMENT_BATCH_MAX_TOKENS")
+    SENTIMENT_BATCH_MAX_MESSAGE_TOKENS: int = Field(default=200, env="SENTIMENT_BATCH_MAX_MESSAGE_TOKENS")
+    SENTIMENT_BATCH_MAX_WAIT_MS: int = Field(default=50, env="SENTIMENT_BATCH_MAX_WAIT_MS")
+    SENTIMENT_BATCH_CONCURRENCY: int = Field(default=20, env="SENTIMENT_BATCH_CONCURRENCY")
 
     # Response Generation Configuration
     RESPONSE_MAX_TOKENS: int = Field(default=500, env="RESPONSE_MAX_TOKENS")
@@ -98,6 +146,10 @@ class Settings(BaseSettings):
     RESPONSE_MAX_LENGTH: int = Field(default=1000, env="RESPONSE_MAX_LENGTH")
     RESPONSE_USE_GUEST_PREFERENCES: bool = Field(default=True, env="RESPONSE_USE_GUEST_PREFERENCES")
     RESPONSE_USE_HOTEL_BRANDING: bool = Field(default=True, env="RESPONSE_USE_HOTEL_BRANDING")
+    # Streaming: send long answers sentence by sentence while they are generated
+    RESPONSE_STREAMING_ENABLED: bool = Field(default=False, env="RESPONSE_STREAMING_ENABLED")
+    RESPONSE_STREAM_MIN_CHUNK_CHARS: int = Field(default=80, env="RESPONSE_STREAM_MIN_CHUNK_CHARS")
+    RESPONSE_STREAM_MAX_CHUNK_CHARS: int = Field(default=1000, env="RESPONSE_STREAM_MAX_CHUNK_CHARS")
 
     # Monitoring
     PROMETHEUS_ENABLED: bool = False
@@ -78,6 +78,13 @@ class SentimentConfig(BaseModel):
         description="Supported languages for sentiment analysis"
     )
     default_language: str = Field(default="en", description="Default language for analysis")
+    
+    # Batching: short messages analyzed together share one prompt
+    batch_max_messages: int = Field(default=10, ge=1, le=50, description="Max messages per batched prompt")
+    batch_max_tokens: int = Field(default=2000, ge=100, description="Max estimated message tokens per batched prompt")
+    batch_max_message_tokens: int = Field(default=200, ge=10, description="Longer messages are analyzed alone")
+    batch_max_wait_ms: int = Field(default=50, ge=0, le=5000, description="Max time a message waits for its batch")
+    batch_concurrency: int = Field(default=20, ge=1, le=200, description="Messages analyzed concurrently by batch tasks")
 
 
 class ResponseGenerationConfig(BaseModel):
@@ -98,6 +105,11 @@ class ResponseGenerationConfig(BaseModel):
     # Personalization
     use_guest_preferences: bool = Field(default=True, description="Use guest preferences for personalization")
     use_hotel_branding: bool = Field(default=True, description="Include hotel branding in responses")
+    
+    # Streaming
+    streaming_enabled: bool = Field(default=False, description="Send long responses in chunks as they are generated")
+    stream_min_chunk_chars: int = Field(default=80, ge=1, description="Shortest sentence chunk sent on its own")
+    stream_max_chunk_chars: int = Field(default=1000, ge=100, le=4096, description="Longest chunk before a forced cut")
 
 
 def get_deepseek_config() -> DeepSeekConfig:
@@ -139,7 +151,12 @@ def get_sentiment_config() -> SentimentConfig:
             min_confidence=getattr(settings, 'SENTIMENT_MIN_CONFIDENCE', 0.6),
             notify_on_negative=getattr(settings, 'SENTIMENT_NOTIFY_ON_NEGATIVE', True),
             notify_on_attention=getattr(settings, 'SENTIMENT_NOTIFY_ON_ATTENTION', True),
-            default_language=getattr(settings, 'SENTIMENT_DEFAULT_LANGUAGE', 'en')
+            default_language=getattr(settings, 'SENTIMENT_DEFAULT_LANGUAGE', 'en'),
+            batch_max_messages=getattr(settings, 'SENTIMENT_BATCH_MAX_MESSAGES', 10),
+            batch_max_tokens=getattr(settings, 'SENTIMENT_BATCH_MAX_TOKENS', 2000),
+            batch_max_message_tokens=getattr(settings, 'SENTIMENT_BATCH_MAX_MESSAGE_TOKENS', 200),
+            batch_max_wait_ms=getattr(settings, 'SENTIMENT_BATCH_MAX_WAIT_MS', 50),
+            batch_concurrency=getattr(settings, 'SENTIMENT_BATCH_CONCURRENCY', 20)
         )
         
         logger.info("Sentiment configuration loaded successfully",
@@ -165,7 +182,10 @@ def get_response_generation_config() -> ResponseGenerationConfig:
             min_response_length=getattr(settings, 'RESPONSE_MIN_LENGTH', 10),
             max_response_length=getattr(settings, 'RESPONSE_MAX_LENGTH', 1000),
             use_guest_preferences=getattr(settings, 'RESPONSE_USE_GUEST_PREFERENCES', True),
-            use_hotel_branding=getattr(settings, 'RESPONSE_USE_HOTEL_BRANDING', True)
+            use_hotel_branding=getattr(settings, 'RESPONSE_USE_HOTEL_BRANDING', True),
+            streaming_enabled=getattr(settings, 'RESPONSE_STREAMING_ENABLED', False),
+            stream_min_chunk_chars=getattr(settings, 'RESPONSE_STREAM_MIN_CHUNK_CHARS', 80),
+            stream_max_chunk_chars=getattr(settings, 'RESPONSE_STREAM_MAX_CHUNK_CHARS', 1000)
         )
         
         logger.info("Response generation configuration loaded successfully",
@@ -37,6 +37,27 @@ rate_limit_violations = Counter(
     registry=REGISTRY
 )
 
+rate_limit_lease_decisions_total = Counter(
+    'rate_limit_lease_decisions_total',
+    'Rate limit decisions by where they were made',
+    ['result'],  # result: local/redis/denied/fallback
+    registry=REGISTRY
+)
+
+rate_limit_lease_tokens_total = Counter(
+    'rate_limit_lease_tokens_total',
+    'Rate limit quota leased from and returned to Redis',
+    ['operation'],  # operation: leased/returned/expired
+    registry=REGISTRY
+)
+
+single_flight_requests_total = Counter(
+    'single_flight_requests_total',
+    'Coalesced calls by how each request was served',
+    ['flight', 'result'],  # result: leader/coalesced/remote/fallback
+    registry=REGISTRY
+)
+
 # System Health Metrics (CRITICAL)
 external_api_errors = Counter(
     'external_api_errors_total',
@@ -296,6 +317,19 @@ def track_trigger_execution(trigger_type: str, hotel_id: str, success: bool = Tr
         status=status
     ).inc()
 
+def track_rate_limit_decision(result: str):
+    """Track where a rate limit decision was made"""
+    rate_limit_lease_decisions_total.labels(result=result).inc()
+
+def track_rate_limit_lease_tokens(operation: str, tokens: int):
+    """Track leased rate limit quota"""
+    if tokens > 0:
+        rate_limit_lease_tokens_total.labels(operation=operation).inc(tokens)
+
+def track_single_flight(flight: str, result: str):
+    """Track how a coalesced request was served"""
+    single_flight_requests_total.labels(flight=flight, result=result).inc()
+
 # Decorator for automatic metrics tracking
 def track_performance(metric_name: str, labels: Optional[Dict[str, str]] = None):
     """Decorator to automatically track function performance"""
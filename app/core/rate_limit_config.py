@@ -19,6 +19,16 @@ class RateLimitAlgorithm(str, Enum):
     SLIDING_WINDOW = "sliding_window"
     TOKEN_BUCKET = "token_bucket"
     LEAKY_BUCKET = "leaky_bucket"
+    # Generic cell rate algorithm: one timestamp per window instead of a log
+    GCRA = "gcra"
+
+
+class RateLimitMode(str, Enum):
+    """Where rate limit decisions are made"""
+    # Every request is checked against Redis
+    DIRECT = "direct"
+    # Quota is leased from Redis in chunks and spent locally
+    LEASED = "leased"
 
 
 class RateLimitScope(str, Enum):
@@ -266,6 +276,24 @@ class RateLimitConfig(BaseModel):
     key_prefix: str = Field(
         default="rate_limit:", description="Redis key prefix"
     )
+
+    # Local lease tier
+    mode: RateLimitMode = Field(
+        default=RateLimitMode.DIRECT,
+        description="Check every request in Redis or spend leased quota locally"
+    )
+    lease_fraction: float = Field(
+        default=0.1, gt=0, le=1,
+        description="Share of the tightest window leased per Redis round trip"
+    )
+    max_lease_size: int = Field(
+        default=50, ge=1,
+        description="Maximum requests leased at once; bounds over-admission per process and key"
+    )
+    max_lease_seconds: float = Field(
+        default=5.0, gt=0,
+        description="Maximum time leased quota may be spent locally"
+    )
     
     # Default limits
     default_global_limit: RateLimitRule = Field(
@@ -331,6 +359,7 @@ RATE_LIMIT_CONFIGS = {
     
     "staging": RateLimitConfig(
         strict_mode=True,
+        mode=RateLimitMode.LEASED,
         default_global_limit=RateLimitRule(
             name="staging_global",
             scope=RateLimitScope.GLOBAL,
@@ -341,6 +370,7 @@ RATE_LIMIT_CONFIGS = {
     
     "production": RateLimitConfig(
         strict_mode=True,
+        mode=RateLimitMode.LEASED,
         default_global_limit=RateLimitRule(
             name="prod_global",
             scope=RateLimitScope.GLOBAL,
@@ -374,6 +404,7 @@ def get_rate_limit_config(environment: str = "production") -> RateLimitConfig:
         "Loaded rate limit configuration",
         environment=environment,
         strict_mode=config.strict_mode,
+        mode=config.mode.value,
         enabled=config.enabled
     )
     
@@ -383,6 +414,7 @@ def get_rate_limit_config(environment: str = "production") -> RateLimitConfig:
 # Export main classes and functions
 __all__ = [
     'RateLimitAlgorithm',
+    'RateLimitMode',
     'RateLimitScope', 
     'RateLimitRule',
     'RateLimitConfig',
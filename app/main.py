@@ -29,6 +29,10 @@ from app.middleware.circuit_breaker_middleware import add_circuit_breaker_middle
 from app.utils.dependency_checker import dependency_monitor, register_default_dependencies
 from app.utils.degradation_handler import get_degradation_handler
 from app.core.performance_integration import initialize_performance_optimizations, cleanup_performance_optimizations
+from app.services.webhook_queue import start_webhook_queue, stop_webhook_queue
+from app.services.hotel_directory import start_hotel_directory, stop_hotel_directory
+from app.services.principal_cache import start_principal_cache, stop_principal_cache
+from app.utils.rate_limit_lease import release_rate_limit_leases
 
 # Setup logging
 setup_logging()
@@ -74,6 +78,18 @@ async def lifespan(app: FastAPI):
         await degradation_handler.start_monitoring(interval=30.0)
         logger.info("Degradation monitoring started")
 
+        # Load hotels for webhook and tenant resolution
+        await start_hotel_directory()
+        logger.info("Hotel directory loaded")
+
+        # Evict principals changed by other workers
+        await start_principal_cache()
+        logger.info("Principal cache invalidation listener started")
+
+        # Start webhook ingestion workers
+        await start_webhook_queue()
+        logger.info("Webhook ingestion queue started")
+
         # Start Green API monitoring
         try:
             from app.services.green_api_monitoring import start_monitoring
@@ -107,6 +123,31 @@ async def lifespan(app: FastAPI):
         except Exception as e:
             logger.warning(f"Error stopping degradation monitoring: {e}")
 
+        # Drain webhook ingestion queue
+        try:
+            await stop_webhook_queue()
+            logger.info("Webhook ingestion queue stopped")
+        except Exception as e:
+            logger.warning(f"Error stopping webhook ingestion queue: {e}")
+
+        try:
+            await stop_hotel_directory()
+            logger.info("Hotel directory stopped")
+        except Exception as e:
+            logger.warning(f"Error stopping hotel directory: {e}")
+
+        try:
+            await stop_principal_cache()
+            logger.info("Principal cache invalidation listener stopped")
+        except Exception as e:
+            logger.warning(f"Error stopping principal cache: {e}")
+
+        # Return unspent rate limit quota to Redis
+        try:
+            await release_rate_limit_leases()
+        except Exception as e:
+            logger.warning(f"Error returning rate limit leases: {e}")
+
         # Cancel monitoring task
         try:
             if 'monitoring_task' in locals():
@@ -143,62 +184,85 @@ app = FastAPI(
 # Enhanced security headers middleware - temporarily disabled due to CSP header issues
 # app.add_middleware(SecurityHeadersMiddleware)
 
-# Webhook security middleware (for webhook endpoints)
-from app.middleware.webhook_security import add_webhook_security_middleware
-add_webhook_security_middleware(
-    app,
-    webhook_paths={
-        "/api/v1/webhooks/green-api",
-        "/api/v1/webhooks/green-api/",
-        "/webhooks/green-api",
-        "/webhooks/green-api/"
-    },
-    environment=settings.ENVIRONMENT
-)
+WEBHOOK_PATHS = {
+    "/api/v1/webhooks/green-api",
+    "/api/v1/webhooks/green-api/",
+    "/webhooks/green-api",
+    "/webhooks/green-api/"
+}
+TENANT_EXCLUDED_PATHS = ["/", "/health", "/docs", "/redoc", "/openapi.json", "/favicon.ico"]
+
+if settings.REQUEST_PIPELINE_ENABLED:
+    # Webhook security, rate limiting, circuit breaking, health checks,
+    # Green API monitoring, auth, hotel tenant/permissions, logging and
+    # monitoring as stages of one pure ASGI middleware, in the same order
+    from app.middleware.pipeline_stages import add_request_pipeline
+    add_request_pipeline(
+        app,
+        webhook_paths=WEBHOOK_PATHS,
+        environment=settings.ENVIRONMENT,
+        rate_limit_storage_backend="redis",
+        hotel_header="X-Hotel-ID",
+        require_hotel=False,  # Not required for all endpoints
+        tenant_excluded_paths=TENANT_EXCLUDED_PATHS,
+        enable_permissions=True,
+        enable_request_logging=True,
+        enable_response_logging=True,
+        enable_body_logging=settings.DEBUG,
+        performance_only=settings.ENVIRONMENT == 'production'
+    )
+else:
+    # Webhook security middleware (for webhook endpoints)
+    from app.middleware.webhook_security import add_webhook_security_middleware
+    add_webhook_security_middleware(
+        app,
+        webhook_paths=WEBHOOK_PATHS,
+        environment=settings.ENVIRONMENT
+    )
 
-# Comprehensive rate limiting middleware (replaces basic rate limiting)
-from app.middleware.rate_limiter import add_comprehensive_rate_limiting
-add_comprehensive_rate_limiting(
-    app,
-    environment=settings.ENVIRONMENT,
-    storage_backend="redis"
-)
+    # Comprehensive rate limiting middleware (replaces basic rate limiting)
+    from app.middleware.rate_limiter import add_comprehensive_rate_limiting
+    add_comprehensive_rate_limiting(
+        app,
+        environment=settings.ENVIRONMENT,
+        storage_backend="redis"
+    )
 
-# Circuit breaker middleware (for reliability)
-add_circuit_breaker_middleware(app)
+    # Circuit breaker middleware (for reliability)
+    add_circuit_breaker_middleware(app)
 
-# Health check middleware (for optimized health check logging)
-app.add_middleware(HealthCheckMiddleware)
+    # Health check middleware (for optimized health check logging)
+    app.add_middleware(HealthCheckMiddleware)
 
-# Green API monitoring middleware
-from app.middleware.green_api_middleware import GreenAPIMiddleware
-app.add_middleware(GreenAPIMiddleware)
+    # Green API monitoring middleware
+    from app.middleware.green_api_middleware import GreenAPIMiddleware
+    app.add_middleware(GreenAPIMiddleware)
 
-# User authentication middleware
-from app.middleware.auth_middleware import AuthMiddleware
-app.add_middleware(AuthMiddleware)
+    # User authentication middleware
+    from app.middleware.auth_middleware import AuthMiddleware
+    app.add_middleware(AuthMiddleware)
 
-# Hotel tenant middleware (for multi-tenancy support)
-from app.middleware.tenant_middleware import add_hotel_tenant_middlewares
-add_hotel_tenant_middlewares(
-    app,
-    hotel_header="X-Hotel-ID",
-    require_hotel=False,  # Not required for all endpoints
-    excluded_paths=["/", "/health", "/docs", "/redoc", "/openapi.json", "/favicon.ico"],
-    enable_permissions=True
-)
+    # Hotel tenant middleware (for multi-tenancy support)
+    from app.middleware.tenant_middleware import add_hotel_tenant_middlewares
+    add_hotel_tenant_middlewares(
+        app,
+        hotel_header="X-Hotel-ID",
+        require_hotel=False,  # Not required for all endpoints
+        excluded_paths=TENANT_EXCLUDED_PATHS,
+        enable_permissions=True
+    )
 
-# Logging middleware (should be early in the chain)
-logging_middleware = create_logging_middleware(
-    enable_request_logging=True,
-    enable_response_logging=True,
-    enable_body_logging=settings.DEBUG,
-    performance_only=settings.ENVIRONMENT == 'production'
-)
-app.add_middleware(logging_middleware)
+    # Logging middleware (should be early in the chain)
+    logging_middleware = create_logging_middleware(
+        enable_request_logging=True,
+        enable_response_logging=True,
+        enable_body_logging=settings.DEBUG,
+        performance_only=settings.ENVIRONMENT == 'production'
+    )
+    app.add_middleware(logging_middleware)
 
-# Monitoring middleware (should be early in the chain)
-app.add_middleware(MonitoringMiddleware)
+    # Monitoring middleware (should be early in the chain)
+    app.add_middleware(MonitoringMiddleware)
 
 # CORS middleware (should be one of the last)
 app.add_middleware(
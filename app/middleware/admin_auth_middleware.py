@@ -11,10 +11,15 @@ from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import JSONResponse
 import structlog
 
-from app.core.admin_security import AdminSecurity, AdminTokenError, AdminAuthorizationError
+from app.core.admin_security import AdminSecurity, AdminTokenError
 from app.models.admin_user import AdminPermission, AdminRole
 from app.models.admin_audit_log import AuditAction, AuditSeverity
 from app.utils.admin_audit import AdminAuditLogger
+from app.utils.path_matcher import PREFIX, PathPatternMap
+from app.utils.permission_bits import ADMIN_PERMISSION_BITS
+from app.services.principal_cache import (
+    PRINCIPAL_ADMIN, Principal, TokenRevokedError, get_principal_cache, load_admin_principal, token_version
+)
 
 logger = structlog.get_logger(__name__)
 
@@ -75,9 +80,11 @@ class AdminAuthMiddleware(BaseHTTPMiddleware):
         
         try:
             # Extract and validate token
-            admin_user = await self._authenticate_request(request)
+            principal = await self._authenticate_request(request)
+            admin_user = principal.user
             
             # Add admin user to request state
+            request.state.admin_principal = principal
             request.state.admin_user = admin_user
             request.state.admin_user_id = admin_user.id
             request.state.admin_role = admin_user.role
@@ -148,7 +155,7 @@ class AdminAuthMiddleware(BaseHTTPMiddleware):
                 }
             )
     
-    async def _authenticate_request(self, request: Request):
+    async def _authenticate_request(self, request: Request) -> Principal:
         """
         Authenticate admin request
         
@@ -156,7 +163,7 @@ class AdminAuthMiddleware(BaseHTTPMiddleware):
             request: HTTP request
             
         Returns:
-            AdminUser: Authenticated admin user
+            Principal: Authenticated admin user with its resolved permissions
             
         Raises:
             HTTPException: If authentication fails
@@ -193,32 +200,46 @@ class AdminAuthMiddleware(BaseHTTPMiddleware):
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid or expired token"
             )
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid user ID in token"
+            )
         
-        # Get user from database (this would need to be injected or accessed differently)
-        # For now, we'll create a mock user from token data
-        from app.models.admin_user import AdminUser, AdminRole
+        # Get user from the principal cache, loading it on a miss
+        try:
+            principal = await get_principal_cache().resolve(
+                PRINCIPAL_ADMIN,
+                user_id,
+                token_version(token_payload),
+                load_admin_principal
+            )
+        except TokenRevokedError:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token has been revoked"
+            )
         
-        # In a real implementation, you'd fetch from database
-        # This is a simplified version for demonstration
-        admin_user = AdminUser(
-            id=user_id,
-            email=token_payload.get("email"),
-            username=token_payload.get("username"),
-            role=AdminRole(token_payload.get("role", "viewer")),
-            permissions=token_payload.get("permissions", []),
-            hotel_id=uuid.UUID(token_payload["hotel_id"]) if token_payload.get("hotel_id") else None,
-            is_active=True,
-            is_verified=True
-        )
+        if not principal:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="User not found"
+            )
         
         # Validate user status
-        if not admin_user.is_active:
+        if not principal.is_active:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Account is deactivated"
             )
         
-        return admin_user
+        if principal.is_locked:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Account is locked"
+            )
+        
+        return principal
     
     async def _log_request(
         self,
@@ -347,6 +368,14 @@ class AdminPermissionMiddleware(BaseHTTPMiddleware):
         """
         super().__init__(app)
         self.permission_map = permission_map or self._default_permission_map()
+        # Path prefix -> (required permissions, their mask), compiled once
+        self._required = PathPatternMap(
+            {
+                pattern: (permissions, ADMIN_PERMISSION_BITS.mask(permissions))
+                for pattern, permissions in self.permission_map.items()
+            },
+            syntax=PREFIX
+        )
     
     def _default_permission_map(self) -> Dict[str, List[AdminPermission]]:
         """Get default permission mappings"""
@@ -371,34 +400,29 @@ class AdminPermissionMiddleware(BaseHTTPMiddleware):
             Response: HTTP response
         """
         # Check if admin user is authenticated
-        admin_user = getattr(request.state, "admin_user", None)
-        if not admin_user:
+        principal = getattr(request.state, "admin_principal", None)
+        if not principal:
             return await call_next(request)
         
         # Check permissions for the requested path
-        required_permissions = self._get_required_permissions(request.url.path)
-        if required_permissions:
-            try:
-                for permission in required_permissions:
-                    AdminSecurity.validate_admin_access(
-                        admin_user=admin_user,
-                        required_permission=permission
-                    )
-            except AdminAuthorizationError as e:
+        required = self._required.lookup(request.url.path)
+        if required is not None:
+            required_permissions, required_mask = required
+            if not principal.allows(required_mask):
+                missing = [p.value for p in required_permissions if not principal.has_permission(p)]
                 logger.warning(
                     "Admin permission denied",
-                    user_id=str(admin_user.id),
+                    user_id=str(principal.user_id),
                     path=request.url.path,
                     required_permissions=[p.value for p in required_permissions],
-                    user_permissions=admin_user.permissions,
-                    error=str(e)
+                    user_permissions=sorted(principal.permissions)
                 )
                 
                 return JSONResponse(
                     status_code=status.HTTP_403_FORBIDDEN,
                     content={
                         "error": "Permission Denied",
-                        "message": str(e),
+                        "message": f"Insufficient permissions. Required: {', '.join(missing)}",
                         "error_code": "INSUFFICIENT_PERMISSIONS",
                         "required_permissions": [p.value for p in required_permissions]
                     }
@@ -416,7 +440,5 @@ class AdminPermissionMiddleware(BaseHTTPMiddleware):
         Returns:
             List[AdminPermission]: Required permissions
         """
-        for pattern, permissions in self.permission_map.items():
-            if path.startswith(pattern):
-                return permissions
-        return []
+        required = self._required.lookup(path)
+        return required[0] if required is not None else []
@@ -12,13 +12,14 @@ from fastapi import Request, Response, HTTPException, status
 from fastapi.responses import JSONResponse
 from starlette.middleware.base import BaseHTTPMiddleware
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
 import structlog
 
 from app.core.security import TokenError, AuthenticationError
 from app.utils.jwt_handler import JWTHandler
 from app.models.user import User
-from app.database import get_db
+from app.services.principal_cache import (
+    PRINCIPAL_USER, Principal, TokenRevokedError, get_principal_cache, load_user_principal, token_version
+)
 
 logger = structlog.get_logger(__name__)
 
@@ -95,31 +96,50 @@ class AuthMiddleware(BaseHTTPMiddleware):
         if request.url.path in self.excluded_paths:
             return await call_next(request)
         
+        rejection = await self._authenticate_or_reject(request, start_time)
+        if rejection is not None:
+            return rejection
+        
+        # Process request
+        response = await call_next(request)
+        
+        # Log successful request
+        processing_time = time.time() - start_time
+        await self._log_request(
+            request=request,
+            user=request.state.user,
+            status_code=response.status_code,
+            processing_time=processing_time,
+            success=True
+        )
+        
+        return response
+    
+    async def _authenticate_or_reject(self, request: Request, start_time: float) -> Optional[JSONResponse]:
+        """
+        Authenticate request and add the user to its state
+        
+        Args:
+            request: HTTP request
+            start_time: When processing of the request started
+            
+        Returns:
+            Optional[JSONResponse]: Error response if authentication failed
+        """
         try:
             # Extract and validate token
-            user = await self._authenticate_request(request)
+            principal = await self._authenticate_request(request)
+            user = principal.user
             
             # Add user to request state
+            request.state.principal = principal
             request.state.user = user
             request.state.user_id = user.id
             request.state.user_role = user.role
             request.state.user_permissions = user.permissions
             request.state.user_hotel_id = user.hotel_id
             
-            # Process request
-            response = await call_next(request)
-            
-            # Log successful request
-            processing_time = time.time() - start_time
-            await self._log_request(
-                request=request,
-                user=user,
-                status_code=response.status_code,
-                processing_time=processing_time,
-                success=True
-            )
-            
-            return response
+            return None
             
         except HTTPException as e:
             # Log failed request
@@ -185,7 +205,7 @@ class AuthMiddleware(BaseHTTPMiddleware):
         
         return False
     
-    async def _authenticate_request(self, request: Request) -> User:
+    async def _authenticate_request(self, request: Request) -> Principal:
         """
         Authenticate user request
         
@@ -193,7 +213,7 @@ class AuthMiddleware(BaseHTTPMiddleware):
             request: HTTP request
             
         Returns:
-            User: Authenticated user
+            Principal: Authenticated user with its resolved permissions
             
         Raises:
             HTTPException: If authentication fails
@@ -236,45 +256,47 @@ class AuthMiddleware(BaseHTTPMiddleware):
                 detail="Invalid user ID in token"
             )
         
-        # Get user from database
+        # Get user from the principal cache, loading it on a miss
         try:
-            # Get database session
-            async for db in get_db():
-                stmt = select(User).where(User.id == user_id)
-                result = await db.execute(stmt)
-                user = result.scalar_one_or_none()
-                break
-            
-            if not user:
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="User not found"
-                )
-            
-            # Check if user is active
-            if not user.is_active:
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="User account is deactivated"
-                )
-            
-            # Check if account is locked
-            if user.is_locked:
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="User account is locked"
-                )
-            
-            return user
-            
-        except HTTPException:
-            raise
+            principal = await get_principal_cache().resolve(
+                PRINCIPAL_USER,
+                user_id,
+                token_version(token_payload),
+                load_user_principal
+            )
+        except TokenRevokedError:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token has been revoked"
+            )
         except Exception as e:
             logger.error("Database error during authentication", error=str(e))
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Authentication failed"
             )
+        
+        if not principal:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="User not found"
+            )
+        
+        # Check if user is active
+        if not principal.is_active:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="User account is deactivated"
+            )
+        
+        # Check if account is locked
+        if principal.is_locked:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="User account is locked"
+            )
+        
+        return principal
     
     async def _log_request(
         self,
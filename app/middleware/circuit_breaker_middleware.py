@@ -171,6 +171,27 @@ class CircuitBreakerMiddleware(BaseHTTPMiddleware):
             return self._create_circuit_breaker_response(cb_name, e)
 
 
+def get_circuit_breaker_health_headers() -> Dict[str, str]:
+    """
+    Circuit breaker counts by state, as response headers for health checks
+    """
+    from app.utils.circuit_breaker import get_all_circuit_breakers
+    
+    circuit_breakers = get_all_circuit_breakers()
+    
+    # Count circuit breakers by state
+    states = {"closed": 0, "open": 0, "half_open": 0}
+    for cb in circuit_breakers.values():
+        states[cb.state.value] += 1
+    
+    return {
+        "X-Circuit-Breakers-Total": str(len(circuit_breakers)),
+        "X-Circuit-Breakers-Closed": str(states["closed"]),
+        "X-Circuit-Breakers-Open": str(states["open"]),
+        "X-Circuit-Breakers-Half-Open": str(states["half_open"])
+    }
+
+
 class CircuitBreakerHealthMiddleware(BaseHTTPMiddleware):
     """
     Middleware to add circuit breaker health information to responses
@@ -184,21 +205,8 @@ class CircuitBreakerHealthMiddleware(BaseHTTPMiddleware):
         
         # Add circuit breaker health headers for monitoring
         if request.url.path.startswith("/health") or request.url.path.startswith("/api/v1/health"):
-            from app.utils.circuit_breaker import get_all_circuit_breakers
-            
-            circuit_breakers = get_all_circuit_breakers()
-            
-            # Count circuit breakers by state
-            states = {"closed": 0, "open": 0, "half_open": 0}
-            for cb in circuit_breakers.values():
-                states[cb.state.value] += 1
-            
-            # Add headers
             if hasattr(response, 'headers'):
-                response.headers["X-Circuit-Breakers-Total"] = str(len(circuit_breakers))
-                response.headers["X-Circuit-Breakers-Closed"] = str(states["closed"])
-                response.headers["X-Circuit-Breakers-Open"] = str(states["open"])
-                response.headers["X-Circuit-Breakers-Half-Open"] = str(states["half_open"])
+                response.headers.update(get_circuit_breaker_health_headers())
         
         return response
 
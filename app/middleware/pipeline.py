@@ -0,0 +1,268 @@
+"""
+Single-frame ASGI request pipeline
+
+Each BaseHTTPMiddleware layer runs the rest of the stack in a task of its
+own and re-streams the response through a memory channel, so a stack of
+ten of them costs ten task hops and ten response copies per request. The
+pipeline runs the same concerns as ordered stages around one call to the
+application: stages see the request before it is handled, decorate the
+response headers as they go out, and record the outcome once the response
+is complete, all in the frame of a single ASGI call.
+
+Stages share one RequestContext per request. Which stages a path needs is
+decided from path-prefix tables compiled when the pipeline is built, and
+cached per path, so a health check does not walk through auth and tenant
+resolution.
+"""
+
+import asyncio
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from starlette.datastructures import MutableHeaders
+from starlette.exceptions import HTTPException
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Returned by PipelineStage.before when the stage does not apply to the
+# request after all; its response and completion hooks are not called
+SKIP = object()
+
+
+class PathPrefixTable:
+    """Path prefixes and exact paths, matched with one call each"""
+
+    def __init__(self, prefixes: Iterable[str] = (), exact: Iterable[str] = ()):
+        # str.startswith takes a tuple and tries each prefix in C
+        self.prefixes: Tuple[str, ...] = tuple(sorted(set(prefixes), key=len, reverse=True))
+        self.exact = frozenset(exact)
+
+    def matches(self, path: str) -> bool:
+        return path in self.exact or (bool(self.prefixes) and path.startswith(self.prefixes))
+
+    def __bool__(self) -> bool:
+        return bool(self.prefixes or self.exact)
+
+
+class RequestContext:
+    """Per-request state shared by the pipeline's stages"""
+
+    def __init__(self, scope: Scope, receive: Receive):
+        self.scope = scope
+        self.request = Request(scope, receive)
+        self.path: str = scope["path"]
+        self.method: str = scope["method"]
+        self.start_time = time.time()
+        self.client_ip = self._client_ip()
+
+        # Filled in by stages
+        self.correlation_id: Optional[str] = None
+        self.request_id: Optional[str] = None
+        self.hotel_id: Optional[Any] = None
+        self.principal: Optional[Any] = None
+        self.timeout: Optional[float] = None
+        self.data: Dict[str, Any] = {}
+
+        # Outcome
+        self.status_code: Optional[int] = None
+        self.response_headers: Optional[MutableHeaders] = None
+        self.error: Optional[BaseException] = None
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds since the pipeline received the request"""
+        return time.time() - self.start_time
+
+    @property
+    def response_started(self) -> bool:
+        return self.status_code is not None
+
+    def _client_ip(self) -> str:
+        headers = self.request.headers
+        forwarded_for = headers.get("x-forwarded-for")
+        if forwarded_for:
+            return forwarded_for.split(",")[0].strip()
+
+        real_ip = headers.get("x-real-ip")
+        if real_ip:
+            return real_ip.strip()
+
+        client = self.scope.get("client")
+        if client:
+            return client[0]
+
+        return "unknown"
+
+    def receive_for_app(self) -> Receive:
+        """
+        The receive channel to hand to the application
+
+        When a stage has read the body through the shared Request, the
+        application gets it replayed instead of an exhausted channel.
+        """
+        body = getattr(self.request, "_body", None)
+        if body is None:
+            return self.request.receive
+
+        replayed = False
+
+        async def receive() -> Message:
+            nonlocal replayed
+            if not replayed:
+                replayed = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await self.request.receive()
+
+        return receive
+
+
+class PipelineStage:
+    """
+    One cross-cutting concern of the request pipeline
+
+    Hooks run in pipeline order before the request is handled and in
+    reverse order on the way out, like the middleware layers they replace.
+    """
+
+    name = "stage"
+
+    def __init__(
+        self,
+        include: Optional[PathPrefixTable] = None,
+        exclude: Optional[PathPrefixTable] = None
+    ):
+        """
+        Args:
+            include: Paths the stage applies to; all paths if not given
+            exclude: Paths the stage never applies to
+        """
+        self.include = include
+        self.exclude = exclude
+
+    def applies_to(self, path: str) -> bool:
+        if self.include is not None and not self.include.matches(path):
+            return False
+        if self.exclude is not None and self.exclude.matches(path):
+            return False
+        return True
+
+    async def before(self, ctx: RequestContext) -> Any:
+        """
+        Called before the request is handled
+
+        Returns None to continue, a Response to answer the request without
+        calling the application, or SKIP if the stage does not apply.
+        """
+        return None
+
+    def on_start(self, ctx: RequestContext, headers: MutableHeaders) -> None:
+        """Called as the response starts; may change its headers"""
+
+    async def on_error(self, ctx: RequestContext, error: Exception) -> Optional[Response]:
+        """Called when handling fails before the response started; may answer instead"""
+        return None
+
+    async def after(self, ctx: RequestContext) -> None:
+        """Called once the response is complete or has failed"""
+
+
+class RequestPipeline:
+    """Pure ASGI middleware running PipelineStages around the application"""
+
+    def __init__(self, app: ASGIApp, stages: Sequence[PipelineStage] = (), path_cache_size: int = 1024):
+        self.app = app
+        self.stages = tuple(stages)
+        self.path_cache_size = path_cache_size
+        self._plans: Dict[str, Tuple[PipelineStage, ...]] = {}
+
+    def plan(self, path: str) -> Tuple[PipelineStage, ...]:
+        """The stages that apply to a path"""
+        plan = self._plans.get(path)
+        if plan is None:
+            plan = tuple(stage for stage in self.stages if stage.applies_to(path))
+            # Paths carry IDs, so bound the cache rather than keep every one
+            if len(self._plans) >= self.path_cache_size:
+                self._plans.clear()
+            self._plans[path] = plan
+        return plan
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        ctx = RequestContext(scope, receive)
+        entered: List[PipelineStage] = []
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", []))
+                headers = MutableHeaders(scope=message)
+                ctx.status_code = message["status"]
+                ctx.response_headers = headers
+                for stage in reversed(entered):
+                    stage.on_start(ctx, headers)
+            await send(message)
+
+        try:
+            response = None
+            for stage in self.plan(ctx.path):
+                try:
+                    result = await stage.before(ctx)
+                except HTTPException as e:
+                    result = JSONResponse(
+                        status_code=e.status_code,
+                        content={"detail": e.detail},
+                        headers=getattr(e, "headers", None)
+                    )
+                if result is SKIP:
+                    continue
+                if result is not None:
+                    response = result
+                    break
+                entered.append(stage)
+
+            if response is not None:
+                await response(scope, receive, send_wrapper)
+            elif ctx.timeout is not None:
+                await asyncio.wait_for(self.app(scope, ctx.receive_for_app(), send_wrapper), ctx.timeout)
+            else:
+                await self.app(scope, ctx.receive_for_app(), send_wrapper)
+
+        except Exception as error:
+            ctx.error = error
+            if ctx.response_started:
+                raise
+
+            response = None
+            for stage in reversed(entered):
+                response = await stage.on_error(ctx, error)
+                if response is not None:
+                    break
+            if response is None:
+                raise
+            await response(scope, receive, send_wrapper)
+
+        finally:
+            for stage in reversed(entered):
+                try:
+                    await stage.after(ctx)
+                except Exception as e:
+                    logger.error("Pipeline stage failed after response",
+                                 stage=stage.name,
+                                 path=ctx.path,
+                                 error=str(e))
+
+
+__all__ = [
+    'SKIP',
+    'PathPrefixTable',
+    'RequestContext',
+    'PipelineStage',
+    'RequestPipeline'
+]
@@ -0,0 +1,609 @@
+"""
+Request pipeline stages for the application's middleware concerns
+
+Each stage runs one of the concerns that main.py used to stack as
+BaseHTTPMiddleware layers, reusing that middleware's checks so both paths
+behave the same. build_request_pipeline() orders them as the stack did,
+outermost first.
+"""
+
+import asyncio
+import random
+import uuid
+from typing import Any, Dict, List, Optional, Set
+
+from starlette.datastructures import MutableHeaders
+from starlette.responses import JSONResponse, PlainTextResponse, Response
+
+from app.core.logging import get_logger, set_correlation_id
+from app.core.metrics import track_http_request, track_error
+from app.core.tenant_context import HotelTenantContext
+from app.core.green_api_logging import LoggingContext
+from app.middleware.pipeline import SKIP, PathPrefixTable, PipelineStage, RequestContext, RequestPipeline
+from app.middleware.monitoring import MonitoringMiddleware
+from app.middleware.logging_middleware import (
+    LoggingMiddleware,
+    log_performance_metric,
+    performance_monitor
+)
+from app.middleware.tenant_middleware import HotelTenantMiddleware, HotelPermissionMiddleware
+from app.middleware.auth_middleware import AuthMiddleware
+from app.middleware.green_api_middleware import GreenAPIMiddleware, green_api_metrics
+from app.middleware.circuit_breaker_middleware import (
+    CircuitBreakerMiddleware,
+    get_circuit_breaker_health_headers
+)
+from app.middleware.rate_limiter import ComprehensiveRateLimiter
+from app.middleware.webhook_security import WebhookSecurityMiddleware
+from app.utils.circuit_breaker import (
+    get_circuit_breaker,
+    CircuitBreakerOpenException,
+    CircuitBreakerTimeoutException
+)
+
+logger = get_logger(__name__)
+
+HEALTH_CHECK_PATHS = ["/health", "/api/v1/health"]
+
+
+class MonitoringStage(PipelineStage):
+    """Request metrics, correlation ID and request start/completion logs"""
+
+    name = "monitoring"
+
+    def __init__(self):
+        super().__init__()
+        self.middleware = MonitoringMiddleware(None)
+
+    async def before(self, ctx: RequestContext) -> Any:
+        ctx.correlation_id = ctx.request.headers.get("X-Correlation-ID")
+        set_correlation_id(ctx.correlation_id)
+
+        query_string = ctx.scope.get("query_string", b"")
+        logger.info(
+            "Request started",
+            method=ctx.method,
+            path=ctx.path,
+            user_agent=ctx.request.headers.get("User-Agent", "unknown"),
+            client_ip=ctx.client_ip,
+            query_params=query_string.decode("latin-1") if query_string else None
+        )
+        return None
+
+    def on_start(self, ctx: RequestContext, headers: MutableHeaders) -> None:
+        headers["X-Response-Time"] = f"{ctx.elapsed:.3f}s"
+        if ctx.correlation_id:
+            headers["X-Correlation-ID"] = ctx.correlation_id
+
+    async def on_error(self, ctx: RequestContext, error: Exception) -> Optional[Response]:
+        return JSONResponse(status_code=500, content={"error": "Internal server error"})
+
+    async def after(self, ctx: RequestContext) -> None:
+        duration = ctx.elapsed
+        status_code = ctx.status_code or 500
+
+        if ctx.error is not None:
+            track_error(type(ctx.error).__name__, "http_request")
+            logger.error(
+                "Request failed with exception",
+                method=ctx.method,
+                path=ctx.path,
+                error=str(ctx.error),
+                error_type=type(ctx.error).__name__
+            )
+
+        track_http_request(ctx.method, self.middleware._normalize_endpoint(ctx.path), status_code, duration)
+
+        log_level = "error" if ctx.error is not None or status_code >= 400 else "info"
+        getattr(logger, log_level)(
+            "Request completed",
+            method=ctx.method,
+            path=ctx.path,
+            status_code=status_code,
+            duration_ms=round(duration * 1000, 2),
+            response_size=ctx.response_headers.get("content-length") if ctx.response_headers else None
+        )
+
+
+class LoggingStage(PipelineStage):
+    """Request ID plus request and response logging, as LoggingMiddleware"""
+
+    name = "logging"
+
+    def __init__(self, **kwargs):
+        """
+        Args:
+            **kwargs: LoggingMiddleware options
+        """
+        self.middleware = LoggingMiddleware(None, **kwargs)
+        super().__init__(exclude=PathPrefixTable(exact=self.middleware.exclude_paths))
+
+    async def before(self, ctx: RequestContext) -> Any:
+        ctx.request_id = str(uuid.uuid4())
+        ctx.request.state.request_id = ctx.request_id
+
+        request_info = await self.middleware._extract_request_info(ctx.request)
+        if self.middleware.log_requests:
+            await self.middleware._log_request(ctx.request, request_info, ctx.request_id)
+        return None
+
+    def on_start(self, ctx: RequestContext, headers: MutableHeaders) -> None:
+        headers["X-Request-ID"] = ctx.request_id
+
+    async def on_error(self, ctx: RequestContext, error: Exception) -> Optional[Response]:
+        return PlainTextResponse("Internal Server Error", status_code=500)
+
+    async def after(self, ctx: RequestContext) -> None:
+        processing_time = ctx.elapsed
+
+        if self.middleware.log_responses:
+            headers = ctx.response_headers or {}
+            response_info = {
+                'status_code': ctx.status_code or 500,
+                'headers': dict(headers),
+                'processing_time': processing_time,
+                'content_length': headers.get('content-length', 0)
+            }
+            await self.middleware._log_response(ctx.request, None, response_info, ctx.request_id, processing_time)
+
+        if ctx.error is not None:
+            await self.middleware._track_error(ctx.error, ctx.request, ctx.request_id)
+
+        performance_monitor.record_log_event(
+            processing_time=processing_time,
+            error=ctx.error is not None
+        )
+
+
+class PerformanceLoggingStage(PipelineStage):
+    """Sampled performance metrics, as PerformanceLoggingMiddleware"""
+
+    name = "performance_logging"
+
+    def __init__(self, sample_rate: float = 1.0):
+        super().__init__()
+        self.sample_rate = sample_rate
+
+    async def before(self, ctx: RequestContext) -> Any:
+        if random.random() > self.sample_rate:
+            return SKIP
+        return None
+
+    async def after(self, ctx: RequestContext) -> None:
+        processing_time = ctx.elapsed
+        performance_monitor.record_log_event(
+            processing_time=processing_time,
+            error=ctx.error is not None
+        )
+
+        # Log only if slow or error
+        if ctx.error is None and (processing_time > 1.0 or (ctx.status_code or 500) >= 400):
+            log_performance_metric(
+                operation='slow_request',
+                duration=processing_time,
+                endpoint=ctx.path,
+                status_code=ctx.status_code
+            )
+
+
+class HotelTenantStage(PipelineStage):
+    """Hotel tenant context, as HotelTenantMiddleware"""
+
+    name = "hotel_tenant"
+
+    def __init__(self, **kwargs):
+        """
+        Args:
+            **kwargs: HotelTenantMiddleware options
+        """
+        self.middleware = HotelTenantMiddleware(None, **kwargs)
+        super().__init__(exclude=PathPrefixTable(self.middleware.excluded_paths))
+
+    async def before(self, ctx: RequestContext) -> Any:
+        hotel_id, rejection = await self.middleware._enter_hotel_context(ctx.request)
+        if rejection is not None:
+            return rejection
+        if not hotel_id:
+            return SKIP
+
+        ctx.hotel_id = ctx.request.state.hotel_id
+        return None
+
+    def on_start(self, ctx: RequestContext, headers: MutableHeaders) -> None:
+        self.middleware._add_hotel_headers(ctx.request, headers)
+
+    async def after(self, ctx: RequestContext) -> None:
+        if ctx.error is not None:
+            logger.error(
+                "Request processing failed",
+                hotel_id=str(ctx.hotel_id),
+                path=ctx.path,
+                error=str(ctx.error)
+            )
+
+        # Clear hotel context after request
+        HotelTenantContext.clear_hotel_context()
+        logger.debug("Hotel context cleared")
+
+
+class HotelPermissionStage(PipelineStage):
+    """Hotel permission checks, as HotelPermissionMiddleware"""
+
+    name = "hotel_permission"
+
+    def __init__(self, permission_map: Optional[Dict[str, List[str]]] = None):
+        self.middleware = HotelPermissionMiddleware(None, permission_map=permission_map)
+        # Patterns only ever match below the part before their first wildcard
+        super().__init__(include=PathPrefixTable(
+            pattern.split('*')[0] for pattern in self.middleware.permission_map
+        ))
+
+    async def before(self, ctx: RequestContext) -> Any:
+        return self.middleware._check_permissions(ctx.request)
+
+
+class AuthStage(PipelineStage):
+    """User authentication, as AuthMiddleware"""
+
+    name = "auth"
+
+    def __init__(self, **kwargs):
+        """
+        Args:
+            **kwargs: AuthMiddleware options
+        """
+        self.middleware = AuthMiddleware(None, **kwargs)
+        super().__init__(
+            include=PathPrefixTable(
+                path for path in self.middleware.require_auth_paths
+                if path.startswith(self.middleware.auth_path_prefix)
+            ),
+            exclude=PathPrefixTable(exact=self.middleware.excluded_paths)
+        )
+
+    async def before(self, ctx: RequestContext) -> Any:
+        rejection = await self.middleware._authenticate_or_reject(ctx.request, ctx.start_time)
+        if rejection is not None:
+            return rejection
+
+        ctx.principal = ctx.request.state.user
+        return None
+
+    async def after(self, ctx: RequestContext) -> None:
+        if ctx.error is None:
+            await self.middleware._log_request(
+                request=ctx.request,
+                user=ctx.principal,
+                status_code=ctx.status_code,
+                processing_time=ctx.elapsed,
+                success=True
+            )
+
+
+class GreenAPIStage(PipelineStage):
+    """Green API request logging and metrics, as GreenAPIMiddleware"""
+
+    name = "green_api"
+
+    def __init__(self):
+        # Requests are recognized by header or query parameter as well as
+        # path, so there is no prefix table to skip by
+        super().__init__()
+        self.middleware = GreenAPIMiddleware(None, metrics=green_api_metrics)
+
+    async def before(self, ctx: RequestContext) -> Any:
+        request = ctx.request
+        if not self.middleware._is_green_api_request(request):
+            return SKIP
+
+        instance_id = self.middleware._extract_instance_id(request)
+        correlation_id = self.middleware._extract_correlation_id(request)
+
+        logging_context = LoggingContext(correlation_id=correlation_id, instance_id=instance_id)
+        logging_context.__enter__()
+
+        logger_context = self.middleware.green_api_logger
+        if instance_id:
+            logger_context = logger_context.with_instance(instance_id)
+        logger_context.log_request(
+            method=request.method,
+            url=str(request.url),
+            headers=dict(request.headers)
+        )
+
+        ctx.data[self.name] = (instance_id, logging_context, logger_context)
+        return None
+
+    def on_start(self, ctx: RequestContext, headers: MutableHeaders) -> None:
+        instance_id = ctx.data[self.name][0]
+        headers["X-Green-API-Response-Time"] = str(ctx.elapsed * 1000)
+        if instance_id:
+            headers["X-Green-API-Instance"] = instance_id
+
+    async def after(self, ctx: RequestContext) -> None:
+        instance_id, logging_context, logger_context = ctx.data[self.name]
+        response_time = ctx.elapsed * 1000
+        try:
+            if ctx.error is not None:
+                logger_context.log_error(ctx.error, "request_processing")
+                await self.middleware.metrics.record_request(
+                    instance_id=instance_id,
+                    response_time=response_time,
+                    error=ctx.error
+                )
+            else:
+                logger_context.log_response(status_code=ctx.status_code, duration=response_time)
+                await self.middleware.metrics.record_request(
+                    instance_id=instance_id,
+                    response_time=response_time,
+                    status_code=ctx.status_code
+                )
+        finally:
+            logging_context.__exit__(None, None, None)
+
+
+class HealthCheckStage(PipelineStage):
+    """Logs slow or failing health checks only, as HealthCheckMiddleware"""
+
+    name = "health_check"
+
+    def __init__(self, health_check_paths: Optional[List[str]] = None):
+        super().__init__(include=PathPrefixTable(exact=health_check_paths or HEALTH_CHECK_PATHS))
+
+    async def after(self, ctx: RequestContext) -> None:
+        duration = ctx.elapsed
+        if ctx.error is not None:
+            logger.error(
+                "Health check failed",
+                path=ctx.path,
+                error=str(ctx.error),
+                duration_ms=round(duration * 1000, 2)
+            )
+        elif duration > 1.0 or ctx.status_code != 200:
+            logger.warning(
+                "Health check issue",
+                path=ctx.path,
+                status_code=ctx.status_code,
+                duration_ms=round(duration * 1000, 2)
+            )
+
+
+class CircuitBreakerHealthStage(PipelineStage):
+    """Circuit breaker state counts on health check responses"""
+
+    name = "circuit_breaker_health"
+
+    def __init__(self):
+        super().__init__(include=PathPrefixTable(HEALTH_CHECK_PATHS))
+
+    def on_start(self, ctx: RequestContext, headers: MutableHeaders) -> None:
+        headers.update(get_circuit_breaker_health_headers())
+
+
+class CircuitBreakerStage(PipelineStage):
+    """Circuit breaker protection of API paths, as CircuitBreakerMiddleware"""
+
+    name = "circuit_breaker"
+
+    def __init__(self, protected_paths: Optional[Dict[str, str]] = None):
+        self.middleware = CircuitBreakerMiddleware(None, protected_paths=protected_paths)
+        super().__init__(include=PathPrefixTable(self.middleware.protected_paths))
+
+    async def before(self, ctx: RequestContext) -> Any:
+        cb_name = self.middleware._get_circuit_breaker_name(ctx.path)
+        circuit_breaker = get_circuit_breaker(cb_name)
+
+        # Add circuit breaker info to request state
+        ctx.request.state.circuit_breaker_name = cb_name
+        ctx.request.state.circuit_breaker = circuit_breaker
+
+        try:
+            circuit_breaker.before_call()
+        except CircuitBreakerOpenException as e:
+            logger.warning("Circuit breaker blocked request",
+                           path=ctx.path,
+                           circuit_breaker=cb_name,
+                           exception=type(e).__name__)
+            return self.middleware._create_circuit_breaker_response(cb_name, e)
+
+        timeout = circuit_breaker.config.timeout
+        ctx.timeout = timeout if ctx.timeout is None else min(ctx.timeout, timeout)
+        ctx.data[self.name] = (cb_name, circuit_breaker)
+        return None
+
+    def on_start(self, ctx: RequestContext, headers: MutableHeaders) -> None:
+        cb_name, circuit_breaker = ctx.data[self.name]
+        headers["X-Circuit-Breaker"] = cb_name
+        headers["X-Circuit-Breaker-State"] = circuit_breaker.state.value
+
+    async def on_error(self, ctx: RequestContext, error: Exception) -> Optional[Response]:
+        cb_name, circuit_breaker = ctx.data[self.name]
+        if isinstance(error, asyncio.TimeoutError):
+            error = CircuitBreakerTimeoutException(
+                f"Circuit breaker '{cb_name}' timeout after {circuit_breaker.config.timeout}s"
+            )
+            logger.warning("Circuit breaker blocked request",
+                           path=ctx.path,
+                           circuit_breaker=cb_name,
+                           exception=type(error).__name__)
+        else:
+            # Log unexpected errors but don't expose them
+            logger.error("Unexpected error in circuit breaker middleware",
+                         path=ctx.path,
+                         circuit_breaker=cb_name,
+                         error=str(error))
+        return self.middleware._create_circuit_breaker_response(cb_name, error)
+
+    async def after(self, ctx: RequestContext) -> None:
+        circuit_breaker = ctx.data[self.name][1]
+        elapsed = ctx.elapsed
+        if ctx.error is None:
+            circuit_breaker.record_success(elapsed)
+        elif isinstance(ctx.error, asyncio.TimeoutError):
+            circuit_breaker.record_failure(elapsed, reason="timeout")
+        elif isinstance(ctx.error, circuit_breaker.config.expected_exception):
+            circuit_breaker.record_failure(elapsed)
+
+
+class RateLimitStage(PipelineStage):
+    """Per-user, per-hotel and per-endpoint rate limits, as ComprehensiveRateLimiter"""
+
+    name = "rate_limit"
+
+    def __init__(self, environment: str = "production", storage_backend: str = "redis"):
+        super().__init__()
+        self.middleware = ComprehensiveRateLimiter(
+            None,
+            environment=environment,
+            storage_backend=storage_backend
+        )
+
+    async def before(self, ctx: RequestContext) -> Any:
+        context, rejection = await self.middleware._check_request(ctx.request)
+        if rejection is not None:
+            return rejection
+        if context is None:
+            return SKIP
+
+        ctx.data[self.name] = context
+        return None
+
+    def on_start(self, ctx: RequestContext, headers: MutableHeaders) -> None:
+        self.middleware._add_rate_limit_headers(headers, ctx.data[self.name])
+
+
+class WebhookSecurityStage(PipelineStage):
+    """Webhook signature, timestamp and replay checks, as WebhookSecurityMiddleware"""
+
+    name = "webhook_security"
+
+    def __init__(self, webhook_paths: Optional[Set[str]] = None, environment: str = "production"):
+        self.middleware = WebhookSecurityMiddleware(
+            None,
+            webhook_paths=webhook_paths,
+            environment=environment
+        )
+        super().__init__(include=PathPrefixTable(self.middleware.webhook_paths))
+
+    async def before(self, ctx: RequestContext) -> Any:
+        # Rejections raise HTTPException, which the pipeline answers
+        provider = await self.middleware._check_request(ctx.request)
+        if provider is None:
+            return SKIP
+
+        ctx.data[self.name] = provider
+        return None
+
+    async def after(self, ctx: RequestContext) -> None:
+        if ctx.error is None:
+            logger.info(
+                "Webhook security validation successful",
+                provider=ctx.data[self.name],
+                path=ctx.path,
+                processing_time_ms=ctx.elapsed * 1000
+            )
+
+
+def build_request_pipeline(
+    webhook_paths: Optional[Set[str]] = None,
+    environment: str = "production",
+    rate_limit_storage_backend: str = "redis",
+    hotel_header: str = "X-Hotel-ID",
+    require_hotel: bool = True,
+    tenant_excluded_paths: Optional[List[str]] = None,
+    enable_permissions: bool = True,
+    enable_request_logging: bool = True,
+    enable_response_logging: bool = True,
+    enable_body_logging: bool = False,
+    performance_only: bool = False
+) -> List[PipelineStage]:
+    """
+    Stages for the application's middleware concerns, outermost first
+
+    Args:
+        webhook_paths: Webhook paths to protect
+        environment: Environment configuration to use
+        rate_limit_storage_backend: Rate limit storage backend ("redis" or "memory")
+        hotel_header: Header name containing hotel ID
+        require_hotel: Whether hotel ID is required
+        tenant_excluded_paths: Paths excluded from hotel requirements
+        enable_permissions: Whether to enforce hotel permissions
+        enable_request_logging: Whether to log requests
+        enable_response_logging: Whether to log responses
+        enable_body_logging: Whether to log bodies (only in debug)
+        performance_only: Whether to log sampled performance metrics only
+
+    Returns:
+        List[PipelineStage]: Stages in pipeline order
+    """
+    from app.core.config import settings
+
+    if performance_only:
+        logging_stage = PerformanceLoggingStage()
+    else:
+        logging_stage = LoggingStage(
+            log_requests=enable_request_logging,
+            log_responses=enable_response_logging,
+            log_request_body=enable_body_logging and settings.DEBUG,
+            log_response_body=enable_body_logging and settings.DEBUG
+        )
+
+    stages: List[PipelineStage] = [
+        MonitoringStage(),
+        logging_stage,
+        HotelTenantStage(
+            hotel_header=hotel_header,
+            require_hotel=require_hotel,
+            excluded_paths=tenant_excluded_paths
+        )
+    ]
+    if enable_permissions:
+        stages.append(HotelPermissionStage())
+
+    stages.extend([
+        AuthStage(),
+        GreenAPIStage(),
+        HealthCheckStage(),
+        CircuitBreakerHealthStage(),
+        CircuitBreakerStage()
+    ])
+
+    rate_limit_stage = RateLimitStage(environment=environment, storage_backend=rate_limit_storage_backend)
+    if rate_limit_stage.middleware.config.enabled:
+        stages.append(rate_limit_stage)
+
+    stages.append(WebhookSecurityStage(webhook_paths=webhook_paths, environment=environment))
+    return stages
+
+
+def add_request_pipeline(app, **kwargs) -> None:
+    """
+    Add the request pipeline to FastAPI app, in place of the middleware stack
+
+    Args:
+        app: FastAPI application
+        **kwargs: build_request_pipeline options
+    """
+    stages = build_request_pipeline(**kwargs)
+    app.add_middleware(RequestPipeline, stages=stages)
+
+    logger.info("Request pipeline added",
+                stages=[stage.name for stage in stages])
+
+
+__all__ = [
+    'MonitoringStage',
+    'LoggingStage',
+    'PerformanceLoggingStage',
+    'HotelTenantStage',
+    'HotelPermissionStage',
+    'AuthStage',
+    'GreenAPIStage',
+    'HealthCheckStage',
+    'CircuitBreakerHealthStage',
+    'CircuitBreakerStage',
+    'RateLimitStage',
+    'WebhookSecurityStage',
+    'build_request_pipeline',
+    'add_request_pipeline'
+]
@@ -5,9 +5,10 @@ This middleware provides advanced rate limiting with support for per-user, per-h
 per-endpoint limits using sliding window algorithms and distributed storage.
 """
 
+import math
 import time
 import asyncio
-from typing import Callable, Dict, Any, Optional, List, Tuple
+from typing import Callable, Dict, Any, Optional, List, MutableMapping, Tuple
 from fastapi import Request, Response, HTTPException
 from fastapi.responses import JSONResponse
 from starlette.middleware.base import BaseHTTPMiddleware
@@ -15,6 +16,7 @@ import structlog
 
 from app.core.rate_limit_config import (
     RateLimitConfig,
+    RateLimitMode,
     RateLimitRule,
     RateLimitScope,
     get_rate_limit_config
@@ -24,6 +26,7 @@ from app.utils.rate_limit_storage import (
     create_rate_limit_storage,
     RateLimitStorageError
 )
+from app.utils.rate_limit_lease import LeasedRateLimiter
 from app.core.config import settings
 
 logger = structlog.get_logger(__name__)
@@ -67,6 +70,17 @@ class ComprehensiveRateLimiter(BaseHTTPMiddleware):
             backend=storage_backend,
             key_prefix=self.config.key_prefix
         )
+
+        # Decisions go straight to storage or through the local lease tier
+        if self.config.mode == RateLimitMode.LEASED:
+            self.limiter = LeasedRateLimiter(
+                self.storage,
+                lease_fraction=self.config.lease_fraction,
+                max_lease_size=self.config.max_lease_size,
+                max_lease_seconds=self.config.max_lease_seconds
+            )
+        else:
+            self.limiter = self.storage
         
         # Cache for rule lookups
         self._rule_cache: Dict[str, RateLimitRule] = {}
@@ -77,6 +91,7 @@ class ComprehensiveRateLimiter(BaseHTTPMiddleware):
             "Comprehensive rate limiter initialized",
             environment=environment,
             storage_backend=storage_backend,
+            mode=self.config.mode.value,
             enabled=self.config.enabled
         )
     
@@ -97,24 +112,16 @@ class ComprehensiveRateLimiter(BaseHTTPMiddleware):
         if not self.config.enabled:
             return await call_next(request)
         
-        try:
-            # Extract request context
-            context = await self._extract_request_context(request)
-            
-            # Get applicable rate limit rules
-            rules = await self._get_applicable_rules(request, context)
-            
-            # Check rate limits
-            await self._check_rate_limits(request, context, rules)
-            
-            # Process request
-            response = await call_next(request)
-            
+        context, rejection = await self._check_request(request)
+        if rejection is not None:
+            return rejection
+        
+        # Process request
+        response = await call_next(request)
+        
+        if context is not None:
             # Add rate limit headers
-            await self._add_rate_limit_headers(response, context, rules)
-            
-            # Increment counters after successful request
-            await self._increment_counters(context, rules)
+            self._add_rate_limit_headers(response.headers, context)
             
             # Log successful request
             processing_time = (time.time() - start_time) * 1000
@@ -125,8 +132,36 @@ class ComprehensiveRateLimiter(BaseHTTPMiddleware):
                 hotel_id=context.get("hotel_id"),
                 processing_time_ms=processing_time
             )
+        
+        return response
+    
+    async def _check_request(self, request: Request) -> Tuple[Optional[Dict[str, Any]], Optional[Response]]:
+        """
+        Check and record a request against its rate limits
+        
+        Args:
+            request: HTTP request
+            
+        Returns:
+            Tuple of the request context, for the response headers, and the
+            429 response if the request is rejected. The context is None when
+            a storage error let the request through unchecked.
+            
+        Raises:
+            HTTPException: If rate limiting fails in strict mode
+        """
+        context: Dict[str, Any] = {}
+        try:
+            # Extract request context
+            context = await self._extract_request_context(request)
+            
+            # Get applicable rate limit rules
+            rules = await self._get_applicable_rules(request, context)
             
-            return response
+            # Check rate limits; allowed requests are recorded atomically
+            await self._check_rate_limits(request, context, rules)
+            
+            return context, None
             
         except RateLimitExceeded as e:
             # Log rate limit violation
@@ -141,7 +176,7 @@ class ComprehensiveRateLimiter(BaseHTTPMiddleware):
                 )
             
             # Return rate limit error response
-            return JSONResponse(
+            return context, JSONResponse(
                 status_code=429,
                 content={
                     "error": "Rate limit exceeded",
@@ -151,6 +186,8 @@ class ComprehensiveRateLimiter(BaseHTTPMiddleware):
                 headers=e.headers
             )
             
+        except HTTPException:
+            raise
         except Exception as e:
             logger.error(
                 "Rate limiting error",
@@ -161,7 +198,7 @@ class ComprehensiveRateLimiter(BaseHTTPMiddleware):
             # In case of error, allow request to proceed
             if not self.config.strict_mode:
                 logger.warning("Allowing request due to rate limiting error")
-                return await call_next(request)
+                return None, None
             else:
                 raise HTTPException(
                     status_code=500,
@@ -264,8 +301,20 @@ class ComprehensiveRateLimiter(BaseHTTPMiddleware):
         context: Dict[str, Any],
         rules: List[RateLimitRule]
     ) -> None:
-        """Check all applicable rate limit rules"""
+        """
+        Check all applicable rate limit rules
+
+        Each rule costs at most one storage round trip that checks every
+        window and records the request if all of them allow it; in leased
+        mode most requests are admitted from local quota. When a rule
+        denies the request, the rules that admitted it are refunded so a
+        rejected request consumes no quota. Results are kept in the context
+        for the response headers.
+        """
         current_time = context["timestamp"]
+        context["rate_limit_results"] = []
+        # (key, rule, metadata) of rules that recorded this request
+        admitted: List[Tuple[str, RateLimitRule, Dict[str, Any]]] = []
         
         for rule in rules:
             # Check exemptions
@@ -276,14 +325,19 @@ class ComprehensiveRateLimiter(BaseHTTPMiddleware):
             key = self._generate_rate_limit_key(context, rule)
             
             try:
-                # Check rate limit
-                allowed, metadata = await self.storage.check_rate_limit(
+                # Check and record in one step
+                allowed, metadata = await self.limiter.acquire(
                     key=key,
                     rule=rule,
                     current_time=current_time
                 )
+                context["rate_limit_results"].append((rule, metadata))
                 
-                if not allowed:
+                if allowed:
+                    admitted.append((key, rule, metadata))
+                else:
+                    await self._refund(admitted, current_time)
+                    
                     # Calculate retry after time
                     retry_after = self._calculate_retry_after(metadata)
                     
@@ -307,6 +361,18 @@ class ComprehensiveRateLimiter(BaseHTTPMiddleware):
                         detail="Rate limiting service unavailable"
                     )
     
+    async def _refund(
+        self,
+        admitted: List[Tuple[str, RateLimitRule, Dict[str, Any]]],
+        current_time: float
+    ) -> None:
+        """Give back the request to the rules that admitted it"""
+        for key, rule, metadata in admitted:
+            try:
+                await self.limiter.refund(key, rule, metadata, current_time)
+            except Exception as e:
+                logger.warning("Rate limit refund failed", rule=rule.name, error=str(e))
+    
     def _is_exempt(self, context: Dict[str, Any], rule: RateLimitRule) -> bool:
         """Check if request is exempt from rate limiting"""
         # Check IP exemptions
@@ -350,36 +416,12 @@ class ComprehensiveRateLimiter(BaseHTTPMiddleware):
         
         return ":".join(key_parts)
     
-    async def _increment_counters(
-        self,
-        context: Dict[str, Any],
-        rules: List[RateLimitRule]
-    ) -> None:
-        """Increment rate limit counters after successful request"""
-        current_time = context["timestamp"]
-        
-        for rule in rules:
-            if self._is_exempt(context, rule):
-                continue
-            
-            key = self._generate_rate_limit_key(context, rule)
-            
-            try:
-                await self.storage.increment_counter(
-                    key=key,
-                    rule=rule,
-                    current_time=current_time
-                )
-            except RateLimitStorageError as e:
-                logger.error("Failed to increment rate limit counter", rule=rule.name, error=str(e))
-    
-    async def _add_rate_limit_headers(
+    def _add_rate_limit_headers(
         self,
-        response: Response,
-        context: Dict[str, Any],
-        rules: List[RateLimitRule]
+        headers: MutableMapping[str, str],
+        context: Dict[str, Any]
     ) -> None:
-        """Add rate limit headers to response"""
+        """Add rate limit headers to response headers"""
         if not self.config.include_rate_limit_headers:
             return
         
@@ -387,36 +429,18 @@ class ComprehensiveRateLimiter(BaseHTTPMiddleware):
         most_restrictive_rule = None
         min_remaining = float('inf')
         
-        for rule in rules:
-            if self._is_exempt(context, rule):
-                continue
-            
-            key = self._generate_rate_limit_key(context, rule)
-            
-            try:
-                allowed, metadata = await self.storage.check_rate_limit(
-                    key=key,
-                    rule=rule,
-                    current_time=context["timestamp"]
-                )
-                
-                # Find rule with minimum remaining requests
-                for window, check_meta in metadata.get("checks", {}).items():
-                    remaining = check_meta.get("remaining", 0)
-                    if remaining < min_remaining:
-                        min_remaining = remaining
-                        most_restrictive_rule = (rule, check_meta)
-                        
-            except RateLimitStorageError:
-                continue
+        for rule, metadata in context.get("rate_limit_results", []):
+            # Find rule with minimum remaining requests
+            for window, check_meta in metadata.get("checks", {}).items():
+                remaining = check_meta.get("remaining", 0)
+                if remaining < min_remaining:
+                    min_remaining = remaining
+                    most_restrictive_rule = (rule, check_meta)
         
         # Add headers based on most restrictive rule
         if most_restrictive_rule:
             rule, meta = most_restrictive_rule
-            headers = self._generate_rate_limit_headers({"checks": {"current": meta}}, rule)
-            
-            for header_name, header_value in headers.items():
-                response.headers[header_name] = header_value
+            headers.update(self._generate_rate_limit_headers({"checks": {"current": meta}}, rule))
     
     def _generate_rate_limit_headers(
         self,
@@ -441,6 +465,15 @@ class ComprehensiveRateLimiter(BaseHTTPMiddleware):
         """Calculate retry after time in seconds"""
         checks = metadata.get("checks", {})
         if checks:
+            # The request may proceed once every exhausted window allows it
+            retry_times = [
+                check["retry_at"] - time.time()
+                for check in checks.values()
+                if not check.get("allowed", True) and check.get("retry_at")
+            ]
+            if retry_times:
+                return max(1, math.ceil(max(retry_times)))
+
             # Use the shortest reset time
             reset_times = [
                 check.get("reset_time", 0) - time.time()
@@ -3,7 +3,7 @@ Enhanced tenant middleware for hotel operations
 """
 
 import uuid
-from typing import Optional, Callable, Dict, Any, List
+from typing import Optional, Callable, Dict, Any, List, MutableMapping, Tuple
 from fastapi import Request, Response, HTTPException, status
 from fastapi.responses import JSONResponse
 from starlette.middleware.base import BaseHTTPMiddleware
@@ -15,8 +15,8 @@ from app.core.tenant_context import (
     HotelTenantManager,
     HotelTenantFilter
 )
-from app.database import get_db_session
-from app.models.hotel import Hotel
+from app.services.hotel_directory import get_hotel_directory
+from app.utils.path_matcher import WILDCARD, PathPatternMap
 from app.core.logging import get_logger
 
 logger = get_logger(__name__)
@@ -76,12 +76,52 @@ class HotelTenantMiddleware(BaseHTTPMiddleware):
         if self._is_excluded_path(request.url.path):
             return await call_next(request)
         
+        hotel_id, rejection = await self._enter_hotel_context(request)
+        if rejection is not None:
+            return rejection
+        
+        try:
+            # Process request
+            response = await call_next(request)
+            
+            # Add hotel context to response headers for debugging
+            if hotel_id:
+                self._add_hotel_headers(request, response.headers)
+            
+            return response
+            
+        except Exception as e:
+            logger.error(
+                "Request processing failed",
+                hotel_id=hotel_id,
+                path=request.url.path,
+                error=str(e)
+            )
+            raise
+            
+        finally:
+            # Clear hotel context after request
+            if hotel_id:
+                HotelTenantContext.clear_hotel_context()
+                logger.debug("Hotel context cleared")
+    
+    async def _enter_hotel_context(self, request: Request) -> Tuple[Optional[str], Optional[JSONResponse]]:
+        """
+        Set the hotel tenant context for a request
+        
+        Args:
+            request: HTTP request
+            
+        Returns:
+            Tuple of the requested hotel ID and an error response if the
+            hotel context could not be set
+        """
         # Extract hotel ID from request
         hotel_id = self._extract_hotel_id(request)
         
         # Validate hotel ID if required
         if self.require_hotel and not hotel_id:
-            return self._create_error_response(
+            return hotel_id, self._create_error_response(
                 "Hotel ID is required",
                 status.HTTP_400_BAD_REQUEST,
                 {"error_code": "HOTEL_ID_REQUIRED"}
@@ -96,26 +136,26 @@ class HotelTenantMiddleware(BaseHTTPMiddleware):
                 # Load hotel context if auto_load_context is enabled
                 hotel_context = None
                 if self.auto_load_context:
-                    with get_db_session() as db:
-                        hotel_context = HotelTenantManager.load_hotel_context(db, hotel_uuid)
-                        
-                        if not hotel_context:
-                            return self._create_error_response(
-                                "Hotel not found",
-                                status.HTTP_404_NOT_FOUND,
-                                {"error_code": "HOTEL_NOT_FOUND", "hotel_id": hotel_id}
-                            )
-                        
-                        # Check if hotel is active
-                        if not hotel_context.get("is_active", False):
-                            return self._create_error_response(
-                                "Hotel is not active",
-                                status.HTTP_403_FORBIDDEN,
-                                {"error_code": "HOTEL_INACTIVE", "hotel_id": hotel_id}
-                            )
-                        
-                        # Set database context for RLS
-                        HotelTenantManager.set_database_hotel_context(db, hotel_uuid)
+                    # Served from the in-process hotel directory; the
+                    # database is only read on a miss
+                    snapshot = await get_hotel_directory().resolve(hotel_uuid)
+                    
+                    if not snapshot:
+                        return hotel_id, self._create_error_response(
+                            "Hotel not found",
+                            status.HTTP_404_NOT_FOUND,
+                            {"error_code": "HOTEL_NOT_FOUND", "hotel_id": hotel_id}
+                        )
+                    
+                    hotel_context = snapshot.to_context()
+                    
+                    # Check if hotel is active
+                    if not hotel_context.get("is_active", False):
+                        return hotel_id, self._create_error_response(
+                            "Hotel is not active",
+                            status.HTTP_403_FORBIDDEN,
+                            {"error_code": "HOTEL_INACTIVE", "hotel_id": hotel_id}
+                        )
                 
                 # Set application context
                 if hotel_context:
@@ -145,7 +185,7 @@ class HotelTenantMiddleware(BaseHTTPMiddleware):
                 )
                 
             except ValueError:
-                return self._create_error_response(
+                return hotel_id, self._create_error_response(
                     "Invalid hotel ID format",
                     status.HTTP_400_BAD_REQUEST,
                     {"error_code": "INVALID_HOTEL_ID", "hotel_id": hotel_id}
@@ -156,39 +196,26 @@ class HotelTenantMiddleware(BaseHTTPMiddleware):
                     hotel_id=hotel_id,
                     error=str(e)
                 )
-                return self._create_error_response(
+                return hotel_id, self._create_error_response(
                     "Failed to set hotel context",
                     status.HTTP_500_INTERNAL_SERVER_ERROR,
                     {"error_code": "CONTEXT_ERROR"}
                 )
         
-        try:
-            # Process request
-            response = await call_next(request)
-            
-            # Add hotel context to response headers for debugging
-            if hotel_id and hasattr(request.state, 'hotel_context'):
-                context = request.state.hotel_context
-                if context:
-                    response.headers["X-Hotel-Name"] = context.get("hotel_name", "Unknown")
-                    response.headers["X-Hotel-Active"] = str(context.get("is_active", False))
-            
-            return response
-            
-        except Exception as e:
-            logger.error(
-                "Request processing failed",
-                hotel_id=hotel_id,
-                path=request.url.path,
-                error=str(e)
-            )
-            raise
-            
-        finally:
-            # Clear hotel context after request
-            if hotel_id:
-                HotelTenantContext.clear_hotel_context()
-                logger.debug("Hotel context cleared")
+        return hotel_id, None
+    
+    def _add_hotel_headers(self, request: Request, headers: MutableMapping[str, str]) -> None:
+        """
+        Add hotel context to response headers for debugging
+        
+        Args:
+            request: HTTP request
+            headers: Response headers
+        """
+        context = getattr(request.state, 'hotel_context', None)
+        if context:
+            headers["X-Hotel-Name"] = context.get("hotel_name", "Unknown")
+            headers["X-Hotel-Active"] = str(context.get("is_active", False))
     
     def _extract_hotel_id(self, request: Request) -> Optional[str]:
         """
@@ -281,6 +308,7 @@ class HotelPermissionMiddleware(BaseHTTPMiddleware):
             "/api/v1/hotels/*/analytics": ["can_view_analytics"],
             "/api/v1/hotels/*/export": ["can_export_data"]
         }
+        self._required = PathPatternMap(self.permission_map, syntax=WILDCARD)
     
     async def dispatch(self, request: Request, call_next: Callable) -> Response:
         """
@@ -293,6 +321,22 @@ class HotelPermissionMiddleware(BaseHTTPMiddleware):
         Returns:
             Response: HTTP response
         """
+        rejection = self._check_permissions(request)
+        if rejection is not None:
+            return rejection
+        
+        return await call_next(request)
+    
+    def _check_permissions(self, request: Request) -> Optional[JSONResponse]:
+        """
+        Check the hotel permissions required by the request path
+        
+        Args:
+            request: HTTP request
+            
+        Returns:
+            Optional[JSONResponse]: Error response if permission is denied
+        """
         # Check if permissions are required for this path
         required_permissions = self._get_required_permissions(request.url.path)
         
@@ -346,7 +390,7 @@ class HotelPermissionMiddleware(BaseHTTPMiddleware):
                     }
                 )
         
-        return await call_next(request)
+        return None
     
     def _get_required_permissions(self, path: str) -> List[str]:
         """
@@ -358,38 +402,7 @@ class HotelPermissionMiddleware(BaseHTTPMiddleware):
         Returns:
             List[str]: Required permissions
         """
-        for pattern, permissions in self.permission_map.items():
-            # Simple pattern matching (could be enhanced with regex)
-            if self._path_matches_pattern(path, pattern):
-                return permissions
-        
-        return []
-    
-    def _path_matches_pattern(self, path: str, pattern: str) -> bool:
-        """
-        Check if path matches pattern
-        
-        Args:
-            path: Request path
-            pattern: Pattern to match
-            
-        Returns:
-            bool: True if path matches pattern
-        """
-        # Simple wildcard matching
-        pattern_parts = pattern.split('*')
-        
-        if len(pattern_parts) == 1:
-            return path == pattern
-        
-        # Check if path starts with first part and ends with last part
-        if not path.startswith(pattern_parts[0]):
-            return False
-        
-        if pattern_parts[-1] and not path.endswith(pattern_parts[-1]):
-            return False
-        
-        return True
+        return self._required.lookup(path) or []
 
 
 # Helper functions for adding middleware to FastAPI app
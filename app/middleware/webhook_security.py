@@ -24,6 +24,8 @@ from app.utils.signature_validator import (
     TimestampValidationError,
     ReplayAttackError
 )
+from app.utils.webhook_payload import WebhookPayload, read_webhook_payload, verify_webhook_payload
+from app.services.hotel_directory import HotelSnapshot, get_hotel_directory
 from app.core.config import settings
 
 logger = structlog.get_logger(__name__)
@@ -89,14 +91,47 @@ class WebhookSecurityMiddleware(BaseHTTPMiddleware):
         """
         start_time = time.time()
         
+        provider = await self._check_request(request)
+        if provider is None:
+            return await call_next(request)
+        
+        # Process request
+        response = await call_next(request)
+        
+        # Log successful validation
+        processing_time = (time.time() - start_time) * 1000
+        logger.info(
+            "Webhook security validation successful",
+            provider=provider,
+            path=request.url.path,
+            processing_time_ms=processing_time
+        )
+        
+        return response
+    
+    async def _check_request(self, request: Request) -> Optional[str]:
+        """
+        Run the security checks for a webhook request
+        
+        Args:
+            request: HTTP request
+            
+        Returns:
+            Optional[str]: Provider whose validation passed, or None when the
+            request proceeds unvalidated (not a webhook, validation disabled,
+            or a non-strict failure)
+            
+        Raises:
+            HTTPException: If the request is rejected
+        """
         # Check if this is a webhook endpoint
         if not self._is_webhook_path(request.url.path):
-            return await call_next(request)
+            return None
         
         # Skip security validation if disabled
         if not self.config.enabled:
             logger.debug("Webhook security validation disabled")
-            return await call_next(request)
+            return None
         
         try:
             # Apply rate limiting
@@ -118,24 +153,12 @@ class WebhookSecurityMiddleware(BaseHTTPMiddleware):
                     )
                 else:
                     logger.warning("Unknown webhook provider, skipping validation", provider=provider)
-                    return await call_next(request)
+                    return None
             
             # Perform security validation
             await self._validate_webhook_security(request, validator, provider)
             
-            # Process request
-            response = await call_next(request)
-            
-            # Log successful validation
-            processing_time = (time.time() - start_time) * 1000
-            logger.info(
-                "Webhook security validation successful",
-                provider=provider,
-                path=request.url.path,
-                processing_time_ms=processing_time
-            )
-            
-            return response
+            return provider
             
         except HTTPException:
             raise
@@ -155,7 +178,7 @@ class WebhookSecurityMiddleware(BaseHTTPMiddleware):
             else:
                 # In non-strict mode, allow request to proceed with warning
                 logger.warning("Proceeding with webhook request despite validation error")
-                return await call_next(request)
+                return None
     
     def _is_webhook_path(self, path: str) -> bool:
         """Check if path is a webhook endpoint"""
@@ -263,19 +286,27 @@ class WebhookSecurityMiddleware(BaseHTTPMiddleware):
         validator: EnhancedSignatureValidator,
         provider: str
     ) -> None:
-        """Validate webhook security (signature, timestamp, replay protection)"""
+        """
+        Validate webhook security (signature, timestamp, replay protection)
+        
+        The body is read and parsed once; the payload is left in request
+        state for the webhook endpoint, marked verified when it passed.
+        """
         try:
-            # Get request body
-            body = await request.body()
-            
-            # Get headers
-            headers = dict(request.headers)
-            
-            # For Green API, we need to get the secret from the hotel
-            # This is a simplified version - in practice, you'd look up the hotel
-            # based on instance ID and get the webhook token
-            secret = await self._get_webhook_secret(request, provider)
+            payload = await read_webhook_payload(request)
+        except ValueError as e:
+            logger.warning("Invalid webhook payload", error=str(e), provider=provider)
+            if self.config.strict_mode:
+                raise HTTPException(status_code=400, detail="Invalid JSON payload")
+            return
+        
+        try:
+            hotel = await self._get_webhook_hotel(request, provider, payload)
+            if hotel is None:
+                # Unknown instance: the endpoint answers it
+                return
             
+            secret = hotel.green_api_webhook_token
             if not secret:
                 if self.config.strict_mode:
                     raise HTTPException(
@@ -287,10 +318,13 @@ class WebhookSecurityMiddleware(BaseHTTPMiddleware):
                     return
             
             # Perform comprehensive validation
-            result = validator.comprehensive_validation(
-                body=body,
-                headers=headers,
-                secret=secret
+            result = await verify_webhook_payload(
+                payload,
+                validator,
+                hotel_id=hotel.id,
+                secret=secret,
+                signature=request.headers.get(validator.config.signature_header),
+                timestamp_header=request.headers.get(validator.config.timestamp_header)
             )
             
             if not result['is_valid']:
@@ -320,28 +354,41 @@ class WebhookSecurityMiddleware(BaseHTTPMiddleware):
                 detail=f"Webhook security validation failed: {str(e)}"
             )
     
-    async def _get_webhook_secret(self, request: Request, provider: str) -> Optional[str]:
+    async def _get_webhook_hotel(
+        self,
+        request: Request,
+        provider: str,
+        payload: WebhookPayload
+    ) -> Optional[HotelSnapshot]:
         """
-        Get webhook secret for validation
+        Hotel whose webhook token signs the request
         
-        This is a simplified implementation. In practice, you would:
-        1. Extract instance ID from headers or URL
-        2. Look up the hotel by instance ID
-        3. Return the hotel's webhook token
+        The instance ID is taken where the webhook endpoints take it: from
+        the URL for /green-api/{instance_id}, otherwise from the payload's
+        instanceData or the instance header.
         """
-        if provider == "green_api":
-            # Extract instance ID from headers
-            instance_id = request.headers.get("X-Green-Api-Instance")
-            
+        if provider != "green_api":
+            return None
+        
+        instance_id = self._instance_id_from_path(request.url.path)
+        if instance_id is None:
+            instance_data = payload.data.get("instanceData") if isinstance(payload.data, dict) else None
+            if isinstance(instance_data, dict):
+                instance_id = instance_data.get("idInstance")
             if not instance_id:
-                # Try to extract from URL or body
-                # This would need to be implemented based on your URL structure
-                pass
-            
-            # For now, return a placeholder
-            # In real implementation, look up hotel by instance_id and return webhook_token
-            return "placeholder_secret"  # This should be replaced with actual lookup
+                instance_id = request.headers.get(self.config.providers.green_api.instance_header)
         
+        if not instance_id:
+            return None
+        
+        return await get_hotel_directory().resolve_instance(str(instance_id))
+    
+    @staticmethod
+    def _instance_id_from_path(path: str) -> Optional[str]:
+        """Instance ID of a /green-api/{instance_id} path"""
+        _, separator, rest = path.rstrip("/").partition("/green-api/")
+        if separator and rest and "/" not in rest:
+            return rest
         return None
     
     def _get_client_ip(self, request: Request) -> str:
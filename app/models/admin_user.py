@@ -254,6 +254,19 @@ class AdminUser(BaseModel, TimestampMixin):
     
     def get_role_permissions(self) -> List[str]:
         """Get default permissions for user role"""
+        return AdminUser.get_default_role_permissions(self.role)
+    
+    @classmethod
+    def get_default_role_permissions(cls, role: AdminRole) -> List[str]:
+        """
+        Get default permissions for a role
+        
+        Args:
+            role: Admin role
+            
+        Returns:
+            List[str]: List of permission strings
+        """
         role_permissions = {
             AdminRole.SUPER_ADMIN: [p.value for p in AdminPermission],
             AdminRole.HOTEL_ADMIN: [
@@ -284,7 +297,7 @@ class AdminUser(BaseModel, TimestampMixin):
             ]
         }
         
-        return role_permissions.get(self.role, [])
+        return role_permissions.get(role, [])
     
     def update_last_login(self) -> None:
         """Update last login timestamp"""
@@ -2,11 +2,12 @@
 Message and Conversation models for WhatsApp Hotel Bot application
 """
 
+import time
 import uuid
 from datetime import datetime
 from typing import Dict, Any, Optional, List
 from decimal import Decimal
-from sqlalchemy import Column, String, Text, DateTime, Index, ForeignKey, CheckConstraint, Numeric
+from sqlalchemy import Column, String, Text, DateTime, Index, ForeignKey, CheckConstraint, Numeric, Integer
 from sqlalchemy.dialects.postgresql import UUID, ENUM
 from sqlalchemy import JSON
 from sqlalchemy.orm import relationship, validates
@@ -74,6 +75,9 @@ conversation_state_enum = ENUM(
     checkfirst=True
 )
 
+# Width of the rolling window kept in Conversation.negative_buckets
+NEGATIVE_WINDOW_HOURS = 24
+
 class Conversation(TenantBaseModel):
     """
     Conversation model for tracking guest conversations
@@ -126,6 +130,45 @@ class Conversation(TenantBaseModel):
         default=datetime.utcnow,
         comment="Timestamp of the last message in the conversation"
     )
+
+    # Denormalized counters, maintained on write by app.services.conversation_counters
+    # and periodically reconciled against the messages table
+    message_count = Column(
+        Integer,
+        nullable=False,
+        default=0,
+        server_default='0',
+        comment="Number of messages in the conversation"
+    )
+
+    incoming_count = Column(
+        Integer,
+        nullable=False,
+        default=0,
+        server_default='0',
+        comment="Number of incoming guest messages in the conversation"
+    )
+
+    unread_count = Column(
+        Integer,
+        nullable=False,
+        default=0,
+        server_default='0',
+        comment="Incoming messages not yet read or answered by the hotel"
+    )
+
+    last_message_id = Column(
+        UUID(as_uuid=True),
+        nullable=True,
+        comment="ID of the most recent message (no FK to avoid a messages/conversations cycle)"
+    )
+
+    negative_buckets = Column(
+        JSON,
+        nullable=False,
+        default=dict,
+        comment="Hourly buckets of negative sentiment counts (epoch hour -> count), last 24h"
+    )
     
     # Table constraints
     __table_args__ = (
@@ -138,6 +181,8 @@ class Conversation(TenantBaseModel):
         Index('idx_conversations_hotel_guest', 'hotel_id', 'guest_id'),
         Index('idx_conversations_hotel_status', 'hotel_id', 'status'),
         Index('idx_conversations_hotel_state', 'hotel_id', 'current_state'),
+        # Keyset pagination of the conversations list
+        Index('idx_conversations_hotel_last_message', 'hotel_id', 'last_message_at', 'id'),
 
         # Partial index for active conversations
         Index(
@@ -146,6 +191,15 @@ class Conversation(TenantBaseModel):
             postgresql_where="status = 'active'"
         ),
 
+        # At most one active conversation per guest; also the conflict
+        # target for batched conversation upserts from webhooks
+        Index(
+            'uq_conversations_active_guest',
+            'hotel_id', 'guest_id',
+            unique=True,
+            postgresql_where="status = 'active'"
+        ),
+
         # Partial index for conversations in specific states
         Index(
             'idx_conversations_processing',
@@ -213,6 +267,15 @@ class Conversation(TenantBaseModel):
         """Update the last message timestamp to now"""
         self.last_message_at = datetime.utcnow()
 
+    @property
+    def negative_count_24h(self) -> int:
+        """Negative-sentiment messages in the last 24 hours"""
+        oldest = int(time.time() // 3600) - NEGATIVE_WINDOW_HOURS
+        return sum(
+            count for key, count in (self.negative_buckets or {}).items()
+            if int(key) > oldest
+        )
+
     def set_context(self, key: str, value: Any) -> None:
         """Set a context value"""
         if self.context is None:
@@ -313,6 +376,13 @@ class Message(TenantBaseModel):
         comment="Categorized sentiment type"
     )
     
+    # Green API message ID, indexed for webhook deduplication and status lookups
+    green_api_message_id = Column(
+        String(255),
+        nullable=True,
+        comment="Green API message ID (idMessage)"
+    )
+    
     # Message metadata
     message_metadata = Column(
         JSON,
@@ -337,6 +407,14 @@ class Message(TenantBaseModel):
         Index('idx_messages_created_at', 'created_at'),
         Index('idx_messages_conversation_created', 'conversation_id', 'created_at'),
         
+        # One stored message per Green API idMessage per hotel (webhook dedup)
+        Index(
+            'uq_messages_hotel_green_api_message_id',
+            'hotel_id', 'green_api_message_id',
+            unique=True,
+            postgresql_where="green_api_message_id IS NOT NULL"
+        ),
+        
         # Partial index for negative sentiment messages
         Index(
             'idx_messages_negative_sentiment',
@@ -104,6 +104,12 @@ class SendPollRequest(GreenAPIBaseRequest):
     multipleAnswers: bool = Field(default=False)
 
 
+class SendTypingRequest(GreenAPIBaseRequest):
+    """Request schema for showing the typing indicator"""
+    chatId: str
+    typingTime: int = Field(default=5000, ge=1000, le=20000, description="Indicator duration in milliseconds")
+
+
 # Response schemas
 class SendMessageResponse(GreenAPIBaseResponse):
     """Response schema for message sending"""
@@ -289,7 +295,7 @@ __all__ = [
     
     # Request schemas
     'SendTextMessageRequest', 'SendFileRequest', 'SendLocationRequest',
-    'SendContactRequest', 'SendPollRequest', 'SetSettingsRequest',
+    'SendContactRequest', 'SendPollRequest', 'SendTypingRequest', 'SetSettingsRequest',
     
     # Response schemas
     'SendMessageResponse', 'MessageStatusResponse', 'GetSettingsResponse',
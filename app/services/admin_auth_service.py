@@ -14,6 +14,7 @@ from app.models.admin_user import AdminUser, AdminRole, AdminPermission
 from app.models.admin_audit_log import AdminAuditLog, AuditAction, AuditSeverity
 from app.core.admin_security import AdminSecurity, AdminAuthenticationError, AdminAuthorizationError
 from app.database import get_db_session
+from app.services.principal_cache import PRINCIPAL_ADMIN, get_principal_cache
 
 logger = structlog.get_logger(__name__)
 
@@ -81,6 +82,8 @@ class AdminAuthService:
                     # Increment failed login attempts
                     admin_user.increment_failed_login()
                     await db.commit()
+                    if admin_user.is_locked:
+                        get_principal_cache().invalidate(PRINCIPAL_ADMIN, admin_user.id)
                     
                     logger.warning(
                         "Authentication failed - invalid password",
@@ -329,6 +332,7 @@ class AdminAuthService:
                 # Set new password
                 admin_user.set_password(new_password)
                 await db.commit()
+                get_principal_cache().invalidate(PRINCIPAL_ADMIN, user_id)
                 
                 logger.info(
                     "Admin user password changed",
@@ -364,6 +368,7 @@ class AdminAuthService:
                 if admin_user:
                     admin_user.unlock_account()
                     await db.commit()
+                    get_principal_cache().invalidate(PRINCIPAL_ADMIN, user_id)
                     
                     logger.info(
                         "Admin user account unlocked",
@@ -13,6 +13,7 @@ from app.models.admin_audit_log import AuditAction, AuditSeverity
 from app.core.admin_security import AdminSecurity, AdminAuthorizationError
 from app.utils.admin_audit import AdminAuditLogger
 from app.database import get_db_session
+from app.services.principal_cache import PRINCIPAL_ADMIN, get_principal_cache
 
 logger = structlog.get_logger(__name__)
 
@@ -179,6 +180,7 @@ class AdminRoleService:
                 
                 await db.commit()
                 await db.refresh(target_user)
+                get_principal_cache().invalidate(PRINCIPAL_ADMIN, user_id)
                 
                 # Log role change
                 await self.audit_logger.log_user_management(
@@ -252,6 +254,7 @@ class AdminRoleService:
                 
                 await db.commit()
                 await db.refresh(target_user)
+                get_principal_cache().invalidate(PRINCIPAL_ADMIN, user_id)
                 
                 # Log permission change
                 await self.audit_logger.log_user_management(
@@ -19,6 +19,7 @@ from app.schemas.admin_auth import (
 from app.core.admin_security import AdminSecurity, AdminAuthenticationError
 from app.utils.admin_audit import AdminAuditLogger
 from app.database import get_db_session
+from app.services.principal_cache import PRINCIPAL_ADMIN, get_principal_cache
 
 logger = structlog.get_logger(__name__)
 
@@ -337,6 +338,7 @@ class AdminUserService:
                 
                 await db.commit()
                 await db.refresh(user)
+                get_principal_cache().invalidate(PRINCIPAL_ADMIN, user_id)
                 
                 # Store new values for audit
                 new_values = {
@@ -481,6 +483,7 @@ class AdminUserService:
                 # Delete user
                 await db.delete(user)
                 await db.commit()
+                get_principal_cache().invalidate(PRINCIPAL_ADMIN, user_id)
 
                 # Log user deletion
                 await self.audit_logger.log_user_management(
@@ -544,6 +547,7 @@ class AdminUserService:
                 # Activate user
                 user.is_active = True
                 await db.commit()
+                get_principal_cache().invalidate(PRINCIPAL_ADMIN, user_id)
 
                 # Log activation
                 await self.audit_logger.log_user_management(
@@ -608,6 +612,7 @@ class AdminUserService:
                 # Deactivate user
                 user.is_active = False
                 await db.commit()
+                get_principal_cache().invalidate(PRINCIPAL_ADMIN, user_id)
 
                 # Log deactivation
                 await self.audit_logger.log_user_management(
@@ -668,6 +673,7 @@ class AdminUserService:
                 # Unlock user
                 user.unlock_account()
                 await db.commit()
+                get_principal_cache().invalidate(PRINCIPAL_ADMIN, user_id)
 
                 # Log unlock
                 await self.audit_logger.log_action(
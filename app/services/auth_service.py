@@ -16,6 +16,7 @@ from app.core.security import Security, AuthenticationError, SecurityError
 from app.utils.jwt_handler import JWTHandler
 from app.models.user import User
 from app.models.role import Role
+from app.services.principal_cache import PRINCIPAL_USER, get_principal_cache
 
 logger = structlog.get_logger(__name__)
 
@@ -238,11 +239,15 @@ class AuthService:
             user.failed_login_attempts = str(failed_attempts)
             
             # Lock account after 5 failed attempts
-            if failed_attempts >= 5:
+            locked = failed_attempts >= 5
+            if locked:
                 user.locked_until = datetime.utcnow() + timedelta(minutes=30)
                 logger.warning("Account locked due to failed attempts", user_id=str(user.id))
             
+            user_id = user.id
             await self.db.commit()
+            if locked:
+                get_principal_cache().invalidate(PRINCIPAL_USER, user_id)
             
         except Exception as e:
             logger.error("Error handling failed login", error=str(e))
@@ -16,6 +16,8 @@ from app.models.message import Message, Conversation
 from app.models.guest import Guest
 from app.services.template_engine import TemplateEngine, TemplateEngineError
 from app.utils.response_matcher import ResponseMatcher
+from app.utils.keyword_matcher import KeywordMatches, get_keyword_registry
+from app.utils.message_analysis import MessageAnalysis
 from app.core.logging import get_logger
 
 logger = get_logger(__name__)
@@ -50,7 +52,8 @@ class AutoResponder:
         self,
         message: Message,
         conversation: Conversation,
-        guest: Guest
+        guest: Guest,
+        analysis: Optional[MessageAnalysis] = None
     ) -> List[Dict[str, Any]]:
         """
         Process incoming message and determine auto-responses
@@ -59,6 +62,7 @@ class AutoResponder:
             message: Incoming message
             conversation: Conversation context
             guest: Guest information
+            analysis: Shared analysis of the message text, if already made
 
         Returns:
             List[Dict[str, Any]]: List of response actions to execute
@@ -74,10 +78,11 @@ class AutoResponder:
                 )
                 return []
 
-            # Evaluate rules against message
+            # Evaluate rules against message, scanning it once for all rule keywords
+            keyword_matches = self._scan_rule_keywords(rules, message, analysis)
             triggered_rules = []
             for rule in rules:
-                if await self._evaluate_rule(rule, message, conversation, guest):
+                if await self._evaluate_rule(rule, message, conversation, guest, keyword_matches):
                     triggered_rules.append(rule)
 
             if not triggered_rules:
@@ -174,12 +179,50 @@ class AutoResponder:
             )
             return []
 
+    def _scan_rule_keywords(
+        self,
+        rules: List[AutoResponseRule],
+        message: Message,
+        analysis: Optional[MessageAnalysis] = None
+    ) -> Optional[KeywordMatches]:
+        """
+        Scan message once for the keywords of all case-insensitive keyword conditions
+
+        Args:
+            rules: Active rules of the message's hotel
+            message: Incoming message
+            analysis: Shared analysis of the message text, if already made
+
+        Returns:
+            Optional[KeywordMatches]: Keywords found, or None if no rule matches keywords
+        """
+        vocabulary = {}
+        for rule in rules:
+            keywords = []
+            for condition in rule.get_trigger_conditions() or []:
+                parameters = condition.get('parameters', {})
+                if (condition.get('type') == TriggerCondition.KEYWORD_MATCH.value
+                        and not parameters.get('case_sensitive', False)):
+                    keywords.extend(kw.lower() for kw in parameters.get('keywords', []))
+            if keywords:
+                vocabulary[str(rule.id)] = keywords
+
+        if not vocabulary or not message.content:
+            return None
+
+        automaton = get_keyword_registry().hotel_automaton(
+            message.hotel_id, vocabulary, namespace="auto_response"
+        )
+        analysis = MessageAnalysis.of(message.content, analysis)
+        return automaton.scan(analysis.lower, lowercase=False)
+
     async def _evaluate_rule(
         self,
         rule: AutoResponseRule,
         message: Message,
         conversation: Conversation,
-        guest: Guest
+        guest: Guest,
+        keyword_matches: Optional[KeywordMatches] = None
     ) -> bool:
         """
         Evaluate if rule conditions are met
@@ -189,6 +232,7 @@ class AutoResponder:
             message: Incoming message
             conversation: Conversation context
             guest: Guest information
+            keyword_matches: Rule keywords found in the message, if already scanned
 
         Returns:
             bool: True if rule should be triggered
@@ -208,7 +252,7 @@ class AutoResponder:
                 parameters = condition.get('parameters', {})
 
                 if not await self._evaluate_condition(
-                    condition_type, parameters, message, conversation, guest
+                    condition_type, parameters, message, conversation, guest, keyword_matches
                 ):
                     return False
 
@@ -229,7 +273,8 @@ class AutoResponder:
         parameters: Dict[str, Any],
         message: Message,
         conversation: Conversation,
-        guest: Guest
+        guest: Guest,
+        keyword_matches: Optional[KeywordMatches] = None
     ) -> bool:
         """
         Evaluate a specific condition
@@ -240,13 +285,14 @@ class AutoResponder:
             message: Incoming message
             conversation: Conversation context
             guest: Guest information
+            keyword_matches: Rule keywords found in the message, if already scanned
 
         Returns:
             bool: True if condition is met
         """
         try:
             if condition_type == TriggerCondition.KEYWORD_MATCH.value:
-                return await self._evaluate_keyword_condition(parameters, message)
+                return await self._evaluate_keyword_condition(parameters, message, keyword_matches)
 
             elif condition_type == TriggerCondition.TIME_BASED.value:
                 return await self._evaluate_time_condition(parameters)
@@ -285,7 +331,8 @@ class AutoResponder:
     async def _evaluate_keyword_condition(
         self,
         parameters: Dict[str, Any],
-        message: Message
+        message: Message,
+        keyword_matches: Optional[KeywordMatches] = None
     ) -> bool:
         """Evaluate keyword matching condition"""
         keywords = parameters.get('keywords', [])
@@ -295,12 +342,13 @@ class AutoResponder:
         if not keywords or not message.content:
             return False
 
-        content = message.content if case_sensitive else message.content.lower()
-
-        if not case_sensitive:
-            keywords = [kw.lower() for kw in keywords]
+        if case_sensitive or keyword_matches is None:
+            matched, _ = self.response_matcher.match_keywords(
+                message.content, keywords, match_type, case_sensitive
+            )
+            return matched
 
-        matches = [kw for kw in keywords if kw in content]
+        matches = [kw for kw in (kw.lower() for kw in keywords) if not kw or kw in keyword_matches]
 
         if match_type == 'all':
             return len(matches) == len(keywords)
@@ -349,10 +397,8 @@ class AutoResponder:
         min_count = parameters.get('min_count', 0)
         max_count = parameters.get('max_count')
 
-        # Get message count for conversation
-        query = select(Message).where(Message.conversation_id == conversation.id)
-        result = await self.db.execute(query)
-        message_count = len(result.scalars().all())
+        # Maintained on write; no scan of the conversation's messages
+        message_count = conversation.message_count or 0
 
         if message_count < min_count:
             return False
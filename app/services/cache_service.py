@@ -1,9 +1,13 @@
 """
 Enhanced multi-level caching service for WhatsApp Hotel Bot
 Provides memory + Redis caching with compression, warming, and intelligent invalidation
+
+Loads on a miss are coalesced per key (see app.utils.single_flight), so an
+expired hot key is loaded once rather than by every concurrent request.
 """
 
 import asyncio
+import inspect
 import json
 import gzip
 import time
@@ -22,6 +26,7 @@ from pydantic import BaseModel
 from app.core.config import settings
 from app.core.logging import get_logger
 from app.core.metrics import track_cache_operation
+from app.utils.single_flight import SingleFlight
 
 logger = get_logger(__name__)
 
@@ -183,6 +188,9 @@ class EnhancedCacheService:
         
         # Invalidation patterns
         self.invalidation_patterns: Dict[str, List[str]] = {}
+        
+        # Concurrent misses of a key share one load; coordinates workers once Redis is up
+        self.single_flight = SingleFlight('cache')
     
     async def initialize(self):
         """Initialize the cache service"""
@@ -198,6 +206,7 @@ class EnhancedCacheService:
             
             # Test Redis connection
             await self.redis_client.ping()
+            self.single_flight.redis_client = self.redis_client
             self.logger.info("Enhanced cache service initialized with Redis")
             
         except Exception as e:
@@ -208,9 +217,43 @@ class EnhancedCacheService:
         self,
         key: str,
         level: CacheLevel = CacheLevel.BOTH,
-        deserializer: Optional[Callable] = None
+        deserializer: Optional[Callable] = None,
+        loader: Optional[Callable] = None,
+        ttl: Optional[int] = None
+    ) -> Optional[Any]:
+        """
+        Get value from cache with multi-level support
+        
+        With a loader, a miss loads the value, caches it with ttl and
+        returns it. Concurrent misses of the same key share one load, across
+        workers too; workers that did not load get the value as a cache hit
+        would return it.
+        """
+        value = await self._get_cached(key, level, deserializer)
+        if value is not None or loader is None:
+            return value
+        
+        return await self.single_flight.do(
+            key,
+            lambda: self._load(key, loader, ttl, level),
+            encode=lambda loaded: self._serialize_value(loaded).decode('utf-8'),
+            decode=lambda data: self._deserialize_value(data.encode('utf-8'), deserializer)
+        )
+    
+    async def _load(self, key: str, loader: Callable, ttl: Optional[int], level: CacheLevel) -> Any:
+        value = loader()
+        if inspect.isawaitable(value):
+            value = await value
+        if value is not None:
+            await self.set(key, value, ttl, level)
+        return value
+    
+    async def _get_cached(
+        self,
+        key: str,
+        level: CacheLevel,
+        deserializer: Optional[Callable]
     ) -> Optional[Any]:
-        """Get value from cache with multi-level support"""
         start_time = time.time()
         
         try:
@@ -227,11 +270,12 @@ class EnhancedCacheService:
                 try:
                     cached_data = await self.redis_client.get(key)
                     if cached_data:
-                        value = self._decompress_and_deserialize(cached_data, deserializer)
+                        serialized_value = self._decompress(cached_data)
+                        value = self._deserialize_value(serialized_value, deserializer)
                         
-                        # Store in memory cache for faster access
+                        # Store in memory cache for faster access, serialized as set() stores it
                         if level == CacheLevel.BOTH:
-                            await self.memory_cache.set(key, value, self.default_ttl)
+                            await self.memory_cache.set(key, serialized_value, self.default_ttl)
                         
                         self.metrics.hits += 1
                         track_cache_operation("get", "redis", True, (time.time() - start_time) * 1000)
@@ -371,16 +415,18 @@ class EnhancedCacheService:
             return gzip.compress(data)
         return data
 
-    def _decompress_and_deserialize(self, data: bytes, deserializer: Optional[Callable] = None) -> Any:
-        """Decompress and deserialize data"""
+    def _decompress(self, data: bytes) -> bytes:
+        """Decompress data if it was compressed"""
         try:
-            # Try to decompress first
             if data.startswith(b'\x1f\x8b'):  # gzip magic number
-                data = gzip.decompress(data)
+                return gzip.decompress(data)
         except Exception:
             pass  # Not compressed or decompression failed
+        return data
 
-        return self._deserialize_value(data, deserializer)
+    def _decompress_and_deserialize(self, data: bytes, deserializer: Optional[Callable] = None) -> Any:
+        """Decompress and deserialize data"""
+        return self._deserialize_value(self._decompress(data), deserializer)
 
     async def warm_cache(self, key: str, warm_func: Callable, ttl: Optional[int] = None) -> bool:
         """Warm cache with data from warming function"""
@@ -443,6 +489,7 @@ class EnhancedCacheService:
                 "hit_rate_percent": hit_rate,
                 "total_operations": total_operations
             },
+            "coalescing": self.single_flight.get_stats(),
             "warming_functions": len(self.warming_functions),
             "invalidation_patterns": len(self.invalidation_patterns)
         }
@@ -0,0 +1,315 @@
+"""
+Write-time maintenance of denormalized conversation counters
+
+Conversation.message_count, incoming_count, unread_count, last_message_id and
+negative_buckets are updated with single atomic UPDATE statements in the same
+transaction as the message insert, status change or sentiment analysis, so
+readers never aggregate the messages table. The statements are plain Core,
+usable from sync and async sessions; reconcile_conversation_counters() repairs
+any drift from the source rows.
+"""
+
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import structlog
+from sqlalchemy import JSON, String, Text, bindparam, case, func, select, text, update
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import aliased
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.models.message import (
+    Conversation, Message, MessageType, NEGATIVE_WINDOW_HOURS
+)
+from app.models.sentiment import SentimentAnalysis
+
+logger = structlog.get_logger(__name__)
+
+# Sentiment scores below this count towards Conversation.negative_buckets
+NEGATIVE_SENTIMENT_THRESHOLD = -0.1
+
+COUNTER_COLUMNS = ('message_count', 'incoming_count', 'unread_count', 'last_message_id')
+
+_conversations = Conversation.__table__
+
+
+def _message_type(message_type: Any) -> MessageType:
+    return message_type if isinstance(message_type, MessageType) else MessageType(message_type)
+
+
+def message_added_stmt(
+    conversation_id: uuid.UUID,
+    message_type: Any,
+    message_id: Optional[uuid.UUID] = None,
+    count: int = 1
+):
+    """
+    UPDATE for messages added to a conversation
+
+    Incoming messages raise the unread count; a reply from the hotel marks
+    everything before it as read.
+    """
+    message_type = _message_type(message_type)
+    values: Dict[str, Any] = {
+        'message_count': Conversation.message_count + count,
+        'last_message_id': message_id
+    }
+    if message_type == MessageType.INCOMING:
+        values['incoming_count'] = Conversation.incoming_count + count
+        values['unread_count'] = Conversation.unread_count + count
+    elif message_type == MessageType.OUTGOING:
+        values['unread_count'] = 0
+    return (
+        update(Conversation)
+        .where(Conversation.id == conversation_id)
+        .values(**values)
+        .returning(*(getattr(Conversation, name) for name in COUNTER_COLUMNS))
+        .execution_options(synchronize_session=False)
+    )
+
+
+def message_read_stmt(conversation_id: uuid.UUID):
+    """UPDATE for an incoming message that has been read"""
+    return (
+        update(Conversation)
+        .where(Conversation.id == conversation_id)
+        .values(unread_count=case(
+            (Conversation.unread_count > 0, Conversation.unread_count - 1),
+            else_=0
+        ))
+        .returning(*(getattr(Conversation, name) for name in COUNTER_COLUMNS))
+        .execution_options(synchronize_session=False)
+    )
+
+
+def apply_counters(conversation: Optional[Conversation], row) -> None:
+    """Copy RETURNING values onto a loaded conversation without marking it dirty"""
+    if conversation is None or row is None:
+        return
+    for name in COUNTER_COLUMNS:
+        set_committed_value(conversation, name, getattr(row, name))
+
+
+async def record_message(session, conversation: Conversation, message: Message) -> None:
+    """Count a newly added message (AsyncSession); the message must be flushed"""
+    result = await session.execute(
+        message_added_stmt(conversation.id, message.message_type, message.id)
+    )
+    apply_counters(conversation, result.first())
+
+
+def record_message_sync(session, conversation: Conversation, message: Message) -> None:
+    """Count a newly added message (sync Session); the message must be flushed"""
+    result = session.execute(
+        message_added_stmt(conversation.id, message.message_type, message.id)
+    )
+    apply_counters(conversation, result.first())
+
+
+async def record_message_read(session, conversation_id: uuid.UUID) -> None:
+    """Decrement the unread count after an incoming message was read (AsyncSession)"""
+    await session.execute(message_read_stmt(conversation_id))
+
+
+def negative_sentiment_stmt(conversation_id: uuid.UUID, at: Optional[datetime] = None):
+    """
+    UPDATE counting a negative-sentiment message in the rolling 24h window
+
+    The bucket increment and the pruning of buckets older than the window
+    happen in one statement against the stored row, so concurrent negatives
+    never overwrite each other's increments.
+    """
+    hour = int((at.timestamp() if at else time.time()) // 3600)
+    return text("""
+        UPDATE conversations
+        SET negative_buckets = ((
+            SELECT COALESCE(jsonb_object_agg(bucket.key, bucket.value), '{}'::jsonb)
+            FROM jsonb_each(COALESCE(conversations.negative_buckets::jsonb, '{}'::jsonb)) AS bucket
+            WHERE bucket.key::bigint > :oldest AND bucket.key <> CAST(:hour AS text)
+        ) || jsonb_build_object(
+            CAST(:hour AS text),
+            COALESCE((conversations.negative_buckets::jsonb ->> CAST(:hour AS text))::int, 0) + 1
+        ))::json
+        WHERE conversations.id = :conversation_id
+        RETURNING conversations.negative_buckets
+    """).bindparams(
+        bindparam('conversation_id', conversation_id, type_=UUID(as_uuid=True)),
+        bindparam('hour', str(hour), type_=String),
+        oldest=hour - NEGATIVE_WINDOW_HOURS
+    ).columns(negative_buckets=JSON)
+
+
+def _apply_negative_buckets(conversation: Optional[Conversation], row) -> None:
+    if conversation is not None and row is not None:
+        set_committed_value(conversation, 'negative_buckets', row.negative_buckets)
+
+
+async def record_negative_sentiment(session, conversation: Conversation, at: Optional[datetime] = None) -> None:
+    """Count a negative-sentiment message on a conversation (AsyncSession)"""
+    result = await session.execute(negative_sentiment_stmt(conversation.id, at))
+    _apply_negative_buckets(conversation, result.first())
+
+
+def record_negative_sentiment_sync(session, conversation: Conversation, at: Optional[datetime] = None) -> None:
+    """Count a negative-sentiment message on a conversation (sync Session)"""
+    result = session.execute(negative_sentiment_stmt(conversation.id, at))
+    _apply_negative_buckets(conversation, result.first())
+
+
+def batch_incoming_stmt():
+    """
+    executemany UPDATE for a batch of incoming messages
+
+    Parameters per conversation: b_id, b_count, b_last_message_id.
+    """
+    return (
+        update(_conversations)
+        .where(_conversations.c.id == bindparam('b_id'))
+        .values(
+            message_count=_conversations.c.message_count + bindparam('b_count'),
+            incoming_count=_conversations.c.incoming_count + bindparam('b_count'),
+            unread_count=_conversations.c.unread_count + bindparam('b_count'),
+            last_message_id=bindparam('b_last_message_id')
+        )
+    )
+
+
+def batch_incoming_params(messages: Iterable[Tuple[uuid.UUID, uuid.UUID]]) -> List[Dict[str, Any]]:
+    """
+    Group (conversation_id, message_id) pairs, in arrival order, into
+    parameters for batch_incoming_stmt()
+    """
+    grouped: Dict[uuid.UUID, Dict[str, Any]] = {}
+    for conversation_id, message_id in messages:
+        params = grouped.setdefault(conversation_id, {
+            'b_id': conversation_id,
+            'b_count': 0,
+            'b_last_message_id': None
+        })
+        params['b_count'] += 1
+        params['b_last_message_id'] = message_id
+    return list(grouped.values())
+
+
+def _reconcile_values() -> Dict[str, Any]:
+    """Correlated subqueries recomputing every counter from messages"""
+    reply = aliased(Message)
+    last_reply_at = (
+        select(func.max(reply.created_at))
+        .where(
+            reply.conversation_id == Conversation.id,
+            reply.message_type == MessageType.OUTGOING
+        )
+        .correlate(Conversation)
+        .scalar_subquery()
+    )
+
+    def count(*criteria):
+        return (
+            select(func.count(Message.id))
+            .where(Message.conversation_id == Conversation.id, *criteria)
+            .correlate(Conversation)
+            .scalar_subquery()
+        )
+
+    return {
+        'message_count': count(),
+        'incoming_count': count(Message.message_type == MessageType.INCOMING),
+        'unread_count': count(
+            Message.message_type == MessageType.INCOMING,
+            Message.created_at > func.coalesce(last_reply_at, datetime(1970, 1, 1)),
+            func.coalesce(Message.message_metadata['delivery_status'].as_string(), '') != 'read'
+        ),
+        'last_message_id': (
+            select(Message.id)
+            .where(Message.conversation_id == Conversation.id)
+            .order_by(Message.created_at.desc())
+            .limit(1)
+            .correlate(Conversation)
+            .scalar_subquery()
+        )
+    }
+
+
+async def reconcile_conversation_counters(session, since: Optional[datetime] = None) -> Dict[str, int]:
+    """
+    Recompute counters for conversations active since `since` (AsyncSession)
+
+    Message counters are rebuilt with one set-based UPDATE; negative
+    sentiment buckets are rebuilt from the last 24h of sentiment analyses,
+    and emptied on every other conversation that still has buckets.
+    Pass since=None to reconcile every conversation.
+    """
+    counters_stmt = update(Conversation).values(**_reconcile_values()).execution_options(
+        synchronize_session=False
+    )
+    if since is not None:
+        counters_stmt = counters_stmt.where(Conversation.last_message_at >= since)
+    reconciled = (await session.execute(counters_stmt)).rowcount
+
+    window_start = datetime.utcnow() - timedelta(hours=NEGATIVE_WINDOW_HOURS)
+    negative_criteria = (
+        SentimentAnalysis.sentiment_score < NEGATIVE_SENTIMENT_THRESHOLD,
+        SentimentAnalysis.created_at >= window_start,
+        SentimentAnalysis.conversation_id.isnot(None)
+    )
+    buckets: Dict[uuid.UUID, Dict[str, int]] = defaultdict(dict)
+    negative_rows = await session.execute(
+        select(SentimentAnalysis.conversation_id, SentimentAnalysis.created_at).where(*negative_criteria)
+    )
+    for conversation_id, created_at in negative_rows:
+        hour = str(int(created_at.timestamp() // 3600))
+        buckets[conversation_id][hour] = buckets[conversation_id].get(hour, 0) + 1
+
+    # Over-counted conversations without recent negatives are reset too
+    cleared = (await session.execute(
+        update(_conversations)
+        .where(
+            _conversations.c.negative_buckets.cast(Text) != '{}',
+            _conversations.c.id.notin_(
+                select(SentimentAnalysis.conversation_id).where(*negative_criteria)
+            )
+        )
+        .values(negative_buckets={})
+    )).rowcount
+
+    params = [
+        {'b_id': conversation_id, 'b_buckets': conversation_buckets}
+        for conversation_id, conversation_buckets in buckets.items()
+    ]
+    if params:
+        await session.execute(
+            update(_conversations)
+            .where(_conversations.c.id == bindparam('b_id'))
+            .values(negative_buckets=bindparam('b_buckets')),
+            params
+        )
+
+    await session.commit()
+    result = {
+        'conversations_reconciled': reconciled,
+        'negative_buckets_rebuilt': len(params),
+        'negative_buckets_cleared': cleared
+    }
+    logger.info("Conversation counters reconciled", **result)
+    return result
+
+
+__all__ = [
+    'NEGATIVE_SENTIMENT_THRESHOLD',
+    'message_added_stmt',
+    'message_read_stmt',
+    'apply_counters',
+    'record_message',
+    'record_message_sync',
+    'record_message_read',
+    'negative_sentiment_stmt',
+    'record_negative_sentiment',
+    'record_negative_sentiment_sync',
+    'batch_incoming_stmt',
+    'batch_incoming_params',
+    'reconcile_conversation_counters'
+]
@@ -1,9 +1,18 @@
 """
 Conversation memory service for managing context and guest preferences
+
+Each conversation's context is one Redis hash (field per context key) whose
+TTL is renewed on every write, so reads, updates and deletes take a single
+round trip and Redis expires idle conversations itself. Context written by
+earlier versions as one string key per context key is read through on a
+miss, by key or with all context, and moved into the hash;
+migrate_legacy_context() moves the rest. Reading or deleting all context
+scans for a conversation's legacy keys only once, guarded by a marker key
+claimed in the same round trip.
 """
 
 import json
-import redis
+import redis.asyncio as redis
 from typing import Dict, Any, Optional, List, Union
 from uuid import UUID
 from datetime import datetime, timedelta
@@ -29,25 +38,43 @@ class ConversationMemory:
         self.context_prefix = "conv_context:"
         self.guest_pref_prefix = "guest_pref:"
         self.session_prefix = "conv_session:"
+        self.migrated_prefix = "conv_context_migrated:"
+        self.legacy_fallback = settings.CONVERSATION_MEMORY_LEGACY_FALLBACK
     
     def _create_redis_client(self) -> redis.Redis:
-        """Create Redis client"""
+        """Create Redis client (connects on first command)"""
+        return redis.from_url(
+            settings.REDIS_URL,
+            decode_responses=True,
+            socket_connect_timeout=5,
+            socket_timeout=5,
+            retry_on_timeout=True
+        )
+    
+    def _context_key(self, conversation_id: Union[str, UUID]) -> str:
+        """Hash holding all context of a conversation"""
+        return f"{self.context_prefix}{conversation_id}"
+    
+    def _legacy_context_key(self, conversation_id: Union[str, UUID], key: str) -> str:
+        """String key of one context value as written by earlier versions"""
+        return f"{self.context_prefix}{conversation_id}:{key}"
+    
+    def _migrated_key(self, conversation_id: Union[str, UUID]) -> str:
+        """Marker claimed by the first scan for a conversation's legacy keys"""
+        return f"{self.migrated_prefix}{conversation_id}"
+    
+    @staticmethod
+    def _serialize(value: Any) -> str:
+        if isinstance(value, (dict, list)):
+            return json.dumps(value, default=str)
+        return str(value)
+    
+    @staticmethod
+    def _deserialize(value: str) -> Any:
         try:
-            client = redis.from_url(
-                settings.REDIS_URL,
-                decode_responses=True,
-                socket_connect_timeout=5,
-                socket_timeout=5,
-                retry_on_timeout=True
-            )
-            # Test connection
-            client.ping()
-            logger.info("Redis connection established")
-            return client
-        except Exception as e:
-            logger.error("Failed to connect to Redis", error=str(e))
-            # Fallback to in-memory storage for development
-            return redis.Redis(host='localhost', port=6379, decode_responses=True)
+            return json.loads(value)
+        except (json.JSONDecodeError, TypeError):
+            return value
     
     async def store_context(
         self,
@@ -63,37 +90,12 @@ class ConversationMemory:
             conversation_id: Conversation ID
             key: Context key
             value: Value to store
-            ttl: Time to live in seconds
+            ttl: Time to live in seconds of the conversation's context
             
         Returns:
             bool: Success status
         """
-        try:
-            redis_key = f"{self.context_prefix}{conversation_id}:{key}"
-            
-            # Serialize value
-            if isinstance(value, (dict, list)):
-                serialized_value = json.dumps(value, default=str)
-            else:
-                serialized_value = str(value)
-            
-            # Store with TTL
-            ttl = ttl or self.default_ttl
-            result = self.redis_client.setex(redis_key, ttl, serialized_value)
-            
-            logger.debug("Context stored",
-                        conversation_id=str(conversation_id),
-                        key=key,
-                        ttl=ttl)
-            
-            return result
-            
-        except Exception as e:
-            logger.error("Failed to store context",
-                        conversation_id=str(conversation_id),
-                        key=key,
-                        error=str(e))
-            return False
+        return await self.update_context(conversation_id, {key: value}, ttl)
     
     async def get_context(
         self,
@@ -115,39 +117,37 @@ class ConversationMemory:
         try:
             if key:
                 # Get specific key
-                redis_key = f"{self.context_prefix}{conversation_id}:{key}"
-                value = self.redis_client.get(redis_key)
+                value = await self.redis_client.hget(self._context_key(conversation_id), key)
+                
+                if value is None and self.legacy_fallback:
+                    value = await self._migrate_legacy_value(conversation_id, key)
                 
                 if value is None:
                     return default
                 
-                # Try to deserialize JSON
-                try:
-                    return json.loads(value)
-                except (json.JSONDecodeError, TypeError):
-                    return value
+                return self._deserialize(value)
             else:
-                # Get all context keys for conversation
-                pattern = f"{self.context_prefix}{conversation_id}:*"
-                keys = self.redis_client.keys(pattern)
+                # Get all context of the conversation
+                redis_key = self._context_key(conversation_id)
+                if self.legacy_fallback:
+                    async with self.redis_client.pipeline(transaction=False) as pipe:
+                        pipe.hgetall(redis_key)
+                        self._claim_legacy_scan(pipe, conversation_id)
+                        values, first_read = await pipe.execute()
+                    if first_read:
+                        # Values already in the hash are newer than legacy ones
+                        legacy = await self._migrate_legacy_conversation(conversation_id)
+                        values = {**legacy, **values}
+                else:
+                    values = await self.redis_client.hgetall(redis_key)
                 
-                if not keys:
+                if not values:
                     return default or {}
                 
-                # Get all values
-                context = {}
-                for redis_key in keys:
-                    # Extract the context key from redis key
-                    context_key = redis_key.split(':', 2)[-1]
-                    value = self.redis_client.get(redis_key)
-                    
-                    if value:
-                        try:
-                            context[context_key] = json.loads(value)
-                        except (json.JSONDecodeError, TypeError):
-                            context[context_key] = value
-                
-                return context
+                return {
+                    context_key: self._deserialize(value)
+                    for context_key, value in values.items()
+                }
                 
         except Exception as e:
             logger.error("Failed to get context",
@@ -168,24 +168,32 @@ class ConversationMemory:
         Args:
             conversation_id: Conversation ID
             updates: Dictionary of key-value pairs to update
-            ttl: Time to live in seconds
+            ttl: Time to live in seconds of the conversation's context
             
         Returns:
             bool: Success status
         """
+        if not updates:
+            return True
+        
         try:
-            success_count = 0
+            redis_key = self._context_key(conversation_id)
+            ttl = ttl or self.default_ttl
             
-            for key, value in updates.items():
-                if await self.store_context(conversation_id, key, value, ttl):
-                    success_count += 1
+            # Write the fields and renew the TTL in one round trip
+            async with self.redis_client.pipeline(transaction=True) as pipe:
+                pipe.hset(redis_key, mapping={
+                    key: self._serialize(value) for key, value in updates.items()
+                })
+                pipe.expire(redis_key, ttl)
+                await pipe.execute()
             
             logger.debug("Context updated",
                         conversation_id=str(conversation_id),
                         updated_keys=list(updates.keys()),
-                        success_count=success_count)
+                        ttl=ttl)
             
-            return success_count == len(updates)
+            return True
             
         except Exception as e:
             logger.error("Failed to update context",
@@ -209,20 +217,29 @@ class ConversationMemory:
             bool: Success status
         """
         try:
+            redis_key = self._context_key(conversation_id)
             if key:
                 # Delete specific key
-                redis_key = f"{self.context_prefix}{conversation_id}:{key}"
-                result = self.redis_client.delete(redis_key)
-                return result > 0
+                async with self.redis_client.pipeline(transaction=False) as pipe:
+                    pipe.hdel(redis_key, key)
+                    if self.legacy_fallback:
+                        pipe.delete(self._legacy_context_key(conversation_id, key))
+                    results = await pipe.execute()
+                return sum(results) > 0
             else:
                 # Delete all context for conversation
-                pattern = f"{self.context_prefix}{conversation_id}:*"
-                keys = self.redis_client.keys(pattern)
-                
-                if keys:
-                    result = self.redis_client.delete(*keys)
-                    return result > 0
+                if not self.legacy_fallback:
+                    await self.redis_client.delete(redis_key)
+                    return True
                 
+                async with self.redis_client.pipeline(transaction=False) as pipe:
+                    pipe.delete(redis_key)
+                    self._claim_legacy_scan(pipe, conversation_id)
+                    _, first_delete = await pipe.execute()
+                if first_delete:
+                    legacy_keys = await self._legacy_keys(conversation_id)
+                    if legacy_keys:
+                        await self.redis_client.delete(*legacy_keys)
                 return True
                 
         except Exception as e:
@@ -232,6 +249,136 @@ class ConversationMemory:
                         error=str(e))
             return False
     
+    async def _migrate_legacy_value(
+        self,
+        conversation_id: Union[str, UUID],
+        key: str
+    ) -> Optional[str]:
+        """Move one context value written by an earlier version into the hash"""
+        legacy_key = self._legacy_context_key(conversation_id, key)
+        value = await self.redis_client.get(legacy_key)
+        if value is None:
+            return None
+        
+        redis_key = self._context_key(conversation_id)
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            pipe.hsetnx(redis_key, key, value)
+            pipe.expire(redis_key, self.default_ttl)
+            pipe.delete(legacy_key)
+            await pipe.execute()
+        
+        logger.debug("Legacy context value migrated",
+                    conversation_id=str(conversation_id),
+                    key=key)
+        return value
+    
+    async def _move_legacy_keys(self, legacy_keys: List[str]) -> Dict[str, str]:
+        """
+        Move legacy context keys into their conversations' hashes
+        
+        Values already present in a hash are kept. Returns the moved values
+        by legacy key; keys that are gone or not legacy string keys are skipped.
+        """
+        if not legacy_keys:
+            return {}
+        
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for legacy_key in legacy_keys:
+                pipe.get(legacy_key)
+            values = await pipe.execute(raise_on_error=False)
+        
+        moved: Dict[str, str] = {}
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for legacy_key, value in zip(legacy_keys, values):
+                if not isinstance(value, str):
+                    continue  # already gone, or not a legacy string key
+                conversation_id, key = legacy_key[len(self.context_prefix):].split(':', 1)
+                redis_key = self._context_key(conversation_id)
+                pipe.hsetnx(redis_key, key, value)
+                pipe.expire(redis_key, self.default_ttl)
+                pipe.delete(legacy_key)
+                moved[legacy_key] = value
+            if moved:
+                await pipe.execute()
+        return moved
+    
+    def _claim_legacy_scan(self, pipe, conversation_id: Union[str, UUID]) -> None:
+        """
+        Queue claiming the scan for a conversation's legacy keys
+        
+        The result is True only for the first claim. No version writes
+        legacy keys any more, so once the marker has outlived the longest
+        context TTL none can be left.
+        """
+        pipe.set(self._migrated_key(conversation_id), 1, nx=True, ex=self.default_ttl)
+    
+    async def _legacy_keys(self, conversation_id: Union[str, UUID]) -> List[str]:
+        """Legacy context keys of one conversation"""
+        try:
+            return [
+                legacy_key async for legacy_key in self.redis_client.scan_iter(
+                    match=self._legacy_context_key(conversation_id, '*')
+                )
+            ]
+        except Exception:
+            # Let the next read scan again
+            await self.redis_client.delete(self._migrated_key(conversation_id))
+            raise
+    
+    async def _migrate_legacy_conversation(self, conversation_id: Union[str, UUID]) -> Dict[str, str]:
+        """Move all legacy context values of one conversation into its hash"""
+        legacy_keys = await self._legacy_keys(conversation_id)
+        prefix = self._legacy_context_key(conversation_id, '')
+        moved = {
+            legacy_key[len(prefix):]: value
+            for legacy_key, value in (await self._move_legacy_keys(legacy_keys)).items()
+        }
+        if moved:
+            logger.debug("Legacy conversation context migrated",
+                        conversation_id=str(conversation_id),
+                        keys=list(moved))
+        return moved
+    
+    async def migrate_legacy_context(self, batch_size: int = 500) -> Dict[str, int]:
+        """
+        Move all context written by earlier versions into per-conversation hashes
+        
+        Walks the keyspace with SCAN, so Redis is never blocked; run once
+        after deploying, then disable CONVERSATION_MEMORY_LEGACY_FALLBACK.
+        Values already present in a hash are kept.
+        
+        Args:
+            batch_size: Keys migrated per round trip
+            
+        Returns:
+            Dict with migration statistics
+        """
+        stats = {'keys_scanned': 0, 'keys_migrated': 0}
+        batch: List[str] = []
+        
+        async def migrate_batch() -> None:
+            stats['keys_migrated'] += len(await self._move_legacy_keys(batch))
+            batch.clear()
+        
+        try:
+            async for legacy_key in self.redis_client.scan_iter(
+                match=f"{self.context_prefix}*:*",
+                count=batch_size
+            ):
+                stats['keys_scanned'] += 1
+                batch.append(legacy_key)
+                if len(batch) >= batch_size:
+                    await migrate_batch()
+            if batch:
+                await migrate_batch()
+            
+            logger.info("Legacy conversation context migrated", **stats)
+            return stats
+            
+        except Exception as e:
+            logger.error("Failed to migrate legacy context", error=str(e), **stats)
+            return {**stats, 'error': str(e)}
+    
     async def store_guest_preferences(
         self,
         guest_id: Union[str, UUID],
@@ -262,7 +409,7 @@ class ConversationMemory:
             serialized = json.dumps(existing, default=str)
             ttl = ttl or (self.default_ttl * 30)  # 30 days for preferences
             
-            result = self.redis_client.setex(redis_key, ttl, serialized)
+            result = await self.redis_client.setex(redis_key, ttl, serialized)
             
             logger.debug("Guest preferences stored",
                         guest_id=str(guest_id),
@@ -291,7 +438,7 @@ class ConversationMemory:
         """
         try:
             redis_key = f"{self.guest_pref_prefix}{guest_id}"
-            value = self.redis_client.get(redis_key)
+            value = await self.redis_client.get(redis_key)
             
             if value:
                 return json.loads(value)
@@ -329,7 +476,7 @@ class ConversationMemory:
             session_data['expires_at'] = (datetime.utcnow() + timedelta(seconds=ttl)).isoformat()
             
             serialized = json.dumps(session_data, default=str)
-            result = self.redis_client.setex(redis_key, ttl, serialized)
+            result = await self.redis_client.setex(redis_key, ttl, serialized)
             
             logger.debug("Conversation session created",
                         conversation_id=str(conversation_id),
@@ -358,7 +505,7 @@ class ConversationMemory:
         """
         try:
             redis_key = f"{self.session_prefix}{conversation_id}"
-            value = self.redis_client.get(redis_key)
+            value = await self.redis_client.get(redis_key)
             
             if value:
                 return json.loads(value)
@@ -388,7 +535,7 @@ class ConversationMemory:
         """
         try:
             redis_key = f"{self.session_prefix}{conversation_id}"
-            result = self.redis_client.expire(redis_key, additional_ttl)
+            result = await self.redis_client.expire(redis_key, additional_ttl)
             
             logger.debug("Session extended",
                         conversation_id=str(conversation_id),
@@ -404,44 +551,16 @@ class ConversationMemory:
     
     async def cleanup_expired_data(self) -> Dict[str, int]:
         """
-        Cleanup expired data (manual cleanup for monitoring)
+        Cleanup memory data
+        
+        Every key is written with a TTL and Redis expires it natively, so
+        there is nothing to sweep; this only moves any context left by
+        earlier versions into per-conversation hashes.
         
         Returns:
             Dict with cleanup statistics
         """
-        try:
-            stats = {
-                'contexts_cleaned': 0,
-                'preferences_cleaned': 0,
-                'sessions_cleaned': 0
-            }
-            
-            # Note: Redis automatically handles TTL expiration,
-            # this is mainly for monitoring and manual cleanup
-            
-            # Get all keys with TTL
-            for prefix, stat_key in [
-                (self.context_prefix, 'contexts_cleaned'),
-                (self.guest_pref_prefix, 'preferences_cleaned'),
-                (self.session_prefix, 'sessions_cleaned')
-            ]:
-                pattern = f"{prefix}*"
-                keys = self.redis_client.keys(pattern)
-                
-                for key in keys:
-                    ttl = self.redis_client.ttl(key)
-                    if ttl == -1:  # No TTL set
-                        # Set default TTL
-                        self.redis_client.expire(key, self.default_ttl)
-                    elif ttl == -2:  # Key doesn't exist (expired)
-                        stats[stat_key] += 1
-            
-            logger.info("Memory cleanup completed", **stats)
-            return stats
-            
-        except Exception as e:
-            logger.error("Failed to cleanup expired data", error=str(e))
-            return {'error': str(e)}
+        return await self.migrate_legacy_context()
 
 
 # Export memory service
@@ -1,18 +1,32 @@
 """
 Redis caching service for DeepSeek AI responses
+
+Cached entries of each operation type are listed in a sorted set scored by
+expiry time, so listing, counting and clearing the cache walk that index
+rather than the Redis keyspace, and per-entry metadata is fetched in one
+pipelined round trip.
+
+Exact-text misses fall through to a per-hotel near-duplicate tier (see
+app.services.semantic_cache): entries are also stored under a key of their
+normalized text, and paraphrases are matched by local embeddings.
+
+Concurrent misses for the same key are coalesced into one DeepSeek call,
+within a process and across workers (see app.utils.single_flight).
 """
 
 import json
 import hashlib
 import time
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple, Callable, Awaitable
 from datetime import datetime, timedelta
 
 import structlog
-import redis
+import redis.asyncio as redis
 from redis.exceptions import RedisError
 
 from app.core.config import settings
+from app.services.semantic_cache import SemanticCache, normalize_text
+from app.utils.single_flight import SingleFlight
 from app.schemas.deepseek import (
     CacheKey,
     CachedResponse,
@@ -26,10 +40,13 @@ logger = structlog.get_logger(__name__)
 class DeepSeekCacheService:
     """Redis-based caching service for DeepSeek AI responses"""
     
+    # Keys deleted per round trip when clearing
+    CLEAR_BATCH_SIZE = 500
+    
     def __init__(self):
-        self.redis_client = self._create_redis_client()
         self.default_ttl = getattr(settings, 'DEEPSEEK_CACHE_TTL', 3600)  # 1 hour
         self.cache_enabled = getattr(settings, 'DEEPSEEK_CACHE_ENABLED', True)
+        self.redis_client = self._create_redis_client()
         
         # Cache key prefixes
         self.prefixes = {
@@ -37,9 +54,28 @@ class DeepSeekCacheService:
             'response': 'deepseek:response:',
             'conversation': 'deepseek:conversation:',
             'metrics': 'deepseek:metrics:',
-            'config': 'deepseek:config:'
+            'config': 'deepseek:config:',
+            'semantic': 'deepseek:semantic:'
         }
         
+        # Sorted set of cached keys per operation type, scored by expiry time
+        self.index_prefix = 'deepseek:index:'
+        
+        # Near-duplicate tier for paraphrased guest messages
+        self.semantic_cache = SemanticCache(
+            mode=getattr(settings, 'DEEPSEEK_SEMANTIC_CACHE_MODE', 'shadow'),
+            similarity_threshold=getattr(settings, 'DEEPSEEK_SEMANTIC_CACHE_THRESHOLD', 0.85),
+            max_entries=getattr(settings, 'DEEPSEEK_SEMANTIC_CACHE_MAX_ENTRIES', 1000)
+        )
+        
+        # Concurrent identical misses share one DeepSeek call; the lock
+        # outlives a request so waiting workers do not call it as well
+        self.single_flight = SingleFlight(
+            'deepseek',
+            self.redis_client if self.cache_enabled else None,
+            lock_ttl=getattr(settings, 'DEEPSEEK_TIMEOUT', 60)
+        )
+        
         # Cache statistics
         self.stats = {
             'hits': 0,
@@ -55,29 +91,22 @@ class DeepSeekCacheService:
             logger.info("DeepSeek cache disabled, using mock client")
             return MockRedisClient()
 
-        try:
-            client = redis.Redis(
-                host=getattr(settings, 'REDIS_HOST', 'localhost'),
-                port=getattr(settings, 'REDIS_PORT', 6379),
-                db=getattr(settings, 'REDIS_DB', 0),
-                password=getattr(settings, 'REDIS_PASSWORD', None),
-                decode_responses=True,
-                socket_timeout=5,
-                socket_connect_timeout=5,
-                retry_on_timeout=True,
-                health_check_interval=30
-            )
-
-            # Test connection
-            client.ping()
-            logger.info("Redis connection established for DeepSeek cache")
-
-            return client
-
-        except Exception as e:
-            logger.warning("Failed to connect to Redis for DeepSeek cache, using mock client", error=str(e))
-            # Return a mock client that does nothing
-            return MockRedisClient()
+        # Connects on first command; failures surface as RedisError
+        return redis.Redis(
+            host=getattr(settings, 'REDIS_HOST', 'localhost'),
+            port=getattr(settings, 'REDIS_PORT', 6379),
+            db=getattr(settings, 'REDIS_DB', 0),
+            password=getattr(settings, 'REDIS_PASSWORD', None),
+            decode_responses=True,
+            socket_timeout=5,
+            socket_connect_timeout=5,
+            retry_on_timeout=True,
+            health_check_interval=30
+        )
+    
+    def _index_key(self, operation_type: str) -> str:
+        """Sorted set indexing the cached keys of an operation type"""
+        return f"{self.index_prefix}{operation_type}"
     
     def _create_cache_key(
         self,
@@ -129,6 +158,128 @@ class DeepSeekCacheService:
             logger.error("Failed to deserialize cached response", error=str(e))
             return None
     
+    async def _store_entry(
+        self,
+        operation_type: str,
+        cache_key: str,
+        serialized_data: str,
+        metadata: Dict[str, Any],
+        ttl: int,
+        normalized_key: Optional[str] = None
+    ) -> bool:
+        """Store an entry with its metadata and index it, in one round trip"""
+        now = time.time()
+        index_key = self._index_key(operation_type)
+        
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            pipe.setex(cache_key, ttl, serialized_data)
+            pipe.setex(f"{cache_key}:meta", ttl, json.dumps(metadata))
+            pipe.zadd(index_key, {cache_key: now + ttl})
+            # Drop expired entries so the index tracks the live cache
+            pipe.zremrangebyscore(index_key, '-inf', now)
+            if normalized_key:
+                semantic_index_key = self._index_key('semantic')
+                pipe.setex(normalized_key, ttl, serialized_data)
+                pipe.zadd(semantic_index_key, {normalized_key: now + ttl})
+                pipe.zremrangebyscore(semantic_index_key, '-inf', now)
+            results = await pipe.execute()
+        
+        return bool(results[0])
+    
+    async def _record_hit(self, cache_key: str) -> None:
+        """Count a hit on a cached entry"""
+        hit_count_key = f"{cache_key}:hits"
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            pipe.incr(hit_count_key)
+            pipe.expire(hit_count_key, self.default_ttl)
+            await pipe.execute()
+    
+    def _semantic_scope(
+        self,
+        operation_type: str,
+        model: str,
+        params: Dict[str, Any],
+        context_hash: Optional[str] = None
+    ) -> Optional[Tuple[str, ...]]:
+        """
+        Near-duplicate scope of a cache lookup: one hotel, parameter set
+        and, for generated responses, conversation context
+        
+        Entries without a hotel are never matched, so hotels cannot see
+        each other's cached results; responses are personalized by their
+        context, so guests never see replies generated for another guest.
+        """
+        hotel_id = params.get('hotel_id')
+        if not self.semantic_cache.enabled or hotel_id is None:
+            return None
+        scope_params = dict(params, context_hash=context_hash) if context_hash is not None else params
+        params_hash = hashlib.md5(json.dumps(scope_params, sort_keys=True, default=str).encode()).hexdigest()
+        return (operation_type, model, str(hotel_id), params_hash)
+    
+    def _normalized_key(self, scope: Tuple[str, ...], normalized: str) -> str:
+        """Cache key of an entry by its normalized text"""
+        operation_type, model, hotel_id, params_hash = scope
+        text_hash = hashlib.md5(normalized.encode()).hexdigest()
+        return f"{self.prefixes['semantic']}{operation_type}:{model}:{hotel_id}:{text_hash}:{params_hash}"
+    
+    async def _get_near_duplicate(
+        self,
+        scope: Optional[Tuple[str, ...]],
+        text: str,
+        cache_key: str
+    ) -> Optional[str]:
+        """
+        Cached data of a near-duplicate of text after an exact-text miss
+        
+        Normalized-text matches are served; paraphrase matches are served
+        in serve mode, and in shadow mode kept to compare with the fresh
+        result that will be cached under cache_key.
+        """
+        if scope is None:
+            return None
+        
+        semantic = self.semantic_cache
+        semantic.stats['lookups'] += 1
+        normalized = normalize_text(text)
+        
+        cached_data = await self.redis_client.get(self._normalized_key(scope, normalized))
+        if cached_data:
+            semantic.stats['normalized_hits'] += 1
+            return cached_data
+        
+        match = semantic.nearest(scope, normalized)
+        if match is None:
+            return None
+        
+        match_key, similarity = match
+        cached_data = await self.redis_client.get(match_key)
+        if not cached_data:
+            semantic.forget(scope, match_key)
+            return None
+        
+        if semantic.serving:
+            semantic.stats['semantic_hits'] += 1
+            logger.debug("Semantic cache hit",
+                       cache_key=match_key,
+                       similarity=round(similarity, 3))
+            return cached_data
+        
+        semantic.record_shadow(scope[0], cache_key, cached_data, similarity)
+        return None
+    
+    def _index_near_duplicate(
+        self,
+        scope: Optional[Tuple[str, ...]],
+        normalized: str,
+        cache_key: str,
+        serialized_data: str
+    ) -> None:
+        """Make a newly cached entry findable by paraphrase, settling any shadow match"""
+        if scope is None:
+            return
+        self.semantic_cache.add(scope, cache_key, normalized)
+        self.semantic_cache.settle_shadow(cache_key, serialized_data)
+    
     async def get_sentiment_cache(
         self,
         text: str,
@@ -142,14 +293,16 @@ class DeepSeekCacheService:
         try:
             cache_key = self._create_cache_key('sentiment', text, model, **kwargs)
             
-            cached_data = self.redis_client.get(cache_key)
+            cached_data = await self.redis_client.get(cache_key)
             if cached_data:
-                self.stats['hits'] += 1
-                
                 # Update hit count
-                hit_count_key = f"{cache_key}:hits"
-                self.redis_client.incr(hit_count_key)
-                self.redis_client.expire(hit_count_key, self.default_ttl)
+                await self._record_hit(cache_key)
+            else:
+                scope = self._semantic_scope('sentiment', model, kwargs)
+                cached_data = await self._get_near_duplicate(scope, text, cache_key)
+            
+            if cached_data:
+                self.stats['hits'] += 1
                 
                 result = self._deserialize_response(cached_data, 'sentiment')
                 
@@ -186,25 +339,27 @@ class DeepSeekCacheService:
         try:
             cache_key = self._create_cache_key('sentiment', text, model, **kwargs)
             serialized_data = self._serialize_response(result)
+            scope = self._semantic_scope('sentiment', model, kwargs)
+            normalized = normalize_text(text)
             
             ttl = ttl or self.default_ttl
             
-            success = self.redis_client.setex(cache_key, ttl, serialized_data)
+            metadata = {
+                'cached_at': datetime.utcnow().isoformat(),
+                'ttl': ttl,
+                'text_length': len(text),
+                'sentiment_type': result.sentiment.value,
+                'confidence': result.confidence
+            }
+            
+            success = await self._store_entry(
+                'sentiment', cache_key, serialized_data, metadata, ttl,
+                normalized_key=self._normalized_key(scope, normalized) if scope else None
+            )
             
             if success:
                 self.stats['sets'] += 1
-                
-                # Set metadata
-                metadata = {
-                    'cached_at': datetime.utcnow().isoformat(),
-                    'ttl': ttl,
-                    'text_length': len(text),
-                    'sentiment_type': result.sentiment.value,
-                    'confidence': result.confidence
-                }
-                
-                metadata_key = f"{cache_key}:meta"
-                self.redis_client.setex(metadata_key, ttl, json.dumps(metadata))
+                self._index_near_duplicate(scope, normalized, cache_key, serialized_data)
                 
                 logger.debug("Sentiment result cached",
                            cache_key=cache_key,
@@ -238,14 +393,16 @@ class DeepSeekCacheService:
             cache_content = f"{message}|{context_hash}"
             cache_key = self._create_cache_key('response', cache_content, model, **kwargs)
             
-            cached_data = self.redis_client.get(cache_key)
+            cached_data = await self.redis_client.get(cache_key)
             if cached_data:
-                self.stats['hits'] += 1
-                
                 # Update hit count
-                hit_count_key = f"{cache_key}:hits"
-                self.redis_client.incr(hit_count_key)
-                self.redis_client.expire(hit_count_key, self.default_ttl)
+                await self._record_hit(cache_key)
+            else:
+                scope = self._semantic_scope('response', model, kwargs, context_hash)
+                cached_data = await self._get_near_duplicate(scope, message, cache_key)
+            
+            if cached_data:
+                self.stats['hits'] += 1
                 
                 result = self._deserialize_response(cached_data, 'response')
                 
@@ -285,25 +442,28 @@ class DeepSeekCacheService:
             cache_content = f"{message}|{context_hash}"
             cache_key = self._create_cache_key('response', cache_content, model, **kwargs)
             serialized_data = self._serialize_response(result)
+            # Paraphrases are only matched within the same conversation context
+            scope = self._semantic_scope('response', model, kwargs, context_hash)
+            normalized = normalize_text(message)
             
             ttl = ttl or self.default_ttl
             
-            success = self.redis_client.setex(cache_key, ttl, serialized_data)
+            metadata = {
+                'cached_at': datetime.utcnow().isoformat(),
+                'ttl': ttl,
+                'message_length': len(message),
+                'response_type': result.response_type,
+                'confidence': result.confidence
+            }
+            
+            success = await self._store_entry(
+                'response', cache_key, serialized_data, metadata, ttl,
+                normalized_key=self._normalized_key(scope, normalized) if scope else None
+            )
             
             if success:
                 self.stats['sets'] += 1
-                
-                # Set metadata
-                metadata = {
-                    'cached_at': datetime.utcnow().isoformat(),
-                    'ttl': ttl,
-                    'message_length': len(message),
-                    'response_type': result.response_type,
-                    'confidence': result.confidence
-                }
-                
-                metadata_key = f"{cache_key}:meta"
-                self.redis_client.setex(metadata_key, ttl, json.dumps(metadata))
+                self._index_near_duplicate(scope, normalized, cache_key, serialized_data)
                 
                 logger.debug("Response result cached",
                            cache_key=cache_key,
@@ -321,11 +481,90 @@ class DeepSeekCacheService:
             logger.error("Error setting response cache", error=str(e))
             return False
     
-    def get_cache_stats(self) -> Dict[str, Any]:
-        """Get cache statistics"""
+    async def _coalesce(
+        self,
+        operation_type: str,
+        cache_key: str,
+        compute: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        return await self.single_flight.do(
+            cache_key,
+            compute,
+            encode=self._serialize_response,
+            decode=lambda data: self._deserialize_response(data, operation_type)
+        )
+    
+    async def coalesce_sentiment(
+        self,
+        text: str,
+        compute: Callable[[], Awaitable[SentimentAnalysisResult]],
+        model: str = "deepseek-chat",
+        **kwargs
+    ) -> SentimentAnalysisResult:
+        """
+        Run compute once for concurrent sentiment cache misses of the same text
+        
+        Callers whose call was coalesced with one that failed in another
+        worker get SingleFlightError.
+        """
+        cache_key = self._create_cache_key('sentiment', text, model, **kwargs)
+        return await self._coalesce('sentiment', cache_key, compute)
+    
+    async def coalesce_response(
+        self,
+        message: str,
+        context_hash: str,
+        compute: Callable[[], Awaitable[ResponseGenerationResult]],
+        model: str = "deepseek-chat",
+        **kwargs
+    ) -> ResponseGenerationResult:
+        """Run compute once for concurrent response cache misses of the same message and context"""
+        cache_key = self._create_cache_key('response', f"{message}|{context_hash}", model, **kwargs)
+        return await self._coalesce('response', cache_key, compute)
+    
+    async def get_cache_stats(self, sample_size: int = 20) -> Dict[str, Any]:
+        """
+        Get cache statistics
+        
+        Entry counts come from the per-type indexes; sizes are estimated
+        from a random sample of entries, so the cost does not grow with
+        the size of the cache.
+        
+        Args:
+            sample_size: Entries sampled per operation type
+        """
         try:
             # Get Redis info
-            redis_info = self.redis_client.info()
+            redis_info = await self.redis_client.info()
+            
+            now = time.time()
+            operation_types = list(self.prefixes)
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                for operation_type in operation_types:
+                    pipe.zcount(self._index_key(operation_type), now, '+inf')
+                for operation_type in operation_types:
+                    pipe.zrandmember(self._index_key(operation_type), sample_size)
+                results = await pipe.execute()
+            counts = results[:len(operation_types)]
+            samples = [sample or [] for sample in results[len(operation_types):]]
+            
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                for sample in samples:
+                    for key in sample:
+                        pipe.strlen(key)
+                sizes = iter(await pipe.execute())
+            
+            entries = {}
+            for operation_type, count, sample in zip(operation_types, counts, samples):
+                # Sampled keys that have expired since being indexed report 0
+                sample_sizes = [size for size in (next(sizes) for _ in sample) if size]
+                average_size = sum(sample_sizes) / len(sample_sizes) if sample_sizes else 0
+                entries[operation_type] = {
+                    'entries': count,
+                    'sampled': len(sample_sizes),
+                    'avg_size_bytes': round(average_size),
+                    'estimated_size_bytes': round(average_size * count)
+                }
             
             # Calculate hit rate
             total_requests = self.stats['hits'] + self.stats['misses']
@@ -338,6 +577,9 @@ class DeepSeekCacheService:
                 'sets': self.stats['sets'],
                 'errors': self.stats['errors'],
                 'hit_rate_percent': round(hit_rate, 2),
+                'entries': entries,
+                'semantic': self.semantic_cache.get_stats(),
+                'coalescing': self.single_flight.get_stats(),
                 'redis_memory_used': redis_info.get('used_memory_human', 'unknown'),
                 'redis_connected_clients': redis_info.get('connected_clients', 0),
                 'redis_keyspace_hits': redis_info.get('keyspace_hits', 0),
@@ -351,27 +593,28 @@ class DeepSeekCacheService:
                 'error': str(e)
             }
     
-    def clear_cache(self, pattern: Optional[str] = None) -> int:
-        """Clear cache entries"""
+    async def clear_cache(self, pattern: Optional[str] = None) -> int:
+        """
+        Clear cache entries
+        
+        Without a pattern, the entries listed in the per-type indexes are
+        deleted with their metadata and hit counters. A pattern is matched
+        with SCAN, so Redis is never blocked by the walk.
+        """
         try:
             if pattern:
                 # Clear specific pattern
-                keys = self.redis_client.keys(pattern)
-                if keys:
-                    deleted = self.redis_client.delete(*keys)
-                    logger.info("Cache cleared by pattern",
-                               pattern=pattern,
-                               deleted_keys=deleted)
-                    return deleted
-                return 0
+                deleted = await self._delete_matching(pattern)
+                logger.info("Cache cleared by pattern",
+                           pattern=pattern,
+                           deleted_keys=deleted)
+                return deleted
             else:
                 # Clear all DeepSeek cache
                 total_deleted = 0
-                for prefix in self.prefixes.values():
-                    keys = self.redis_client.keys(f"{prefix}*")
-                    if keys:
-                        deleted = self.redis_client.delete(*keys)
-                        total_deleted += deleted
+                for operation_type in self.prefixes:
+                    total_deleted += await self._delete_indexed(operation_type)
+                self.semantic_cache.clear()
                 
                 logger.info("All DeepSeek cache cleared",
                            deleted_keys=total_deleted)
@@ -381,43 +624,93 @@ class DeepSeekCacheService:
             logger.error("Error clearing cache", error=str(e))
             return 0
     
-    def get_cache_keys_info(self, limit: int = 100) -> List[Dict[str, Any]]:
-        """Get information about cached keys"""
+    async def _delete_indexed(self, operation_type: str) -> int:
+        """Delete the indexed entries of an operation type, a batch per round trip"""
+        index_key = self._index_key(operation_type)
+        deleted = 0
+        
+        while True:
+            keys = await self.redis_client.zrange(index_key, 0, self.CLEAR_BATCH_SIZE - 1)
+            if not keys:
+                return deleted
+            
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                pipe.unlink(*[
+                    related_key
+                    for key in keys
+                    for related_key in (key, f"{key}:meta", f"{key}:hits")
+                ])
+                pipe.zrem(index_key, *keys)
+                results = await pipe.execute()
+            deleted += results[0]
+    
+    async def _delete_matching(self, pattern: str) -> int:
+        """Delete keys matching pattern, walking the keyspace with SCAN"""
+        deleted = 0
+        batch: List[str] = []
+        
+        async for key in self.redis_client.scan_iter(match=pattern, count=self.CLEAR_BATCH_SIZE):
+            batch.append(key)
+            if len(batch) >= self.CLEAR_BATCH_SIZE:
+                deleted += await self.redis_client.unlink(*batch)
+                batch = []
+        if batch:
+            deleted += await self.redis_client.unlink(*batch)
+        
+        return deleted
+    
+    async def get_cache_keys_info(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """
+        Get information about cached keys
+        
+        Lists up to limit live entries per operation type, most recently
+        cached first, in two round trips whatever the size of the cache.
+        """
         try:
             keys_info = []
+            now = time.time()
             
-            for operation_type, prefix in self.prefixes.items():
-                keys = self.redis_client.keys(f"{prefix}*")[:limit]
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                for operation_type in self.prefixes:
+                    pipe.zrevrangebyscore(self._index_key(operation_type), '+inf', now, start=0, num=limit)
+                listed = await pipe.execute()
+            
+            entries = [
+                (operation_type, key)
+                for operation_type, keys in zip(self.prefixes, listed)
+                for key in keys
+            ]
+            if not entries:
+                return keys_info
+            
+            # Fetch TTL, size, metadata and hit count of every entry at once
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                for _, key in entries:
+                    pipe.ttl(key)
+                    pipe.strlen(key)
+                    pipe.get(f"{key}:meta")
+                    pipe.get(f"{key}:hits")
+                results = await pipe.execute()
+            
+            for position, (operation_type, key) in enumerate(entries):
+                ttl, size, meta_data, hit_count = results[position * 4:position * 4 + 4]
+                if ttl == -2:
+                    continue  # expired since it was listed
                 
-                for key in keys:
-                    if not key.endswith(':meta') and not key.endswith(':hits'):
-                        try:
-                            ttl = self.redis_client.ttl(key)
-                            size = len(self.redis_client.get(key) or '')
-                            
-                            # Get metadata if available
-                            meta_key = f"{key}:meta"
-                            metadata = {}
-                            if self.redis_client.exists(meta_key):
-                                meta_data = self.redis_client.get(meta_key)
-                                if meta_data:
-                                    metadata = json.loads(meta_data)
-                            
-                            # Get hit count
-                            hit_count_key = f"{key}:hits"
-                            hit_count = self.redis_client.get(hit_count_key) or 0
-                            
-                            keys_info.append({
-                                'key': key,
-                                'operation_type': operation_type,
-                                'ttl_seconds': ttl,
-                                'size_bytes': size,
-                                'hit_count': int(hit_count),
-                                'metadata': metadata
-                            })
-                            
-                        except Exception as e:
-                            logger.error("Error getting key info", key=key, error=str(e))
+                try:
+                    metadata = json.loads(meta_data) if meta_data else {}
+                except ValueError as e:
+                    logger.error("Error getting key info", key=key, error=str(e))
+                    metadata = {}
+                
+                keys_info.append({
+                    'key': key,
+                    'operation_type': operation_type,
+                    'ttl_seconds': ttl,
+                    'size_bytes': size,
+                    'hit_count': int(hit_count or 0),
+                    'metadata': metadata
+                })
             
             return keys_info
             
@@ -432,35 +725,92 @@ class MockRedisClient:
     def __init__(self):
         self.data = {}
     
-    def get(self, key):
+    async def get(self, key):
         return None
     
-    def setex(self, key, ttl, value):
+    async def setex(self, key, ttl, value):
         return False
     
-    def delete(self, *keys):
+    async def delete(self, *keys):
         return 0
     
-    def keys(self, pattern):
-        return []
+    async def unlink(self, *keys):
+        return 0
     
-    def exists(self, key):
+    async def exists(self, key):
         return False
     
-    def incr(self, key):
+    async def incr(self, key):
         return 1
     
-    def expire(self, key, ttl):
+    async def expire(self, key, ttl):
         return True
     
-    def ttl(self, key):
+    async def ttl(self, key):
         return -1
     
-    def ping(self):
+    async def strlen(self, key):
+        return 0
+    
+    async def zadd(self, name, mapping):
+        return 0
+    
+    async def zrem(self, name, *members):
+        return 0
+    
+    async def zremrangebyscore(self, name, min, max):
+        return 0
+    
+    async def zrange(self, name, start, end):
+        return []
+    
+    async def zrevrangebyscore(self, name, max, min, start=None, num=None):
+        return []
+    
+    async def zcount(self, name, min, max):
+        return 0
+    
+    async def zrandmember(self, key, count=None):
+        return []
+    
+    async def scan_iter(self, match=None, count=None):
+        return
+        yield
+    
+    async def ping(self):
         return True
     
-    def info(self):
+    async def info(self):
         return {}
+    
+    def pipeline(self, transaction=True):
+        return MockRedisPipeline(self)
+
+
+class MockRedisPipeline:
+    """Pipeline of the mock Redis client"""
+    
+    def __init__(self, client: MockRedisClient):
+        self.client = client
+        self.commands = []
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        return False
+    
+    def __getattr__(self, name):
+        command = getattr(self.client, name)
+        
+        def queue(*args, **kwargs):
+            self.commands.append(command(*args, **kwargs))
+        return queue
+    
+    async def execute(self, raise_on_error=True):
+        results = [await command for command in self.commands]
+        self.commands = []
+        return results
 
 
 # Global cache service instance
@@ -6,7 +6,7 @@ import asyncio
 import hashlib
 import json
 import time
-from typing import Optional, Dict, Any, List, Union
+from typing import AsyncIterator, Optional, Dict, Any, List, Union
 from datetime import datetime, timedelta
 
 import structlog
@@ -34,17 +34,28 @@ from app.schemas.deepseek import (
     ChatCompletionResponse,
     ChatMessage,
     MessageRole,
-    DeepSeekAPIError,
     DeepSeekOperationLog
 )
+from app.exceptions.custom_exceptions import DeepSeekAPIError
 from app.core.deepseek_logging import get_deepseek_logger, log_deepseek_operation
-from app.utils.circuit_breaker import get_circuit_breaker
-from app.core.circuit_breaker_config import get_circuit_breaker_config, CircuitBreakerNames
+from app.utils.bulkhead import get_bulkhead
+from app.utils.circuit_breaker import CircuitBreakerOpenException
+from app.core.circuit_breaker_config import (
+    get_circuit_breaker_config,
+    get_bulkhead_limits,
+    CircuitBreakerNames
+)
 from app.decorators.retry_decorator import retry_http_requests
 
 logger = structlog.get_logger(__name__)
 
 
+def _usage_tokens(usage: Any, field: str) -> int:
+    """Token count from a stream's usage, parsed or left as a raw dict by older SDKs"""
+    value = usage.get(field) if isinstance(usage, dict) else getattr(usage, field, None)
+    return value or 0
+
+
 class RateLimiter:
     """Rate limiter for DeepSeek API calls"""
     
@@ -97,8 +108,9 @@ class RateLimiter:
 class DeepSeekClient:
     """Async client for DeepSeek API"""
     
-    def __init__(self, config: Optional[DeepSeekConfig] = None):
+    def __init__(self, config: Optional[DeepSeekConfig] = None, tenant_id: Optional[str] = None):
         self.config = config or get_global_deepseek_config()
+        self.tenant_id = tenant_id or "default"
         self.client = AsyncOpenAI(
             api_key=self.config.api_key,
             base_url=self.config.base_url,
@@ -110,9 +122,14 @@ class DeepSeekClient:
         )
         self.logger = get_deepseek_logger()
 
-        # Circuit breaker for reliability
+        # Per-hotel bulkhead; the shared breaker only trips on provider-wide outages
         cb_config = get_circuit_breaker_config(CircuitBreakerNames.DEEPSEEK_API)
-        self.circuit_breaker = get_circuit_breaker(CircuitBreakerNames.DEEPSEEK_API, cb_config)
+        self.bulkhead = get_bulkhead(
+            CircuitBreakerNames.DEEPSEEK_API,
+            cb_config,
+            **get_bulkhead_limits(CircuitBreakerNames.DEEPSEEK_API)
+        )
+        self.circuit_breaker = self.bulkhead.provider_breaker
 
         logger.info("DeepSeek client initialized",
                    base_url=self.config.base_url,
@@ -134,28 +151,16 @@ class DeepSeekClient:
         self,
         request: ChatCompletionRequest,
         operation_type: str = "chat_completion",
-        correlation_id: Optional[str] = None
+        correlation_id: Optional[str] = None,
+        tenant_id: Optional[str] = None
     ) -> ChatCompletionResponse:
         """Make request to DeepSeek API with circuit breaker and retry logic"""
 
         # Estimate tokens for rate limiting
-        total_content = " ".join([msg.content for msg in request.messages])
-        estimated_tokens = self._estimate_tokens(total_content) + (request.max_tokens or 0)
+        estimated_tokens = self._estimate_request_tokens(request)
 
         # Wait for rate limit
-        max_wait_attempts = 5
-        wait_attempts = 0
-
-        while not await self.rate_limiter.acquire(estimated_tokens):
-            if wait_attempts >= max_wait_attempts:
-                raise Exception("Rate limit exceeded, max wait attempts reached")
-
-            wait_time = self.rate_limiter.get_wait_time()
-            logger.warning("Rate limit hit, waiting",
-                         wait_time=wait_time,
-                         attempt=wait_attempts + 1)
-            await asyncio.sleep(wait_time + 1)
-            wait_attempts += 1
+        await self._wait_for_rate_limit(estimated_tokens)
 
         # Execute with circuit breaker protection
         async def make_api_request():
@@ -202,40 +207,168 @@ class DeepSeekClient:
             )
 
             # Log successful operation
-            log_deepseek_operation(
+            await log_deepseek_operation(
                 operation_type=operation_type,
-                model=request.model,
-                input_tokens=result.usage["prompt_tokens"] if result.usage else 0,
-                output_tokens=result.usage["completion_tokens"] if result.usage else 0,
-                response_time_ms=response_time,
+                model_used=request.model,
+                tokens_used=result.usage["total_tokens"] if result.usage else 0,
+                api_response_time_ms=response_time,
                 correlation_id=correlation_id
             )
 
             return result
 
         try:
-            # Execute with circuit breaker
-            return await self.circuit_breaker.call(make_api_request)
+            # Execute within the hotel's bulkhead
+            return await self.bulkhead.call(tenant_id or self.tenant_id, make_api_request)
         except Exception as e:
-            # Log error
-            logger.error("DeepSeek API request failed",
-                        operation_type=operation_type,
-                        model=request.model,
-                        error=str(e),
-                        error_type=type(e).__name__)
-
-            # Log failed operation
-            log_deepseek_operation(
-                operation_type=operation_type,
-                model=request.model,
-                input_tokens=estimated_tokens,
-                output_tokens=0,
-                response_time_ms=0,
-                correlation_id=correlation_id,
-                error=str(e)
-            )
+            raise await self._request_failed(request, operation_type, correlation_id, e) from e
+    
+    def _estimate_request_tokens(self, request: ChatCompletionRequest) -> int:
+        """Estimate prompt plus completion tokens of a request"""
+        total_content = " ".join([msg.content for msg in request.messages])
+        return self._estimate_tokens(total_content) + (request.max_tokens or 0)
+    
+    async def _wait_for_rate_limit(self, estimated_tokens: int) -> None:
+        """Wait until the rate limiter admits a request"""
+        max_wait_attempts = 5
+        wait_attempts = 0
 
-            raise DeepSeekAPIError(f"DeepSeek API request failed: {str(e)}") from e
+        while not await self.rate_limiter.acquire(estimated_tokens):
+            if wait_attempts >= max_wait_attempts:
+                raise Exception("Rate limit exceeded, max wait attempts reached")
+
+            wait_time = self.rate_limiter.get_wait_time()
+            logger.warning("Rate limit hit, waiting",
+                         wait_time=wait_time,
+                         attempt=wait_attempts + 1)
+            await asyncio.sleep(wait_time + 1)
+            wait_attempts += 1
+    
+    async def _request_failed(
+        self,
+        request: ChatCompletionRequest,
+        operation_type: str,
+        correlation_id: Optional[str],
+        error: Exception
+    ) -> DeepSeekAPIError:
+        """Log a failed request; returns the error to raise"""
+        # Log error
+        logger.error("DeepSeek API request failed",
+                    operation_type=operation_type,
+                    model=request.model,
+                    error=str(error),
+                    error_type=type(error).__name__)
+
+        # Log failed operation
+        await log_deepseek_operation(
+            operation_type=operation_type,
+            model_used=request.model,
+            tokens_used=0,
+            api_response_time_ms=0,
+            success=False,
+            error_message=str(error),
+            correlation_id=correlation_id
+        )
+
+        return DeepSeekAPIError(message=f"DeepSeek API request failed: {str(error)}")
+    
+    async def _stream_request(
+        self,
+        request: ChatCompletionRequest,
+        operation_type: str = "chat_completion_stream",
+        correlation_id: Optional[str] = None,
+        tenant_id: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """
+        Stream a request's completion as text deltas
+        
+        The hotel's bulkhead admits the request before the stream opens and
+        records its outcome once the stream has ended, so a connection that
+        drops mid-answer counts as a failure. A consumer that stops early
+        closes the stream without either.
+        """
+        estimated_tokens = self._estimate_request_tokens(request)
+        await self._wait_for_rate_limit(estimated_tokens)
+        
+        # Only admission raises CircuitBreakerOpenException; failures inside
+        # are already wrapped in DeepSeekAPIError
+        try:
+            async with self.bulkhead.admit(tenant_id or self.tenant_id) as compartment:
+                start_time = time.time()
+                first_token_ms = None
+                output: List[str] = []
+                usage = None
+                stream = None
+                completed = False
+                
+                try:
+                    # The breaker's timeout bounds the wait for the response headers;
+                    # the client timeout bounds each read after that
+                    stream = await asyncio.wait_for(
+                        self.client.chat.completions.create(
+                            model=request.model,
+                            messages=[{"role": msg.role.value, "content": msg.content} for msg in request.messages],
+                            max_tokens=request.max_tokens,
+                            temperature=request.temperature,
+                            top_p=request.top_p,
+                            frequency_penalty=request.frequency_penalty,
+                            presence_penalty=request.presence_penalty,
+                            stop=request.stop,
+                            stream=True,
+                            extra_body={"stream_options": {"include_usage": True}}
+                        ),
+                        timeout=self.bulkhead.breaker_config.timeout
+                    )
+                    
+                    async for event in stream:
+                        if getattr(event, 'usage', None):
+                            usage = event.usage  # final event, with empty choices
+                        if not event.choices:
+                            continue
+                        delta = event.choices[0].delta.content
+                        if delta:
+                            if first_token_ms is None:
+                                first_token_ms = int((time.time() - start_time) * 1000)
+                            output.append(delta)
+                            yield delta
+                    
+                    completed = True
+                
+                except Exception as e:
+                    if isinstance(e, (asyncio.TimeoutError, self.bulkhead.breaker_config.expected_exception)):
+                        self.bulkhead.record_failure(compartment, time.time() - start_time, e)
+                    raise await self._request_failed(request, operation_type, correlation_id, e) from e
+                
+                finally:
+                    if stream is not None and not completed:
+                        await stream.response.aclose()
+                
+                response_time = time.time() - start_time
+                self.bulkhead.record_success(compartment, response_time)
+        except CircuitBreakerOpenException as e:
+            raise await self._request_failed(request, operation_type, correlation_id, e) from e
+        
+        # Without a usage event, fall back to estimates
+        if usage:
+            prompt_tokens = _usage_tokens(usage, 'prompt_tokens')
+            completion_tokens = _usage_tokens(usage, 'completion_tokens')
+        else:
+            prompt_tokens = estimated_tokens - (request.max_tokens or 0)
+            completion_tokens = self._estimate_tokens(''.join(output))
+        await log_deepseek_operation(
+            operation_type=operation_type,
+            model_used=request.model,
+            tokens_used=prompt_tokens + completion_tokens,
+            api_response_time_ms=int(response_time * 1000),
+            correlation_id=correlation_id
+        )
+        
+        logger.debug("DeepSeek stream completed",
+                    model=request.model,
+                    time_to_first_token_ms=first_token_ms,
+                    response_time_ms=int(response_time * 1000),
+                    output_chars=sum(len(delta) for delta in output),
+                    correlation_id=correlation_id)
     
     async def chat_completion(
         self,
@@ -244,6 +377,7 @@ class DeepSeekClient:
         max_tokens: Optional[int] = None,
         temperature: Optional[float] = None,
         correlation_id: Optional[str] = None,
+        tenant_id: Optional[str] = None,
         **kwargs
     ) -> ChatCompletionResponse:
         """Create chat completion"""
@@ -259,7 +393,36 @@ class DeepSeekClient:
         return await self._make_request(
             request, 
             operation_type="chat_completion",
-            correlation_id=correlation_id
+            correlation_id=correlation_id,
+            tenant_id=tenant_id
+        )
+    
+    def stream_chat_completion(
+        self,
+        messages: List[ChatMessage],
+        model: Optional[DeepSeekModel] = None,
+        max_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+        correlation_id: Optional[str] = None,
+        tenant_id: Optional[str] = None,
+        **kwargs
+    ) -> AsyncIterator[str]:
+        """Stream chat completion as text deltas"""
+        
+        request = ChatCompletionRequest(
+            model=(model or self.config.default_model).value,
+            messages=messages,
+            max_tokens=max_tokens or self.config.max_tokens,
+            temperature=temperature or self.config.temperature,
+            stream=True,
+            **kwargs
+        )
+        
+        return self._stream_request(
+            request,
+            operation_type="chat_completion_stream",
+            correlation_id=correlation_id,
+            tenant_id=tenant_id
         )
     
     async def simple_completion(
@@ -364,7 +527,7 @@ async def get_hotel_deepseek_client(hotel_id: str, hotel_settings: Dict[str, Any
     hotel_config = create_hotel_deepseek_config(hotel_id, hotel_settings)
 
     # Create and store client
-    client = DeepSeekClient(hotel_config)
+    client = DeepSeekClient(hotel_config, tenant_id=hotel_id)
     _hotel_clients[hotel_id] = client
 
     logger.info("Created hotel-specific DeepSeek client", hotel_id=hotel_id)
@@ -405,7 +568,8 @@ def get_hotel_client_metrics() -> Dict[str, Dict[str, Any]]:
             "temperature": client.config.temperature,
             "has_api_key": bool(client.config.api_key),
             "rate_limit_rpm": client.config.max_requests_per_minute,
-            "rate_limit_tpm": client.config.max_tokens_per_minute
+            "rate_limit_tpm": client.config.max_tokens_per_minute,
+            "circuit_breaker": client.bulkhead.get_tenant_state(hotel_id)
         }
 
     return metrics
@@ -424,7 +588,7 @@ def create_hotel_deepseek_client(hotel_id: str, hotel_settings: Dict[str, Any])
         DeepSeekClient: Configured client for the hotel
     """
     hotel_config = create_hotel_deepseek_config(hotel_id, hotel_settings)
-    return DeepSeekClient(hotel_config)
+    return DeepSeekClient(hotel_config, tenant_id=hotel_id)
 
 
 # Export main components
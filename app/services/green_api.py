@@ -17,12 +17,14 @@ from app.middleware.green_api_middleware import get_green_api_metrics
 from app.schemas.green_api import (
     GreenAPIBaseRequest, GreenAPIBaseResponse, GreenAPIError,
     SendTextMessageRequest, SendFileRequest, SendLocationRequest,
-    SendContactRequest, SendPollRequest, SetSettingsRequest,
+    SendContactRequest, SendPollRequest, SendTypingRequest, SetSettingsRequest,
     SendMessageResponse, GetSettingsResponse, GetStateInstanceResponse,
     MessageType, MessageStatus
 )
-from app.utils.circuit_breaker import get_circuit_breaker
-from app.core.circuit_breaker_config import get_circuit_breaker_config, CircuitBreakerNames
+from app.utils.bulkhead import get_bulkhead
+from app.core.circuit_breaker_config import (
+    get_circuit_breaker_config, get_bulkhead_limits, CircuitBreakerNames
+)
 from app.decorators.retry_decorator import retry_http_requests
 
 logger = structlog.get_logger(__name__)
@@ -184,9 +186,14 @@ class GreenAPIClient:
         self.retry_handler = RetryHandler(config)
         self._client: Optional[httpx.AsyncClient] = None
 
-        # Circuit breaker for reliability
+        # Per-instance bulkhead; the shared breaker only trips on provider-wide outages
         cb_config = get_circuit_breaker_config(CircuitBreakerNames.GREEN_API)
-        self.circuit_breaker = get_circuit_breaker(CircuitBreakerNames.GREEN_API, cb_config)
+        self.bulkhead = get_bulkhead(
+            CircuitBreakerNames.GREEN_API,
+            cb_config,
+            **get_bulkhead_limits(CircuitBreakerNames.GREEN_API)
+        )
+        self.circuit_breaker = self.bulkhead.provider_breaker
 
         # Metrics
         self.request_count = 0
@@ -291,8 +298,8 @@ class GreenAPIClient:
             return result
 
         try:
-            # Execute with circuit breaker
-            result = await self.circuit_breaker.call(make_http_request)
+            # Execute within this instance's bulkhead
+            result = await self.bulkhead.call(self.config.instance_id, make_http_request)
 
             return result
 
@@ -365,6 +372,10 @@ class GreenAPIClient:
         result = await self._make_request("POST", "sendPoll", request.dict())
         return SendMessageResponse(**result)
     
+    async def send_typing(self, request: SendTypingRequest) -> Dict[str, Any]:
+        """Show the typing indicator in a chat"""
+        return await self._make_request("POST", "sendTyping", request.dict())
+    
     async def get_settings(self) -> GetSettingsResponse:
         """Get instance settings"""
         result = await self._make_request("GET", "getSettings")
@@ -404,7 +415,8 @@ class GreenAPIClient:
             "error_count": self.error_count,
             "error_rate": self.error_count / max(self.request_count, 1),
             "last_request_time": self.last_request_time.isoformat() if self.last_request_time else None,
-            "instance_id": self.config.instance_id
+            "instance_id": self.config.instance_id,
+            "circuit_breaker": self.bulkhead.get_tenant_state(self.config.instance_id)
         }
 
 
@@ -16,7 +16,7 @@ from app.services.green_api import (
 )
 from app.schemas.green_api import (
     SendTextMessageRequest, SendFileRequest, SendLocationRequest,
-    SendContactRequest, SendPollRequest, SendMessageResponse,
+    SendContactRequest, SendPollRequest, SendTypingRequest, SendMessageResponse,
     format_chat_id, extract_phone_number, MessageType
 )
 from app.models.hotel import Hotel
@@ -257,6 +257,31 @@ class GreenAPIService:
                         error=str(e))
             raise
     
+    async def send_typing(
+        self,
+        hotel: Hotel,
+        phone_number: str,
+        typing_time_ms: int = 5000
+    ) -> bool:
+        """Show the typing indicator to guest; best effort, never raises"""
+        try:
+            client = await self.get_hotel_client(hotel)
+            
+            request = SendTypingRequest(
+                chatId=format_chat_id(phone_number),
+                typingTime=typing_time_ms
+            )
+            
+            await client.send_typing(request)
+            return True
+            
+        except Exception as e:
+            logger.debug("Failed to send typing indicator",
+                        hotel_id=hotel.id,
+                        phone_number=phone_number,
+                        error=str(e))
+            return False
+    
     async def get_instance_status(self, hotel: Hotel) -> Dict[str, Any]:
         """Get Green API instance status for hotel"""
         try:
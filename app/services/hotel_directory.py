@@ -0,0 +1,445 @@
+"""
+In-process directory of hotels
+
+Webhooks resolve their hotel by Green API instance ID and tenant requests
+by hotel ID, on every request. The directory keeps an immutable snapshot
+of every hotel in memory so that both are dictionary lookups: it is loaded
+in bulk at startup, refreshed incrementally from hotels whose updated_at
+moved, and fully reloaded now and then to drop deleted hotels. When
+HotelService changes a hotel it evicts the snapshot locally and publishes
+the hotel ID on a Redis channel that every worker's directory listens on,
+so other workers drop it too instead of waiting for the next refresh.
+
+A lookup that misses falls back to one database query and caches the
+result; misses for unknown keys are remembered briefly so that webhooks
+for an unknown instance do not each cost a query.
+"""
+
+import asyncio
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional, Tuple, Union
+
+import structlog
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import configure_mappers, make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.core.config import settings
+from app.models.hotel import Hotel
+from app.utils.invalidation_channel import InvalidationChannel
+
+logger = structlog.get_logger(__name__)
+
+HOTEL_COLUMNS = (
+    'id',
+    'name',
+    'whatsapp_number',
+    'green_api_instance_id',
+    'green_api_token',
+    'green_api_webhook_token',
+    'settings',
+    'is_active',
+    'created_at',
+    'updated_at'
+)
+
+
+def _freeze(value: Any) -> Any:
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _thaw(value: Any) -> Any:
+    if isinstance(value, Mapping):
+        return {key: _thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(item) for item in value]
+    return value
+
+
+@dataclass(frozen=True)
+class HotelSnapshot:
+    """Immutable copy of a hotel row"""
+
+    id: uuid.UUID
+    name: str
+    whatsapp_number: str
+    green_api_instance_id: Optional[str]
+    green_api_token: Optional[str]
+    green_api_webhook_token: Optional[str]
+    settings: Mapping[str, Any]
+    is_active: bool
+    created_at: Optional[datetime]
+    updated_at: Optional[datetime]
+
+    @classmethod
+    def from_hotel(cls, hotel: Hotel) -> "HotelSnapshot":
+        values = {column: getattr(hotel, column) for column in HOTEL_COLUMNS}
+        values['settings'] = _freeze(values['settings'] or {})
+        return cls(**values)
+
+    @property
+    def has_green_api_credentials(self) -> bool:
+        return bool(self.green_api_instance_id and self.green_api_token)
+
+    @property
+    def is_operational(self) -> bool:
+        return self.is_active and self.has_green_api_credentials
+
+    def to_context(self) -> Dict[str, Any]:
+        """Hotel context in the shape HotelTenantManager.load_hotel_context returns"""
+        return {
+            "hotel_id": self.id,
+            "hotel_name": self.name,
+            "is_active": self.is_active,
+            "whatsapp_number": self.whatsapp_number,
+            "has_green_api_credentials": self.has_green_api_credentials,
+            "is_operational": self.is_operational,
+            "settings": self.settings,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None
+        }
+
+    def to_hotel(self) -> Hotel:
+        """
+        A detached Hotel carrying this snapshot
+
+        The instance looks like one loaded by a closed session: it can be
+        merged into a session with load=False without another query, and
+        changing it does not affect the snapshot.
+        """
+        # Unlike Hotel(), new_instance() does not configure the mappers itself
+        configure_mappers()
+        hotel = Hotel.__mapper__.class_manager.new_instance()
+        for column in HOTEL_COLUMNS:
+            value = getattr(self, column)
+            set_committed_value(hotel, column, _thaw(value) if column == 'settings' else value)
+        make_transient_to_detached(hotel)
+        return hotel
+
+
+class HotelDirectory:
+    """Hotels by ID and by Green API instance ID, kept in memory"""
+
+    def __init__(
+        self,
+        redis_url: Optional[str] = None,
+        channel: Optional[str] = None,
+        refresh_interval: Optional[float] = None,
+        full_reload_interval: Optional[float] = None,
+        negative_ttl: Optional[float] = None
+    ):
+        self.redis_url = redis_url or settings.REDIS_URL
+        self.channel = channel or settings.HOTEL_DIRECTORY_CHANNEL
+        self.refresh_interval = refresh_interval or settings.HOTEL_DIRECTORY_REFRESH_SECONDS
+        self.full_reload_interval = full_reload_interval or settings.HOTEL_DIRECTORY_FULL_RELOAD_SECONDS
+        self.negative_ttl = negative_ttl if negative_ttl is not None else settings.HOTEL_DIRECTORY_NEGATIVE_TTL_SECONDS
+
+        self._by_id: Dict[uuid.UUID, HotelSnapshot] = {}
+        self._by_instance: Dict[str, HotelSnapshot] = {}
+        # ("id" | "instance", key) -> monotonic expiry of a cached miss
+        self._misses: Dict[Tuple[str, Any], float] = {}
+        self._high_water: Optional[datetime] = None
+        # Bumped by every eviction so that a query started before it
+        # does not put the stale row back
+        self._version = 0
+        self._loaded = False
+        self._last_full_load = 0.0
+
+        self._refresh_task: Optional[asyncio.Task] = None
+        # Anything published while not subscribed is lost, so catch up
+        # with a refresh on every (re)subscription
+        self.invalidations = InvalidationChannel(
+            self.channel,
+            self.apply_invalidation,
+            on_subscribe=self.refresh,
+            redis_url=self.redis_url
+        )
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'negative_hits': 0,
+            'loads': 0,
+            'refreshed': 0,
+            'invalidations': 0,
+            'remote_invalidations': 0,
+            'errors': 0
+        }
+
+    # Lookups
+
+    def get(self, hotel_id: Union[uuid.UUID, str]) -> Optional[HotelSnapshot]:
+        """Cached snapshot of a hotel, without touching the database"""
+        if not isinstance(hotel_id, uuid.UUID):
+            hotel_id = uuid.UUID(str(hotel_id))
+        return self._by_id.get(hotel_id)
+
+    def get_by_instance_id(self, instance_id: str) -> Optional[HotelSnapshot]:
+        """Cached snapshot of the active hotel for a Green API instance"""
+        return self._by_instance.get(str(instance_id))
+
+    async def resolve(
+        self,
+        hotel_id: Union[uuid.UUID, str],
+        db: Optional[AsyncSession] = None
+    ) -> Optional[HotelSnapshot]:
+        """
+        Snapshot of a hotel, loading it on a miss
+
+        Args:
+            hotel_id: Hotel UUID
+            db: Session to load with on a miss; a new one is opened if not given
+
+        Returns:
+            Optional[HotelSnapshot]: The hotel, or None if it does not exist
+        """
+        if not isinstance(hotel_id, uuid.UUID):
+            hotel_id = uuid.UUID(str(hotel_id))
+        snapshot = self._by_id.get(hotel_id)
+        if snapshot is not None:
+            self.stats['hits'] += 1
+            return snapshot
+        return await self._load_one(("id", hotel_id), Hotel.id == hotel_id, db)
+
+    async def resolve_instance(
+        self,
+        instance_id: str,
+        db: Optional[AsyncSession] = None
+    ) -> Optional[HotelSnapshot]:
+        """
+        Snapshot of the active hotel for a Green API instance, loading it on a miss
+
+        Args:
+            instance_id: Green API instance ID
+            db: Session to load with on a miss; a new one is opened if not given
+
+        Returns:
+            Optional[HotelSnapshot]: The hotel, or None if no active hotel uses the instance
+        """
+        instance_id = str(instance_id)
+        snapshot = self._by_instance.get(instance_id)
+        if snapshot is not None:
+            self.stats['hits'] += 1
+            return snapshot
+        snapshot = await self._load_one(
+            ("instance", instance_id),
+            (Hotel.green_api_instance_id == instance_id) & (Hotel.is_active == True),
+            db
+        )
+        return snapshot if snapshot is not None and snapshot.is_active else None
+
+    async def _load_one(self, miss_key: Tuple[str, Any], condition: Any, db: Optional[AsyncSession]) -> Optional[HotelSnapshot]:
+        expires_at = self._misses.get(miss_key)
+        if expires_at is not None:
+            if expires_at > time.monotonic():
+                self.stats['negative_hits'] += 1
+                return None
+            del self._misses[miss_key]
+
+        self.stats['misses'] += 1
+        version = self._version
+        snapshots = await self._fetch(select(Hotel).where(condition).limit(1), db)
+        if not snapshots:
+            if self.negative_ttl > 0 and version == self._version:
+                self._misses[miss_key] = time.monotonic() + self.negative_ttl
+            return None
+
+        snapshot = snapshots[0]
+        if version == self._version:
+            self._store(snapshot)
+        return snapshot
+
+    async def _fetch(self, statement: Any, db: Optional[AsyncSession]) -> List[HotelSnapshot]:
+        if db is not None:
+            result = await db.execute(statement)
+            return [HotelSnapshot.from_hotel(hotel) for hotel in result.scalars().all()]
+
+        from app.database import get_db_session
+        async with get_db_session() as session:
+            result = await session.execute(statement)
+            return [HotelSnapshot.from_hotel(hotel) for hotel in result.scalars().all()]
+
+    # Maintenance
+
+    def _store(self, snapshot: HotelSnapshot) -> None:
+        previous = self._by_id.get(snapshot.id)
+        if previous is not None and previous.green_api_instance_id:
+            if self._by_instance.get(previous.green_api_instance_id) is previous:
+                del self._by_instance[previous.green_api_instance_id]
+
+        self._by_id[snapshot.id] = snapshot
+        if snapshot.green_api_instance_id and snapshot.is_active:
+            self._by_instance[snapshot.green_api_instance_id] = snapshot
+        self._misses.pop(("id", snapshot.id), None)
+        if snapshot.green_api_instance_id:
+            self._misses.pop(("instance", snapshot.green_api_instance_id), None)
+
+    def evict(self, hotel_id: Union[uuid.UUID, str]) -> None:
+        """Drop a hotel so that its next lookup reads it from the database"""
+        if not isinstance(hotel_id, uuid.UUID):
+            hotel_id = uuid.UUID(str(hotel_id))
+        self._version += 1
+        snapshot = self._by_id.pop(hotel_id, None)
+        if snapshot is not None and snapshot.green_api_instance_id:
+            if self._by_instance.get(snapshot.green_api_instance_id) is snapshot:
+                del self._by_instance[snapshot.green_api_instance_id]
+        # The hotel may now be what a remembered miss was looking for
+        self._misses.clear()
+
+    async def load_all(self) -> int:
+        """Replace the directory with every hotel in the database"""
+        version = self._version
+        snapshots = await self._fetch(select(Hotel), None)
+
+        by_id = {snapshot.id: snapshot for snapshot in snapshots}
+        by_instance = {
+            snapshot.green_api_instance_id: snapshot
+            for snapshot in snapshots
+            if snapshot.green_api_instance_id and snapshot.is_active
+        }
+        if version != self._version:
+            # Something was evicted while loading; keep it out
+            by_id = {key: value for key, value in by_id.items() if key in self._by_id}
+            by_instance = {key: value for key, value in by_instance.items() if value.id in by_id}
+
+        self._by_id = by_id
+        self._by_instance = by_instance
+        self._misses = {}
+        self._high_water = max((s.updated_at for s in snapshots if s.updated_at), default=self._high_water)
+        self._loaded = True
+        self._last_full_load = time.monotonic()
+        self.stats['loads'] += 1
+
+        logger.info("Hotel directory loaded", hotels=len(by_id))
+        return len(by_id)
+
+    async def refresh(self) -> int:
+        """Pick up hotels changed since the last load or refresh"""
+        if not self._loaded or time.monotonic() - self._last_full_load >= self.full_reload_interval:
+            return await self.load_all()
+
+        statement = select(Hotel)
+        if self._high_water is not None:
+            statement = statement.where(Hotel.updated_at > self._high_water)
+
+        version = self._version
+        snapshots = await self._fetch(statement, None)
+        if version == self._version:
+            for snapshot in snapshots:
+                self._store(snapshot)
+        else:
+            for snapshot in snapshots:
+                self.evict(snapshot.id)
+
+        self._high_water = max((s.updated_at for s in snapshots if s.updated_at), default=self._high_water)
+        self.stats['refreshed'] += len(snapshots)
+        return len(snapshots)
+
+    # Invalidation
+
+    def invalidate(self, hotel_id: Union[uuid.UUID, str]) -> None:
+        """
+        Evict a changed hotel here and in every other worker
+
+        Safe to call from synchronous code, with or without a running
+        event loop. Publishing is best effort; the periodic refresh still
+        picks the change up if Redis is unavailable.
+        """
+        self.evict(hotel_id)
+        self.stats['invalidations'] += 1
+        self.invalidations.publish(str(hotel_id))
+
+    def apply_invalidation(self, message: str) -> None:
+        """Evict the hotel named by an invalidation from another worker"""
+        try:
+            self.evict(message)
+        except ValueError:
+            logger.warning("Ignoring malformed hotel directory invalidation", message=message)
+            return
+        self.stats['remote_invalidations'] += 1
+
+    # Lifecycle
+
+    async def start(self) -> None:
+        """Load every hotel and start the refresh and invalidation listeners"""
+        if self._refresh_task is not None:
+            return
+        try:
+            await self.load_all()
+        except Exception as e:
+            # Lookups fall back to the database until a refresh succeeds
+            self.stats['errors'] += 1
+            logger.error("Hotel directory initial load failed", error=str(e))
+
+        self._refresh_task = asyncio.create_task(self._refresh_loop())
+        await self.invalidations.start()
+
+    async def stop(self) -> None:
+        """Stop the refresh and invalidation listeners"""
+        await self.invalidations.stop()
+        task, self._refresh_task = self._refresh_task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                self.stats['errors'] += 1
+                logger.warning("Hotel directory refresh failed", error=str(e))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get directory statistics"""
+        return {
+            **self.stats,
+            'hotels': len(self._by_id),
+            'instances': len(self._by_instance),
+            'loaded': self._loaded,
+            'running': self._refresh_task is not None,
+            'invalidation_channel': self.invalidations.get_stats()
+        }
+
+
+# Global directory instance
+_hotel_directory: Optional[HotelDirectory] = None
+
+
+def get_hotel_directory() -> HotelDirectory:
+    """Get the global hotel directory"""
+    global _hotel_directory
+    if _hotel_directory is None:
+        _hotel_directory = HotelDirectory()
+    return _hotel_directory
+
+
+async def start_hotel_directory() -> HotelDirectory:
+    """Load the global hotel directory and keep it up to date"""
+    directory = get_hotel_directory()
+    await directory.start()
+    return directory
+
+
+async def stop_hotel_directory() -> None:
+    """Stop keeping the global hotel directory up to date"""
+    if _hotel_directory is not None:
+        await _hotel_directory.stop()
+
+
+__all__ = [
+    'HotelSnapshot',
+    'HotelDirectory',
+    'get_hotel_directory',
+    'start_hotel_directory',
+    'stop_hotel_directory'
+]
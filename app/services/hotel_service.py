@@ -18,6 +18,7 @@ from app.schemas.hotel import (
     HotelSearchParams
 )
 from app.core.tenant import TenantContext, require_tenant_context
+from app.services.hotel_directory import get_hotel_directory
 from app.core.logging import get_logger
 
 logger = get_logger(__name__)
@@ -95,6 +96,7 @@ class HotelService:
             self.db.add(hotel)
             self.db.commit()
             self.db.refresh(hotel)
+            get_hotel_directory().invalidate(hotel.id)
             
             self.logger.info(
                 "Hotel created successfully",
@@ -206,6 +208,7 @@ class HotelService:
             
             self.db.commit()
             self.db.refresh(hotel)
+            get_hotel_directory().invalidate(hotel_id)
             
             self.logger.info(
                 "Hotel updated successfully",
@@ -245,6 +248,7 @@ class HotelService:
             
             self.db.delete(hotel)
             self.db.commit()
+            get_hotel_directory().invalidate(hotel_id)
             
             self.logger.info(
                 "Hotel deleted successfully",
@@ -427,6 +431,7 @@ class HotelService:
 
             self.db.commit()
             self.db.refresh(hotel)
+            get_hotel_directory().invalidate(hotel_id)
 
             self.logger.info(
                 "Green API settings updated",
@@ -469,6 +474,7 @@ class HotelService:
 
             self.db.commit()
             self.db.refresh(hotel)
+            get_hotel_directory().invalidate(hotel_id)
 
             self.logger.info(
                 "DeepSeek settings updated",
@@ -1,6 +1,8 @@
 """
 Language Detection Service
 Automatically detects user language based on phone number and message content
+
+Message content is scored by the shared detector in app.utils.language_detector.
 """
 
 import re
@@ -8,9 +10,14 @@ import json
 from typing import Dict, Optional, Tuple
 from app.core.logging import get_logger
 from app.services.green_api_client import GreenAPIClient
+from app.utils.language_detector import get_language_detector
+from app.utils.message_analysis import MessageAnalysis
 
 logger = get_logger(__name__)
 
+# Content scores below this leave the decision to the phone number
+CONTENT_CONFIDENCE_THRESHOLD = 0.3
+
 
 class LanguageDetector:
     """Service for detecting user language from phone number and content"""
@@ -85,44 +92,8 @@ class LanguageDetector:
             "54": "es",     # Argentina
         }
         
-        # Language detection patterns for message content
-        self.language_patterns = {
-            "ru": [
-                r'[а-яё]',  # Cyrillic characters
-                r'\b(привет|здравствуй|спасибо|пожалуйста|да|нет|как дела)\b',
-                r'\b(отель|номер|завтрак|ужин|пляж|море)\b'
-            ],
-            "en": [
-                r'\b(hello|hi|thank|please|yes|no|how are you)\b',
-                r'\b(hotel|room|breakfast|dinner|beach|sea)\b',
-                r'\b(good|bad|nice|great|awesome)\b'
-            ],
-            "th": [
-                r'[ก-๙]',  # Thai characters
-                r'\b(สวัสดี|ขอบคุณ|ครับ|ค่ะ|ใช่|ไม่)\b',
-                r'\b(โรงแรม|ห้อง|อาหาร|ชายหาด|ทะเล)\b'
-            ],
-            "zh": [
-                r'[\u4e00-\u9fff]',  # Chinese characters
-                r'\b(你好|谢谢|是|不是|酒店|房间)\b'
-            ],
-            "de": [
-                r'\b(hallo|danke|bitte|ja|nein|wie geht)\b',
-                r'\b(hotel|zimmer|frühstück|strand|meer)\b'
-            ],
-            "fr": [
-                r'\b(bonjour|merci|sil vous plaît|oui|non|comment allez)\b',
-                r'\b(hôtel|chambre|petit déjeuner|plage|mer)\b'
-            ],
-            "es": [
-                r'\b(hola|gracias|por favor|sí|no|cómo está)\b',
-                r'\b(hotel|habitación|desayuno|playa|mar)\b'
-            ],
-            "ar": [
-                r'[\u0600-\u06ff]',  # Arabic characters
-                r'\b(مرحبا|شكرا|نعم|لا|فندق|غرفة)\b'
-            ]
-        }
+        # Content detection is shared with the rest of the pipeline
+        self.content_detector = get_language_detector()
         
         # Default language priorities
         self.language_priorities = {
@@ -163,33 +134,37 @@ class LanguageDetector:
                             error=str(e))
             return None
     
-    def detect_language_from_content(self, message_content: str) -> Optional[str]:
-        """Detect language based on message content"""
+    def detect_language_from_content(
+        self,
+        message_content: str,
+        phone_number: Optional[str] = None,
+        analysis: Optional[MessageAnalysis] = None
+    ) -> Optional[str]:
+        """
+        Detect language based on message content
+        
+        With a phone number the guest's language is remembered, so their
+        later messages skip detection.
+        """
         try:
             if not message_content:
                 return None
             
-            content_lower = message_content.lower()
-            language_scores = {}
-            
-            # Score each language based on pattern matches
-            for lang, patterns in self.language_patterns.items():
-                score = 0
-                for pattern in patterns:
-                    matches = len(re.findall(pattern, content_lower, re.IGNORECASE))
-                    score += matches
-                
-                if score > 0:
-                    language_scores[lang] = score
+            if phone_number:
+                language, confidence = self.content_detector.detect_guest_language(
+                    phone_number, message_content, CONTENT_CONFIDENCE_THRESHOLD, analysis
+                )
+            else:
+                language, confidence = self.content_detector.detect_language(
+                    message_content, CONTENT_CONFIDENCE_THRESHOLD, analysis
+                )
             
-            if language_scores:
-                # Get language with highest score
-                detected_lang = max(language_scores, key=language_scores.get)
+            if confidence >= CONTENT_CONFIDENCE_THRESHOLD:
                 self.logger.debug("Language detected from content",
                                 content_preview=message_content[:50],
-                                scores=language_scores,
-                                detected=detected_lang)
-                return detected_lang
+                                confidence=confidence,
+                                detected=language)
+                return language
             
             return None
             
@@ -199,7 +174,12 @@ class LanguageDetector:
                             error=str(e))
             return None
     
-    def detect_language(self, phone_number: str, message_content: str = None) -> Tuple[str, float]:
+    def detect_language(
+        self,
+        phone_number: str,
+        message_content: str = None,
+        analysis: Optional[MessageAnalysis] = None
+    ) -> Tuple[str, float]:
         """
         Detect language with confidence score
         
@@ -216,7 +196,7 @@ class LanguageDetector:
             
             # Try content detection
             if message_content:
-                content_lang = self.detect_language_from_content(message_content)
+                content_lang = self.detect_language_from_content(message_content, phone_number, analysis)
                 if content_lang:
                     detected_languages.append((content_lang, 0.9))  # Very high confidence from content
             
@@ -293,4 +273,4 @@ class LanguageDetector:
     
     def get_supported_languages(self) -> Dict[str, str]:
         """Get list of supported languages"""
-        return {code: self.get_language_name(code) for code in self.language_patterns.keys()}
+        return {code: self.get_language_name(code) for code in self.content_detector.get_supported_languages()}
@@ -4,7 +4,7 @@ Message processor service for incoming WhatsApp messages
 
 from typing import Dict, Any, Optional, List
 import structlog
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
 
 from app.models.hotel import Hotel
@@ -12,6 +12,7 @@ from app.models.guest import Guest
 from app.models.message import Message, Conversation, MessageType, SentimentType
 from app.models.notification import StaffNotification
 from app.utils.message_parser import parse_whatsapp_message, assess_message_urgency
+from app.utils.message_analysis import MessageAnalysis
 from app.services.green_api_service import extract_message_content
 
 logger = structlog.get_logger(__name__)
@@ -20,13 +21,14 @@ logger = structlog.get_logger(__name__)
 class MessageProcessor:
     """Service for processing incoming WhatsApp messages"""
     
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
     
     async def process_incoming_message(
         self,
         hotel: Hotel,
-        message: Message
+        message: Message,
+        analysis: Optional[MessageAnalysis] = None
     ) -> Dict[str, Any]:
         """
         Process incoming message with parsing, analysis, and triggers
@@ -34,13 +36,16 @@ class MessageProcessor:
         Args:
             hotel: Hotel instance
             message: Message instance
+            analysis: Analysis of the message text made on arrival, if any
             
         Returns:
             Dict with processing results
         """
         try:
+            analysis = MessageAnalysis.of(message.content, analysis)
+            
             # Parse message content
-            parsed_data = self._parse_message_content(message)
+            parsed_data = self._parse_message_content(message, analysis)
             
             # Update message with parsed data
             message.set_metadata('parsed_data', parsed_data)
@@ -71,7 +76,7 @@ class MessageProcessor:
             conversation.update_last_message_time()
             
             # Commit changes
-            self.db.commit()
+            await self.db.commit()
             
             result = {
                 'status': 'processed',
@@ -96,21 +101,25 @@ class MessageProcessor:
             return result
             
         except Exception as e:
-            self.db.rollback()
+            await self.db.rollback()
             logger.error("Error processing incoming message",
                         hotel_id=hotel.id,
                         message_id=message.id,
                         error=str(e))
             raise
     
-    def _parse_message_content(self, message: Message) -> Dict[str, Any]:
+    def _parse_message_content(
+        self,
+        message: Message,
+        analysis: Optional[MessageAnalysis] = None
+    ) -> Dict[str, Any]:
         """Parse message content and extract structured information"""
         try:
             # Get raw message data
             raw_data = message.get_metadata('raw_message_data', {})
             
             # Parse using message parser
-            parsed_data = parse_whatsapp_message(message.content, raw_data)
+            parsed_data = parse_whatsapp_message(message.content, raw_data, analysis)
             
             return parsed_data
             
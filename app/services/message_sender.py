@@ -2,7 +2,8 @@
 Message sender service for WhatsApp Hotel Bot
 """
 
-from typing import Optional, Dict, Any, List
+import asyncio
+from typing import AsyncIterator, Optional, Dict, Any, List
 import structlog
 from sqlalchemy.orm import Session
 from datetime import datetime
@@ -13,11 +14,15 @@ from app.models.guest import Guest
 from app.models.message import Message, Conversation, MessageType
 from app.models.message_queue import MessageQueue, MessageStatus as QueueStatus
 from app.services.green_api_service import GreenAPIService
+from app.services.conversation_counters import record_message_sync
 from app.schemas.green_api import SendMessageResponse
 # Removed circular import - will use lazy import when needed
 
 logger = structlog.get_logger(__name__)
 
+# Seconds a streamed message may pause before the guest sees the typing indicator
+TYPING_INDICATOR_DELAY = 0.5
+
 
 class MessageSender:
     """Service for sending messages through Green API with queue management"""
@@ -69,6 +74,7 @@ class MessageSender:
             
             self.db.add(message_record)
             self.db.flush()  # Get ID
+            record_message_sync(self.db, conversation, message_record)
             
             # Queue message for sending
             queue_entry = self._queue_message(
@@ -110,6 +116,72 @@ class MessageSender:
                         error=str(e))
             raise
     
+    async def send_streamed_message(
+        self,
+        hotel: Hotel,
+        guest: Guest,
+        chunks: AsyncIterator[str],
+        priority: str = "normal",
+        quoted_message_id: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Send a message generated as a stream, one text message per chunk
+        
+        The typing indicator is shown when the next chunk takes more than
+        TYPING_INDICATOR_DELAY seconds to generate; each chunk is sent as
+        soon as it is complete. Only the first chunk quotes quoted_message_id.
+        
+        Args:
+            hotel: Hotel instance
+            guest: Guest instance
+            chunks: Message text in sentence or paragraph chunks
+            priority: Message priority (high, normal, low)
+            quoted_message_id: Optional message ID to quote
+            
+        Returns:
+            Send result of each chunk, in order
+        """
+        results = []
+        next_chunk = None
+        try:
+            while True:
+                next_chunk = asyncio.ensure_future(self._next_chunk(chunks))
+                done, _ = await asyncio.wait({next_chunk}, timeout=TYPING_INDICATOR_DELAY)
+                if not done:
+                    await self.green_api_service.send_typing(hotel, guest.phone_number)
+                
+                chunk = await next_chunk
+                if chunk is None:
+                    break
+                
+                results.append(await self.send_text_message(
+                    hotel=hotel,
+                    guest=guest,
+                    message=chunk,
+                    priority=priority,
+                    quoted_message_id=None if results else quoted_message_id
+                ))
+        finally:
+            # Stop generation if a send failed or we were cancelled
+            if next_chunk is not None and not next_chunk.done():
+                next_chunk.cancel()
+                await asyncio.gather(next_chunk, return_exceptions=True)
+            await chunks.aclose()
+        
+        logger.info("Streamed message sent",
+                   hotel_id=hotel.id,
+                   guest_id=guest.id,
+                   chunk_count=len(results))
+        
+        return results
+    
+    @staticmethod
+    async def _next_chunk(chunks: AsyncIterator[str]) -> Optional[str]:
+        try:
+            return await chunks.__anext__()
+        except StopAsyncIteration:
+            return None
+    
     async def send_file_message(
         self,
         hotel: Hotel,
@@ -142,6 +214,7 @@ class MessageSender:
             
             self.db.add(message_record)
             self.db.flush()
+            record_message_sync(self.db, conversation, message_record)
             
             # Queue message
             queue_entry = self._queue_message(
@@ -214,6 +287,7 @@ class MessageSender:
             
             self.db.add(message_record)
             self.db.flush()
+            record_message_sync(self.db, conversation, message_record)
             
             # Queue and send immediately (locations are usually urgent)
             queue_entry = self._queue_message(
@@ -369,6 +443,7 @@ class MessageSender:
             queue_entry.sent_at = datetime.utcnow()
             queue_entry.green_api_message_id = response.idMessage
             
+            message.green_api_message_id = response.idMessage
             message.set_metadata("green_api_message_id", response.idMessage)
             message.set_metadata("sent_at", datetime.utcnow().isoformat())
             
@@ -426,6 +501,7 @@ class MessageSender:
             queue_entry.sent_at = datetime.utcnow()
             queue_entry.green_api_message_id = response.idMessage
             
+            message.green_api_message_id = response.idMessage
             message.set_metadata("green_api_message_id", response.idMessage)
             message.set_metadata("sent_at", datetime.utcnow().isoformat())
             
@@ -469,6 +545,7 @@ class MessageSender:
             queue_entry.sent_at = datetime.utcnow()
             queue_entry.green_api_message_id = response.idMessage
             
+            message.green_api_message_id = response.idMessage
             message.set_metadata("green_api_message_id", response.idMessage)
             message.set_metadata("sent_at", datetime.utcnow().isoformat())
             
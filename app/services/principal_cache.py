@@ -0,0 +1,461 @@
+"""
+Cache of authenticated principals
+
+AuthMiddleware and AdminAuthMiddleware used to load the user behind every
+authenticated request. The dashboard polls dozens of endpoints per screen,
+so those lookups dominated database reads. Principals (the loaded user
+with its active and lock state and resolved permissions) are cached per
+user and token for a short TTL, and users that do not exist are cached
+for a shorter one.
+
+Services that change a user, role or lock state invalidate the user's
+entries, here and, over Redis pub/sub, in every other worker. Logging out
+revokes the token: it is remembered locally and in Redis until it
+expires, so a revoked token is rejected from memory.
+"""
+
+import json
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, Optional, Set, Tuple, Union
+
+import redis.asyncio as aioredis
+import structlog
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.models.admin_user import AdminUser
+from app.models.user import User
+from app.utils.invalidation_channel import InvalidationChannel
+from app.utils.permission_bits import ADMIN_PERMISSION_BITS, USER_PERMISSION_BITS, PermissionBitset
+from app.utils.single_flight import SingleFlight
+
+logger = structlog.get_logger(__name__)
+
+PRINCIPAL_USER = "user"
+PRINCIPAL_ADMIN = "admin"
+
+# (kind, user ID, token version)
+PrincipalKey = Tuple[str, uuid.UUID, Optional[str]]
+
+
+class TokenRevokedError(Exception):
+    """The token was revoked before it expired"""
+    pass
+
+
+@dataclass(frozen=True)
+class Principal:
+    """An authenticated user as the auth middlewares need it"""
+
+    kind: str
+    user_id: uuid.UUID
+    role: Any
+    # Effective (role and explicit) permissions, as a PermissionBitset mask
+    permission_mask: int
+    hotel_id: Optional[uuid.UUID]
+    is_active: bool
+    locked_until: Optional[datetime]
+    # The loaded User or AdminUser, detached from its session
+    user: Any = field(compare=False, repr=False)
+
+    @classmethod
+    def from_user(cls, user: Any) -> "Principal":
+        return cls(
+            kind=PRINCIPAL_USER,
+            user_id=user.id,
+            role=user.role,
+            permission_mask=USER_PERMISSION_BITS.effective_mask(user.role, user.permissions),
+            hotel_id=user.hotel_id,
+            is_active=user.is_active,
+            locked_until=user.locked_until,
+            user=user
+        )
+
+    @classmethod
+    def from_admin_user(cls, admin_user: Any) -> "Principal":
+        return cls(
+            kind=PRINCIPAL_ADMIN,
+            user_id=admin_user.id,
+            role=admin_user.role,
+            permission_mask=ADMIN_PERMISSION_BITS.effective_mask(admin_user.role, admin_user.permissions),
+            hotel_id=admin_user.hotel_id,
+            is_active=admin_user.is_active,
+            locked_until=admin_user.locked_until,
+            user=admin_user
+        )
+
+    @property
+    def permission_bits(self) -> PermissionBitset:
+        return USER_PERMISSION_BITS if self.kind == PRINCIPAL_USER else ADMIN_PERMISSION_BITS
+
+    @property
+    def permissions(self) -> FrozenSet[str]:
+        return frozenset(self.permission_bits.names(self.permission_mask))
+
+    @property
+    def is_locked(self) -> bool:
+        return self.locked_until is not None and datetime.utcnow() < self.locked_until
+
+    def allows(self, required_mask: int) -> bool:
+        """Whether the principal holds every permission of a mask"""
+        return self.permission_mask & required_mask == required_mask
+
+    def has_permission(self, permission: Any) -> bool:
+        """Check a permission, given as an enum member or its value"""
+        bit = self.permission_bits.bits.get(getattr(permission, "value", permission), 0)
+        return bit != 0 and self.permission_mask & bit == bit
+
+
+def token_version(token_payload: Dict[str, Any]) -> Optional[str]:
+    """The identity of a token among the user's tokens: its jti, else its issue time"""
+    version = token_payload.get("jti") or token_payload.get("iat")
+    return str(version) if version is not None else None
+
+
+class PrincipalCache:
+    """Principals by (kind, user ID, token version), with invalidation"""
+
+    REVOKED_KEY_PREFIX = "principal:revoked"
+
+    def __init__(
+        self,
+        ttl: Optional[float] = None,
+        negative_ttl: Optional[float] = None,
+        max_size: Optional[int] = None,
+        redis_url: Optional[str] = None,
+        channel: Optional[str] = None
+    ):
+        self.ttl = ttl if ttl is not None else settings.PRINCIPAL_CACHE_TTL_SECONDS
+        self.negative_ttl = negative_ttl if negative_ttl is not None else settings.PRINCIPAL_CACHE_NEGATIVE_TTL_SECONDS
+        self.max_size = max_size or settings.PRINCIPAL_CACHE_MAX_SIZE
+        self.redis_url = redis_url or settings.REDIS_URL
+
+        # key -> (monotonic expiry, principal or None for a missing user), oldest first
+        self._entries: "OrderedDict[PrincipalKey, Tuple[float, Optional[Principal]]]" = OrderedDict()
+        self._keys_by_user: Dict[Tuple[str, uuid.UUID], Set[PrincipalKey]] = {}
+        # key -> wall-clock time the revoked token expires
+        self._revoked: Dict[PrincipalKey, float] = {}
+        # Bumped by every invalidation so that a load started before it
+        # does not cache what it read
+        self._version = 0
+
+        self._redis_client: Optional[aioredis.Redis] = None
+        self._redis_unavailable_until = 0.0
+        self.single_flight = SingleFlight('principal')
+        self.invalidations = InvalidationChannel(
+            channel or settings.PRINCIPAL_CACHE_CHANNEL,
+            self.apply_invalidation,
+            on_subscribe=self._clear_async,
+            redis_url=self.redis_url
+        )
+        self.stats = {
+            'hits': 0,
+            'negative_hits': 0,
+            'misses': 0,
+            'revoked_hits': 0,
+            'invalidations': 0,
+            'remote_invalidations': 0,
+            'evicted': 0
+        }
+
+    async def resolve(
+        self,
+        kind: str,
+        user_id: uuid.UUID,
+        version: Optional[str],
+        loader: Callable[[uuid.UUID], Awaitable[Optional[Principal]]]
+    ) -> Optional[Principal]:
+        """
+        The principal behind a token, loading it on a miss
+
+        Args:
+            kind: PRINCIPAL_USER or PRINCIPAL_ADMIN
+            user_id: User ID from the token
+            version: Token version from token_version()
+            loader: Loads the principal from the database; None if the user does not exist
+
+        Returns:
+            Optional[Principal]: The principal, or None if the user does not exist.
+                Active and lock state are for the caller to check.
+
+        Raises:
+            TokenRevokedError: If the token was revoked
+        """
+        key = (kind, user_id, version)
+        if self._is_revoked_locally(key):
+            self.stats['revoked_hits'] += 1
+            raise TokenRevokedError()
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, principal = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.stats['hits' if principal is not None else 'negative_hits'] += 1
+                return principal
+            self._forget(key)
+
+        return await self.single_flight.do(
+            f"{kind}:{user_id}:{version}",
+            lambda: self._load(key, loader)
+        )
+
+    async def _load(
+        self,
+        key: PrincipalKey,
+        loader: Callable[[uuid.UUID], Awaitable[Optional[Principal]]]
+    ) -> Optional[Principal]:
+        self.stats['misses'] += 1
+        version = self._version
+
+        if await self._is_revoked_remotely(key):
+            self.stats['revoked_hits'] += 1
+            raise TokenRevokedError()
+
+        principal = await loader(key[1])
+        if version == self._version:
+            self._remember(key, principal)
+        return principal
+
+    def _remember(self, key: PrincipalKey, principal: Optional[Principal]) -> None:
+        ttl = self.ttl if principal is not None else self.negative_ttl
+        if ttl <= 0:
+            return
+        self._entries[key] = (time.monotonic() + ttl, principal)
+        self._entries.move_to_end(key)
+        self._keys_by_user.setdefault(key[:2], set()).add(key)
+        while len(self._entries) > self.max_size:
+            oldest = next(iter(self._entries))
+            self._forget(oldest)
+            self.stats['evicted'] += 1
+
+    def _forget(self, key: PrincipalKey) -> None:
+        self._entries.pop(key, None)
+        keys = self._keys_by_user.get(key[:2])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[key[:2]]
+
+    # Revocation
+
+    def _is_revoked_locally(self, key: PrincipalKey) -> bool:
+        until = self._revoked.get(key)
+        if until is None:
+            return False
+        if until <= time.time():
+            del self._revoked[key]
+            return False
+        return True
+
+    def _revoked_key(self, key: PrincipalKey) -> str:
+        kind, user_id, version = key
+        return f"{self.REVOKED_KEY_PREFIX}:{kind}:{user_id}:{version}"
+
+    async def _get_redis(self) -> Optional[aioredis.Redis]:
+        if self._redis_client is None and time.monotonic() >= self._redis_unavailable_until:
+            try:
+                self._redis_client = aioredis.from_url(
+                    self.redis_url,
+                    socket_timeout=0.5,
+                    socket_connect_timeout=0.5
+                )
+            except Exception as e:
+                logger.warning("Principal cache Redis unavailable", error=str(e))
+                self._redis_unavailable_until = time.monotonic() + 30
+        return self._redis_client
+
+    async def _is_revoked_remotely(self, key: PrincipalKey) -> bool:
+        client = await self._get_redis()
+        if client is None:
+            return False
+        try:
+            until = await client.get(self._revoked_key(key))
+        except Exception as e:
+            # Fail open like the rest of auth's Redis use; the token still expires
+            logger.warning("Revoked token check failed", error=str(e))
+            self._redis_client = None
+            self._redis_unavailable_until = time.monotonic() + 30
+            return False
+        if until is None:
+            return False
+        self._revoked[key] = float(until)
+        return True
+
+    async def revoke_token(
+        self,
+        kind: str,
+        user_id: uuid.UUID,
+        version: Optional[str],
+        expires_at: Union[float, datetime, None]
+    ) -> None:
+        """
+        Reject a token from now until it expires
+
+        Args:
+            kind: PRINCIPAL_USER or PRINCIPAL_ADMIN
+            user_id: User ID from the token
+            version: Token version from token_version()
+            expires_at: The token's exp claim
+        """
+        if isinstance(expires_at, datetime):
+            expires_at = expires_at.timestamp()
+        until = float(expires_at) if expires_at is not None else time.time() + 24 * 3600
+        remaining = int(until - time.time()) + 1
+        if remaining <= 0:
+            return
+
+        key = (kind, user_id, version)
+        self._revoked[key] = until
+        self._forget(key)
+
+        client = await self._get_redis()
+        if client is not None:
+            try:
+                await client.set(self._revoked_key(key), until, ex=remaining)
+            except Exception as e:
+                logger.warning("Revoked token not stored in Redis", user_id=str(user_id), error=str(e))
+
+        self.invalidations.publish(json.dumps({
+            "kind": kind,
+            "user_id": str(user_id),
+            "token": version,
+            "until": until
+        }))
+
+    # Invalidation
+
+    def evict(self, kind: str, user_id: Optional[uuid.UUID] = None) -> None:
+        """Drop cached principals of one user, or of every user of a kind"""
+        self._version += 1
+        if user_id is None:
+            keys = [key for key in self._entries if key[0] == kind]
+        else:
+            keys = list(self._keys_by_user.get((kind, user_id), ()))
+        for key in keys:
+            self._forget(key)
+
+    def invalidate(self, kind: str, user_id: Optional[Union[uuid.UUID, str]] = None) -> None:
+        """
+        Evict a changed user (or, without user_id, every user of a kind)
+        here and in every other worker
+
+        Safe to call with or without a running event loop.
+        """
+        if user_id is not None and not isinstance(user_id, uuid.UUID):
+            user_id = uuid.UUID(str(user_id))
+        self.evict(kind, user_id)
+        self.stats['invalidations'] += 1
+        self.invalidations.publish(json.dumps({
+            "kind": kind,
+            "user_id": str(user_id) if user_id is not None else None
+        }))
+
+    def apply_invalidation(self, message: str) -> None:
+        """Apply an invalidation or revocation published by a worker"""
+        try:
+            data = json.loads(message)
+            kind = data["kind"]
+            user_id = uuid.UUID(data["user_id"]) if data.get("user_id") else None
+        except (ValueError, KeyError, TypeError):
+            logger.warning("Ignoring malformed principal cache invalidation", message=message)
+            return
+
+        if "token" in data and user_id is not None:
+            key = (kind, user_id, data["token"])
+            self._revoked[key] = float(data.get("until") or time.time())
+            self._forget(key)
+        else:
+            self.evict(kind, user_id)
+        self.stats['remote_invalidations'] += 1
+
+    def clear(self) -> None:
+        """Drop every cached principal"""
+        self._version += 1
+        self._entries.clear()
+        self._keys_by_user.clear()
+
+    async def _clear_async(self) -> None:
+        # Invalidations published while not subscribed are lost
+        self.clear()
+
+    async def start(self) -> None:
+        """Start listening for invalidations from other workers"""
+        await self.invalidations.start()
+
+    async def stop(self) -> None:
+        """Stop listening for invalidations"""
+        await self.invalidations.stop()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        return {
+            **self.stats,
+            'size': len(self._entries),
+            'revoked': len(self._revoked),
+            'invalidation_channel': self.invalidations.get_stats()
+        }
+
+
+async def load_user_principal(user_id: uuid.UUID) -> Optional[Principal]:
+    """Load a user from the database; None if it does not exist"""
+    from app.database import get_db_session
+
+    async with get_db_session() as db:
+        result = await db.execute(select(User).where(User.id == user_id))
+        user = result.scalar_one_or_none()
+    return Principal.from_user(user) if user else None
+
+
+async def load_admin_principal(user_id: uuid.UUID) -> Optional[Principal]:
+    """Load an admin user from the database; None if it does not exist"""
+    from app.database import get_db_session
+
+    async with get_db_session() as db:
+        result = await db.execute(select(AdminUser).where(AdminUser.id == user_id))
+        admin_user = result.scalar_one_or_none()
+    return Principal.from_admin_user(admin_user) if admin_user else None
+
+
+# Global cache instance
+_principal_cache: Optional[PrincipalCache] = None
+
+
+def get_principal_cache() -> PrincipalCache:
+    """Get the global principal cache"""
+    global _principal_cache
+    if _principal_cache is None:
+        _principal_cache = PrincipalCache()
+    return _principal_cache
+
+
+async def start_principal_cache() -> PrincipalCache:
+    """Start invalidating the global principal cache from other workers"""
+    cache = get_principal_cache()
+    await cache.start()
+    return cache
+
+
+async def stop_principal_cache() -> None:
+    """Stop invalidating the global principal cache"""
+    if _principal_cache is not None:
+        await _principal_cache.stop()
+
+
+__all__ = [
+    'PRINCIPAL_USER',
+    'PRINCIPAL_ADMIN',
+    'TokenRevokedError',
+    'Principal',
+    'token_version',
+    'PrincipalCache',
+    'load_user_principal',
+    'load_admin_principal',
+    'get_principal_cache',
+    'start_principal_cache',
+    'stop_principal_cache'
+]
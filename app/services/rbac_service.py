@@ -15,6 +15,7 @@ import structlog
 from app.models.user import User
 from app.models.role import Role, UserRole, UserPermission
 from app.core.security import AuthorizationError
+from app.services.principal_cache import PRINCIPAL_USER, get_principal_cache
 
 logger = structlog.get_logger(__name__)
 
@@ -225,6 +226,7 @@ class RBACService:
             
             await self.db.commit()
             await self.db.refresh(role)
+            get_principal_cache().invalidate(PRINCIPAL_USER)
             
             logger.info("Role updated", role_id=str(role_id))
             return role
@@ -270,6 +272,7 @@ class RBACService:
             # Delete role
             await self.db.delete(role)
             await self.db.commit()
+            get_principal_cache().invalidate(PRINCIPAL_USER)
             
             logger.info("Role deleted", role_id=str(role_id))
             return True
@@ -311,6 +314,7 @@ class RBACService:
             # Assign role
             user.role = role
             await self.db.commit()
+            get_principal_cache().invalidate(PRINCIPAL_USER, user_id)
             
             logger.info("Role assigned to user", user_id=str(user_id), role=role.value)
             return True
@@ -350,6 +354,7 @@ class RBACService:
             if permission.value not in user.permissions:
                 user.permissions = user.permissions + [permission.value]
                 await self.db.commit()
+                get_principal_cache().invalidate(PRINCIPAL_USER, user_id)
                 
                 logger.info("Permission added to user", user_id=str(user_id), permission=permission.value)
             
@@ -390,6 +395,7 @@ class RBACService:
             if permission.value in user.permissions:
                 user.permissions = [p for p in user.permissions if p != permission.value]
                 await self.db.commit()
+                get_principal_cache().invalidate(PRINCIPAL_USER, user_id)
                 
                 logger.info("Permission removed from user", user_id=str(user_id), permission=permission.value)
             
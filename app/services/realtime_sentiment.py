@@ -5,7 +5,7 @@ Real-time sentiment analysis service for WhatsApp Hotel Bot
 import asyncio
 import time
 import uuid
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 from datetime import datetime
 
 import structlog
@@ -13,11 +13,13 @@ from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
 
 from app.services.sentiment_analyzer import SentimentAnalyzer
+from app.services.sentiment_batcher import SentimentBatchCollector
 from app.services.staff_notification import StaffNotificationService
 from app.models.message import Message
 from app.models.sentiment import SentimentAnalysis
 from app.schemas.deepseek import SentimentAnalysisResult, SentimentType
 from app.core.deepseek_logging import log_deepseek_operation
+from app.utils.message_analysis import MessageAnalysis
 from app.tasks.analyze_message_sentiment import analyze_message_sentiment_task
 from app.tasks.send_staff_alert import send_staff_alert_task
 
@@ -37,7 +39,8 @@ class RealtimeSentimentAnalyzer:
         message: Message,
         conversation_id: str,
         context: Optional[Dict[str, Any]] = None,
-        correlation_id: Optional[str] = None
+        correlation_id: Optional[str] = None,
+        analysis: Optional[MessageAnalysis] = None
     ) -> SentimentAnalysisResult:
         """
         Analyze sentiment of a message in real-time
@@ -47,6 +50,7 @@ class RealtimeSentimentAnalyzer:
             conversation_id: ID of the conversation
             context: Additional context for analysis
             correlation_id: Correlation ID for tracking
+            analysis: Shared analysis of the message text, if already made
             
         Returns:
             SentimentAnalysisResult: Analysis result
@@ -64,7 +68,8 @@ class RealtimeSentimentAnalyzer:
             result = await self.sentiment_analyzer.analyze_message_sentiment(
                 message=message,
                 context=context,
-                correlation_id=correlation_id
+                correlation_id=correlation_id,
+                analysis=analysis
             )
             
             # Process the result
@@ -93,6 +98,62 @@ class RealtimeSentimentAnalyzer:
                         correlation_id=correlation_id)
             raise
     
+    async def analyze_messages(
+        self,
+        messages: List[Message],
+        correlation_id: Optional[str] = None,
+        max_concurrency: Optional[int] = None
+    ) -> List[Tuple[Message, Optional[SentimentAnalysisResult]]]:
+        """
+        Analyze many messages, batching their DeepSeek prompts
+        
+        Messages are analyzed concurrently, at most max_concurrency at a
+        time, and cache misses among them are packed into shared prompts.
+        
+        Args:
+            messages: Messages to analyze
+            correlation_id: Correlation ID for tracking
+            max_concurrency: Messages analyzed at once; defaults to the
+                sentiment configuration
+            
+        Returns:
+            Each message with its result, or None if its analysis failed
+        """
+        correlation_id = correlation_id or str(uuid.uuid4())
+        semaphore = asyncio.Semaphore(
+            max_concurrency or self.sentiment_analyzer.config.batch_concurrency
+        )
+        batcher = SentimentBatchCollector.from_config(self.sentiment_analyzer)
+        
+        async def analyze(message: Message) -> Optional[SentimentAnalysisResult]:
+            async with semaphore:
+                try:
+                    return await self.analyze_message(
+                        message=message,
+                        conversation_id=str(message.conversation_id),
+                        correlation_id=correlation_id,
+                        analysis=MessageAnalysis(message.content)
+                    )
+                except Exception as e:
+                    logger.error("Failed to analyze message in batch",
+                               message_id=str(message.id),
+                               error=str(e),
+                               correlation_id=correlation_id)
+                    return None
+        
+        self.sentiment_analyzer.batcher = batcher
+        try:
+            results = await asyncio.gather(*(analyze(message) for message in messages))
+        finally:
+            self.sentiment_analyzer.batcher = None
+            await batcher.drain()
+        
+        logger.info("Batched sentiment analysis stats",
+                   correlation_id=correlation_id,
+                   **batcher.get_stats())
+        
+        return list(zip(messages, results))
+    
     async def process_sentiment_result(
         self,
         result: SentimentAnalysisResult,
@@ -205,50 +266,34 @@ class RealtimeSentimentAnalyzer:
         if result.sentiment == SentimentType.REQUIRES_ATTENTION:
             return True
         
-        # Check for consecutive negative messages from same guest
-        recent_negative_count = await self._count_recent_negative_messages(
-            guest_id=message.guest_id,
-            hotel_id=message.hotel_id
-        )
+        # Check for repeated negative messages in the conversation
+        recent_negative_count = await self._count_recent_negative_messages(message)
         
         if recent_negative_count >= 3:  # 3 consecutive negative messages
             return True
         
         return False
     
-    async def _count_recent_negative_messages(
-        self,
-        guest_id: str,
-        hotel_id: str,
-        hours: int = 24
-    ) -> int:
+    async def _count_recent_negative_messages(self, message: Message) -> int:
         """
-        Count recent negative messages from a guest
+        Count recent negative messages in the message's conversation
+        
+        Reads the conversation's rolling 24h counter instead of scanning
+        sentiment analyses.
         
         Args:
-            guest_id: Guest ID
-            hotel_id: Hotel ID
-            hours: Hours to look back
+            message: Message being analysed
             
         Returns:
-            int: Count of negative messages
+            int: Count of negative messages in the last 24 hours
         """
         try:
-            from datetime import timedelta
-            cutoff_time = datetime.utcnow() - timedelta(hours=hours)
-            
-            count = self.db.query(SentimentAnalysis).filter(
-                SentimentAnalysis.guest_id == guest_id,
-                SentimentAnalysis.hotel_id == hotel_id,
-                SentimentAnalysis.sentiment_score < -0.1,
-                SentimentAnalysis.created_at >= cutoff_time
-            ).count()
-            
-            return count
+            conversation = message.conversation
+            return conversation.negative_count_24h if conversation is not None else 0
             
         except Exception as e:
             logger.error("Failed to count recent negative messages",
-                        guest_id=guest_id,
+                        conversation_id=str(message.conversation_id),
                         error=str(e))
             return 0
     
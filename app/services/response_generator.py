@@ -3,7 +3,7 @@ AI response generation service for WhatsApp Hotel Bot
 """
 
 import time
-from typing import Optional, Dict, Any, List
+from typing import AsyncIterator, Optional, Dict, Any, List, Tuple
 import uuid
 import json
 
@@ -30,6 +30,7 @@ from app.models.guest import Guest
 from app.models.hotel import Hotel
 from app.models.sentiment import SentimentAnalysis
 from app.core.deepseek_logging import log_deepseek_operation
+from app.utils.stream_chunker import SentenceChunker, chunk_stream
 
 logger = structlog.get_logger(__name__)
 
@@ -67,61 +68,16 @@ class ResponseGenerator:
         correlation_id = correlation_id or str(uuid.uuid4())
         
         try:
-            # Get related entities
-            hotel = self.db.query(Hotel).filter(Hotel.id == message.hotel_id).first()
-            guest = self.db.query(Guest).filter(Guest.id == message.guest_id).first()
-            conversation = None
-            if message.conversation_id:
-                conversation = self.db.query(Conversation).filter(
-                    Conversation.id == message.conversation_id
-                ).first()
-            
-            if not hotel or not guest:
-                raise ValueError("Hotel or guest not found for message")
-            
-            # Get conversation history
-            conversation_history = await self._get_conversation_history(
-                message.conversation_id,
-                limit=self.config.max_context_messages
-            )
-            
-            # Get guest sentiment context
-            sentiment_context = await self._get_sentiment_context(message.id)
-            
-            # Detect response type if not provided
-            if not response_type:
-                response_type = self.template_manager.detect_response_type(
-                    message.content,
-                    context={**(context or {}), **sentiment_context}
-                )
-            
-            # Prepare generation request
-            request = ResponseGenerationRequest(
-                message=message.content,
-                context=context or {},
-                hotel_id=str(message.hotel_id),
-                guest_id=str(message.guest_id),
-                conversation_history=conversation_history,
-                guest_preferences=guest.preferences if isinstance(guest.preferences, dict) else {},
-                hotel_settings=hotel.settings if isinstance(hotel.settings, dict) else {},
-                language=self.config.default_language if hasattr(self.config, 'default_language') else 'en',
-                response_type=response_type.value
+            hotel, guest, request, response_type, context_hash = await self._prepare_generation(
+                message, response_type, context
             )
 
-            # Create context hash for caching
-            context_hash = self.token_optimizer.create_context_hash({
-                'hotel_id': str(message.hotel_id),
-                'guest_preferences': guest.preferences if isinstance(guest.preferences, dict) else {},
-                'conversation_history': conversation_history,
-                'sentiment_context': sentiment_context,
-                'response_type': response_type.value
-            })
-
             # Check cache first
             cached_result = await self.cache_service.get_response_cache(
                 message=message.content,
                 context_hash=context_hash,
-                response_type=response_type.value
+                response_type=response_type.value,
+                hotel_id=str(hotel.id)
             )
 
             if cached_result:
@@ -160,6 +116,189 @@ class ResponseGenerator:
                         correlation_id=correlation_id)
             raise
     
+    async def stream_response(
+        self,
+        message: Message,
+        response_type: Optional[ResponseType] = None,
+        context: Optional[Dict[str, Any]] = None,
+        correlation_id: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """
+        Generate AI response to a guest message as it is written
+        
+        Yields the response in sentence or paragraph chunks as soon as
+        DeepSeek has generated each one, so the start of a long answer can
+        be sent while the rest is still being written. A cached response is
+        yielded whole, and a completed stream is cached. The length and
+        guest-name touch-ups of _post_process_response need the whole
+        response; streaming stops at max_response_length instead.
+        
+        If the stream fails before its first chunk, the fallback response
+        is yielded; after that, the chunks already yielded stand.
+        """
+        start_time = time.time()
+        correlation_id = correlation_id or str(uuid.uuid4())
+        
+        hotel, guest, request, response_type, context_hash = await self._prepare_generation(
+            message, response_type, context
+        )
+        
+        cached_result = await self.cache_service.get_response_cache(
+            message=message.content,
+            context_hash=context_hash,
+            response_type=response_type.value,
+            hotel_id=str(hotel.id)
+        )
+        
+        if cached_result:
+            logger.info("Response generation cache hit",
+                       message_id=str(message.id),
+                       response_type=response_type.value,
+                       correlation_id=correlation_id)
+            yield cached_result.response
+            return
+        
+        client = await get_deepseek_client()
+        messages = self._build_prompt_messages(request, hotel, guest, response_type)
+        chunker = SentenceChunker(
+            min_chars=self.config.stream_min_chunk_chars,
+            max_chars=self.config.stream_max_chunk_chars
+        )
+        
+        chunks: List[str] = []
+        response_length = 0
+        truncated = False
+        
+        deltas = client.stream_chat_completion(
+            messages=messages,
+            max_tokens=self.config.max_response_tokens,
+            temperature=self.config.response_temperature,
+            correlation_id=correlation_id,
+            tenant_id=str(hotel.id)
+        )
+        stream = chunk_stream(deltas, chunker)
+        
+        try:
+            async for chunk in stream:
+                if response_length + len(chunk) > self.config.max_response_length:
+                    truncated = True
+                    break
+                
+                chunks.append(chunk)
+                response_length += len(chunk)
+                
+                # Per-chunk accounting; the client logs the stream's actual usage
+                logger.debug("Response chunk generated",
+                            message_id=str(message.id),
+                            chunk_index=len(chunks) - 1,
+                            chunk_tokens=self.token_optimizer.estimate_tokens(chunk),
+                            elapsed_ms=int((time.time() - start_time) * 1000),
+                            correlation_id=correlation_id)
+                
+                yield chunk
+                
+        except Exception as e:
+            logger.error("AI response streaming failed",
+                        message_id=str(message.id),
+                        chunks_sent=len(chunks),
+                        error=str(e),
+                        correlation_id=correlation_id)
+            
+            if not chunks:
+                fallback = self._create_fallback_response(request.message, response_type, hotel, guest)
+                yield fallback.response
+            return
+        
+        finally:
+            # Stop generating when truncated or when the caller stops reading
+            await stream.aclose()
+            await deltas.aclose()
+        
+        if not chunks:
+            return
+        
+        response_content = "\n\n".join(chunks)
+        
+        # Cache complete answers only; a truncated one would be cut off again on every hit
+        if not truncated:
+            await self.cache_service.set_response_cache(
+                message=request.message,
+                context_hash=context_hash,
+                result=ResponseGenerationResult(
+                    response=response_content,
+                    confidence=0.8,  # Default confidence for AI responses
+                    response_type=response_type.value,
+                    reasoning=f"Generated {response_type.value} response using DeepSeek AI",
+                    suggested_actions=self._extract_suggested_actions(response_content, response_type)
+                ),
+                response_type=response_type.value,
+                hotel_id=str(hotel.id)
+            )
+        
+        logger.info("Response streaming completed",
+                   message_id=str(message.id),
+                   response_type=response_type.value,
+                   chunk_count=len(chunks),
+                   response_length=response_length,
+                   truncated=truncated,
+                   duration_ms=int((time.time() - start_time) * 1000),
+                   correlation_id=correlation_id)
+    
+    async def _prepare_generation(
+        self,
+        message: Message,
+        response_type: Optional[ResponseType],
+        context: Optional[Dict[str, Any]]
+    ) -> Tuple[Hotel, Guest, ResponseGenerationRequest, ResponseType, str]:
+        """Load context for a message; (hotel, guest, request, response type, context hash)"""
+        
+        # Get related entities
+        hotel = self.db.query(Hotel).filter(Hotel.id == message.hotel_id).first()
+        guest = self.db.query(Guest).filter(Guest.id == message.guest_id).first()
+        
+        if not hotel or not guest:
+            raise ValueError("Hotel or guest not found for message")
+        
+        # Get conversation history
+        conversation_history = await self._get_conversation_history(
+            message.conversation_id,
+            limit=self.config.max_context_messages
+        )
+        
+        # Get guest sentiment context
+        sentiment_context = await self._get_sentiment_context(message.id)
+        
+        # Detect response type if not provided
+        if not response_type:
+            response_type = self.template_manager.detect_response_type(
+                message.content,
+                context={**(context or {}), **sentiment_context}
+            )
+        
+        # Prepare generation request
+        request = ResponseGenerationRequest(
+            message=message.content,
+            context=context or {},
+            hotel_id=str(message.hotel_id),
+            guest_id=str(message.guest_id),
+            conversation_history=conversation_history,
+            guest_preferences=guest.preferences if isinstance(guest.preferences, dict) else {},
+            hotel_settings=hotel.settings if isinstance(hotel.settings, dict) else {},
+            language=self.config.default_language if hasattr(self.config, 'default_language') else 'en',
+            response_type=response_type.value
+        )
+
+        # Create context hash for caching
+        context_hash = self.token_optimizer.create_context_hash({
+            'hotel_id': str(message.hotel_id),
+            'guest_preferences': guest.preferences if isinstance(guest.preferences, dict) else {},
+            'conversation_history': conversation_history,
+            'sentiment_context': sentiment_context,
+            'response_type': response_type.value
+        })
+        
+        return hotel, guest, request, response_type, context_hash
+    
     async def _generate_response_with_ai(
         self,
         request: ResponseGenerationRequest,
@@ -171,7 +310,86 @@ class ResponseGenerator:
     ) -> ResponseGenerationResult:
         """Generate response using DeepSeek AI"""
         
+        try:
+            # Identical messages in the same context arriving together share one
+            # API call; each caller gets its own copy to post-process
+            result = await self.cache_service.coalesce_response(
+                message=request.message,
+                context_hash=context_hash,
+                compute=lambda: self._request_response(
+                    request, hotel, guest, response_type, context_hash, correlation_id
+                ),
+                response_type=response_type.value,
+                hotel_id=str(hotel.id)
+            )
+            return result.copy()
+            
+        except Exception as e:
+            logger.error("AI response generation failed",
+                        guest_message=request.message[:100],
+                        error=str(e),
+                        correlation_id=correlation_id)
+            
+            # Return fallback response
+            return self._create_fallback_response(request.message, response_type, hotel, guest)
+    
+    async def _request_response(
+        self,
+        request: ResponseGenerationRequest,
+        hotel: Hotel,
+        guest: Guest,
+        response_type: ResponseType,
+        context_hash: str,
+        correlation_id: str
+    ) -> ResponseGenerationResult:
+        """Generate a response with DeepSeek and cache it"""
+        
         client = await get_deepseek_client()
+        messages = self._build_prompt_messages(request, hotel, guest, response_type)
+        
+        # Make API call
+        response = await client.chat_completion(
+            messages=messages,
+            max_tokens=self.config.max_response_tokens,
+            temperature=self.config.response_temperature,
+            correlation_id=correlation_id,
+            tenant_id=str(hotel.id)
+        )
+        
+        # Extract response content
+        if not response.choices or not response.choices[0].message.content:
+            raise ValueError("No response content from DeepSeek API")
+        
+        response_content = response.choices[0].message.content.strip()
+        
+        # Create result object
+        result = ResponseGenerationResult(
+            response=response_content,
+            confidence=0.8,  # Default confidence for AI responses
+            response_type=response_type.value,
+            reasoning=f"Generated {response_type.value} response using DeepSeek AI",
+            suggested_actions=self._extract_suggested_actions(response_content, response_type)
+        )
+
+        # Cache the result
+        await self.cache_service.set_response_cache(
+            message=request.message,
+            context_hash=context_hash,
+            result=result,
+            response_type=response_type.value,
+            hotel_id=str(hotel.id)
+        )
+
+        return result
+    
+    def _build_prompt_messages(
+        self,
+        request: ResponseGenerationRequest,
+        hotel: Hotel,
+        guest: Guest,
+        response_type: ResponseType
+    ) -> List[ChatMessage]:
+        """Create the token-optimized prompt for a response"""
         
         # Create prompts
         system_prompt = self.template_manager.get_system_prompt(
@@ -198,50 +416,7 @@ class ResponseGenerator:
         ]
 
         # Optimize message list
-        messages = self.token_optimizer.optimize_chat_messages(messages)
-        
-        try:
-            # Make API call
-            response = await client.chat_completion(
-                messages=messages,
-                max_tokens=self.config.max_response_tokens,
-                temperature=self.config.response_temperature,
-                correlation_id=correlation_id
-            )
-            
-            # Extract response content
-            if not response.choices or not response.choices[0].message.content:
-                raise ValueError("No response content from DeepSeek API")
-            
-            response_content = response.choices[0].message.content.strip()
-            
-            # Create result object
-            result = ResponseGenerationResult(
-                response=response_content,
-                confidence=0.8,  # Default confidence for AI responses
-                response_type=response_type.value,
-                reasoning=f"Generated {response_type.value} response using DeepSeek AI",
-                suggested_actions=self._extract_suggested_actions(response_content, response_type)
-            )
-
-            # Cache the result
-            await self.cache_service.set_response_cache(
-                message=request.message,
-                context_hash=context_hash,
-                result=result,
-                response_type=response_type.value
-            )
-
-            return result
-            
-        except Exception as e:
-            logger.error("AI response generation failed",
-                        guest_message=request.message[:100],
-                        error=str(e),
-                        correlation_id=correlation_id)
-            
-            # Return fallback response
-            return self._create_fallback_response(request.message, response_type, hotel, guest)
+        return self.token_optimizer.optimize_chat_messages(messages)
     
     def _extract_suggested_actions(self, response: str, response_type: ResponseType) -> List[str]:
         """Extract suggested follow-up actions from response"""
@@ -15,6 +15,7 @@ from app.tasks.execute_triggers import (
     evaluate_event_triggers_task
 )
 from app.core.logging import get_logger
+from app.utils.cron_parser import CronParser
 
 logger = get_logger(__name__)
 
@@ -36,6 +37,7 @@ class TriggerScheduler:
         """
         self.db = db
         self.logger = logger.bind(service="trigger_scheduler")
+        self.cron_parser = CronParser()
     
     async def schedule_trigger(
         self,
@@ -342,7 +344,13 @@ class TriggerScheduler:
             elif schedule_type == 'immediate':
                 return reference_time
             
-            # TODO: Implement specific_time and cron_expression
+            elif schedule_type == 'cron_expression':
+                cron_expr = time_conditions.get('cron_expression')
+                if cron_expr:
+                    return self.cron_parser.get_next_execution_time(cron_expr, reference_time)
+                return None
+            
+            # TODO: Implement specific_time
             
             return None
             
@@ -0,0 +1,320 @@
+"""
+Near-duplicate matching for the DeepSeek cache
+
+Guests ask the same few hundred questions per hotel in many spellings, so
+exact-text caching misses most repeats. Text is first normalized (case,
+punctuation, emoji, whitespace); texts that normalize identically share a
+cache entry. Beyond that, each text is embedded as an L2-normalized vector
+of hashed word and character-trigram features, computed locally on the
+CPU, and the nearest previously cached text of the same hotel is looked up
+through an inverted index. Paraphrase hits are only served once shadow
+mode has shown they agree with fresh DeepSeek results.
+"""
+
+import json
+import re
+import unicodedata
+import zlib
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Set, Tuple
+
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+# Sparse embedding dimension; large enough that hashed features rarely collide
+EMBEDDING_BUCKETS = 1 << 18
+
+# Weight of whole words against their character trigrams
+WORD_FEATURE_WEIGHT = 1.0
+TRIGRAM_FEATURE_WEIGHT = 0.5
+
+# Function words carry little meaning; negations are deliberately not among them
+STOP_WORDS = frozenset(
+    'a an the is are am was were be been it its this that these those i me my we our you your '
+    'he she they them to of in on at for from with by and or do does did can could would will '
+    'please hi hello there here what where when how which who'.split()
+)
+STOP_WORD_WEIGHT = 0.2
+
+# Response texts this similar count as agreeing in shadow mode
+RESPONSE_AGREEMENT_SIMILARITY = 0.6
+
+# Shadow candidates awaiting the fresh result they are compared with
+SHADOW_PENDING_SIZE = 10000
+
+# Hotel/parameter scopes whose indexes are kept
+MAX_SCOPES = 1000
+
+SEMANTIC_CACHE_MODES = ('off', 'shadow', 'serve')
+
+_APOSTROPHES = re.compile(r"['’`´]")
+_CONTRACTIONS = (
+    (re.compile(r"\bcan['’]t\b"), 'can not'),
+    (re.compile(r"\bwon['’]t\b"), 'will not'),
+    (re.compile(r"n['’]t\b"), ' not'),
+    (re.compile(r"['’]re\b"), ' are'),
+    (re.compile(r"['’]m\b"), ' am'),
+    (re.compile(r"['’]ll\b"), ' will'),
+    (re.compile(r"['’]ve\b"), ' have'),
+    (re.compile(r"['’]s\b"), ' is')
+)
+_NON_WORD = re.compile(r'[\W_]+')
+
+Vector = Dict[int, float]
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalize text for near-duplicate matching
+
+    Case-folds, expands English contractions, and turns punctuation, emoji
+    and runs of whitespace into single spaces.
+    """
+    text = unicodedata.normalize('NFKC', text or '').casefold()
+    for pattern, expansion in _CONTRACTIONS:
+        text = pattern.sub(expansion, text)
+    text = _APOSTROPHES.sub('', text)
+    return _NON_WORD.sub(' ', text).strip()
+
+
+def _feature(token: str) -> int:
+    return zlib.crc32(token.encode('utf-8')) % EMBEDDING_BUCKETS
+
+
+def embed_text(normalized: str) -> Vector:
+    """Sparse, L2-normalized hashed word and character-trigram vector of normalized text"""
+    vector: Vector = {}
+    for word in normalized.split():
+        feature = _feature(word)
+        if word in STOP_WORDS:
+            vector[feature] = vector.get(feature, 0.0) + STOP_WORD_WEIGHT
+            continue
+        vector[feature] = vector.get(feature, 0.0) + WORD_FEATURE_WEIGHT
+        padded = f" {word} "
+        for i in range(len(padded) - 2):
+            feature = _feature(padded[i:i + 3])
+            vector[feature] = vector.get(feature, 0.0) + TRIGRAM_FEATURE_WEIGHT
+
+    norm = sum(weight * weight for weight in vector.values()) ** 0.5
+    if norm:
+        for feature in vector:
+            vector[feature] /= norm
+    return vector
+
+
+def cosine_similarity(a: Vector, b: Vector) -> float:
+    """Cosine similarity of two normalized sparse vectors"""
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(weight * b.get(feature, 0.0) for feature, weight in a.items())
+
+
+def sentiment_results_agree(cached: Dict[str, Any], fresh: Dict[str, Any]) -> bool:
+    """Cached and fresh sentiment results lead to the same handling"""
+    return (
+        cached.get('sentiment') == fresh.get('sentiment')
+        and bool(cached.get('requires_attention')) == bool(fresh.get('requires_attention'))
+    )
+
+
+def response_results_agree(cached: Dict[str, Any], fresh: Dict[str, Any]) -> bool:
+    """Cached and fresh responses are of the same type and say much the same"""
+    if cached.get('response_type') != fresh.get('response_type'):
+        return False
+    similarity = cosine_similarity(
+        embed_text(normalize_text(cached.get('response', ''))),
+        embed_text(normalize_text(fresh.get('response', '')))
+    )
+    return similarity >= RESPONSE_AGREEMENT_SIMILARITY
+
+
+SHADOW_AGREEMENT: Dict[str, Callable[[Dict[str, Any], Dict[str, Any]], bool]] = {
+    'sentiment': sentiment_results_agree,
+    'response': response_results_agree
+}
+
+
+class SemanticIndex:
+    """
+    Nearest-neighbour index over the cached texts of one scope
+
+    An inverted index from feature to entries means a lookup only scores
+    entries sharing a feature with the query. The least recently added or
+    matched entries are evicted beyond max_entries.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        # cache key -> vector
+        self._entries: "OrderedDict[str, Vector]" = OrderedDict()
+        self._postings: Dict[int, Set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, cache_key: str, vector: Vector) -> None:
+        """Index the vector of a cached text"""
+        self.remove(cache_key)
+        self._entries[cache_key] = vector
+        for feature in vector:
+            self._postings.setdefault(feature, set()).add(cache_key)
+        while len(self._entries) > self.max_entries:
+            self.remove(next(iter(self._entries)))
+
+    def remove(self, cache_key: str) -> None:
+        """Drop a cached text from the index"""
+        vector = self._entries.pop(cache_key, None)
+        if vector is None:
+            return
+        for feature in vector:
+            postings = self._postings.get(feature)
+            if postings is not None:
+                postings.discard(cache_key)
+                if not postings:
+                    del self._postings[feature]
+
+    def nearest(self, vector: Vector) -> Optional[Tuple[str, float]]:
+        """Most similar indexed text as (cache key, cosine similarity)"""
+        scores: Dict[str, float] = {}
+        entries = self._entries
+        for feature, weight in vector.items():
+            for cache_key in self._postings.get(feature, ()):
+                scores[cache_key] = scores.get(cache_key, 0.0) + weight * entries[cache_key][feature]
+        if not scores:
+            return None
+
+        cache_key = max(scores, key=scores.get)
+        entries.move_to_end(cache_key)
+        return cache_key, scores[cache_key]
+
+
+class SemanticCache:
+    """
+    Per-hotel near-duplicate lookup for cached DeepSeek results
+
+    Modes:
+        off: no near-duplicate matching
+        shadow: normalized-text matches are served; paraphrase matches are
+            only compared with the fresh result to measure agreement
+        serve: paraphrase matches above the threshold are served too
+    """
+
+    def __init__(
+        self,
+        mode: str = 'shadow',
+        similarity_threshold: float = 0.85,
+        max_entries: int = 1000
+    ):
+        if mode not in SEMANTIC_CACHE_MODES:
+            raise ValueError(f"Unknown semantic cache mode: {mode}")
+        self.mode = mode
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+        self._indexes: "OrderedDict[Hashable, SemanticIndex]" = OrderedDict()
+        # exact cache key -> (operation type, cached data, similarity)
+        self._shadow: "OrderedDict[str, Tuple[str, str, float]]" = OrderedDict()
+        self.stats = {
+            'lookups': 0,
+            'normalized_hits': 0,
+            'semantic_hits': 0,
+            'shadow_matches': 0,
+            'shadow_agreed': 0,
+            'shadow_disagreed': 0
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != 'off'
+
+    @property
+    def serving(self) -> bool:
+        return self.mode == 'serve'
+
+    def _index(self, scope: Hashable, create: bool = False) -> Optional[SemanticIndex]:
+        index = self._indexes.get(scope)
+        if index is None and create:
+            index = self._indexes[scope] = SemanticIndex(self.max_entries)
+            if len(self._indexes) > MAX_SCOPES:
+                self._indexes.popitem(last=False)
+        if index is not None:
+            self._indexes.move_to_end(scope)
+        return index
+
+    def add(self, scope: Hashable, cache_key: str, normalized: str) -> None:
+        """Index a cached text of a hotel scope"""
+        if normalized:
+            self._index(scope, create=True).add(cache_key, embed_text(normalized))
+
+    def forget(self, scope: Hashable, cache_key: str) -> None:
+        """Drop a cached text that is no longer in the cache"""
+        index = self._index(scope)
+        if index is not None:
+            index.remove(cache_key)
+
+    def nearest(self, scope: Hashable, normalized: str) -> Optional[Tuple[str, float]]:
+        """Cache key of the most similar cached text above the threshold, with its similarity"""
+        index = self._index(scope)
+        if index is None or not normalized:
+            return None
+        match = index.nearest(embed_text(normalized))
+        if match is None or match[1] < self.similarity_threshold:
+            return None
+        return match
+
+    def record_shadow(self, operation_type: str, cache_key: str, cached_data: str, similarity: float) -> None:
+        """Remember a paraphrase match to compare with the fresh result cached under cache_key"""
+        self.stats['shadow_matches'] += 1
+        self._shadow[cache_key] = (operation_type, cached_data, similarity)
+        self._shadow.move_to_end(cache_key)
+        if len(self._shadow) > SHADOW_PENDING_SIZE:
+            self._shadow.popitem(last=False)
+
+    def settle_shadow(self, cache_key: str, fresh_data: str) -> Optional[bool]:
+        """Compare a pending shadow match with the fresh result; None if there was none"""
+        pending = self._shadow.pop(cache_key, None)
+        if pending is None:
+            return None
+
+        operation_type, cached_data, similarity = pending
+        agree = SHADOW_AGREEMENT.get(operation_type)
+        try:
+            agreed = bool(agree and agree(json.loads(cached_data), json.loads(fresh_data)))
+        except (TypeError, ValueError):
+            agreed = False
+
+        self.stats['shadow_agreed' if agreed else 'shadow_disagreed'] += 1
+        logger.debug("Semantic cache shadow comparison",
+                    operation_type=operation_type,
+                    similarity=round(similarity, 3),
+                    agreed=agreed)
+        return agreed
+
+    def clear(self) -> None:
+        """Drop all indexes and pending shadow matches"""
+        self._indexes.clear()
+        self._shadow.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get near-duplicate matching statistics"""
+        lookups = self.stats['lookups']
+        settled = self.stats['shadow_agreed'] + self.stats['shadow_disagreed']
+        hits = self.stats['normalized_hits'] + self.stats['semantic_hits']
+        return {
+            **self.stats,
+            'mode': self.mode,
+            'similarity_threshold': self.similarity_threshold,
+            'hit_rate_percent': round(hits / lookups * 100, 2) if lookups else 0,
+            'shadow_agreement_percent': round(self.stats['shadow_agreed'] / settled * 100, 2) if settled else None,
+            'indexed_scopes': len(self._indexes),
+            'indexed_entries': sum(len(index) for index in self._indexes.values())
+        }
+
+
+__all__ = [
+    'SemanticCache',
+    'SemanticIndex',
+    'normalize_text',
+    'embed_text',
+    'cosine_similarity'
+]
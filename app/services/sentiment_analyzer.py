@@ -2,9 +2,10 @@
 Sentiment analysis service for WhatsApp Hotel Bot
 """
 
+import asyncio
 import json
 import time
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, TYPE_CHECKING
 from datetime import datetime
 import uuid
 
@@ -28,9 +29,26 @@ from app.models.message import Message
 from app.models.guest import Guest
 from app.models.hotel import Hotel
 from app.core.deepseek_logging import log_deepseek_operation
+from app.services.conversation_counters import (
+    NEGATIVE_SENTIMENT_THRESHOLD, record_negative_sentiment_sync
+)
+from app.utils.keyword_matcher import get_keyword_registry, keyword_tag
+from app.utils.message_analysis import MessageAnalysis
+
+if TYPE_CHECKING:
+    from app.services.sentiment_batcher import SentimentBatchCollector
 
 logger = structlog.get_logger(__name__)
 
+# Completion tokens allowed per message of a batched prompt
+BATCH_TOKENS_PER_MESSAGE = 120
+
+# Keywords of the fallback analysis used when the AI service is unavailable
+FALLBACK_SENTIMENT_KEYWORDS = {
+    'negative': ['bad', 'terrible', 'awful', 'hate', 'worst', 'horrible', 'disgusting'],
+    'positive': ['good', 'great', 'excellent', 'love', 'amazing', 'wonderful', 'perfect']
+}
+
 
 class SentimentAnalyzer:
     """Service for analyzing message sentiment using DeepSeek AI"""
@@ -40,12 +58,16 @@ class SentimentAnalyzer:
         self.config = get_global_sentiment_config()
         self.cache_service = get_cache_service()
         self.token_optimizer = get_token_optimizer()
+        # Set while messages are analyzed in bulk, so cache misses share prompts
+        self.batcher: Optional["SentimentBatchCollector"] = None
+        get_keyword_registry().register('sentiment_fallback', FALLBACK_SENTIMENT_KEYWORDS)
         
     async def analyze_message_sentiment(
         self,
         message: Message,
         context: Optional[Dict[str, Any]] = None,
-        correlation_id: Optional[str] = None
+        correlation_id: Optional[str] = None,
+        analysis: Optional[MessageAnalysis] = None
     ) -> SentimentAnalysisResult:
         """
         Analyze sentiment of a message
@@ -54,6 +76,7 @@ class SentimentAnalyzer:
             message: Message object to analyze
             context: Additional context for analysis
             correlation_id: Correlation ID for tracking
+            analysis: Shared analysis of the message text, if already made
             
         Returns:
             SentimentAnalysisResult with analysis results
@@ -79,7 +102,7 @@ class SentimentAnalyzer:
             )
             
             # Perform sentiment analysis
-            result = await self._analyze_sentiment_with_ai(request, correlation_id)
+            result = await self._analyze_sentiment_with_ai(request, correlation_id, analysis)
             
             # Store results in database
             sentiment_record = await self._store_sentiment_analysis(
@@ -109,7 +132,8 @@ class SentimentAnalyzer:
     async def _analyze_sentiment_with_ai(
         self,
         request: SentimentAnalysisRequest,
-        correlation_id: str
+        correlation_id: str,
+        analysis: Optional[MessageAnalysis] = None
     ) -> SentimentAnalysisResult:
         """Perform AI-powered sentiment analysis"""
 
@@ -127,6 +151,35 @@ class SentimentAnalyzer:
                        correlation_id=correlation_id)
             return cached_result
 
+        if self.batcher is not None:
+            compute = lambda: self.batcher.submit(request, correlation_id)
+        else:
+            compute = lambda: self._request_sentiment(request, correlation_id)
+
+        try:
+            # Identical messages arriving together share one API call
+            return await self.cache_service.coalesce_sentiment(
+                text=request.text,
+                compute=compute,
+                language=request.language,
+                hotel_id=request.hotel_id
+            )
+            
+        except Exception as e:
+            logger.error("AI sentiment analysis failed",
+                        text=request.text[:100],
+                        error=str(e),
+                        correlation_id=correlation_id)
+            
+            # Return fallback result
+            return self._create_fallback_sentiment_result(request.text, analysis)
+    
+    async def _request_sentiment(
+        self,
+        request: SentimentAnalysisRequest,
+        correlation_id: str
+    ) -> SentimentAnalysisResult:
+        """Analyze sentiment with DeepSeek and cache the result"""
         client = await get_deepseek_client()
         
         # Create prompt for sentiment analysis
@@ -145,59 +198,116 @@ class SentimentAnalyzer:
         # Optimize message list
         messages = self.token_optimizer.optimize_chat_messages(messages)
         
+        # Make API call
+        response = await client.chat_completion(
+            messages=messages,
+            max_tokens=500,
+            temperature=0.3,  # Lower temperature for more consistent results
+            correlation_id=correlation_id,
+            tenant_id=request.hotel_id
+        )
+        
+        # Parse response
+        if not response.choices or not response.choices[0].message.content:
+            raise ValueError("No response content from DeepSeek API")
+        
+        response_content = response.choices[0].message.content
+        
+        # Parse JSON response
         try:
-            # Make API call
-            response = await client.chat_completion(
-                messages=messages,
-                max_tokens=500,
-                temperature=0.3,  # Lower temperature for more consistent results
-                correlation_id=correlation_id
-            )
-            
-            # Parse response
-            if not response.choices or not response.choices[0].message.content:
-                raise ValueError("No response content from DeepSeek API")
-            
-            response_content = response.choices[0].message.content
-            
-            # Parse JSON response
-            try:
-                result_data = json.loads(response_content)
-            except json.JSONDecodeError:
-                # Fallback: try to extract JSON from response
-                result_data = self._extract_json_from_response(response_content)
-            
-            # Create result object
-            result = SentimentAnalysisResult(
-                sentiment=SentimentType(result_data.get('sentiment', 'neutral')),
-                score=float(result_data.get('score', 0.0)),
-                confidence=float(result_data.get('confidence', 0.0)),
-                requires_attention=bool(result_data.get('requires_attention', False)),
-                reason=result_data.get('reason'),
-                keywords=result_data.get('keywords', [])
-            )
-            
-            # Validate result
-            self._validate_sentiment_result(result)
+            result_data = json.loads(response_content)
+        except json.JSONDecodeError:
+            # Fallback: try to extract JSON from response
+            result_data = self._extract_json_from_response(response_content)
+        
+        result = self._build_sentiment_result(result_data)
+
+        # Cache the result
+        await self.cache_service.set_sentiment_cache(
+            text=request.text,
+            result=result,
+            language=request.language,
+            hotel_id=request.hotel_id
+        )
 
-            # Cache the result
-            await self.cache_service.set_sentiment_cache(
+        return result
+    
+    async def _request_sentiment_batch(
+        self,
+        requests: List[SentimentAnalysisRequest],
+        correlation_id: str
+    ) -> List[Optional[SentimentAnalysisResult]]:
+        """
+        Analyze the sentiment of several messages in one DeepSeek prompt
+        
+        Results are mapped back to the requests by index and cached. A
+        request the response has no valid result for gets None, for the
+        caller to fall back on.
+        """
+        client = await get_deepseek_client()
+        # A batch mixing hotels runs in the shared compartment
+        hotel_ids = {request.hotel_id for request in requests}
+        
+        system_prompt = self.token_optimizer.optimize_text(self._create_batch_sentiment_system_prompt())
+        user_prompt = self.token_optimizer.optimize_text(self._create_batch_sentiment_user_prompt(requests))
+        
+        messages = self.token_optimizer.optimize_chat_messages([
+            ChatMessage(role=MessageRole.SYSTEM, content=system_prompt),
+            ChatMessage(role=MessageRole.USER, content=user_prompt)
+        ])
+        
+        response = await client.chat_completion(
+            messages=messages,
+            max_tokens=BATCH_TOKENS_PER_MESSAGE * len(requests),
+            temperature=0.3,
+            correlation_id=correlation_id,
+            tenant_id=hotel_ids.pop() if len(hotel_ids) == 1 else None
+        )
+        
+        if not response.choices or not response.choices[0].message.content:
+            raise ValueError("No response content from DeepSeek API")
+        
+        items = self._parse_batch_sentiment_response(response.choices[0].message.content, len(requests))
+        
+        results: List[Optional[SentimentAnalysisResult]] = []
+        for index, result_data in enumerate(items):
+            result = None
+            if result_data is not None:
+                try:
+                    result = self._build_sentiment_result(result_data)
+                except (ValueError, TypeError) as e:
+                    logger.warning("Invalid result in batched sentiment response",
+                                 index=index,
+                                 error=str(e),
+                                 correlation_id=correlation_id)
+            results.append(result)
+        
+        await asyncio.gather(*(
+            self.cache_service.set_sentiment_cache(
                 text=request.text,
                 result=result,
                 language=request.language,
                 hotel_id=request.hotel_id
             )
-
-            return result
-            
-        except Exception as e:
-            logger.error("AI sentiment analysis failed",
-                        text=request.text[:100],
-                        error=str(e),
-                        correlation_id=correlation_id)
-            
-            # Return fallback result
-            return self._create_fallback_sentiment_result(request.text)
+            for request, result in zip(requests, results) if result is not None
+        ))
+        
+        return results
+    
+    def _build_sentiment_result(self, result_data: Dict[str, Any]) -> SentimentAnalysisResult:
+        """Create a validated result from parsed response data"""
+        result = SentimentAnalysisResult(
+            sentiment=SentimentType(result_data.get('sentiment', 'neutral')),
+            score=float(result_data.get('score', 0.0)),
+            confidence=float(result_data.get('confidence', 0.0)),
+            requires_attention=bool(result_data.get('requires_attention', False)),
+            reason=result_data.get('reason'),
+            keywords=result_data.get('keywords', [])
+        )
+        
+        # Validate result
+        self._validate_sentiment_result(result)
+        return result
     
     def _create_sentiment_system_prompt(self) -> str:
         """Create system prompt for sentiment analysis"""
@@ -227,6 +337,72 @@ Respond ONLY with valid JSON in this format:
   "keywords": ["keyword1", "keyword2"]
 }"""
     
+    def _create_batch_sentiment_system_prompt(self) -> str:
+        """Create system prompt for analyzing several messages at once"""
+        return """You are an expert sentiment analyzer for hotel guest communications.
+
+You will receive several numbered guest messages. Analyze each one on its own and determine:
+1. Sentiment: positive, negative, neutral, or requires_attention
+2. Score: from -1.0 (very negative) to 1.0 (very positive)
+3. Confidence: from 0.0 to 1.0 (how confident you are)
+4. Whether it requires staff attention
+5. Brief reason for your assessment
+6. Key sentiment indicators (keywords)
+
+Guidelines:
+- "requires_attention" is for extremely negative sentiment (score < -0.7) or urgent issues
+- Consider cultural context and hospitality industry standards
+- Be conservative with "requires_attention" - only for serious issues
+- Focus on guest satisfaction and service quality
+
+Respond ONLY with a valid JSON array holding one object per message, each
+with the number of the message it analyzes as "index":
+[
+  {
+    "index": 0,
+    "sentiment": "positive|negative|neutral|requires_attention",
+    "score": -1.0 to 1.0,
+    "confidence": 0.0 to 1.0,
+    "requires_attention": true|false,
+    "reason": "brief explanation",
+    "keywords": ["keyword1", "keyword2"]
+  }
+]"""
+    
+    def _create_batch_sentiment_user_prompt(self, requests: List[SentimentAnalysisRequest]) -> str:
+        """Create user prompt listing the messages of a batch by index"""
+        lines = [f"Analyze the sentiment of each of these {len(requests)} hotel guest messages:", ""]
+        for index, request in enumerate(requests):
+            language = f" (language: {request.language})" if request.language and request.language != 'en' else ""
+            lines.append(f"[{index}]{language} {json.dumps(request.text, ensure_ascii=False)}")
+        lines.extend(["", "Provide your analysis as a JSON array:"])
+        return "\n".join(lines)
+    
+    def _parse_batch_sentiment_response(self, response: str, count: int) -> List[Optional[Dict[str, Any]]]:
+        """Map the objects of a batched response to message indexes; None where missing"""
+        try:
+            parsed = json.loads(response)
+        except json.JSONDecodeError:
+            start_idx = response.find('[')
+            end_idx = response.rfind(']') + 1
+            try:
+                parsed = json.loads(response[start_idx:end_idx]) if start_idx != -1 and end_idx > start_idx else []
+            except json.JSONDecodeError:
+                parsed = []
+        
+        if isinstance(parsed, dict):
+            # Tolerate the array being wrapped in an object
+            parsed = next((value for value in parsed.values() if isinstance(value, list)), [])
+        
+        items: List[Optional[Dict[str, Any]]] = [None] * count
+        for item in parsed if isinstance(parsed, list) else []:
+            if not isinstance(item, dict):
+                continue
+            index = item.get('index')
+            if isinstance(index, int) and 0 <= index < count and items[index] is None:
+                items[index] = item
+        return items
+    
     def _create_sentiment_user_prompt(self, request: SentimentAnalysisRequest) -> str:
         """Create user prompt for sentiment analysis"""
         prompt = f"Analyze the sentiment of this hotel guest message:\n\nMessage: \"{request.text}\""
@@ -282,16 +458,17 @@ Respond ONLY with valid JSON in this format:
         result.score = max(-1.0, min(1.0, result.score))
         result.confidence = max(0.0, min(1.0, result.confidence))
     
-    def _create_fallback_sentiment_result(self, text: str) -> SentimentAnalysisResult:
+    def _create_fallback_sentiment_result(
+        self,
+        text: str,
+        analysis: Optional[MessageAnalysis] = None
+    ) -> SentimentAnalysisResult:
         """Create fallback sentiment result when AI analysis fails"""
         # Simple keyword-based fallback
-        text_lower = text.lower()
+        matches = MessageAnalysis.of(text, analysis).keyword_matches
         
-        negative_keywords = ['bad', 'terrible', 'awful', 'hate', 'worst', 'horrible', 'disgusting']
-        positive_keywords = ['good', 'great', 'excellent', 'love', 'amazing', 'wonderful', 'perfect']
-        
-        negative_count = sum(1 for word in negative_keywords if word in text_lower)
-        positive_count = sum(1 for word in positive_keywords if word in text_lower)
+        negative_count = matches.count(keyword_tag('sentiment_fallback', 'negative'))
+        positive_count = matches.count(keyword_tag('sentiment_fallback', 'positive'))
         
         if negative_count > positive_count:
             sentiment = SentimentType.NEGATIVE
@@ -341,6 +518,11 @@ Respond ONLY with valid JSON in this format:
             )
             
             self.db.add(sentiment_record)
+            
+            # Keep the conversation's rolling negative count in the same transaction
+            if result.score < NEGATIVE_SENTIMENT_THRESHOLD and message.conversation is not None:
+                record_negative_sentiment_sync(self.db, message.conversation)
+            
             self.db.commit()
             self.db.refresh(sentiment_record)
             
@@ -0,0 +1,178 @@
+"""
+Micro-batching of DeepSeek sentiment analysis
+
+Sentiment prompts are mostly system prompt: a short guest message adds a
+few dozen tokens to several hundred of instructions. When many messages
+are analyzed at once, the collector packs short ones into a single
+prompt with a JSON-array answer, mapped back to the messages by index.
+A batch is sent once it is full, once the next message would exceed its
+token budget, or once its first message has waited max_wait_ms.
+"""
+
+import asyncio
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import structlog
+
+from app.schemas.deepseek import SentimentAnalysisRequest, SentimentAnalysisResult
+from app.services.sentiment_analyzer import SentimentAnalyzer
+
+logger = structlog.get_logger(__name__)
+
+
+class SentimentBatchError(Exception):
+    """A batched response had no valid result for a message"""
+    pass
+
+
+class SentimentBatchCollector:
+    """Collects concurrent sentiment requests into batched prompts"""
+
+    def __init__(
+        self,
+        analyzer: SentimentAnalyzer,
+        max_messages: int = 10,
+        max_tokens: int = 2000,
+        max_message_tokens: int = 200,
+        max_wait_ms: int = 50
+    ):
+        """
+        Args:
+            analyzer: Sentiment analyzer making the DeepSeek calls
+            max_messages: Messages per batched prompt
+            max_tokens: Estimated message tokens per batched prompt
+            max_message_tokens: Messages longer than this (or with context)
+                are analyzed alone
+            max_wait_ms: Longest a message waits for its batch to fill
+        """
+        self.analyzer = analyzer
+        self.max_messages = max_messages
+        self.max_tokens = max_tokens
+        self.max_message_tokens = max_message_tokens
+        self.max_wait = max_wait_ms / 1000
+        self._pending: List[Tuple[SentimentAnalysisRequest, str, asyncio.Future]] = []
+        self._pending_tokens = 0
+        self._deadline: Optional[asyncio.TimerHandle] = None
+        self._batches: Set[asyncio.Task] = set()
+        self.stats = {
+            'messages': 0,
+            'batched_messages': 0,
+            'single_messages': 0,
+            'batches': 0,
+            'failed_messages': 0,
+            'flush_size': 0,
+            'flush_tokens': 0,
+            'flush_deadline': 0,
+            'flush_drain': 0
+        }
+
+    @classmethod
+    def from_config(cls, analyzer: SentimentAnalyzer) -> "SentimentBatchCollector":
+        """Collector sized by the analyzer's sentiment configuration"""
+        config = analyzer.config
+        return cls(
+            analyzer,
+            max_messages=config.batch_max_messages,
+            max_tokens=config.batch_max_tokens,
+            max_message_tokens=config.batch_max_message_tokens,
+            max_wait_ms=config.batch_max_wait_ms
+        )
+
+    async def submit(
+        self,
+        request: SentimentAnalysisRequest,
+        correlation_id: str
+    ) -> SentimentAnalysisResult:
+        """
+        Analyze a message, batched with others submitted around the same time
+
+        Raises:
+            SentimentBatchError: The batched response had no valid result for it
+        """
+        self.stats['messages'] += 1
+        tokens = self.analyzer.token_optimizer.estimate_tokens(request.text)
+
+        if request.context or tokens > self.max_message_tokens or self.max_messages == 1:
+            self.stats['single_messages'] += 1
+            return await self.analyzer._request_sentiment(request, correlation_id)
+
+        if self._pending and self._pending_tokens + tokens > self.max_tokens:
+            self._flush('tokens')
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((request, correlation_id, future))
+        self._pending_tokens += tokens
+
+        if len(self._pending) >= self.max_messages:
+            self._flush('size')
+        elif self._deadline is None:
+            self._deadline = asyncio.get_running_loop().call_later(self.max_wait, self._flush, 'deadline')
+
+        return await future
+
+    def _flush(self, reason: str) -> None:
+        if self._deadline is not None:
+            self._deadline.cancel()
+            self._deadline = None
+        if not self._pending:
+            return
+
+        batch, self._pending, self._pending_tokens = self._pending, [], 0
+        self.stats[f'flush_{reason}'] += 1
+
+        task = asyncio.ensure_future(self._send(batch))
+        self._batches.add(task)
+        task.add_done_callback(self._batches.discard)
+
+    async def _send(self, batch: List[Tuple[SentimentAnalysisRequest, str, asyncio.Future]]) -> None:
+        requests = [request for request, _, _ in batch]
+        correlation_id = batch[0][1]
+
+        try:
+            if len(requests) == 1:
+                self.stats['single_messages'] += 1
+                results = [await self.analyzer._request_sentiment(requests[0], correlation_id)]
+            else:
+                self.stats['batches'] += 1
+                self.stats['batched_messages'] += len(requests)
+                results = await self.analyzer._request_sentiment_batch(requests, correlation_id)
+        except Exception as e:
+            logger.warning("Batched sentiment analysis failed",
+                          batch_size=len(requests),
+                          error=str(e),
+                          correlation_id=correlation_id)
+            self.stats['failed_messages'] += len(requests)
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, _, future), result in zip(batch, results):
+            if future.done():
+                continue  # caller gave up
+            if result is None:
+                self.stats['failed_messages'] += 1
+                future.set_exception(SentimentBatchError("No sentiment result for message in batch"))
+            else:
+                future.set_result(result)
+
+    async def drain(self) -> None:
+        """Send pending messages now and wait for all batches in flight"""
+        self._flush('drain')
+        if self._batches:
+            await asyncio.gather(*self._batches, return_exceptions=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get batching statistics"""
+        prompts = self.stats['batches'] + self.stats['single_messages']
+        return {
+            **self.stats,
+            'pending': len(self._pending),
+            'messages_per_prompt': round(self.stats['messages'] / prompts, 2) if prompts else 0
+        }
+
+
+__all__ = [
+    'SentimentBatchCollector',
+    'SentimentBatchError'
+]
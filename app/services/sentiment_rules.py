@@ -18,6 +18,7 @@ from app.models.message import Message
 from app.models.guest import Guest
 from app.schemas.deepseek import SentimentAnalysisResult, SentimentType
 from app.utils.threshold_manager import get_threshold_manager, ThresholdManager
+from app.utils.keyword_matcher import KeywordMatches, get_keyword_registry
 
 logger = structlog.get_logger(__name__)
 
@@ -90,13 +91,16 @@ class SentimentRulesEngine:
             
             # Get hotel-specific rules or use defaults
             rules = await self._get_hotel_rules(hotel_id)
+            keyword_matches = self._scan_rule_keywords(rules, message.content, hotel_id)
             
             triggered_actions = []
             
             # Evaluate each rule
             for rule in rules:
                 try:
-                    if await self._evaluate_rule_conditions(rule, sentiment, message, hotel_id):
+                    if await self._evaluate_rule_conditions(
+                        rule, sentiment, message, hotel_id, keyword_matches
+                    ):
                         actions = await self._execute_rule_actions(rule, sentiment, message, correlation_id)
                         triggered_actions.extend(actions)
                         
@@ -209,9 +213,7 @@ class SentimentRulesEngine:
                 return EscalationLevel.SUPERVISOR
             
             # Multiple recent negative messages - escalate to supervisor
-            recent_negative_count = await self._count_recent_negative_messages(
-                message.guest_id, hotel_id, hours=24
-            )
+            recent_negative_count = await self._count_recent_negative_messages(message)
             if recent_negative_count >= thresholds.get("escalation_negative_count", 3):
                 return EscalationLevel.SUPERVISOR
             
@@ -238,7 +240,8 @@ class SentimentRulesEngine:
         rule: Dict[str, Any],
         sentiment: SentimentAnalysisResult,
         message: Message,
-        hotel_id: str
+        hotel_id: str,
+        keyword_matches: Optional[KeywordMatches] = None
     ) -> bool:
         """Evaluate if rule conditions are met"""
         conditions = rule.get("conditions", [])
@@ -265,7 +268,7 @@ class SentimentRulesEngine:
             
             elif condition_type == RuleCondition.KEYWORD_MATCH.value:
                 keywords = condition.get("keywords", [])
-                if not self._check_keyword_match(message.content, keywords):
+                if not self._check_keyword_match(message.content, keywords, keyword_matches):
                     return False
         
         return True
@@ -357,32 +360,53 @@ class SentimentRulesEngine:
         except Exception:
             return False
     
-    async def _count_recent_negative_messages(
-        self,
-        guest_id: str,
-        hotel_id: str,
-        hours: int = 24
-    ) -> int:
-        """Count recent negative messages from guest"""
+    async def _count_recent_negative_messages(self, message: Message) -> int:
+        """Count negative messages in the conversation over the last 24 hours"""
         try:
-            cutoff_time = datetime.utcnow() - timedelta(hours=hours)
-            
-            count = self.db.query(SentimentAnalysis).filter(
-                SentimentAnalysis.guest_id == guest_id,
-                SentimentAnalysis.hotel_id == hotel_id,
-                SentimentAnalysis.sentiment_score < -0.1,
-                SentimentAnalysis.created_at >= cutoff_time
-            ).count()
-            
-            return count
+            conversation = message.conversation
+            return conversation.negative_count_24h if conversation is not None else 0
             
         except Exception:
             return 0
     
-    def _check_keyword_match(self, text: str, keywords: List[str]) -> bool:
+    def _scan_rule_keywords(
+        self,
+        rules: List[Dict[str, Any]],
+        text: Optional[str],
+        hotel_id: str
+    ) -> Optional[KeywordMatches]:
+        """Scan text once for the keywords of every keyword condition in the hotel's rules"""
+        vocabulary = {}
+        for rule in rules:
+            keywords = [
+                keyword.lower()
+                for condition in rule.get("conditions", [])
+                if condition.get("type") == RuleCondition.KEYWORD_MATCH.value
+                for keyword in condition.get("keywords", [])
+            ]
+            if keywords:
+                vocabulary[str(rule.get("id"))] = keywords
+        
+        if not vocabulary:
+            return None
+        
+        automaton = get_keyword_registry().hotel_automaton(
+            hotel_id, vocabulary, namespace="sentiment_rules"
+        )
+        return automaton.scan(text or "")
+    
+    def _check_keyword_match(
+        self,
+        text: str,
+        keywords: List[str],
+        matches: Optional[KeywordMatches] = None
+    ) -> bool:
         """Check if text contains any of the specified keywords"""
-        text_lower = text.lower()
-        return any(keyword.lower() in text_lower for keyword in keywords)
+        if matches is None:
+            matches = get_keyword_registry().keyword_automaton(
+                [keyword.lower() for keyword in keywords]
+            ).scan(text)
+        return any(not keyword or keyword.lower() in matches for keyword in keywords)
     
     async def _create_alert_action(
         self,
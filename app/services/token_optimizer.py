@@ -12,6 +12,7 @@ from app.schemas.deepseek import ChatMessage, MessageRole
 from app.models.message import Message
 from app.models.guest import Guest
 from app.models.hotel import Hotel
+from app.utils.message_analysis import MessageAnalysis, estimate_token_count
 
 logger = structlog.get_logger(__name__)
 
@@ -41,19 +42,20 @@ class TokenOptimizer:
             'average_reduction_percent': 0.0
         }
     
-    def estimate_tokens(self, text: str) -> int:
-        """Estimate token count for text"""
+    def estimate_tokens(self, text: str, analysis: Optional[MessageAnalysis] = None) -> int:
+        """Estimate token count for text, reusing a shared analysis of it if given"""
         if not text:
             return 0
         
         # Remove extra whitespace for more accurate estimation
-        cleaned_text = re.sub(r'\s+', ' ', text.strip())
-        
-        # Rough estimation: 1 token ≈ 4 characters for English
-        # Add some buffer for special tokens and formatting
-        estimated_tokens = max(1, len(cleaned_text) // self.chars_per_token)
-        
-        return int(estimated_tokens * 1.1)  # 10% buffer
+        if analysis is not None and analysis.describes(text):
+            cleaned_text = analysis.normalized
+        else:
+            cleaned_text = re.sub(r'\s+', ' ', text.strip())
+        
+        # Rough estimation: 1 token ≈ 4 characters for English,
+        # plus a 10% buffer for special tokens and formatting
+        return estimate_token_count(cleaned_text, self.chars_per_token)
     
     def optimize_text(self, text: str, max_tokens: Optional[int] = None) -> str:
         """Optimize text to reduce token usage"""
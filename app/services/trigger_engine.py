@@ -16,7 +16,9 @@ from app.models.guest import Guest
 from app.services.green_api_service import GreenAPIService
 from app.services.message_sender import MessageSender
 from app.utils.trigger_evaluator import TriggerEvaluator
+from app.services.trigger_index import HotelTriggerIndex, get_trigger_index_cache
 from app.utils.template_renderer import TemplateRenderer
+from app.utils.message_analysis import MessageAnalysis
 from app.core.logging import get_logger
 from app.database import get_db
 
@@ -53,7 +55,8 @@ class TriggerEngine:
         self, 
         hotel_id: uuid.UUID, 
         context: Dict[str, Any],
-        trigger_type: Optional[TriggerType] = None
+        trigger_type: Optional[TriggerType] = None,
+        analysis: Optional[MessageAnalysis] = None
     ) -> List[Dict[str, Any]]:
         """
         Evaluate triggers for a hotel with given context
@@ -62,59 +65,60 @@ class TriggerEngine:
             hotel_id: Hotel ID
             context: Context data for evaluation
             trigger_type: Optional filter by trigger type
+            analysis: Shared analysis of the message that raised the event, if any
             
         Returns:
             List[Dict[str, Any]]: List of triggers that should be executed
         """
         try:
-            # Get active triggers for the hotel
-            query = self.db.query(Trigger).filter(
-                and_(
-                    Trigger.hotel_id == hotel_id,
-                    Trigger.is_active == True
-                )
-            )
+            if isinstance(trigger_type, str):
+                trigger_type = TriggerType(trigger_type)
             
-            if trigger_type:
-                query = query.filter(Trigger.trigger_type == trigger_type)
+            # The analysis is only visible to predicates; returned contexts stay serializable
+            eval_context = context if analysis is None else {**context, 'message_analysis': analysis}
             
-            # Order by priority (1 = highest priority)
-            triggers = query.order_by(Trigger.priority.asc()).all()
+            # Only triggers that can match this context, in priority order
+            index = self._get_trigger_index(hotel_id)
+            candidates = index.candidates(trigger_type, context.get('event_type'))
             
-            executable_triggers = []
+            matched = []
             
-            for trigger in triggers:
+            for compiled in candidates:
                 try:
-                    # Evaluate trigger conditions
-                    should_execute = await self.evaluator.evaluate_conditions(
-                        trigger.trigger_type,
-                        trigger.conditions,
-                        context
-                    )
-                    
-                    if should_execute:
-                        executable_triggers.append({
-                            'trigger': trigger,
-                            'context': context,
-                            'evaluation_time': datetime.utcnow()
-                        })
-                        
-                        self.logger.info(
-                            "Trigger conditions met",
-                            trigger_id=str(trigger.id),
-                            hotel_id=str(hotel_id),
-                            trigger_name=trigger.name
-                        )
+                    # Evaluate precompiled trigger conditions
+                    if compiled.predicate(eval_context):
+                        matched.append(compiled)
                     
                 except Exception as e:
                     self.logger.error(
                         "Error evaluating trigger",
-                        trigger_id=str(trigger.id),
+                        trigger_id=str(compiled.trigger_id),
                         hotel_id=str(hotel_id),
                         error=str(e)
                     )
                     continue
             
+            executable_triggers = []
+            
+            for compiled in matched:
+                # The index only holds snapshots; load the trigger into this session
+                trigger = self.db.get(Trigger, compiled.trigger_id)
+                if trigger is None or not trigger.is_active:
+                    continue
+                
+                executable_triggers.append({
+                    'trigger': trigger,
+                    'context': context,
+                    'evaluation_time': datetime.utcnow()
+                })
+                
+                self.logger.info(
+                    "Trigger conditions met",
+                    trigger_id=str(trigger.id),
+                    hotel_id=str(hotel_id),
+                    trigger_name=trigger.name
+                )
+            
             return executable_triggers
             
         except Exception as e:
@@ -125,6 +129,31 @@ class TriggerEngine:
             )
             raise TriggerEngineError(f"Failed to evaluate triggers: {str(e)}")
     
+    def _get_trigger_index(self, hotel_id: uuid.UUID) -> HotelTriggerIndex:
+        """
+        Get the hotel's compiled trigger index, loading it on a cache miss
+        
+        Args:
+            hotel_id: Hotel ID
+            
+        Returns:
+            HotelTriggerIndex: Active triggers compiled and grouped by event
+        """
+        cache = get_trigger_index_cache()
+        index = cache.get(hotel_id)
+        if index is not None:
+            return index
+        
+        version = cache.version(hotel_id)
+        triggers = self.db.query(Trigger).filter(
+            and_(
+                Trigger.hotel_id == hotel_id,
+                Trigger.is_active == True
+            )
+        ).order_by(Trigger.priority.asc()).all()
+        
+        return cache.build(hotel_id, triggers, self.evaluator, version)
+    
     async def execute_trigger(
         self, 
         trigger_id: uuid.UUID, 
@@ -297,8 +326,11 @@ class TriggerEngine:
                 pass
             
             elif schedule_type == 'cron_expression':
-                # TODO: Implement cron expression scheduling
-                pass
+                cron_expr = time_conditions.get('cron_expression')
+                if cron_expr:
+                    scheduled_time = self.evaluator.cron_parser.get_next_execution_time(
+                        cron_expr, reference_time
+                    )
             
             if scheduled_time:
                 # TODO: Schedule with Celery
@@ -0,0 +1,233 @@
+"""
+Compiled per-hotel trigger index
+
+Active triggers are loaded once per hotel, their conditions compiled into
+predicates and grouped by trigger type and, for event-based triggers, by the
+event they subscribe to. TriggerService bumps a per-hotel version stamp in
+Redis on every create, update and delete, and each evaluation compares it
+with the stamp its cached index was built at, so a change made in the API
+process reaches Celery workers on their next evaluation. While Redis is
+unreachable no cached index is served and triggers are loaded every time.
+"""
+
+import heapq
+import time
+import uuid
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import redis
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.models.trigger import Trigger, TriggerType
+from app.utils.trigger_evaluator import ConditionPredicate, TriggerEvaluator
+
+logger = get_logger(__name__)
+
+# Redis key of a hotel's shared trigger version stamp
+VERSION_KEY_PREFIX = "trigger_index_version:"
+
+# (shared stamp from Redis or None if unreachable, local stamp)
+IndexVersion = Tuple[Optional[int], int]
+
+
+class CompiledTrigger:
+    """
+    Snapshot of an active trigger with its conditions compiled to a predicate
+
+    Only plain values are kept, never the ORM instance: the index outlives
+    the session that loaded it and is shared by every request, so callers
+    load matched triggers into their own session by trigger_id.
+    """
+
+    __slots__ = ('trigger_id', 'name', 'trigger_type', 'event_type', 'rank', 'predicate')
+
+    def __init__(self, trigger: Trigger, rank: int, predicate: ConditionPredicate):
+        self.trigger_id = trigger.id
+        self.name = trigger.name
+        self.trigger_type = trigger.trigger_type
+        self.event_type = None
+        if self.trigger_type == TriggerType.EVENT_BASED:
+            self.event_type = (trigger.conditions or {}).get('event_based', {}).get('event_type')
+        # Position in priority order; keeps merged candidate lists stable
+        self.rank = rank
+        self.predicate = predicate
+
+
+class HotelTriggerIndex:
+    """Compiled triggers of one hotel, grouped for event lookup"""
+
+    def __init__(self, hotel_id: uuid.UUID, version: IndexVersion, compiled: List[CompiledTrigger]):
+        self.hotel_id = hotel_id
+        self.version = version
+        self.built_at = time.monotonic()
+        self.triggers = compiled
+        self.by_type: Dict[TriggerType, List[CompiledTrigger]] = defaultdict(list)
+        self.by_event: Dict[Any, List[CompiledTrigger]] = defaultdict(list)
+        self.not_event_based: List[CompiledTrigger] = []
+
+        for entry in compiled:
+            self.by_type[entry.trigger_type].append(entry)
+            if entry.trigger_type == TriggerType.EVENT_BASED:
+                self.by_event[entry.event_type].append(entry)
+            else:
+                self.not_event_based.append(entry)
+
+    def candidates(
+        self,
+        trigger_type: Optional[TriggerType] = None,
+        event_type: Optional[str] = None
+    ) -> Iterable[CompiledTrigger]:
+        """
+        Triggers worth evaluating for a context, in priority order
+
+        Event-based triggers subscribed to another event can never fire and
+        are skipped without evaluation.
+        """
+        if trigger_type == TriggerType.EVENT_BASED:
+            return self.by_event.get(event_type, [])
+        if trigger_type is not None:
+            return self.by_type.get(trigger_type, [])
+        return heapq.merge(
+            self.not_event_based,
+            self.by_event.get(event_type, []),
+            key=lambda entry: entry.rank
+        )
+
+
+class TriggerIndexCache:
+    """In-process cache of HotelTriggerIndex keyed by hotel"""
+
+    def __init__(
+        self,
+        ttl_seconds: Optional[int] = None,
+        redis_client: Optional[redis.Redis] = None,
+        redis_url: Optional[str] = None
+    ):
+        self.ttl_seconds = ttl_seconds or settings.TRIGGER_INDEX_TTL_SECONDS
+        self.redis_url = redis_url or settings.REDIS_URL
+        self._redis_client = redis_client
+        self._unavailable_until = 0.0
+        self._indexes: Dict[str, HotelTriggerIndex] = {}
+        self._versions: Dict[str, int] = defaultdict(int)
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'builds': 0,
+            'invalidations': 0,
+            'errors': 0
+        }
+
+    def _redis(self) -> Optional[redis.Redis]:
+        """Client for the shared stamps; None while backing off after an error"""
+        if time.monotonic() < self._unavailable_until:
+            return None
+        if self._redis_client is None:
+            self._redis_client = redis.from_url(self.redis_url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        return self._redis_client
+
+    def _redis_failed(self, hotel_id: uuid.UUID, error: Exception) -> None:
+        self.stats['errors'] += 1
+        self._unavailable_until = time.monotonic() + 30
+        logger.warning("Trigger version stamp unavailable", hotel_id=str(hotel_id), error=str(error))
+
+    def version(self, hotel_id: uuid.UUID) -> IndexVersion:
+        """Current version stamp of a hotel's triggers, one Redis read"""
+        shared = None
+        client = self._redis()
+        if client is not None:
+            try:
+                shared = int(client.get(f"{VERSION_KEY_PREFIX}{hotel_id}") or 0)
+            except Exception as e:
+                self._redis_failed(hotel_id, e)
+        return shared, self._versions[str(hotel_id)]
+
+    def invalidate(self, hotel_id: uuid.UUID) -> None:
+        """Bump the hotel's version stamp in every process; its index is rebuilt on next use"""
+        self._versions[str(hotel_id)] += 1
+        self._indexes.pop(str(hotel_id), None)
+        self.stats['invalidations'] += 1
+
+        client = self._redis()
+        if client is not None:
+            try:
+                client.incr(f"{VERSION_KEY_PREFIX}{hotel_id}")
+            except Exception as e:
+                self._redis_failed(hotel_id, e)
+
+    def get(self, hotel_id: uuid.UUID) -> Optional[HotelTriggerIndex]:
+        """Cached index, or None if missing, outdated, expired or unverifiable"""
+        index = self._indexes.get(str(hotel_id))
+        version = self.version(hotel_id) if index is not None else None
+        if (
+            index is None
+            or version[0] is None
+            or index.version != version
+            or time.monotonic() - index.built_at > self.ttl_seconds
+        ):
+            self.stats['misses'] += 1
+            return None
+        self.stats['hits'] += 1
+        return index
+
+    def build(
+        self,
+        hotel_id: uuid.UUID,
+        triggers: List[Trigger],
+        evaluator: TriggerEvaluator,
+        version: IndexVersion
+    ) -> HotelTriggerIndex:
+        """
+        Compile and cache an index for triggers loaded at `version`
+
+        Read the version before loading triggers: if CRUD lands while they
+        load, the cached index is already outdated and is rebuilt next time.
+        """
+        compiled = [
+            CompiledTrigger(
+                trigger,
+                rank,
+                evaluator.compile_conditions(trigger.trigger_type, trigger.conditions)
+            )
+            for rank, trigger in enumerate(triggers)
+        ]
+        index = HotelTriggerIndex(hotel_id, version, compiled)
+        self._indexes[str(hotel_id)] = index
+        self.stats['builds'] += 1
+
+        logger.debug(
+            "Trigger index built",
+            hotel_id=str(hotel_id),
+            version=version[0],
+            triggers=len(compiled)
+        )
+        return index
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        return {
+            **self.stats,
+            'hotels': len(self._indexes),
+            'ttl_seconds': self.ttl_seconds
+        }
+
+
+# Global trigger index cache
+_trigger_index_cache: Optional[TriggerIndexCache] = None
+
+
+def get_trigger_index_cache() -> TriggerIndexCache:
+    """Get the global trigger index cache"""
+    global _trigger_index_cache
+    if _trigger_index_cache is None:
+        _trigger_index_cache = TriggerIndexCache()
+    return _trigger_index_cache
+
+
+__all__ = [
+    'CompiledTrigger',
+    'HotelTriggerIndex',
+    'TriggerIndexCache',
+    'get_trigger_index_cache'
+]
@@ -29,6 +29,7 @@ from app.core.tenant import TenantContext, require_tenant_context
 from app.core.logging import get_logger
 from app.logging.trigger_logger import get_trigger_logger, TriggerEventType
 from app.monitoring.trigger_metrics import trigger_metrics
+from app.services.trigger_index import get_trigger_index_cache
 
 logger = get_logger(__name__)
 
@@ -113,6 +114,7 @@ class TriggerService:
             self.db.add(trigger)
             self.db.commit()
             self.db.refresh(trigger)
+            get_trigger_index_cache().invalidate(hotel_id)
             
             self.logger.info(
                 "Trigger created successfully",
@@ -241,6 +243,7 @@ class TriggerService:
             
             self.db.commit()
             self.db.refresh(trigger)
+            get_trigger_index_cache().invalidate(hotel_id)
             
             self.logger.info(
                 "Trigger updated successfully",
@@ -289,6 +292,7 @@ class TriggerService:
             
             self.db.delete(trigger)
             self.db.commit()
+            get_trigger_index_cache().invalidate(hotel_id)
             
             self.logger.info(
                 "Trigger deleted successfully",
@@ -0,0 +1,345 @@
+"""
+Micro-batched persistence for incoming Green API message webhooks
+
+Incoming-message webhooks are collected for a few milliseconds (or until the
+batch is full) and written with set-based statements: one guest upsert, one
+conversation upsert, one multi-row message insert and one conversation counter
+update per batch, all in a single transaction. Each submitted webhook gets a future that resolves with the stored
+message ID once its batch commits.
+"""
+
+import asyncio
+import re
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
+
+import structlog
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from app.core.config import settings
+from app.models.hotel import Hotel
+from app.models.guest import Guest
+from app.models.message import (
+    Message, Conversation, MessageType, ConversationStatus, ConversationState
+)
+from app.schemas.green_api import IncomingMessageWebhook, extract_phone_number
+from app.services.green_api_service import extract_message_content
+from app.services.conversation_counters import batch_incoming_params, batch_incoming_stmt
+from app.utils.message_analysis import MessageAnalysis
+from app.services.webhook_processor import (
+    build_incoming_message_metadata, queue_message_processing
+)
+
+logger = structlog.get_logger(__name__)
+
+# Mirrors ck_guests_phone_format so bad rows are rejected before the batch
+PHONE_PATTERN = re.compile(r'^\+?[1-9]\d{1,14}$')
+
+MAX_CONTENT_LENGTH = 4000
+
+
+@dataclass
+class PendingIncomingMessage:
+    """Incoming-message webhook waiting for its batch to be written"""
+    hotel: Hotel
+    webhook_data: IncomingMessageWebhook
+    future: asyncio.Future
+    phone: str = ""
+    guest_name: str = ""
+    content: str = ""
+    message_id: uuid.UUID = field(default_factory=uuid.uuid4)
+    conversation_id: Optional[uuid.UUID] = None
+    duplicate: bool = False
+
+    def prepare(self) -> None:
+        """Extract and validate row values; raises ValueError for bad input"""
+        sender_data = self.webhook_data.senderData
+        message_data = self.webhook_data.messageData
+
+        phone_number = extract_phone_number(sender_data.chatId)
+        phone = re.sub(r'[^\d+]', '', phone_number)
+        if not PHONE_PATTERN.match(phone):
+            raise ValueError(f"Invalid phone number in chat ID: {sender_data.chatId}")
+        self.phone = phone if phone.startswith('+') else f"+{phone}"
+        self.guest_name = (sender_data.senderName or f"Guest {phone_number}")[:255]
+
+        content = (extract_message_content(message_data.dict(), message_data.typeMessage) or "").strip()
+        if not content:
+            raise ValueError("Message content is required")
+        if len(content) > MAX_CONTENT_LENGTH:
+            raise ValueError(f"Message content must be less than {MAX_CONTENT_LENGTH} characters")
+        self.content = content
+
+
+class WebhookBatchWriter:
+    """
+    Collects incoming-message webhooks and writes them in set-based batches
+
+    A batch is flushed when it reaches max_batch_size or max_delay_ms after its
+    first item arrived. If the set-based write fails, the batch is retried one
+    item per SAVEPOINT so a single bad webhook cannot fail its neighbours.
+    """
+
+    def __init__(
+        self,
+        session_factory=None,
+        work_queue=None,
+        max_batch_size: Optional[int] = None,
+        max_delay_ms: Optional[float] = None,
+        max_pending: Optional[int] = None
+    ):
+        self._session_factory = session_factory
+        self.work_queue = work_queue
+        self.max_batch_size = max_batch_size or settings.WEBHOOK_BATCH_MAX_SIZE
+        self.max_delay = (max_delay_ms or settings.WEBHOOK_BATCH_MAX_DELAY_MS) / 1000
+        self.max_pending = max_pending or settings.WEBHOOK_BATCH_MAX_PENDING
+
+        self._buffer: List[PendingIncomingMessage] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._flush_tasks: Set[asyncio.Task] = set()
+        self._pending_slots = asyncio.Semaphore(self.max_pending)
+        self.stats = {
+            'submitted': 0,
+            'written': 0,
+            'duplicates': 0,
+            'failed': 0,
+            'batches': 0,
+            'isolated_batches': 0,
+            'last_batch_size': 0,
+            'last_batch_ms': 0.0
+        }
+
+    async def submit(self, hotel: Hotel, webhook_data: IncomingMessageWebhook) -> asyncio.Future:
+        """
+        Add an incoming-message webhook to the current batch
+
+        Waits only when max_pending items are already in flight.
+
+        Returns:
+            asyncio.Future: Resolves with the message ID when the batch commits,
+                None if the idMessage was already stored, or the item's
+                exception if it could not be stored
+        """
+        await self._pending_slots.acquire()
+        loop = asyncio.get_running_loop()
+        item = PendingIncomingMessage(hotel=hotel, webhook_data=webhook_data, future=loop.create_future())
+        item.future.add_done_callback(self._on_item_done)
+        self.stats['submitted'] += 1
+
+        try:
+            item.prepare()
+        except Exception as e:
+            logger.warning("Rejected incoming webhook before batching",
+                          hotel_id=hotel.id,
+                          green_api_message_id=webhook_data.idMessage,
+                          error=str(e))
+            item.future.set_exception(e)
+            return item.future
+
+        self._buffer.append(item)
+        if len(self._buffer) >= self.max_batch_size:
+            self._start_flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.max_delay, self._start_flush)
+
+        return item.future
+
+    async def flush(self) -> None:
+        """Write the current buffer and wait for all in-flight batches"""
+        self._start_flush()
+        if self._flush_tasks:
+            await asyncio.gather(*list(self._flush_tasks), return_exceptions=True)
+
+    def _on_item_done(self, future: asyncio.Future) -> None:
+        self._pending_slots.release()
+        if not future.cancelled() and future.exception() is not None:
+            self.stats['failed'] += 1
+
+    def _start_flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._buffer = self._buffer, []
+        if not batch:
+            return
+        task = asyncio.get_running_loop().create_task(self._write_batch(batch))
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_tasks.discard)
+
+    def _open_session(self):
+        if self._session_factory is not None:
+            return self._session_factory()
+        # Lazy import keeps engine creation out of module import time
+        from app.database import get_db_session
+        return get_db_session()
+
+    async def _write_batch(self, batch: List[PendingIncomingMessage]) -> None:
+        started = time.perf_counter()
+        isolated = False
+        try:
+            async with self._open_session() as session:
+                try:
+                    await self._write_rows(session, batch)
+                    await session.commit()
+                except Exception as e:
+                    await session.rollback()
+                    logger.warning("Batched webhook write failed, retrying per item",
+                                  batch_size=len(batch),
+                                  error=str(e))
+                    isolated = True
+                    await self._write_isolated(session, batch)
+        except Exception as e:
+            logger.error("Webhook batch could not be written",
+                        batch_size=len(batch),
+                        error=str(e))
+            for item in batch:
+                if not item.future.done():
+                    item.future.set_exception(e)
+            return
+
+        self.stats['batches'] += 1
+        self.stats['isolated_batches'] += int(isolated)
+        self.stats['last_batch_size'] = len(batch)
+        self.stats['last_batch_ms'] = (time.perf_counter() - started) * 1000
+
+        for item in batch:
+            if item.future.done():
+                continue
+            if item.duplicate:
+                # Already stored by an earlier delivery; nothing to process
+                self.stats['duplicates'] += 1
+                item.future.set_result(None)
+                continue
+            item.future.set_result(item.message_id)
+            self.stats['written'] += 1
+            queue_message_processing(
+                self.work_queue, item.hotel, item.message_id, MessageAnalysis(item.content)
+            )
+
+        logger.info("Webhook batch committed",
+                   batch_size=len(batch),
+                   isolated=isolated,
+                   duration_ms=round(self.stats['last_batch_ms'], 2))
+
+    async def _write_isolated(self, session, batch: List[PendingIncomingMessage]) -> None:
+        """Retry a failed batch item by item, each inside its own SAVEPOINT"""
+        for item in batch:
+            try:
+                async with session.begin_nested():
+                    await self._write_rows(session, [item])
+            except Exception as e:
+                logger.error("Error storing incoming message",
+                            hotel_id=item.hotel.id,
+                            green_api_message_id=item.webhook_data.idMessage,
+                            error=str(e))
+                item.future.set_exception(e)
+        await session.commit()
+
+    @staticmethod
+    def _insert_for(session):
+        """Dialect-specific INSERT construct supporting ON CONFLICT"""
+        if session.bind.dialect.name == "sqlite":
+            return sqlite_insert
+        return pg_insert
+
+    async def _write_rows(self, session, items: List[PendingIncomingMessage]) -> None:
+        """Upsert guests and conversations and insert messages for items"""
+        insert = self._insert_for(session)
+        now = datetime.utcnow()
+
+        # Guests: one row per (hotel, phone); DO UPDATE so RETURNING covers existing rows
+        guest_rows: Dict[tuple, Dict[str, Any]] = {}
+        for item in items:
+            guest_rows.setdefault((item.hotel.id, item.phone), {
+                "id": uuid.uuid4(),
+                "hotel_id": item.hotel.id,
+                "phone": item.phone,
+                "name": item.guest_name,
+                "preferences": {
+                    "chat_id": item.webhook_data.senderData.chatId,
+                    "first_contact": now.isoformat(),
+                    "source": "whatsapp_incoming"
+                },
+                "last_interaction": now
+            })
+        guest_stmt = insert(Guest).values(list(guest_rows.values()))
+        guest_stmt = guest_stmt.on_conflict_do_update(
+            index_elements=[Guest.hotel_id, Guest.phone],
+            set_={"last_interaction": guest_stmt.excluded.last_interaction}
+        ).returning(Guest.id, Guest.hotel_id, Guest.phone)
+        guest_ids = {
+            (row.hotel_id, row.phone): row.id
+            for row in await session.execute(guest_stmt)
+        }
+
+        # Conversations: one active conversation per (hotel, guest)
+        conversation_rows: Dict[tuple, Dict[str, Any]] = {}
+        for item in items:
+            guest_id = guest_ids[(item.hotel.id, item.phone)]
+            conversation_rows.setdefault((item.hotel.id, guest_id), {
+                "id": uuid.uuid4(),
+                "hotel_id": item.hotel.id,
+                "guest_id": guest_id,
+                "status": ConversationStatus.ACTIVE,
+                "current_state": ConversationState.GREETING,
+                "context": {},
+                "last_message_at": now
+            })
+        conversation_stmt = insert(Conversation).values(list(conversation_rows.values()))
+        conversation_stmt = conversation_stmt.on_conflict_do_update(
+            index_elements=[Conversation.hotel_id, Conversation.guest_id],
+            index_where=text("status = 'active'"),
+            set_={"last_message_at": conversation_stmt.excluded.last_message_at}
+        ).returning(Conversation.id, Conversation.hotel_id, Conversation.guest_id)
+        conversation_ids = {
+            (row.hotel_id, row.guest_id): row.id
+            for row in await session.execute(conversation_stmt)
+        }
+
+        # Messages: a single multi-row INSERT
+        message_rows = []
+        for item in items:
+            guest_id = guest_ids[(item.hotel.id, item.phone)]
+            item.conversation_id = conversation_ids[(item.hotel.id, guest_id)]
+            message_rows.append({
+                "id": item.message_id,
+                "hotel_id": item.hotel.id,
+                "conversation_id": item.conversation_id,
+                "message_type": MessageType.INCOMING,
+                "content": item.content,
+                "green_api_message_id": item.webhook_data.idMessage,
+                "message_metadata": build_incoming_message_metadata(item.webhook_data)
+            })
+        # Redelivered idMessages hit the unique index and are skipped
+        message_stmt = insert(Message).values(message_rows).on_conflict_do_nothing(
+            index_elements=[Message.hotel_id, Message.green_api_message_id],
+            index_where=text("green_api_message_id IS NOT NULL")
+        ).returning(Message.id)
+        inserted = {row.id for row in await session.execute(message_stmt)}
+        for item in items:
+            item.duplicate = item.message_id not in inserted
+
+        # Conversation counters: one executemany UPDATE for the stored messages
+        counter_params = batch_incoming_params(
+            (item.conversation_id, item.message_id) for item in items if not item.duplicate
+        )
+        if counter_params:
+            await session.execute(batch_incoming_stmt(), counter_params)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get batching statistics"""
+        return {
+            **self.stats,
+            'buffered': len(self._buffer),
+            'in_flight_batches': len(self._flush_tasks),
+            'max_batch_size': self.max_batch_size,
+            'max_delay_ms': self.max_delay * 1000
+        }
+
+
+__all__ = ['WebhookBatchWriter', 'PendingIncomingMessage']
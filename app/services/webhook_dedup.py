@@ -0,0 +1,163 @@
+"""
+Deduplication of Green API webhook redeliveries
+
+Green API retries webhooks it considers undelivered, so the same idMessage can
+arrive several times. Deliveries are claimed here before anything is written or
+analysed: first in a small in-process LRU, then atomically in Redis with
+SET NX EX so that all workers agree. The unique index on
+Message.green_api_message_id remains the durable guarantee when Redis is down.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import redis.asyncio as redis
+import structlog
+
+from app.core.config import settings
+
+logger = structlog.get_logger(__name__)
+
+
+class WebhookDeduplicator:
+    """Claims Green API message IDs so each delivery is processed once"""
+
+    KEY_PREFIX = "webhook:dedup"
+
+    def __init__(
+        self,
+        redis_url: Optional[str] = None,
+        ttl_seconds: Optional[int] = None,
+        local_cache_size: Optional[int] = None
+    ):
+        self.redis_url = redis_url or settings.REDIS_URL
+        self.ttl_seconds = ttl_seconds or settings.WEBHOOK_DEDUP_TTL_SECONDS
+        self.local_cache_size = local_cache_size or settings.WEBHOOK_DEDUP_LOCAL_SIZE
+        self.redis_client: Optional[redis.Redis] = None
+        self._redis_unavailable_until = 0.0
+        # key -> monotonic expiry time, oldest first
+        self._recent: "OrderedDict[str, float]" = OrderedDict()
+        self.stats = {
+            'claimed': 0,
+            'duplicates_local': 0,
+            'duplicates_redis': 0,
+            'released': 0,
+            'redis_errors': 0
+        }
+
+    def _key(self, hotel_id: Any, message_id: str) -> str:
+        return f"{self.KEY_PREFIX}:{hotel_id}:{message_id}"
+
+    async def _get_redis(self) -> Optional[redis.Redis]:
+        if self.redis_client is None and time.monotonic() >= self._redis_unavailable_until:
+            try:
+                self.redis_client = redis.from_url(
+                    self.redis_url,
+                    socket_timeout=0.5,
+                    socket_connect_timeout=0.5
+                )
+            except Exception as e:
+                logger.warning("Webhook dedup Redis unavailable", error=str(e))
+                self._redis_unavailable_until = time.monotonic() + 30
+        return self.redis_client
+
+    def _seen_locally(self, key: str) -> bool:
+        expires_at = self._recent.get(key)
+        if expires_at is None:
+            return False
+        if expires_at < time.monotonic():
+            del self._recent[key]
+            return False
+        self._recent.move_to_end(key)
+        return True
+
+    def _remember(self, key: str) -> None:
+        self._recent[key] = time.monotonic() + self.ttl_seconds
+        self._recent.move_to_end(key)
+        while len(self._recent) > self.local_cache_size:
+            self._recent.popitem(last=False)
+
+    async def claim(self, hotel_id: Any, message_id: Optional[str]) -> bool:
+        """
+        Claim a webhook delivery
+
+        Args:
+            hotel_id: Hotel the webhook belongs to
+            message_id: Green API idMessage
+
+        Returns:
+            bool: True for the first delivery, False for a duplicate.
+                Redis errors fail open; the database index still deduplicates.
+        """
+        if not message_id:
+            return True
+
+        key = self._key(hotel_id, message_id)
+        if self._seen_locally(key):
+            self.stats['duplicates_local'] += 1
+            return False
+
+        client = await self._get_redis()
+        if client is not None:
+            try:
+                claimed = await client.set(key, 1, nx=True, ex=self.ttl_seconds)
+            except Exception as e:
+                self.stats['redis_errors'] += 1
+                logger.warning("Webhook dedup claim failed, relying on database",
+                              hotel_id=hotel_id,
+                              green_api_message_id=message_id,
+                              error=str(e))
+                claimed = True
+            if not claimed:
+                self._remember(key)
+                self.stats['duplicates_redis'] += 1
+                return False
+
+        self._remember(key)
+        self.stats['claimed'] += 1
+        return True
+
+    async def release(self, hotel_id: Any, message_id: Optional[str]) -> None:
+        """Forget a claim whose processing failed so a redelivery is accepted"""
+        if not message_id:
+            return
+
+        key = self._key(hotel_id, message_id)
+        self._recent.pop(key, None)
+        self.stats['released'] += 1
+
+        client = await self._get_redis()
+        if client is not None:
+            try:
+                await client.delete(key)
+            except Exception as e:
+                self.stats['redis_errors'] += 1
+                logger.warning("Webhook dedup release failed",
+                              hotel_id=hotel_id,
+                              green_api_message_id=message_id,
+                              error=str(e))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get deduplication statistics"""
+        return {
+            **self.stats,
+            'local_entries': len(self._recent),
+            'local_cache_size': self.local_cache_size,
+            'ttl_seconds': self.ttl_seconds
+        }
+
+
+# Global deduplicator instance
+_webhook_deduplicator: Optional[WebhookDeduplicator] = None
+
+
+def get_webhook_deduplicator() -> WebhookDeduplicator:
+    """Get the global webhook deduplicator"""
+    global _webhook_deduplicator
+    if _webhook_deduplicator is None:
+        _webhook_deduplicator = WebhookDeduplicator()
+    return _webhook_deduplicator
+
+
+__all__ = ['WebhookDeduplicator', 'get_webhook_deduplicator']
@@ -4,13 +4,14 @@ Webhook processor for Green API webhooks
 
 from typing import Dict, Any, Optional
 import structlog
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
 
 from app.schemas.green_api import (
     WebhookData, WebhookType, IncomingMessageWebhook,
     OutgoingMessageStatusWebhook, StateInstanceWebhook,
-    DeviceInfoWebhook, extract_phone_number
+    DeviceInfoWebhook, MessageStatus, extract_phone_number
 )
 from app.models.hotel import Hotel
 from app.models.guest import Guest
@@ -20,16 +21,63 @@ from app.services.green_api_service import (
     map_green_api_message_type, extract_message_content
 )
 from app.services.message_processor import MessageProcessor
+from app.services.conversation_counters import record_message, record_message_read
+from app.utils.message_analysis import MessageAnalysis
 # Removed circular imports - will use lazy imports when needed
 
 logger = structlog.get_logger(__name__)
 
 
+def build_incoming_message_metadata(webhook_data: IncomingMessageWebhook) -> Dict[str, Any]:
+    """Build the message_metadata stored with an incoming WhatsApp message"""
+    sender_data = webhook_data.senderData
+    message_data = webhook_data.messageData
+    return {
+        "green_api_message_id": webhook_data.idMessage,
+        "green_api_message_type": message_data.typeMessage,
+        "chat_id": sender_data.chatId,
+        "sender": sender_data.sender,
+        "sender_name": sender_data.senderName,
+        "timestamp": webhook_data.timestamp,
+        "raw_message_data": message_data.dict()
+    }
+
+
+def queue_message_processing(
+    work_queue,
+    hotel: Hotel,
+    message_id: Any,
+    analysis: Optional[MessageAnalysis] = None
+) -> None:
+    """
+    Queue a stored incoming message for processing
+
+    Uses the in-process work queue when it has room, otherwise the Celery task.
+    The analysis travels with in-process jobs; Celery workers analyse afresh.
+    """
+    if work_queue is not None and work_queue.submit_message_processing(hotel, message_id, analysis):
+        return
+
+    # Lazy import to avoid circular dependency
+    from app.tasks.process_incoming import process_incoming_message_task
+    process_incoming_message_task.delay(
+        hotel_id=str(hotel.id),
+        message_id=str(message_id)
+    )
+
+
 class WebhookProcessor:
     """Processes different types of Green API webhooks"""
     
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession, work_queue=None):
+        """
+        Args:
+            db: Async database session
+            work_queue: Optional WebhookWorkQueue used to hand stored incoming
+                messages off for processing instead of running it inline
+        """
         self.db = db
+        self.work_queue = work_queue
     
     async def process_webhook(self, hotel: Hotel, webhook_data: WebhookData) -> None:
         """
@@ -81,14 +129,21 @@ class WebhookProcessor:
             sender_data = webhook_data.senderData
             message_data = webhook_data.messageData
             
+            # Green API redelivers webhooks; never store the same idMessage twice
+            if await self._message_exists(hotel, webhook_data.idMessage):
+                logger.info("Duplicate incoming message ignored",
+                           hotel_id=hotel.id,
+                           green_api_message_id=webhook_data.idMessage)
+                return
+            
             # Extract phone number from chat ID
             phone_number = extract_phone_number(sender_data.chatId)
             
             # Find or create guest
-            guest = self._get_or_create_guest(hotel, phone_number, sender_data)
+            guest = await self._get_or_create_guest(hotel, phone_number, sender_data)
             
             # Find or create conversation
-            conversation = self._get_or_create_conversation(hotel, guest)
+            conversation = await self._get_or_create_conversation(hotel, guest)
             
             # Extract message content
             message_content = extract_message_content(
@@ -96,30 +151,28 @@ class WebhookProcessor:
                 message_data.typeMessage
             )
             
+            # Analysed lazily, once, by everything downstream
+            analysis = MessageAnalysis(message_content)
+            
             # Create message record
             message = Message(
                 hotel_id=hotel.id,
                 conversation_id=conversation.id,
                 message_type=MessageType.INCOMING,
                 content=message_content,
-                message_metadata={
-                    "green_api_message_id": webhook_data.idMessage,
-                    "green_api_message_type": message_data.typeMessage,
-                    "chat_id": sender_data.chatId,
-                    "sender": sender_data.sender,
-                    "sender_name": sender_data.senderName,
-                    "timestamp": webhook_data.timestamp,
-                    "raw_message_data": message_data.dict()
-                }
+                green_api_message_id=webhook_data.idMessage,
+                message_metadata=build_incoming_message_metadata(webhook_data)
             )
             
             self.db.add(message)
+            await self.db.flush()
             
-            # Update conversation timestamp
+            # Update conversation timestamp and counters in the same transaction
             conversation.update_last_message_time()
+            await record_message(self.db, conversation, message)
             
             # Commit changes
-            self.db.commit()
+            await self.db.commit()
             
             logger.info("Incoming message processed",
                        hotel_id=hotel.id,
@@ -128,28 +181,10 @@ class WebhookProcessor:
                        message_id=message.id,
                        green_api_message_id=webhook_data.idMessage)
 
-            # Process message immediately for urgent cases
-            processor = MessageProcessor(self.db)
-            try:
-                await processor.process_incoming_message(hotel, message)
-                logger.info("Message processing completed",
-                           hotel_id=hotel.id,
-                           message_id=message.id)
-            except Exception as e:
-                logger.error("Error in immediate message processing",
-                           hotel_id=hotel.id,
-                           message_id=message.id,
-                           error=str(e))
-                # Fall back to async processing
-                # Lazy import to avoid circular dependency
-                from app.tasks.process_incoming import process_incoming_message_task
-                process_incoming_message_task.delay(
-                    hotel_id=str(hotel.id),
-                    message_id=str(message.id)
-                )
+            await self._dispatch_message_processing(hotel, message, analysis)
             
         except Exception as e:
-            self.db.rollback()
+            await self.db.rollback()
             logger.error("Error processing incoming message",
                         hotel_id=hotel.id,
                         error=str(e))
@@ -169,16 +204,19 @@ class WebhookProcessor:
             message_data = webhook_data.messageData
             
             # Try to find existing message by Green API message ID
-            existing_message = self.db.query(Message).filter(
-                Message.hotel_id == hotel.id,
-                Message.message_metadata['green_api_message_id'].astext == webhook_data.idMessage
-            ).first()
+            result = await self.db.execute(
+                select(Message).where(
+                    Message.hotel_id == hotel.id,
+                    Message.green_api_message_id == webhook_data.idMessage
+                ).limit(1)
+            )
+            existing_message = result.scalar_one_or_none()
             
             if existing_message:
                 # Update metadata with confirmation
                 existing_message.set_metadata('confirmed_sent', True)
                 existing_message.set_metadata('sent_timestamp', webhook_data.timestamp)
-                self.db.commit()
+                await self.db.commit()
                 
                 logger.info("Outgoing message confirmed",
                            hotel_id=hotel.id,
@@ -190,7 +228,7 @@ class WebhookProcessor:
                              green_api_message_id=webhook_data.idMessage)
             
         except Exception as e:
-            self.db.rollback()
+            await self.db.rollback()
             logger.error("Error processing outgoing message",
                         hotel_id=hotel.id,
                         error=str(e))
@@ -204,17 +242,28 @@ class WebhookProcessor:
         """Process message status webhook"""
         try:
             # Find message by Green API message ID
-            message = self.db.query(Message).filter(
-                Message.hotel_id == hotel.id,
-                Message.message_metadata['green_api_message_id'].astext == webhook_data.idMessage
-            ).first()
+            result = await self.db.execute(
+                select(Message).where(
+                    Message.hotel_id == hotel.id,
+                    Message.green_api_message_id == webhook_data.idMessage
+                ).limit(1)
+            )
+            message = result.scalar_one_or_none()
             
             if message:
+                previous_status = message.get_metadata('delivery_status')
+                
                 # Update message status
                 message.set_metadata('delivery_status', webhook_data.status)
+                if (
+                    webhook_data.status == MessageStatus.READ
+                    and previous_status != MessageStatus.READ
+                    and message.message_type == MessageType.INCOMING
+                ):
+                    await record_message_read(self.db, message.conversation_id)
                 message.set_metadata('status_timestamp', webhook_data.timestamp)
                 
-                self.db.commit()
+                await self.db.commit()
                 
                 logger.info("Message status updated",
                            hotel_id=hotel.id,
@@ -236,7 +285,7 @@ class WebhookProcessor:
                              status=webhook_data.status)
             
         except Exception as e:
-            self.db.rollback()
+            await self.db.rollback()
             logger.error("Error processing message status",
                         hotel_id=hotel.id,
                         error=str(e))
@@ -255,7 +304,7 @@ class WebhookProcessor:
             hotel.set_setting('green_api.current_state', state)
             hotel.set_setting('green_api.last_state_update', webhook_data.timestamp)
             
-            self.db.commit()
+            await self.db.commit()
             
             logger.info("Instance state updated",
                        hotel_id=hotel.id,
@@ -276,10 +325,10 @@ class WebhookProcessor:
                     }
                 )
                 self.db.add(notification)
-                self.db.commit()
+                await self.db.commit()
             
         except Exception as e:
-            self.db.rollback()
+            await self.db.rollback()
             logger.error("Error processing state change",
                         hotel_id=hotel.id,
                         error=str(e))
@@ -298,7 +347,7 @@ class WebhookProcessor:
             hotel.set_setting('green_api.device_info', device_data)
             hotel.set_setting('green_api.last_device_update', webhook_data.timestamp)
             
-            self.db.commit()
+            await self.db.commit()
             
             logger.info("Device info updated",
                        hotel_id=hotel.id,
@@ -306,39 +355,80 @@ class WebhookProcessor:
                        timestamp=webhook_data.timestamp)
             
         except Exception as e:
-            self.db.rollback()
+            await self.db.rollback()
             logger.error("Error processing device info",
                         hotel_id=hotel.id,
                         error=str(e))
             raise
     
-    def _get_or_create_guest(
+    async def _dispatch_message_processing(
+        self,
+        hotel: Hotel,
+        message: Message,
+        analysis: Optional[MessageAnalysis] = None
+    ) -> None:
+        """Hand a stored incoming message off for parsing, sentiment and triggers"""
+        if self.work_queue is None:
+            # No queue (direct callers such as tests): process inline
+            processor = MessageProcessor(self.db)
+            try:
+                await processor.process_incoming_message(hotel, message, analysis)
+                logger.info("Message processing completed",
+                           hotel_id=hotel.id,
+                           message_id=message.id)
+                return
+            except Exception as e:
+                logger.error("Error in immediate message processing",
+                           hotel_id=hotel.id,
+                           message_id=message.id,
+                           error=str(e))
+
+        # Queue full or inline processing failed: fall back to Celery
+        queue_message_processing(self.work_queue, hotel, message.id, analysis)
+    
+    async def _message_exists(self, hotel: Hotel, green_api_message_id: str) -> bool:
+        """Check whether a message with this Green API idMessage is already stored"""
+        result = await self.db.execute(
+            select(Message.id).where(
+                Message.hotel_id == hotel.id,
+                Message.green_api_message_id == green_api_message_id
+            ).limit(1)
+        )
+        return result.scalar_one_or_none() is not None
+    
+    async def _get_or_create_guest(
         self,
         hotel: Hotel,
         phone_number: str,
         sender_data: Any
     ) -> Guest:
         """Get or create guest from sender data"""
+        # Guest.phone is stored normalized with a leading '+'
+        phone = phone_number if phone_number.startswith('+') else f"+{phone_number}"
+
         # Try to find existing guest
-        guest = self.db.query(Guest).filter(
-            Guest.hotel_id == hotel.id,
-            Guest.phone_number == phone_number
-        ).first()
+        result = await self.db.execute(
+            select(Guest).where(
+                Guest.hotel_id == hotel.id,
+                Guest.phone == phone
+            )
+        )
+        guest = result.scalar_one_or_none()
         
         if not guest:
             # Create new guest
             guest = Guest(
                 hotel_id=hotel.id,
-                phone_number=phone_number,
+                phone=phone,
                 name=sender_data.senderName or f"Guest {phone_number}",
-                metadata={
+                preferences={
                     "chat_id": sender_data.chatId,
                     "first_contact": datetime.utcnow().isoformat(),
                     "source": "whatsapp_incoming"
                 }
             )
             self.db.add(guest)
-            self.db.flush()  # Get ID without committing
+            await self.db.flush()  # Get ID without committing
             
             logger.info("New guest created",
                        hotel_id=hotel.id,
@@ -347,14 +437,17 @@ class WebhookProcessor:
         
         return guest
     
-    def _get_or_create_conversation(self, hotel: Hotel, guest: Guest) -> Conversation:
+    async def _get_or_create_conversation(self, hotel: Hotel, guest: Guest) -> Conversation:
         """Get or create conversation for guest"""
         # Try to find active conversation
-        conversation = self.db.query(Conversation).filter(
-            Conversation.hotel_id == hotel.id,
-            Conversation.guest_id == guest.id,
-            Conversation.status == 'active'
-        ).first()
+        result = await self.db.execute(
+            select(Conversation).where(
+                Conversation.hotel_id == hotel.id,
+                Conversation.guest_id == guest.id,
+                Conversation.status == 'active'
+            ).limit(1)
+        )
+        conversation = result.scalar_one_or_none()
         
         if not conversation:
             # Create new conversation
@@ -364,7 +457,7 @@ class WebhookProcessor:
                 status='active'
             )
             self.db.add(conversation)
-            self.db.flush()  # Get ID without committing
+            await self.db.flush()  # Get ID without committing
             
             logger.info("New conversation created",
                        hotel_id=hotel.id,
@@ -375,4 +468,4 @@ class WebhookProcessor:
 
 
 # Export main class
-__all__ = ['WebhookProcessor']
+__all__ = ['WebhookProcessor', 'build_incoming_message_metadata', 'queue_message_processing']
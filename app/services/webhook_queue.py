@@ -0,0 +1,313 @@
+"""
+Bounded in-process work queue for Green API webhook ingestion
+
+The webhook endpoint only validates and enqueues; persistence and message
+processing run on a small pool of worker tasks, each with its own AsyncSession,
+so a slow database never holds up the HTTP response.
+"""
+
+import asyncio
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import structlog
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+
+from app.core.config import settings
+from app.models.hotel import Hotel
+from app.models.message import Message, Conversation
+from app.schemas.green_api import WebhookData, WebhookType
+from app.utils.message_analysis import MessageAnalysis
+
+logger = structlog.get_logger(__name__)
+
+
+class WebhookJobType:
+    """Kinds of work accepted by the webhook queue"""
+    INGEST_WEBHOOK = "ingest_webhook"
+    PROCESS_MESSAGE = "process_message"
+
+
+@dataclass
+class WebhookJob:
+    """Single unit of work for the webhook queue"""
+    job_type: str
+    hotel: Hotel
+    webhook_data: Optional[WebhookData] = None
+    message_id: Optional[uuid.UUID] = None
+    analysis: Optional[MessageAnalysis] = None
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class WebhookWorkQueue:
+    """
+    Bounded asyncio queue drained by a fixed pool of worker tasks
+
+    Submission never blocks: when the queue is full the caller is told so and
+    decides how to shed load (the endpoint answers 503 so Green API retries,
+    message processing falls back to Celery).
+    """
+
+    def __init__(
+        self,
+        max_size: Optional[int] = None,
+        workers: Optional[int] = None,
+        session_factory=None
+    ):
+        self.max_size = max_size or settings.WEBHOOK_QUEUE_MAX_SIZE
+        self.worker_count = workers or settings.WEBHOOK_QUEUE_WORKERS
+        self._session_factory = session_factory
+        self.batch_writer = None
+        if settings.WEBHOOK_BATCH_ENABLED:
+            from app.services.webhook_batch_writer import WebhookBatchWriter
+            self.batch_writer = WebhookBatchWriter(
+                session_factory=session_factory,
+                work_queue=self
+            )
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._running = False
+        self.stats = {
+            'submitted': 0,
+            'rejected': 0,
+            'completed': 0,
+            'failed': 0,
+            'max_wait_ms': 0.0
+        }
+
+    @property
+    def is_running(self) -> bool:
+        """Whether worker tasks are currently draining the queue"""
+        return self._running
+
+    async def start(self) -> None:
+        """Start worker tasks on the running event loop"""
+        if self._running:
+            return
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._running = True
+        self._workers = [
+            asyncio.create_task(self._worker_loop(i), name=f"webhook-worker-{i}")
+            for i in range(self.worker_count)
+        ]
+        logger.info("Webhook work queue started",
+                   workers=self.worker_count,
+                   max_size=self.max_size)
+
+    async def stop(self, drain_timeout: float = 10.0) -> None:
+        """Drain outstanding jobs (bounded by drain_timeout) and stop workers"""
+        if not self._running:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=drain_timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Webhook queue drain timed out",
+                          pending=self._queue.qsize())
+        if self.batch_writer is not None:
+            await self.batch_writer.flush()
+        self._running = False
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        logger.info("Webhook work queue stopped", **self.get_stats())
+
+    def submit_webhook(self, hotel: Hotel, webhook_data: WebhookData) -> bool:
+        """
+        Enqueue a parsed webhook for ingestion
+
+        Returns:
+            bool: False if the queue is full and the webhook was not accepted
+        """
+        return self._submit(WebhookJob(
+            job_type=WebhookJobType.INGEST_WEBHOOK,
+            hotel=hotel,
+            webhook_data=webhook_data
+        ))
+
+    def submit_message_processing(
+        self,
+        hotel: Hotel,
+        message_id: uuid.UUID,
+        analysis: Optional[MessageAnalysis] = None
+    ) -> bool:
+        """
+        Enqueue a stored incoming message for parsing, sentiment and triggers
+
+        Args:
+            hotel: Hotel the message belongs to
+            message_id: Stored message ID
+            analysis: Analysis of the message text made on arrival
+
+        Returns:
+            bool: False if the queue is full and the job was not accepted
+        """
+        return self._submit(WebhookJob(
+            job_type=WebhookJobType.PROCESS_MESSAGE,
+            hotel=hotel,
+            message_id=message_id,
+            analysis=analysis
+        ))
+
+    def _submit(self, job: WebhookJob) -> bool:
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_size)
+        if not self._running:
+            # Lazily start when used outside the application lifespan
+            asyncio.get_running_loop().create_task(self.start())
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.stats['rejected'] += 1
+            logger.warning("Webhook queue full, rejecting job",
+                          job_type=job.job_type,
+                          hotel_id=job.hotel.id,
+                          queue_size=self._queue.qsize())
+            return False
+        self.stats['submitted'] += 1
+        return True
+
+    async def _worker_loop(self, worker_id: int) -> None:
+        """Pull jobs until cancelled"""
+        while True:
+            job = await self._queue.get()
+            try:
+                wait_ms = (time.monotonic() - job.enqueued_at) * 1000
+                if wait_ms > self.stats['max_wait_ms']:
+                    self.stats['max_wait_ms'] = wait_ms
+                await self._run_job(job)
+                self.stats['completed'] += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats['failed'] += 1
+                if job.job_type == WebhookJobType.INGEST_WEBHOOK:
+                    await self._release_claim(job)
+                logger.error("Webhook job failed",
+                            worker_id=worker_id,
+                            job_type=job.job_type,
+                            hotel_id=job.hotel.id,
+                            error=str(e))
+            finally:
+                self._queue.task_done()
+
+    async def _release_claim(self, job: WebhookJob) -> None:
+        """Let Green API redeliver a webhook whose ingestion failed"""
+        message_id = getattr(job.webhook_data, 'idMessage', None)
+        if message_id:
+            from app.services.webhook_dedup import get_webhook_deduplicator
+            await get_webhook_deduplicator().release(job.hotel.id, message_id)
+
+    def _release_on_failure(self, job: WebhookJob, future: asyncio.Future) -> None:
+        if not future.cancelled() and future.exception() is not None:
+            asyncio.get_running_loop().create_task(self._release_claim(job))
+
+    def _open_session(self):
+        if self._session_factory is not None:
+            return self._session_factory()
+        # Lazy import keeps engine creation out of module import time
+        from app.database import get_db_session
+        return get_db_session()
+
+    async def _run_job(self, job: WebhookJob) -> None:
+        if (
+            self.batch_writer is not None
+            and job.job_type == WebhookJobType.INGEST_WEBHOOK
+            and job.webhook_data.typeWebhook == WebhookType.INCOMING_MESSAGE
+        ):
+            # Persisted by the batch writer; the worker moves on immediately
+            future = await self.batch_writer.submit(job.hotel, job.webhook_data)
+            future.add_done_callback(lambda f: self._release_on_failure(job, f))
+            return
+
+        async with self._open_session() as session:
+            # Re-attach the hotel loaded by the request without another query
+            hotel = await session.merge(job.hotel, load=False)
+
+            if job.job_type == WebhookJobType.INGEST_WEBHOOK:
+                from app.services.webhook_processor import WebhookProcessor
+                processor = WebhookProcessor(session, work_queue=self)
+                await processor.process_webhook(hotel, job.webhook_data)
+
+            elif job.job_type == WebhookJobType.PROCESS_MESSAGE:
+                await self._process_message(session, hotel, job.message_id, job.analysis)
+
+            else:
+                logger.warning("Unknown webhook job type", job_type=job.job_type)
+
+    async def _process_message(
+        self,
+        session,
+        hotel: Hotel,
+        message_id: uuid.UUID,
+        analysis: Optional[MessageAnalysis] = None
+    ) -> None:
+        from app.services.message_processor import MessageProcessor
+
+        result = await session.execute(
+            select(Message)
+            .options(selectinload(Message.conversation).selectinload(Conversation.guest))
+            .where(Message.id == message_id, Message.hotel_id == hotel.id)
+        )
+        message = result.scalar_one_or_none()
+        if not message:
+            logger.warning("Queued message not found",
+                          hotel_id=hotel.id,
+                          message_id=message_id)
+            return
+
+        processor = MessageProcessor(session)
+        await processor.process_incoming_message(hotel, message, analysis)
+        logger.info("Message processing completed",
+                   hotel_id=hotel.id,
+                   message_id=message.id)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get queue statistics"""
+        return {
+            **self.stats,
+            'queue_size': self._queue.qsize() if self._queue else 0,
+            'max_size': self.max_size,
+            'workers': len(self._workers),
+            'running': self._running,
+            'batch_writer': self.batch_writer.get_stats() if self.batch_writer else None
+        }
+
+
+# Global queue instance
+_webhook_queue: Optional[WebhookWorkQueue] = None
+
+
+def get_webhook_queue() -> WebhookWorkQueue:
+    """Get the global webhook work queue"""
+    global _webhook_queue
+    if _webhook_queue is None:
+        _webhook_queue = WebhookWorkQueue()
+    return _webhook_queue
+
+
+async def start_webhook_queue() -> WebhookWorkQueue:
+    """Start the global webhook work queue"""
+    queue = get_webhook_queue()
+    await queue.start()
+    return queue
+
+
+async def stop_webhook_queue() -> None:
+    """Drain and stop the global webhook work queue"""
+    if _webhook_queue is not None:
+        await _webhook_queue.stop()
+
+
+__all__ = [
+    'WebhookJobType',
+    'WebhookJob',
+    'WebhookWorkQueue',
+    'get_webhook_queue',
+    'start_webhook_queue',
+    'stop_webhook_queue'
+]
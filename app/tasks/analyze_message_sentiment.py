@@ -13,6 +13,7 @@ from app.core.celery_app import celery_app, high_priority_task
 from app.database import get_db
 from app.models.message import Message
 from app.services.realtime_sentiment import get_realtime_sentiment_analyzer
+from app.utils.message_analysis import MessageAnalysis
 from app.core.deepseek_logging import log_deepseek_operation
 
 logger = structlog.get_logger(__name__)
@@ -68,7 +69,8 @@ def analyze_message_sentiment_realtime_task(
                         message=message,
                         conversation_id=conversation_id,
                         context=context,
-                        correlation_id=correlation_id
+                        correlation_id=correlation_id,
+                        analysis=MessageAnalysis(message.content)
                     )
                 )
                 
@@ -122,46 +124,40 @@ def batch_analyze_messages_task(
             # Initialize analyzer
             analyzer = get_realtime_sentiment_analyzer(db)
             
-            # Process each message
-            results = []
+            # Get all messages in one query, in the order given
+            positions = {str(message_id): i for i, message_id in enumerate(message_ids)}
+            messages = db.query(Message).filter(Message.id.in_(message_ids)).all()
+            messages.sort(key=lambda message: positions.get(str(message.id), len(positions)))
+            found_ids = {str(message.id) for message in messages}
             for message_id in message_ids:
-                try:
-                    # Get message
-                    message = db.query(Message).filter(Message.id == message_id).first()
-                    if not message:
-                        logger.warning("Message not found in batch analysis",
-                                     message_id=message_id,
-                                     correlation_id=correlation_id)
-                        continue
-                    
-                    # Run async analysis
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-                    
-                    try:
-                        result = loop.run_until_complete(
-                            analyzer.analyze_message(
-                                message=message,
-                                conversation_id=str(message.conversation_id),
-                                correlation_id=correlation_id
-                            )
-                        )
-                        results.append({
-                            "message_id": message_id,
-                            "sentiment": result.sentiment.value,
-                            "score": result.score,
-                            "requires_attention": result.requires_attention
-                        })
-                        
-                    finally:
-                        loop.close()
-                        
-                except Exception as e:
-                    logger.error("Failed to analyze message in batch",
-                               message_id=message_id,
-                               error=str(e),
-                               correlation_id=correlation_id)
-                    continue
+                if str(message_id) not in found_ids:
+                    logger.warning("Message not found in batch analysis",
+                                 message_id=message_id,
+                                 correlation_id=correlation_id)
+            
+            # Analyze all messages on one event loop, batching their prompts
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            
+            try:
+                analyzed = loop.run_until_complete(
+                    analyzer.analyze_messages(
+                        messages=messages,
+                        correlation_id=correlation_id
+                    )
+                )
+            finally:
+                loop.close()
+            
+            results = [
+                {
+                    "message_id": str(message.id),
+                    "sentiment": result.sentiment.value,
+                    "score": result.score,
+                    "requires_attention": result.requires_attention
+                }
+                for message, result in analyzed if result is not None
+            ]
             
             logger.info("Batch sentiment analysis completed",
                        processed_count=len(results),
@@ -2,7 +2,8 @@
 Celery tasks for AI response generation
 """
 
-from typing import Optional, Dict, Any
+import asyncio
+from typing import Optional, Dict, Any, List
 import uuid
 
 import structlog
@@ -20,6 +21,16 @@ from app.utils.prompt_templates import ResponseType
 logger = structlog.get_logger(__name__)
 
 
+def _run_async(coro):
+    """Run a coroutine to completion on a fresh event loop"""
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
 @celery_app.task(bind=True, max_retries=3)
 def generate_response_task(
     self,
@@ -81,13 +92,48 @@ def generate_response_task(
                                  response_type=response_type,
                                  correlation_id=correlation_id)
             
+            # Stream long answers to the guest as they are generated
+            if auto_send and generator.config.streaming_enabled:
+                hotel = db.query(Hotel).filter(Hotel.id == message.hotel_id).first()
+                guest = db.query(Guest).filter(Guest.id == message.guest_id).first()
+                if not hotel or not guest:
+                    logger.error("Hotel or guest not found for streaming response",
+                               message_id=message_id,
+                               correlation_id=correlation_id)
+                    return
+                
+                sender = MessageSender(db)
+                send_results = _run_async(sender.send_streamed_message(
+                    hotel=hotel,
+                    guest=guest,
+                    chunks=generator.stream_response(
+                        message=message,
+                        response_type=response_type_enum,
+                        context=context,
+                        correlation_id=correlation_id
+                    ),
+                    quoted_message_id=str(message.id)  # Quote the original message
+                ))
+                
+                logger.info("Streamed response generation task completed",
+                           message_id=message_id,
+                           chunk_count=len(send_results),
+                           correlation_id=correlation_id)
+                
+                return {
+                    'message_id': message_id,
+                    'streamed': True,
+                    'sent_message_ids': [r.get('message_id') for r in send_results],
+                    'correlation_id': correlation_id
+                }
+            
             # Generate response
-            result = await generator.generate_response(
+            result = _run_async(generator.generate_response(
                 message=message,
                 response_type=response_type_enum,
                 context=context,
                 correlation_id=correlation_id
-            )
+            ))
             
             # Store generated response (optional - for review/approval workflow)
             # This could be stored in a separate table for human review before sending
@@ -188,13 +234,13 @@ def send_generated_response_task(
             sender = MessageSender(db)
             
             # Send response
-            send_result = await sender.send_text_message(
+            send_result = _run_async(sender.send_text_message(
                 hotel=hotel,
                 guest=guest,
                 message=generated_response,
                 priority="normal",
                 quoted_message_id=str(message.id)  # Quote the original message
-            )
+            ))
             
             if send_result.get('success'):
                 logger.info("Generated response sent successfully",
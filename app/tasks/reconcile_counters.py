@@ -0,0 +1,54 @@
+"""
+Celery task reconciling denormalized conversation counters
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+import structlog
+
+from app.tasks.base import maintenance_task
+from app.database import get_db_session
+from app.services.conversation_counters import reconcile_conversation_counters
+
+logger = structlog.get_logger(__name__)
+
+
+async def _reconcile(since: Optional[datetime]) -> Dict[str, int]:
+    async with get_db_session() as db:
+        return await reconcile_conversation_counters(db, since=since)
+
+
+@maintenance_task(bind=True)
+def reconcile_conversation_counters_task(self, hours: Optional[int] = 48) -> Dict[str, Any]:
+    """
+    Recompute conversation counters from the messages table
+
+    Write-time counters can drift after crashes between statements or
+    manual data fixes; this repairs conversations active in the last
+    `hours` (all conversations when hours is None).
+
+    Returns:
+        Dict with reconciliation statistics
+    """
+    since = datetime.utcnow() - timedelta(hours=hours) if hours else None
+
+    # Run async function in sync context
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    try:
+        result = loop.run_until_complete(_reconcile(since))
+        return {
+            "status": "completed",
+            "since": since.isoformat() if since else None,
+            **result
+        }
+    except Exception as exc:
+        logger.error("Conversation counter reconciliation failed", error=str(exc))
+        raise
+    finally:
+        loop.close()
+
+
+__all__ = ['reconcile_conversation_counters_task']
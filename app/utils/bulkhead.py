@@ -0,0 +1,360 @@
+"""
+Per-tenant bulkheads for outbound providers
+
+Each hotel (or Green API instance) gets its own circuit breaker and
+concurrency cap, created on first use and evicted once idle, so one
+hotel's banned instance or revoked API key trips only its own breaker.
+The provider's shared breaker is kept for provider-wide outages: it only
+counts failures that point at the provider (no HTTP status, or 5xx), and
+only once several tenants see them at the same time.
+
+Slots under the provider-wide concurrency cap are granted round-robin
+across tenants with waiting requests, so a hotel with a burst of
+traffic queues behind its own requests rather than everyone else's.
+"""
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Optional
+
+from app.core.logging import get_logger
+from app.utils.circuit_breaker import (
+    CircuitBreaker,
+    CircuitBreakerConfig,
+    CircuitBreakerTimeoutException,
+    CircuitState,
+    get_circuit_breaker
+)
+
+logger = get_logger(__name__)
+
+
+def is_provider_failure(error: BaseException) -> bool:
+    """Whether a failure points at the provider rather than one tenant's account"""
+    status = getattr(error, 'status_code', None)
+    if status is None:
+        status = getattr(getattr(error, 'response', None), 'status_code', None)
+    # Connection errors and timeouts carry no status; 4xx are about the
+    # tenant's credentials, instance or quota
+    return not isinstance(status, int) or status >= 500
+
+
+class FairLimiter:
+    """
+    Concurrency limit with a per-tenant cap, granting freed slots
+    round-robin across tenants with waiting requests
+
+    Waiters are plain futures rather than asyncio primitives, so one
+    limiter can serve the fresh event loop of each Celery task.
+    """
+
+    def __init__(self, capacity: int, per_tenant: int):
+        self.capacity = capacity
+        self.per_tenant = per_tenant
+        self.in_use = 0
+        self._tenant_in_use: Dict[str, int] = {}
+        self._waiters: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+
+    def _has_room(self, tenant_id: str) -> bool:
+        return self.in_use < self.capacity and self._tenant_in_use.get(tenant_id, 0) < self.per_tenant
+
+    def _grant(self, tenant_id: str) -> None:
+        self.in_use += 1
+        self._tenant_in_use[tenant_id] = self._tenant_in_use.get(tenant_id, 0) + 1
+
+    async def acquire(self, tenant_id: str) -> None:
+        # Free slots are never held back while requests wait, so anyone
+        # waiting now is either out of global slots or at their own cap
+        if self._has_room(tenant_id) and tenant_id not in self._waiters:
+            self._grant(tenant_id)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(tenant_id, deque()).append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release(tenant_id)  # granted just as we were cancelled
+            else:
+                self._discard(tenant_id, future)
+            raise
+
+    def release(self, tenant_id: str) -> None:
+        self.in_use -= 1
+        remaining = self._tenant_in_use.get(tenant_id, 1) - 1
+        if remaining > 0:
+            self._tenant_in_use[tenant_id] = remaining
+        else:
+            self._tenant_in_use.pop(tenant_id, None)
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        # Hand free slots to waiting tenants in turn
+        while self.in_use < self.capacity:
+            tenant_id = next(
+                (tenant_id for tenant_id in self._waiters if self._has_room(tenant_id)),
+                None
+            )
+            if tenant_id is None:
+                return
+
+            queue = self._waiters[tenant_id]
+            future = queue.popleft()
+            if queue:
+                self._waiters.move_to_end(tenant_id)
+            else:
+                del self._waiters[tenant_id]
+
+            if future.done() or future.get_loop().is_closed():
+                continue
+            self._grant(tenant_id)
+            future.set_result(None)
+
+    def _discard(self, tenant_id: str, future: asyncio.Future) -> None:
+        queue = self._waiters.get(tenant_id)
+        if queue is None:
+            return
+        try:
+            queue.remove(future)
+        except ValueError:
+            pass
+        if not queue:
+            del self._waiters[tenant_id]
+
+    def in_flight(self, tenant_id: Optional[str] = None) -> int:
+        """Requests holding a slot, for one tenant or all"""
+        if tenant_id is not None:
+            return self._tenant_in_use.get(tenant_id, 0)
+        return self.in_use
+
+    def queued(self, tenant_id: Optional[str] = None) -> int:
+        """Requests waiting for a slot, for one tenant or all"""
+        if tenant_id is not None:
+            return len(self._waiters.get(tenant_id, ()))
+        return sum(len(queue) for queue in self._waiters.values())
+
+
+@dataclass
+class TenantCompartment:
+    """One tenant's breaker and usage"""
+    tenant_id: str
+    breaker: CircuitBreaker
+    active: int = 0
+    last_used: float = field(default_factory=time.monotonic)
+
+
+class Bulkhead:
+    """Per-tenant circuit breakers and concurrency caps for one provider"""
+
+    def __init__(
+        self,
+        name: str,
+        breaker_config: CircuitBreakerConfig,
+        max_concurrency_per_tenant: int = 10,
+        max_concurrency: int = 100,
+        idle_ttl: float = 600.0,
+        provider_min_tenants: int = 2,
+        classify: Callable[[BaseException], bool] = is_provider_failure
+    ):
+        """
+        Args:
+            name: Provider name; also the name of its shared circuit breaker
+            breaker_config: Configuration of the shared and per-tenant breakers
+            max_concurrency_per_tenant: In-flight requests per tenant
+            max_concurrency: In-flight requests across all tenants
+            idle_ttl: Seconds after which an unused tenant is evicted
+            provider_min_tenants: Distinct tenants that must see provider
+                failures within the breaker's recovery timeout before the
+                shared breaker counts them
+            classify: Tells provider failures from tenant failures
+        """
+        self.name = name
+        self.breaker_config = breaker_config
+        self.provider_breaker = get_circuit_breaker(name, breaker_config)
+        self.idle_ttl = idle_ttl
+        self.provider_min_tenants = provider_min_tenants
+        self.classify = classify
+        self.limiter = FairLimiter(max_concurrency, max_concurrency_per_tenant)
+        self._tenants: Dict[str, TenantCompartment] = {}
+        self._provider_failures: Dict[str, float] = {}
+        self._last_sweep = time.monotonic()
+        self.stats = {
+            'requests': 0,
+            'rejected_tenant': 0,
+            'rejected_provider': 0,
+            'tenant_failures': 0,
+            'provider_failures': 0,
+            'evicted': 0
+        }
+
+    def _compartment(self, tenant_id: str) -> TenantCompartment:
+        now = time.monotonic()
+        if now - self._last_sweep > self.idle_ttl / 2:
+            self._evict_idle(now)
+
+        compartment = self._tenants.get(tenant_id)
+        if compartment is None:
+            compartment = TenantCompartment(
+                tenant_id=tenant_id,
+                breaker=CircuitBreaker(f"{self.name}:{tenant_id}", self.breaker_config)
+            )
+            self._tenants[tenant_id] = compartment
+        return compartment
+
+    def _evict_idle(self, now: float) -> None:
+        self._last_sweep = now
+        for tenant_id, compartment in list(self._tenants.items()):
+            # A tripped breaker is kept so eviction does not reset it
+            if (compartment.active == 0
+                    and now - compartment.last_used > self.idle_ttl
+                    and compartment.breaker.state == CircuitState.CLOSED):
+                del self._tenants[tenant_id]
+                self.stats['evicted'] += 1
+
+    @asynccontextmanager
+    async def admit(self, tenant_id: str) -> AsyncIterator[TenantCompartment]:
+        """
+        Hold a slot for one request of a tenant
+
+        Fails fast with CircuitBreakerOpenException when the tenant's or
+        the provider's breaker is open. The caller reports the outcome
+        with record_success or record_failure.
+        """
+        compartment = self._compartment(tenant_id)
+        self.stats['requests'] += 1
+        try:
+            self.provider_breaker.before_call()
+        except Exception:
+            self.stats['rejected_provider'] += 1
+            raise
+        try:
+            compartment.breaker.before_call()
+        except Exception:
+            self.stats['rejected_tenant'] += 1
+            raise
+
+        compartment.active += 1
+        try:
+            await self.limiter.acquire(tenant_id)
+            try:
+                yield compartment
+            finally:
+                self.limiter.release(tenant_id)
+        finally:
+            compartment.active -= 1
+            compartment.last_used = time.monotonic()
+
+    def record_success(self, compartment: TenantCompartment, response_time: float) -> None:
+        """Record a successful request admitted by admit()"""
+        compartment.breaker.record_success(response_time)
+        self.provider_breaker.record_success(response_time)
+
+    def record_failure(
+        self,
+        compartment: TenantCompartment,
+        response_time: float,
+        error: BaseException
+    ) -> None:
+        """Record a failed request admitted by admit()"""
+        timeout = isinstance(error, (asyncio.TimeoutError, CircuitBreakerTimeoutException))
+        reason = "timeout" if timeout else "exception"
+        compartment.breaker.record_failure(response_time, reason=reason)
+        self.stats['tenant_failures'] += 1
+
+        if not (timeout or self.classify(error)):
+            # The provider answered; only this tenant is affected
+            self.provider_breaker.record_success(response_time)
+            return
+
+        now = time.monotonic()
+        self._provider_failures[compartment.tenant_id] = now
+        horizon = now - self.breaker_config.recovery_timeout
+        self._provider_failures = {
+            tenant_id: failed_at
+            for tenant_id, failed_at in self._provider_failures.items()
+            if failed_at > horizon
+        }
+        if len(self._provider_failures) >= self.provider_min_tenants:
+            self.provider_breaker.record_failure(response_time, reason=reason)
+            self.stats['provider_failures'] += 1
+
+    async def call(self, tenant_id: str, func: Callable, *args, **kwargs) -> Any:
+        """Execute an async function within the tenant's bulkhead"""
+        async with self.admit(tenant_id) as compartment:
+            start_time = time.time()
+            try:
+                result = await asyncio.wait_for(
+                    func(*args, **kwargs),
+                    timeout=self.breaker_config.timeout
+                )
+            except asyncio.TimeoutError as e:
+                self.record_failure(compartment, time.time() - start_time, e)
+                raise CircuitBreakerTimeoutException(
+                    f"Bulkhead '{self.name}:{tenant_id}' timeout after {self.breaker_config.timeout}s"
+                ) from e
+            except self.breaker_config.expected_exception as e:
+                self.record_failure(compartment, time.time() - start_time, e)
+                raise
+
+            self.record_success(compartment, time.time() - start_time)
+            return result
+
+    def get_tenant_state(self, tenant_id: str) -> Dict[str, Any]:
+        """Breaker state and load of one tenant"""
+        compartment = self._tenants.get(tenant_id)
+        return {
+            'state': compartment.breaker.state.value if compartment else CircuitState.CLOSED.value,
+            'provider_state': self.provider_breaker.state.value,
+            'in_flight': self.limiter.in_flight(tenant_id),
+            'queued': self.limiter.queued(tenant_id)
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get bulkhead statistics"""
+        return {
+            **self.stats,
+            'provider_state': self.provider_breaker.state.value,
+            'tenants': len(self._tenants),
+            'open_tenants': sorted(
+                tenant_id for tenant_id, compartment in self._tenants.items()
+                if compartment.breaker.state != CircuitState.CLOSED
+            ),
+            'in_flight': self.limiter.in_flight(),
+            'queued': self.limiter.queued()
+        }
+
+
+# Global bulkhead registry, one per provider
+_bulkheads: Dict[str, Bulkhead] = {}
+_registry_lock = threading.Lock()
+
+
+def get_bulkhead(name: str, breaker_config: Optional[CircuitBreakerConfig] = None, **kwargs) -> Bulkhead:
+    """
+    Get or create the bulkhead of a provider
+    """
+    with _registry_lock:
+        if name not in _bulkheads:
+            _bulkheads[name] = Bulkhead(name, breaker_config or CircuitBreakerConfig(), **kwargs)
+        return _bulkheads[name]
+
+
+def get_all_bulkheads() -> Dict[str, Bulkhead]:
+    """Get all registered bulkheads"""
+    with _registry_lock:
+        return _bulkheads.copy()
+
+
+__all__ = [
+    'Bulkhead',
+    'FairLimiter',
+    'TenantCompartment',
+    'is_provider_failure',
+    'get_bulkhead',
+    'get_all_bulkheads'
+]
@@ -219,9 +219,10 @@ class CircuitBreaker:
                 logger.warning("Circuit breaker reopened during half-open test",
                              name=self.name)
     
-    async def call(self, func: Callable, *args, **kwargs) -> Any:
+    def before_call(self) -> None:
         """
-        Execute function with circuit breaker protection
+        Admit a request or fail fast; for calls not made through call(),
+        which then report their outcome with record_success/record_failure
         """
         if not self._can_attempt_request():
             logger.warning("Circuit breaker is open, failing fast",
@@ -235,6 +236,35 @@ class CircuitBreaker:
             raise CircuitBreakerOpenException(
                 f"Circuit breaker '{self.name}' is open"
             )
+
+    def record_success(self, response_time: float) -> None:
+        """Record a successful request admitted by before_call"""
+        # Record success metrics
+        if METRICS_AVAILABLE:
+            metrics = get_reliability_metrics()
+            metrics.record_circuit_breaker_request(
+                self.name, self.state.value, "success", response_time
+            )
+
+        self._handle_success()
+
+    def record_failure(self, response_time: float, reason: str = "exception") -> None:
+        """Record a failed request admitted by before_call"""
+        # Record failure metrics
+        if METRICS_AVAILABLE:
+            metrics = get_reliability_metrics()
+            metrics.record_circuit_breaker_request(
+                self.name, self.state.value, "timeout" if reason == "timeout" else "failure", response_time
+            )
+            metrics.record_circuit_breaker_failure(self.name, reason)
+
+        self._handle_failure()
+
+    async def call(self, func: Callable, *args, **kwargs) -> Any:
+        """
+        Execute function with circuit breaker protection
+        """
+        self.before_call()
         
         start_time = time.time()
 
@@ -248,30 +278,11 @@ class CircuitBreaker:
             else:
                 result = func(*args, **kwargs)
 
-            response_time = time.time() - start_time
-
-            # Record success metrics
-            if METRICS_AVAILABLE:
-                metrics = get_reliability_metrics()
-                metrics.record_circuit_breaker_request(
-                    self.name, self.state.value, "success", response_time
-                )
-
-            self._handle_success()
+            self.record_success(time.time() - start_time)
             return result
             
         except self.config.expected_exception as e:
-            response_time = time.time() - start_time
-
-            # Record failure metrics
-            if METRICS_AVAILABLE:
-                metrics = get_reliability_metrics()
-                metrics.record_circuit_breaker_request(
-                    self.name, self.state.value, "failure", response_time
-                )
-                metrics.record_circuit_breaker_failure(self.name, "exception")
-
-            self._handle_failure()
+            self.record_failure(time.time() - start_time)
             logger.error("Circuit breaker recorded failure",
                         name=self.name,
                         error=str(e),
@@ -279,17 +290,7 @@ class CircuitBreaker:
             raise
 
         except asyncio.TimeoutError as e:
-            response_time = time.time() - start_time
-
-            # Record timeout metrics
-            if METRICS_AVAILABLE:
-                metrics = get_reliability_metrics()
-                metrics.record_circuit_breaker_request(
-                    self.name, self.state.value, "timeout", response_time
-                )
-                metrics.record_circuit_breaker_failure(self.name, "timeout")
-
-            self._handle_failure()
+            self.record_failure(time.time() - start_time, reason="timeout")
             logger.error("Circuit breaker timeout",
                         name=self.name,
                         timeout=self.config.timeout)
@@ -2,15 +2,25 @@
 Cron expression parser for WhatsApp Hotel Bot application
 """
 
+import calendar
 import re
+from bisect import bisect_left
 from datetime import datetime, timedelta
-from typing import List, Optional, Tuple
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
 import structlog
 
 from app.core.logging import get_logger
 
 logger = get_logger(__name__)
 
+# Number of distinct parsed expressions kept by compile_cron_expression()
+CRON_CACHE_SIZE = 1024
+
+# Upper bound on how far ahead a next execution is searched; covers leap-day
+# schedules combined with a weekday, which can skip several leap years
+MAX_SEARCH_YEARS = 50
+
 
 class CronParserError(Exception):
     """Base exception for cron parser errors"""
@@ -206,34 +216,69 @@ class CronParser:
         """
         try:
             from_time = from_time or datetime.utcnow()
-            parsed = self.parse_cron_expression(cron_expr)
-            
-            # Start from the next minute
-            next_time = from_time.replace(second=0, microsecond=0) + timedelta(minutes=1)
+            next_time = compile_cron_expression(cron_expr).next_after(from_time)
             
-            # Find next valid time (limit search to avoid infinite loops)
-            max_iterations = 366 * 24 * 60  # One year worth of minutes
-            
-            for _ in range(max_iterations):
-                if self._time_matches_cron(next_time, parsed):
-                    return next_time
-                next_time += timedelta(minutes=1)
+            if next_time is None:
+                self.logger.warning(
+                    "No valid execution time found for cron expression",
+                    cron_expr=cron_expr,
+                    from_time=from_time.isoformat()
+                )
+            return next_time
             
-            # If we get here, no valid time found in the next year
-            self.logger.warning(
-                "No valid execution time found for cron expression",
+        except CronParserError as e:
+            self.logger.error(
+                "Error calculating next execution time",
                 cron_expr=cron_expr,
-                from_time=from_time.isoformat()
+                error=str(e)
             )
             return None
+    
+    def next_n_executions(
+        self,
+        cron_expr: str,
+        count: int,
+        from_time: Optional[datetime] = None
+    ) -> List[datetime]:
+        """
+        Get the next `count` execution times for a cron expression
+        
+        Args:
+            cron_expr: Cron expression
+            count: Number of execution times to return
+            from_time: Start time (defaults to now)
             
+        Returns:
+            List[datetime]: Execution times in ascending order; shorter than
+                count if the expression stops matching
+        """
+        try:
+            schedule = compile_cron_expression(cron_expr)
         except CronParserError as e:
             self.logger.error(
-                "Error calculating next execution time",
+                "Error calculating execution times",
                 cron_expr=cron_expr,
                 error=str(e)
             )
-            return None
+            return []
+        
+        executions = []
+        next_time = from_time or datetime.utcnow()
+        for _ in range(count):
+            next_time = schedule.next_after(next_time)
+            if next_time is None:
+                break
+            executions.append(next_time)
+        return executions
+    
+    def matches(self, cron_expr: str, dt: datetime) -> bool:
+        """
+        Check if a datetime matches a cron expression
+        
+        Raises:
+            CronParserError: If expression is invalid
+        """
+        return compile_cron_expression(cron_expr).matches(dt)
     
     def _time_matches_cron(self, dt: datetime, parsed_cron: dict) -> bool:
         """
@@ -333,8 +378,142 @@ class CronParser:
             return f"Invalid cron expression: {cron_expr}"
 
 
+class CronSchedule:
+    """
+    Compiled cron expression with closed-form next-fire computation
+    
+    Fields are kept as sorted tuples (for bisect) and bitmasks (for O(1)
+    membership), and the next match is found field by field from month down
+    to minute, carrying into the larger field when a smaller one runs out.
+    As in CronParser, day-of-month and weekday must both match and weekdays
+    follow datetime.weekday() (0 = Monday).
+    """
+    
+    __slots__ = (
+        'minutes', 'hours', 'days', 'months',
+        'minute_mask', 'hour_mask', 'day_mask', 'month_mask', 'weekday_mask',
+        'satisfiable'
+    )
+    
+    def __init__(self, parsed: Dict[str, List[int]]):
+        self.minutes = tuple(sorted(parsed['minute']))
+        self.hours = tuple(sorted(parsed['hour']))
+        self.days = tuple(sorted(parsed['day']))
+        self.months = tuple(sorted(parsed['month']))
+        self.minute_mask = self._mask(self.minutes)
+        self.hour_mask = self._mask(self.hours)
+        self.day_mask = self._mask(self.days)
+        self.month_mask = self._mask(self.months)
+        self.weekday_mask = self._mask(parsed['weekday'])
+        # e.g. "0 0 31 2 *" can never fire; don't search for it
+        self.satisfiable = any(
+            day <= calendar.monthrange(2000, month)[1]
+            for month in self.months for day in self.days
+        )
+    
+    @staticmethod
+    def _mask(values) -> int:
+        mask = 0
+        for value in values:
+            mask |= 1 << value
+        return mask
+    
+    @staticmethod
+    def _next_value(values: Tuple[int, ...], current: int) -> Optional[int]:
+        index = bisect_left(values, current)
+        return values[index] if index < len(values) else None
+    
+    def matches(self, dt: datetime) -> bool:
+        """Check if a datetime matches this schedule"""
+        return bool(
+            self.minute_mask >> dt.minute & 1 and
+            self.hour_mask >> dt.hour & 1 and
+            self.day_mask >> dt.day & 1 and
+            self.month_mask >> dt.month & 1 and
+            self.weekday_mask >> dt.weekday() & 1
+        )
+    
+    def _next_day(self, dt: datetime) -> Optional[int]:
+        """First matching day of dt's month on or after dt.day"""
+        days_in_month = calendar.monthrange(dt.year, dt.month)[1]
+        first_weekday = (dt.weekday() - (dt.day - 1)) % 7
+        for day in self.days[bisect_left(self.days, dt.day):]:
+            if day > days_in_month:
+                return None
+            if self.weekday_mask >> ((first_weekday + day - 1) % 7) & 1:
+                return day
+        return None
+    
+    def next_after(self, from_time: datetime) -> Optional[datetime]:
+        """
+        Get the first matching minute strictly after from_time
+        
+        Timezone info on from_time is preserved.
+        """
+        if not self.satisfiable:
+            return None
+        
+        dt = from_time.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        last_year = dt.year + MAX_SEARCH_YEARS
+        
+        while dt.year <= last_year:
+            month = self._next_value(self.months, dt.month)
+            if month is None:
+                dt = dt.replace(year=dt.year + 1, month=self.months[0], day=1, hour=0, minute=0)
+                continue
+            if month != dt.month:
+                dt = dt.replace(month=month, day=1, hour=0, minute=0)
+            
+            day = self._next_day(dt)
+            if day is None:
+                # Carry into the next month
+                if dt.month == 12:
+                    dt = dt.replace(year=dt.year + 1, month=1, day=1, hour=0, minute=0)
+                else:
+                    dt = dt.replace(month=dt.month + 1, day=1, hour=0, minute=0)
+                continue
+            if day != dt.day:
+                dt = dt.replace(day=day, hour=0, minute=0)
+            
+            hour = self._next_value(self.hours, dt.hour)
+            if hour is None:
+                dt = dt.replace(hour=0, minute=0) + timedelta(days=1)
+                continue
+            if hour != dt.hour:
+                dt = dt.replace(hour=hour, minute=0)
+            
+            minute = self._next_value(self.minutes, dt.minute)
+            if minute is None:
+                dt = dt.replace(minute=0) + timedelta(hours=1)
+                continue
+            return dt.replace(minute=minute)
+        
+        return None
+
+
+# Shared parser for compile_cron_expression(); parsing keeps no state
+_parser = CronParser()
+
+
+@lru_cache(maxsize=CRON_CACHE_SIZE)
+def _compile_normalized(cron_expr: str) -> CronSchedule:
+    return CronSchedule(_parser.parse_cron_expression(cron_expr))
+
+
+def compile_cron_expression(cron_expr: str) -> CronSchedule:
+    """
+    Get the compiled schedule for a cron expression, cached by expression
+    
+    Raises:
+        CronParserError: If expression is invalid
+    """
+    return _compile_normalized(" ".join(cron_expr.split()))
+
+
 # Export parser and exceptions
 __all__ = [
     'CronParser',
-    'CronParserError'
+    'CronParserError',
+    'CronSchedule',
+    'compile_cron_expression'
 ]
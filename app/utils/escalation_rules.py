@@ -9,6 +9,7 @@ from enum import Enum
 import structlog
 
 from app.core.logging import get_logger
+from app.utils.keyword_matcher import get_keyword_registry, keyword_tag
 
 logger = get_logger(__name__)
 
@@ -66,6 +67,8 @@ class EscalationRuleEngine:
     def __init__(self):
         self.rules: List[EscalationRule] = []
         self.keyword_patterns = self._setup_keyword_patterns()
+        self.keyword_registry = get_keyword_registry()
+        self.keyword_registry.register('escalation', self.keyword_patterns)
         self._setup_default_rules()
     
     def _setup_keyword_patterns(self) -> Dict[str, List[str]]:
@@ -244,23 +247,21 @@ class EscalationRuleEngine:
         return highest_priority_rule.description
     
     # Keyword checking methods
+    def _has_keywords(self, text: str, category: str) -> bool:
+        """Check text against one keyword category; the scan is shared across checks"""
+        return self.keyword_registry.scan(text).has(keyword_tag('escalation', category))
+    
     def check_complaint_keywords(self, text: str) -> bool:
         """Check if text contains complaint keywords"""
-        text_lower = text.lower()
-        complaint_keywords = self.keyword_patterns['complaint']
-        return any(keyword in text_lower for keyword in complaint_keywords)
+        return self._has_keywords(text, 'complaint')
     
     def check_emergency_keywords(self, text: str) -> bool:
         """Check if text contains emergency keywords"""
-        text_lower = text.lower()
-        emergency_keywords = self.keyword_patterns['emergency']
-        return any(keyword in text_lower for keyword in emergency_keywords)
+        return self._has_keywords(text, 'emergency')
     
     def check_escalation_request_keywords(self, text: str) -> bool:
         """Check if text contains escalation request keywords"""
-        text_lower = text.lower()
-        escalation_keywords = self.keyword_patterns['escalation_requests']
-        return any(keyword in text_lower for keyword in escalation_keywords)
+        return self._has_keywords(text, 'escalation_requests')
     
     # Rule condition methods
     def _check_complaint_keywords_rule(self, context: Dict[str, Any]) -> bool:
@@ -276,16 +277,13 @@ class EscalationRuleEngine:
     def _check_negative_with_intensity(self, context: Dict[str, Any]) -> bool:
         """Rule condition for negative sentiment with intensity words"""
         sentiment_score = context.get('sentiment_score', 0)
-        message_content = context.get('message_content', '').lower()
+        message_content = context.get('message_content', '')
         
         if sentiment_score >= -0.5:  # Not negative enough
             return False
         
         # Check for intensity words
-        intensity_words = self.keyword_patterns['negative_intensity']
-        has_intensity = any(word in message_content for word in intensity_words)
-        
-        return has_intensity
+        return self._has_keywords(message_content, 'negative_intensity')
     
     def _check_timeout_rule(self, context: Dict[str, Any]) -> bool:
         """Rule condition for timeout"""
@@ -0,0 +1,48 @@
+"""
+JSON decoding with an optional fast parser
+
+Webhook bodies are parsed on every delivery. orjson parses them several
+times faster than the standard library and is used when it is installed;
+otherwise decoding falls back to json. Both raise json.JSONDecodeError
+(orjson's error subclasses it) for invalid input.
+"""
+
+import json
+from typing import Any, Union
+
+# Optional orjson import
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+JSON_BACKEND = "orjson" if ORJSON_AVAILABLE else "json"
+
+
+def loads(data: Union[bytes, bytearray, memoryview, str]) -> Any:
+    """
+    Decode a JSON document
+
+    Args:
+        data: Raw JSON, as received or already decoded to text
+
+    Returns:
+        Any: The decoded value
+
+    Raises:
+        json.JSONDecodeError: If the document is not valid JSON
+    """
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    if isinstance(data, memoryview):
+        data = data.tobytes()
+    return json.loads(data)
+
+
+__all__ = [
+    'JSON_BACKEND',
+    'ORJSON_AVAILABLE',
+    'loads'
+]
@@ -10,6 +10,8 @@ from datetime import datetime
 
 from app.services.deepseek_client import DeepSeekClient
 from app.core.logging import get_logger
+from app.utils.keyword_matcher import KeywordMatches, get_keyword_registry, keyword_tag
+from app.utils.message_analysis import MessageAnalysis
 
 logger = get_logger(__name__)
 
@@ -66,6 +68,11 @@ class IntentClassifier:
             'fire', 'emergency', 'help', 'urgent', 'police', 'ambulance',
             'medical', 'accident', 'danger', 'security', 'break-in', 'theft'
         }
+        self.keyword_registry = get_keyword_registry()
+        self.keyword_registry.register('intent_classifier.intent', self.keyword_patterns)
+        self.keyword_registry.register(
+            'intent_classifier.emergency', {'emergency': sorted(self.emergency_keywords)}
+        )
     
     def _setup_keyword_patterns(self) -> Dict[MessageIntent, List[str]]:
         """Setup keyword patterns for rule-based classification"""
@@ -115,7 +122,8 @@ class IntentClassifier:
     async def classify_intent(
         self,
         message: str,
-        context: Optional[Dict[str, Any]] = None
+        context: Optional[Dict[str, Any]] = None,
+        analysis: Optional[MessageAnalysis] = None
     ) -> IntentClassificationResult:
         """
         Classify the intent of a message
@@ -123,18 +131,21 @@ class IntentClassifier:
         Args:
             message: Message text to classify
             context: Additional context (conversation history, guest info, etc.)
+            analysis: Shared analysis of the message text, if already made
             
         Returns:
             IntentClassificationResult: Classification result
         """
         try:
+            matches = MessageAnalysis.of(message, analysis).keyword_matches
+
             # First check for emergency
-            if self._is_emergency(message):
+            if self._is_emergency(message, matches):
                 return IntentClassificationResult(
                     intent=MessageIntent.EMERGENCY,
                     confidence=1.0,
                     urgency_level=5,
-                    keywords=self._extract_emergency_keywords(message),
+                    keywords=self._extract_emergency_keywords(message, matches),
                     reasoning="Emergency keywords detected"
                 )
             
@@ -144,7 +155,7 @@ class IntentClassifier:
                 return ai_result
             
             # Fallback to rule-based classification
-            rule_result = self._classify_with_rules(message)
+            rule_result = self._classify_with_rules(message, matches)
             
             # Combine results if both available
             if ai_result and rule_result:
@@ -197,26 +208,25 @@ class IntentClassifier:
             logger.warning("AI classification failed", error=str(e))
             return None
     
-    def _classify_with_rules(self, message: str) -> IntentClassificationResult:
+    def _classify_with_rules(
+        self,
+        message: str,
+        matches: Optional[KeywordMatches] = None
+    ) -> IntentClassificationResult:
         """Classify using rule-based approach"""
-        message_lower = message.lower()
+        if matches is None:
+            matches = self.keyword_registry.scan(message)
         
         # Calculate scores for each intent
         intent_scores = {}
         matched_keywords = {}
         
         for intent, keywords in self.keyword_patterns.items():
-            score = 0
-            matches = []
-            
-            for keyword in keywords:
-                if keyword in message_lower:
-                    score += 1
-                    matches.append(keyword)
+            intent_matches = matches.keywords(keyword_tag('intent_classifier.intent', intent))
             
-            if score > 0:
-                intent_scores[intent] = score / len(keywords)  # Normalize by keyword count
-                matched_keywords[intent] = matches
+            if intent_matches:
+                intent_scores[intent] = len(intent_matches) / len(keywords)  # Normalize by keyword count
+                matched_keywords[intent] = intent_matches
         
         if not intent_scores:
             return IntentClassificationResult(
@@ -317,15 +327,21 @@ Example response:
             logger.warning("Failed to parse AI response", error=str(e), response=response[:200])
             return None
     
-    def _is_emergency(self, message: str) -> bool:
+    def _is_emergency(self, message: str, matches: Optional[KeywordMatches] = None) -> bool:
         """Check if message indicates emergency"""
-        message_lower = message.lower()
-        return any(keyword in message_lower for keyword in self.emergency_keywords)
+        if matches is None:
+            matches = self.keyword_registry.scan(message)
+        return matches.has(keyword_tag('intent_classifier.emergency', 'emergency'))
     
-    def _extract_emergency_keywords(self, message: str) -> List[str]:
+    def _extract_emergency_keywords(
+        self,
+        message: str,
+        matches: Optional[KeywordMatches] = None
+    ) -> List[str]:
         """Extract emergency keywords from message"""
-        message_lower = message.lower()
-        return [kw for kw in self.emergency_keywords if kw in message_lower]
+        if matches is None:
+            matches = self.keyword_registry.scan(message)
+        return matches.keywords(keyword_tag('intent_classifier.emergency', 'emergency'))
     
     def _calculate_urgency(self, intent: MessageIntent, keywords: List[str]) -> int:
         """Calculate urgency level based on intent and keywords"""
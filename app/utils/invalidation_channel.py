@@ -0,0 +1,165 @@
+"""
+Cache invalidation between workers over Redis pub/sub
+
+In-process caches evict an entry locally when it changes and publish its
+key on a channel; every worker listening on the channel evicts it too.
+Publishing is best effort and works both from the event loop and from
+synchronous code without one (Celery tasks, thread pools). Messages
+published while a listener was disconnected are lost, so the listener
+calls back on every (re)subscription for the cache to catch up.
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+import redis
+import redis.asyncio as aioredis
+import structlog
+
+from app.core.config import settings
+
+logger = structlog.get_logger(__name__)
+
+
+class InvalidationChannel:
+    """Publishes and listens for invalidated keys on one Redis channel"""
+
+    def __init__(
+        self,
+        channel: str,
+        on_message: Callable[[str], None],
+        on_subscribe: Optional[Callable[[], Awaitable[Any]]] = None,
+        redis_url: Optional[str] = None,
+        retry_delay: float = 5.0
+    ):
+        """
+        Args:
+            channel: Redis channel name
+            on_message: Called with every key published by any worker
+            on_subscribe: Awaited after each (re)subscription
+            redis_url: Redis URL; settings.REDIS_URL if not given
+            retry_delay: Seconds to wait before resubscribing after an error
+        """
+        self.channel = channel
+        self.on_message = on_message
+        self.on_subscribe = on_subscribe
+        self.redis_url = redis_url or settings.REDIS_URL
+        self.retry_delay = retry_delay
+
+        self._listener: Optional[asyncio.Task] = None
+        self._publishes: Set[asyncio.Task] = set()
+        self._sync_client: Optional[redis.Redis] = None
+        self._unavailable_until = 0.0
+        self.stats = {
+            'published': 0,
+            'received': 0,
+            'errors': 0
+        }
+
+    def publish(self, key: str) -> None:
+        """Tell every worker that a key changed"""
+        if time.monotonic() < self._unavailable_until:
+            return
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+
+        if loop is not None:
+            task = loop.create_task(self._publish_async(key))
+            self._publishes.add(task)
+            task.add_done_callback(self._publishes.discard)
+        else:
+            self._publish_sync(key)
+
+    async def flush(self) -> None:
+        """Wait for publishes started from the event loop"""
+        if self._publishes:
+            await asyncio.gather(*self._publishes, return_exceptions=True)
+
+    async def _publish_async(self, key: str) -> None:
+        try:
+            client = aioredis.from_url(self.redis_url, socket_timeout=0.5, socket_connect_timeout=0.5)
+            try:
+                await client.publish(self.channel, key)
+            finally:
+                await client.close()
+            self.stats['published'] += 1
+        except Exception as e:
+            self._publish_failed(key, e)
+
+    def _publish_sync(self, key: str) -> None:
+        try:
+            if self._sync_client is None:
+                self._sync_client = redis.from_url(self.redis_url, socket_timeout=0.5, socket_connect_timeout=0.5)
+            self._sync_client.publish(self.channel, key)
+            self.stats['published'] += 1
+        except Exception as e:
+            self._sync_client = None
+            self._publish_failed(key, e)
+
+    def _publish_failed(self, key: str, error: Exception) -> None:
+        self.stats['errors'] += 1
+        self._unavailable_until = time.monotonic() + 30
+        logger.warning("Cache invalidation not published",
+                      channel=self.channel,
+                      key=key,
+                      error=str(error))
+
+    async def start(self) -> None:
+        """Start listening for invalidations"""
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        """Stop listening for invalidations"""
+        listener, self._listener = self._listener, None
+        if listener is not None:
+            listener.cancel()
+            await asyncio.gather(listener, return_exceptions=True)
+
+    @property
+    def listening(self) -> bool:
+        return self._listener is not None
+
+    async def _listen(self) -> None:
+        while True:
+            client = aioredis.from_url(self.redis_url)
+            pubsub = client.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                if self.on_subscribe is not None:
+                    await self.on_subscribe()
+                while True:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message and message.get("type") == "message":
+                        data = message["data"]
+                        self.stats['received'] += 1
+                        self.on_message(data.decode() if isinstance(data, bytes) else data)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats['errors'] += 1
+                logger.warning("Cache invalidation listener failed, retrying",
+                              channel=self.channel,
+                              error=str(e))
+                await asyncio.sleep(self.retry_delay)
+            finally:
+                try:
+                    await pubsub.reset()
+                    await client.close()
+                except Exception:
+                    pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get channel statistics"""
+        return {
+            **self.stats,
+            'channel': self.channel,
+            'listening': self.listening
+        }
+
+
+__all__ = ['InvalidationChannel']
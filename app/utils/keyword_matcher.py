@@ -0,0 +1,312 @@
+"""
+Shared multi-keyword matcher for text classifiers
+
+Classifiers register their keyword tables once under a namespace; all
+tables are compiled into one Aho-Corasick automaton so a message is
+scanned a single time however many classifiers look at it, and the scan
+result is shared through a small cache keyed by text. Matching keeps the
+substring semantics of the `keyword in text.lower()` checks it replaces.
+Hotel-specific rule keywords get their own automaton, cached per hotel
+and rebuilt when the hotel's vocabulary changes.
+"""
+
+from collections import OrderedDict, deque
+from enum import Enum
+from typing import Any, Dict, FrozenSet, Hashable, Iterable, List, Mapping, Optional, Tuple
+
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Scan results kept for recently seen texts
+KEYWORD_SCAN_CACHE_SIZE = 512
+
+# Automatons kept for hotel vocabularies and ad-hoc keyword lists
+AUTOMATON_CACHE_SIZE = 256
+
+
+def keyword_tag(namespace: str, category: Any) -> str:
+    """Tag identifying one keyword category of a namespace"""
+    if isinstance(category, Enum):
+        category = category.value
+    return f"{namespace}:{category}"
+
+
+class KeywordAutomaton:
+    """
+    Aho-Corasick automaton over tagged keywords
+
+    Failure links are folded into the transition table, so scanning is a
+    single dict lookup per character.
+    """
+
+    def __init__(self, tagged_keywords: Iterable[Tuple[str, str]]):
+        """
+        Args:
+            tagged_keywords: (tag, keyword) pairs; keywords are matched as given
+        """
+        # tag -> keyword -> position in the tag's list, to report hits in order
+        self.tags: Dict[str, Dict[str, int]] = {}
+        goto: List[Dict[str, int]] = [{}]
+        outputs: List[Tuple[str, ...]] = [()]
+
+        for tag, keyword in tagged_keywords:
+            if not keyword:
+                continue
+            positions = self.tags.setdefault(tag, {})
+            positions.setdefault(keyword, len(positions))
+
+            state = 0
+            for char in keyword:
+                next_state = goto[state].get(char)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][char] = next_state
+                    goto.append({})
+                    outputs.append(())
+                state = next_state
+            if keyword not in outputs[state]:
+                outputs[state] += (keyword,)
+
+        # Breadth-first: a state's failure target is always shallower, so its
+        # transitions are complete by the time they are inherited
+        fail = [0] * len(goto)
+        transitions: List[Dict[str, int]] = [dict() for _ in goto]
+        transitions[0] = dict(goto[0])
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            inherited = transitions[fail[state]]
+            transitions[state] = {**inherited, **goto[state]}
+            outputs[state] = outputs[state] + tuple(
+                keyword for keyword in outputs[fail[state]] if keyword not in outputs[state]
+            )
+            for char, child in goto[state].items():
+                fail[child] = inherited.get(char, 0)
+                queue.append(child)
+
+        self._transitions = transitions
+        self._outputs: List[Optional[Tuple[str, ...]]] = [output or None for output in outputs]
+        self.size = len(goto)
+
+    def find(self, text: str) -> FrozenSet[str]:
+        """All keywords occurring in text"""
+        transitions = self._transitions
+        outputs = self._outputs
+        found = set()
+        state = 0
+        for char in text:
+            state = transitions[state].get(char, 0)
+            output = outputs[state]
+            if output is not None:
+                found.update(output)
+        return frozenset(found)
+
+    def scan(self, text: str, lowercase: bool = True) -> 'KeywordMatches':
+        """Scan text once and return every hit with its tags"""
+        if not text:
+            return KeywordMatches(frozenset(), self)
+        return KeywordMatches(self.find(text.lower() if lowercase else text), self)
+
+
+class KeywordMatches:
+    """Keywords found in one text, queried by tag"""
+
+    __slots__ = ('found', '_automaton')
+
+    def __init__(self, found: FrozenSet[str], automaton: KeywordAutomaton):
+        self.found = found
+        self._automaton = automaton
+
+    def __contains__(self, keyword: str) -> bool:
+        return keyword in self.found
+
+    def __bool__(self) -> bool:
+        return bool(self.found)
+
+    def keywords(self, tag: str) -> List[str]:
+        """Keywords of a tag that occur, in the order they were registered"""
+        positions = self._automaton.tags.get(tag)
+        if not positions or not self.found:
+            return []
+        return sorted((kw for kw in self.found if kw in positions), key=positions.__getitem__)
+
+    def has(self, tag: str) -> bool:
+        """Whether any keyword of a tag occurs"""
+        positions = self._automaton.tags.get(tag)
+        return bool(positions) and any(kw in positions for kw in self.found)
+
+    def count(self, tag: str) -> int:
+        """Number of distinct keywords of a tag that occur"""
+        positions = self._automaton.tags.get(tag)
+        if not positions:
+            return 0
+        return sum(1 for kw in self.found if kw in positions)
+
+    def hits(self) -> Dict[str, List[str]]:
+        """Every tag with at least one hit and its keywords"""
+        return {
+            tag: self.keywords(tag)
+            for tag, positions in self._automaton.tags.items()
+            if any(kw in positions for kw in self.found)
+        }
+
+
+class KeywordRegistry:
+    """Global keyword vocabulary and its compiled automaton"""
+
+    def __init__(
+        self,
+        scan_cache_size: int = KEYWORD_SCAN_CACHE_SIZE,
+        automaton_cache_size: int = AUTOMATON_CACHE_SIZE
+    ):
+        self.scan_cache_size = scan_cache_size
+        self.automaton_cache_size = automaton_cache_size
+        self._vocabularies: Dict[str, Dict[str, Tuple[str, ...]]] = {}
+        self.version = 0
+        self._automaton: Optional[KeywordAutomaton] = None
+        self._automaton_version = -1
+        self._scans: "OrderedDict[str, KeywordMatches]" = OrderedDict()
+        # key -> (fingerprint, automaton)
+        self._automatons: "OrderedDict[Hashable, Tuple[Hashable, KeywordAutomaton]]" = OrderedDict()
+        self.stats = {
+            'scans': 0,
+            'scan_cache_hits': 0,
+            'builds': 0
+        }
+
+    def register(self, namespace: str, vocabulary: Mapping[Any, Iterable[str]]) -> None:
+        """
+        Register or replace a namespace's keyword categories
+
+        Re-registering identical keywords is free; any change bumps the
+        vocabulary version and the automaton is rebuilt on next scan.
+        """
+        normalized = {
+            keyword_tag(namespace, category): tuple(keyword.lower() for keyword in keywords)
+            for category, keywords in vocabulary.items()
+        }
+        if self._vocabularies.get(namespace) == normalized:
+            return
+        self._vocabularies[namespace] = normalized
+        self.version += 1
+        self._scans.clear()
+
+    @property
+    def automaton(self) -> KeywordAutomaton:
+        """Automaton of the current global vocabulary"""
+        if self._automaton is None or self._automaton_version != self.version:
+            self._automaton = KeywordAutomaton(
+                (tag, keyword)
+                for vocabulary in self._vocabularies.values()
+                for tag, keywords in vocabulary.items()
+                for keyword in keywords
+            )
+            self._automaton_version = self.version
+            self.stats['builds'] += 1
+            logger.debug(
+                "Keyword automaton built",
+                version=self.version,
+                states=self._automaton.size
+            )
+        return self._automaton
+
+    def scan(self, text: str) -> KeywordMatches:
+        """Match text against every registered keyword, sharing recent results"""
+        text = text or ""
+        automaton = self.automaton
+        matches = self._scans.get(text)
+        if matches is not None:
+            self._scans.move_to_end(text)
+            self.stats['scan_cache_hits'] += 1
+            return matches
+
+        matches = automaton.scan(text)
+        self.stats['scans'] += 1
+        self._scans[text] = matches
+        if len(self._scans) > self.scan_cache_size:
+            self._scans.popitem(last=False)
+        return matches
+
+    def _cached_automaton(
+        self,
+        key: Hashable,
+        fingerprint: Hashable,
+        tagged_keywords: Iterable[Tuple[str, str]]
+    ) -> KeywordAutomaton:
+        """Get or build an automaton cached under key until its fingerprint changes"""
+        entry = self._automatons.get(key)
+        if entry is not None and entry[0] == fingerprint:
+            self._automatons.move_to_end(key)
+            return entry[1]
+
+        automaton = KeywordAutomaton(tagged_keywords)
+        self._automatons[key] = (fingerprint, automaton)
+        self._automatons.move_to_end(key)
+        if len(self._automatons) > self.automaton_cache_size:
+            self._automatons.popitem(last=False)
+        self.stats['builds'] += 1
+        return automaton
+
+    def hotel_automaton(
+        self,
+        hotel_id: Any,
+        vocabulary: Mapping[str, Iterable[str]],
+        namespace: str = "rules"
+    ) -> KeywordAutomaton:
+        """
+        Automaton of a hotel's rule keywords, rebuilt when they change
+
+        Args:
+            hotel_id: Hotel the rules belong to
+            vocabulary: Tag (e.g. rule ID) -> keywords, lower-cased by caller
+            namespace: Rule family, so different rule sets of a hotel do not evict each other
+        """
+        fingerprint = tuple(sorted(
+            (str(tag), tuple(keywords)) for tag, keywords in vocabulary.items()
+        ))
+        return self._cached_automaton(
+            (namespace, str(hotel_id)),
+            fingerprint,
+            ((tag, keyword) for tag, keywords in fingerprint for keyword in keywords)
+        )
+
+    def keyword_automaton(self, keywords: Iterable[str]) -> KeywordAutomaton:
+        """Automaton for an ad-hoc keyword list, matched exactly as given"""
+        keywords = tuple(keywords)
+        return self._cached_automaton(
+            ('keywords', keywords),
+            keywords,
+            (('keywords', keyword) for keyword in keywords)
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get matcher statistics"""
+        return {
+            **self.stats,
+            'version': self.version,
+            'namespaces': sorted(self._vocabularies),
+            'cached_scans': len(self._scans),
+            'cached_automatons': len(self._automatons)
+        }
+
+
+# Global keyword registry
+_keyword_registry: Optional[KeywordRegistry] = None
+
+
+def get_keyword_registry() -> KeywordRegistry:
+    """Get the global keyword registry"""
+    global _keyword_registry
+    if _keyword_registry is None:
+        _keyword_registry = KeywordRegistry()
+    return _keyword_registry
+
+
+__all__ = [
+    'KeywordAutomaton',
+    'KeywordMatches',
+    'KeywordRegistry',
+    'get_keyword_registry',
+    'keyword_tag'
+]
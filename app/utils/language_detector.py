@@ -1,26 +1,65 @@
 """
 Enhanced language detection service for WhatsApp Hotel Bot
+
+Every supported language is scored in a single pass over the message
+tokens: common words map to a bitmask of the languages that use them,
+words written in a language's script count towards it, and one combined
+pattern finds greetings of all languages at once. Short messages, which
+rarely contain a common word, are also compared against character-trigram
+profiles of each language's vocabulary. Results are cached by text, and
+per guest phone so later messages from a guest skip detection.
 """
 
 import re
-from typing import Dict, List, Optional, Tuple
-from collections import Counter
-import structlog
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
 
 from app.core.logging import get_logger
+from app.utils.message_analysis import WORD_PATTERN, MessageAnalysis
 
 logger = get_logger(__name__)
 
+# Messages with at most this many words are also scored by trigrams
+SHORT_TEXT_WORDS = 3
+
+# Trigram similarity is weaker evidence than a matched common word
+TRIGRAM_WEIGHT = 0.8
+
+# Detection results kept for recently seen texts
+RESULT_CACHE_SIZE = 1024
+
+# Guests whose language is remembered
+GUEST_CACHE_SIZE = 10000
+
+# Seconds a guest's remembered language is used before detecting it afresh
+GUEST_LANGUAGE_TTL_SECONDS = 3600
+
+
+def _trigrams(words: Iterable[str]) -> set:
+    """Character trigrams of space-padded words"""
+    trigrams = set()
+    for word in words:
+        padded = f" {word} "
+        trigrams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return trigrams
+
 
 class LanguageDetector:
     """
     Enhanced language detection service
 
     Detects language from text using pattern matching and keyword analysis.
-    Supports English, Spanish, Russian, and French.
+    Supports English, Spanish, Russian, French, German, Thai, Chinese and
+    Arabic.
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        result_cache_size: int = RESULT_CACHE_SIZE,
+        guest_cache_size: int = GUEST_CACHE_SIZE,
+        guest_language_ttl: float = GUEST_LANGUAGE_TTL_SECONDS
+    ):
         """Initialize language detector with patterns"""
         self.logger = logger.bind(service="language_detector")
 
@@ -30,7 +69,8 @@ class LanguageDetector:
                 'common_words': [
                     'the', 'and', 'is', 'in', 'to', 'of', 'a', 'that', 'it', 'with',
                     'for', 'as', 'was', 'on', 'are', 'you', 'this', 'be', 'at', 'by',
-                    'hello', 'hi', 'thank', 'please', 'help', 'room', 'hotel', 'booking'
+                    'hello', 'hi', 'thank', 'thanks', 'please', 'help', 'room', 'hotel', 'booking',
+                    'yes', 'good', 'great', 'nice', 'breakfast', 'dinner', 'beach'
                 ],
                 'greetings': ['hello', 'hi', 'hey', 'good morning', 'good afternoon', 'good evening'],
                 'patterns': [r'\b(hello|hi|hey|good\s+(morning|afternoon|evening))\b']
@@ -39,7 +79,8 @@ class LanguageDetector:
                 'common_words': [
                     'el', 'la', 'de', 'que', 'y', 'a', 'en', 'un', 'es', 'se',
                     'no', 'te', 'lo', 'le', 'da', 'su', 'por', 'son', 'con', 'para',
-                    'hola', 'gracias', 'por favor', 'ayuda', 'habitación', 'hotel', 'reserva'
+                    'hola', 'gracias', 'por favor', 'ayuda', 'habitación', 'hotel', 'reserva',
+                    'sí', 'desayuno', 'playa'
                 ],
                 'greetings': ['hola', 'buenos días', 'buenas tardes', 'buenas noches'],
                 'patterns': [r'\b(hola|buenos\s+(días|tardes|noches))\b']
@@ -48,19 +89,49 @@ class LanguageDetector:
                 'common_words': [
                     'и', 'в', 'не', 'на', 'я', 'быть', 'он', 'с', 'что', 'а',
                     'по', 'это', 'она', 'этот', 'к', 'но', 'они', 'мы', 'как', 'из',
-                    'привет', 'спасибо', 'пожалуйста', 'помощь', 'номер', 'отель', 'бронирование'
+                    'привет', 'спасибо', 'пожалуйста', 'помощь', 'номер', 'отель', 'бронирование',
+                    'да', 'нет', 'завтрак', 'ужин', 'пляж', 'море'
                 ],
                 'greetings': ['привет', 'здравствуйте', 'добро пожаловать'],
-                'patterns': [r'\b(привет|здравствуйте|добро\s+пожаловать)\b']
+                'patterns': [r'\b(привет|здравствуйте|добро\s+пожаловать)\b'],
+                'script': '\u0400-\u04ff'
             },
             'fr': {
                 'common_words': [
                     'le', 'de', 'et', 'à', 'un', 'il', 'être', 'et', 'en', 'avoir',
                     'que', 'pour', 'dans', 'ce', 'son', 'une', 'sur', 'avec', 'ne', 'se',
-                    'bonjour', 'merci', 's\'il vous plaît', 'aide', 'chambre', 'hôtel', 'réservation'
+                    'bonjour', 'merci', 's\'il vous plaît', 'aide', 'chambre', 'hôtel', 'réservation',
+                    'oui', 'non', 'plage'
                 ],
                 'greetings': ['bonjour', 'bonsoir', 'salut'],
                 'patterns': [r'\b(bonjour|bonsoir|salut)\b']
+            },
+            'de': {
+                'common_words': [
+                    'der', 'die', 'das', 'und', 'ist', 'ich', 'nicht', 'zu', 'mit', 'sie',
+                    'ein', 'eine', 'wir', 'auf', 'für', 'bitte', 'danke', 'hallo', 'hilfe',
+                    'zimmer', 'frühstück', 'ja', 'nein', 'strand'
+                ],
+                'greetings': ['hallo', 'guten morgen', 'guten tag', 'guten abend'],
+                'patterns': [r'\b(hallo|guten\s+(morgen|tag|abend))\b']
+            },
+            'th': {
+                'common_words': ['สวัสดี', 'ขอบคุณ', 'ครับ', 'ค่ะ', 'โรงแรม', 'ห้อง'],
+                'greetings': ['สวัสดี'],
+                'patterns': [r'สวัสดี'],
+                'script': '\u0e00-\u0e7f'
+            },
+            'zh': {
+                'common_words': ['你好', '谢谢', '酒店', '房间'],
+                'greetings': ['你好'],
+                'patterns': [r'你好'],
+                'script': '\u4e00-\u9fff'
+            },
+            'ar': {
+                'common_words': ['مرحبا', 'شكرا', 'نعم', 'لا', 'فندق', 'غرفة'],
+                'greetings': ['مرحبا'],
+                'patterns': [r'\bمرحبا\b'],
+                'script': '\u0600-\u06ff'
             }
         }
 
@@ -70,13 +141,81 @@ class LanguageDetector:
         # Supported languages
         self.supported_languages = list(self.language_patterns.keys())
 
-    def detect_language(self, text: str, confidence_threshold: float = 0.3) -> Tuple[str, float]:
+        self.result_cache_size = result_cache_size
+        self.guest_cache_size = guest_cache_size
+        self.guest_language_ttl = guest_language_ttl
+        # text -> (best_language, best_score, scores)
+        self._results: "OrderedDict[str, Tuple[str, float, Dict[str, float]]]" = OrderedDict()
+        # phone digits -> (language, confidence, monotonic expiry time)
+        self._guest_languages: "OrderedDict[str, Tuple[str, float, float]]" = OrderedDict()
+        self.stats = {
+            'detections': 0,
+            'result_cache_hits': 0,
+            'guest_cache_hits': 0
+        }
+
+        self._compile()
+
+    def _compile(self) -> None:
+        """Build the lookup tables shared by all languages, once"""
+        # Bit i of a mask stands for the i-th supported language
+        self._languages = tuple(self.language_patterns)
+        self._mask_languages: Dict[int, Tuple[int, ...]] = {}
+
+        # Common words are only ever matched as whole tokens
+        self._word_languages: Dict[str, int] = {}
+        self._trigram_languages: Dict[str, int] = {}
+        greeting_patterns = []
+        scripts = []
+        for index, (language, patterns) in enumerate(self.language_patterns.items()):
+            bit = 1 << index
+            for word in patterns['common_words']:
+                if WORD_PATTERN.fullmatch(word):
+                    self._word_languages[word] = self._word_languages.get(word, 0) | bit
+            profile_words = WORD_PATTERN.findall(' '.join(patterns['common_words'] + patterns['greetings']))
+            for trigram in _trigrams(profile_words):
+                self._trigram_languages[trigram] = self._trigram_languages.get(trigram, 0) | bit
+            if patterns.get('patterns'):
+                greeting_patterns.append(f"(?P<{language}>{'|'.join(patterns['patterns'])})")
+            if patterns.get('script'):
+                scripts.append(f"(?P<{language}>[{patterns['script']}])")
+
+        self._greeting_pattern = re.compile('|'.join(greeting_patterns), re.IGNORECASE)
+        self._script_pattern = re.compile('|'.join(scripts))
+        # First character of a word -> mask of the language written in its script
+        self._char_scripts: Dict[str, int] = {}
+
+    def _languages_of(self, mask: int) -> Tuple[int, ...]:
+        """Indices of the languages in mask"""
+        indices = self._mask_languages.get(mask)
+        if indices is None:
+            indices = self._mask_languages[mask] = tuple(
+                index for index in range(len(self._languages)) if mask >> index & 1
+            )
+        return indices
+
+    def _script_mask(self, char: str) -> int:
+        """Mask of the language whose script char belongs to"""
+        mask = self._char_scripts.get(char)
+        if mask is None:
+            match = self._script_pattern.match(char)
+            mask = 1 << self._languages.index(match.lastgroup) if match else 0
+            self._char_scripts[char] = mask
+        return mask
+
+    def detect_language(
+        self,
+        text: str,
+        confidence_threshold: float = 0.3,
+        analysis: Optional[MessageAnalysis] = None
+    ) -> Tuple[str, float]:
         """
         Detect language from text
 
         Args:
             text: Text to analyze
             confidence_threshold: Minimum confidence threshold
+            analysis: Shared analysis of text, to reuse its tokens
 
         Returns:
             Tuple[str, float]: (language_code, confidence_score)
@@ -85,16 +224,26 @@ class LanguageDetector:
             return self.default_language, 0.0
 
         text_lower = text.lower().strip()
-        scores = {}
-
-        # Calculate scores for each language
-        for lang_code, patterns in self.language_patterns.items():
-            score = self._calculate_language_score(text_lower, patterns)
-            scores[lang_code] = score
-
-        # Find best match
-        best_language = max(scores.keys(), key=lambda k: scores[k])
-        best_score = scores[best_language]
+        cached = self._results.get(text_lower)
+        if cached is not None:
+            self._results.move_to_end(text_lower)
+            self.stats['result_cache_hits'] += 1
+            best_language, best_score, scores = cached
+        else:
+            # Tokenize once for all languages
+            if analysis is not None and analysis.describes(text):
+                words = analysis.tokens
+            else:
+                words = WORD_PATTERN.findall(text_lower)
+            scores = self._score_languages(text_lower, words)
+            self.stats['detections'] += 1
+
+            # First language wins ties, as the default comes first
+            best_language = max(scores, key=scores.get)
+            best_score = scores[best_language]
+            self._results[text_lower] = (best_language, best_score, scores)
+            if len(self._results) > self.result_cache_size:
+                self._results.popitem(last=False)
 
         # Apply confidence threshold
         if best_score < confidence_threshold:
@@ -117,39 +266,110 @@ class LanguageDetector:
 
         return best_language, best_score
 
-    def _calculate_language_score(self, text: str, patterns: Dict) -> float:
+    def _score_languages(self, text: str, words: Sequence[str]) -> Dict[str, float]:
         """
-        Calculate language score for given text and patterns
+        Score every language for text in one pass over its words
 
         Args:
             text: Text to analyze (lowercase)
-            patterns: Language patterns dictionary
+            words: Words of text
 
         Returns:
-            float: Language score (0.0 to 1.0)
+            Dict[str, float]: Language code -> score (0.0 to 1.0)
         """
-        score = 0.0
-        total_checks = 0
+        languages = self._languages
+        word_hits = [0] * len(languages)
 
-        # Check common words
-        words = re.findall(r'\b\w+\b', text)
+        # Common words and words in a language's own script
         if words:
-            common_words = patterns.get('common_words', [])
-            word_matches = sum(1 for word in words if word in common_words)
-            word_score = word_matches / len(words) if words else 0
-            score += word_score * 0.6  # 60% weight for common words
-            total_checks += 0.6
-
-        # Check greeting patterns
-        greeting_patterns = patterns.get('patterns', [])
-        for pattern in greeting_patterns:
-            if re.search(pattern, text, re.IGNORECASE):
-                score += 0.4  # 40% weight for greetings
+            word_languages = self._word_languages.get
+            script_mask = self._script_mask
+            for mask, count in Counter(word_languages(word) or script_mask(word[0]) for word in words).items():
+                if mask:
+                    for index in self._languages_of(mask):
+                        word_hits[index] += count
+
+        # Greetings of all languages in one search
+        greeted = {match.lastgroup for match in self._greeting_pattern.finditer(text)}
+
+        # 60% weight for common words, 40% for greetings, normalized by the checks made
+        scores = {}
+        for index, language in enumerate(languages):
+            score = word_hits[index] / len(words) * 0.6 if words else 0.0
+            total_checks = 0.6 if words else 0.0
+            if language in greeted:
+                score += 0.4
                 total_checks += 0.4
-                break
+            scores[language] = score / total_checks if total_checks > 0 else 0.0
+
+        # Short messages rarely contain a common word; compare their spelling too
+        if 0 < len(words) <= SHORT_TEXT_WORDS:
+            for language, similarity in self._trigram_similarity(words).items():
+                scores[language] = max(scores[language], similarity * TRIGRAM_WEIGHT)
+
+        return scores
+
+    def _trigram_similarity(self, words: Sequence[str]) -> Dict[str, float]:
+        """Share of the words' trigrams found in each language's profile"""
+        trigrams = _trigrams(words)
+        hits = [0] * len(self._languages)
+        for trigram in trigrams:
+            mask = self._trigram_languages.get(trigram)
+            if mask:
+                for index in self._languages_of(mask):
+                    hits[index] += 1
+        return {
+            language: hits[index] / len(trigrams)
+            for index, language in enumerate(self._languages)
+        }
+
+    def detect_guest_language(
+        self,
+        phone_number: str,
+        text: str,
+        confidence_threshold: float = 0.3,
+        analysis: Optional[MessageAnalysis] = None
+    ) -> Tuple[str, float]:
+        """
+        Detect the language of a guest's message, remembering it per guest
+
+        Once a guest's message has been detected with enough confidence,
+        their later messages return that language without detection for
+        guest_language_ttl seconds, so a guest who switches language is
+        picked up again.
 
-        # Normalize score
-        return score / total_checks if total_checks > 0 else 0.0
+        Args:
+            phone_number: Guest phone number or WhatsApp chat ID
+            text: Message text
+            confidence_threshold: Minimum confidence to remember the language
+            analysis: Shared analysis of text, to reuse its tokens
+
+        Returns:
+            Tuple[str, float]: (language_code, confidence_score)
+        """
+        guest_key = re.sub(r'\D', '', phone_number or '')
+        cached = self._guest_languages.get(guest_key) if guest_key else None
+        if cached is not None:
+            language, confidence, expires_at = cached
+            if expires_at > time.monotonic():
+                self._guest_languages.move_to_end(guest_key)
+                self.stats['guest_cache_hits'] += 1
+                return language, confidence
+            del self._guest_languages[guest_key]
+
+        language, confidence = self.detect_language(text, confidence_threshold, analysis)
+        if guest_key and confidence >= confidence_threshold:
+            self._guest_languages[guest_key] = (
+                language, confidence, time.monotonic() + self.guest_language_ttl
+            )
+            self._guest_languages.move_to_end(guest_key)
+            if len(self._guest_languages) > self.guest_cache_size:
+                self._guest_languages.popitem(last=False)
+        return language, confidence
+
+    def forget_guest_language(self, phone_number: str) -> None:
+        """Detect the guest's language afresh on their next message"""
+        self._guest_languages.pop(re.sub(r'\D', '', phone_number or ''), None)
 
     def get_supported_languages(self) -> List[str]:
         """
@@ -186,6 +406,30 @@ class LanguageDetector:
             'en': 'English',
             'es': 'Spanish',
             'ru': 'Russian',
-            'fr': 'French'
+            'fr': 'French',
+            'de': 'German',
+            'th': 'Thai',
+            'zh': 'Chinese',
+            'ar': 'Arabic'
+        }
+        return language_names.get(language_code, language_code.upper())
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get detector statistics"""
+        return {
+            **self.stats,
+            'cached_results': len(self._results),
+            'cached_guests': len(self._guest_languages)
         }
-        return language_names.get(language_code, language_code.upper())
\ No newline at end of file
+
+
+# Global language detector instance
+_language_detector: Optional[LanguageDetector] = None
+
+
+def get_language_detector() -> LanguageDetector:
+    """Get the global language detector"""
+    global _language_detector
+    if _language_detector is None:
+        _language_detector = LanguageDetector()
+    return _language_detector
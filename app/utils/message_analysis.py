@@ -0,0 +1,129 @@
+"""
+Parse-once analysis of an incoming message
+
+A MessageAnalysis wraps the text of one message and computes each derived
+view (normalized text, tokens, keyword hits, regex entities, language,
+token estimate) on first use, at most once. It is created when the message
+arrives and handed down the pipeline so parsing, sentiment, auto-response
+and trigger evaluation share the work instead of rescanning the text.
+"""
+
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.utils.keyword_matcher import KeywordMatches, get_keyword_registry
+
+# Entity patterns shared by MessageParser and MessageAnalysis
+ENTITY_PATTERNS = {
+    'email': re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'),
+    'phone': re.compile(r'[\+]?[1-9]?[0-9]{7,15}'),
+    'url': re.compile(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+'),
+    'booking_ref': re.compile(r'\b[A-Z0-9]{6,12}\b'),
+    'room_number': re.compile(r'\b(?:room|rm|suite)\s*#?(\d{1,4})\b', re.IGNORECASE),
+    'date': re.compile(r'\b\d{1,2}[/-]\d{1,2}[/-]\d{2,4}\b'),
+    'time': re.compile(r'\b\d{1,2}:\d{2}(?:\s*[AaPp][Mm])?\b'),
+}
+
+WORD_PATTERN = re.compile(r'\b\w+\b')
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+# Rough approximation: 1 token ≈ 4 characters for English
+CHARS_PER_TOKEN = 4
+
+
+def estimate_token_count(normalized_text: str, chars_per_token: int = CHARS_PER_TOKEN) -> int:
+    """Estimate tokens of whitespace-normalized text, with a 10% buffer"""
+    return int(max(1, len(normalized_text) // chars_per_token) * 1.1)
+
+
+class MessageAnalysis:
+    """Lazily computed, read-only views of one message's text"""
+
+    __slots__ = ('text', '_values')
+
+    def __init__(self, text: Optional[str]):
+        object.__setattr__(self, 'text', text or "")
+        object.__setattr__(self, '_values', {})
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("MessageAnalysis is read-only")
+
+    def __repr__(self) -> str:
+        return f"MessageAnalysis({self.text[:30]!r}, computed={sorted(self._values)})"
+
+    @classmethod
+    def of(cls, text: Optional[str], analysis: Optional['MessageAnalysis'] = None) -> 'MessageAnalysis':
+        """Reuse analysis if it belongs to text, otherwise analyse text afresh"""
+        if analysis is not None and analysis.describes(text):
+            return analysis
+        return cls(text)
+
+    def describes(self, text: Optional[str]) -> bool:
+        """Whether this analysis is of text"""
+        return self.text == (text or "")
+
+    def _lazy(self, name: str, compute: Callable[[], Any]) -> Any:
+        values = self._values
+        if name not in values:
+            values[name] = compute()
+        return values[name]
+
+    @property
+    def normalized(self) -> str:
+        """Text with surrounding whitespace stripped and inner runs collapsed"""
+        return self._lazy('normalized', lambda: WHITESPACE_PATTERN.sub(' ', self.text.strip()))
+
+    @property
+    def lower(self) -> str:
+        """Lower-cased text"""
+        return self._lazy('lower', self.text.lower)
+
+    @property
+    def tokens(self) -> Tuple[str, ...]:
+        """Words of the lower-cased text"""
+        return self._lazy('tokens', lambda: tuple(WORD_PATTERN.findall(self.lower)))
+
+    @property
+    def keyword_matches(self) -> KeywordMatches:
+        """Hits of every registered classifier keyword"""
+        # Rescanned if a classifier registered keywords since the last scan
+        registry = get_keyword_registry()
+        scanned = self._values.get('keyword_matches')
+        if scanned is None or scanned[0] != registry.version:
+            scanned = self._values['keyword_matches'] = (registry.version, registry.scan(self.text))
+        return scanned[1]
+
+    @property
+    def entities(self) -> Dict[str, List[str]]:
+        """Regex entities found in the text, by entity type"""
+        def extract() -> Dict[str, List[str]]:
+            extracted = {}
+            for data_type, pattern in ENTITY_PATTERNS.items():
+                matches = pattern.findall(self.text)
+                if matches:
+                    extracted[data_type] = matches
+            return extracted
+        return self._lazy('entities', extract)
+
+    @property
+    def language(self) -> Tuple[str, float]:
+        """Detected language code and confidence"""
+        def detect() -> Tuple[str, float]:
+            from app.utils.language_detector import get_language_detector
+            return get_language_detector().detect_language(self.text, analysis=self)
+        return self._lazy('language', detect)
+
+    @property
+    def token_estimate(self) -> int:
+        """Estimated DeepSeek tokens for the text"""
+        return self._lazy(
+            'token_estimate',
+            lambda: estimate_token_count(self.normalized) if self.text else 0
+        )
+
+
+__all__ = [
+    'ENTITY_PATTERNS',
+    'MessageAnalysis',
+    'estimate_token_count'
+]
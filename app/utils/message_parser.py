@@ -7,6 +7,9 @@ from typing import Dict, Any, Optional, List, Tuple
 import structlog
 from datetime import datetime
 
+from app.utils.keyword_matcher import KeywordMatches, get_keyword_registry, keyword_tag
+from app.utils.message_analysis import ENTITY_PATTERNS, MessageAnalysis
+
 logger = structlog.get_logger(__name__)
 
 
@@ -15,15 +18,7 @@ class MessageParser:
     
     def __init__(self):
         # Common patterns for message parsing
-        self.patterns = {
-            'email': re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'),
-            'phone': re.compile(r'[\+]?[1-9]?[0-9]{7,15}'),
-            'url': re.compile(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+'),
-            'booking_ref': re.compile(r'\b[A-Z0-9]{6,12}\b'),
-            'room_number': re.compile(r'\b(?:room|rm|suite)\s*#?(\d{1,4})\b', re.IGNORECASE),
-            'date': re.compile(r'\b\d{1,2}[/-]\d{1,2}[/-]\d{2,4}\b'),
-            'time': re.compile(r'\b\d{1,2}:\d{2}(?:\s*[AaPp][Mm])?\b'),
-        }
+        self.patterns = dict(ENTITY_PATTERNS)
         
         # Intent keywords
         self.intent_keywords = {
@@ -35,27 +30,67 @@ class MessageParser:
             'cancellation': ['cancel', 'refund', 'change', 'modify'],
             'emergency': ['emergency', 'urgent', 'help', 'fire', 'medical', 'police'],
         }
+
+        # Sentiment, urgency and language indicators
+        self.sentiment_keywords = {
+            'positive': ['good', 'great', 'excellent', 'amazing', 'wonderful', 'perfect', 'love', 'fantastic', 'happy', 'satisfied'],
+            'negative': ['bad', 'terrible', 'awful', 'horrible', 'disappointed', 'angry', 'frustrated', 'upset', 'problem', 'issue'],
+        }
+        self.urgency_keywords = {
+            'high': ['emergency', 'urgent', 'asap', 'immediately', 'fire', 'medical', 'police', 'help'],
+            'medium': ['soon', 'quickly', 'problem', 'issue', 'broken', 'not working'],
+        }
+        self.language_keywords = {
+            'es': ['hola', 'gracias', 'por favor', 'sí', 'no', 'bueno', 'malo', 'habitación'],
+            'fr': ['bonjour', 'merci', 's\'il vous plaît', 'oui', 'non', 'bon', 'mauvais', 'chambre'],
+        }
+        self.automated_keywords = {
+            'automated': [
+                'this is an automated message',
+                'do not reply',
+                'auto-generated',
+                'system message',
+                'confirmation number',
+                'booking confirmed'
+            ]
+        }
+
+        # All tables share one keyword scan per message
+        self.keyword_registry = get_keyword_registry()
+        self.keyword_registry.register('message_parser.intent', self.intent_keywords)
+        self.keyword_registry.register('message_parser.sentiment', self.sentiment_keywords)
+        self.keyword_registry.register('message_parser.urgency', self.urgency_keywords)
+        self.keyword_registry.register('message_parser.language', self.language_keywords)
+        self.keyword_registry.register('message_parser.automated', self.automated_keywords)
     
-    def parse_message(self, content: str, message_data: Dict[str, Any]) -> Dict[str, Any]:
+    def parse_message(
+        self,
+        content: str,
+        message_data: Dict[str, Any],
+        analysis: Optional[MessageAnalysis] = None
+    ) -> Dict[str, Any]:
         """
         Parse message content and extract structured information
         
         Args:
             content: Message text content
             message_data: Raw message data from Green API
+            analysis: Shared analysis of content, created if not given
             
         Returns:
             Dict with parsed information
         """
         try:
+            analysis = MessageAnalysis.of(content, analysis)
+            matches = analysis.keyword_matches
             parsed = {
                 'original_content': content,
                 'cleaned_content': self._clean_content(content),
-                'extracted_data': self._extract_data(content),
-                'intent': self._detect_intent(content),
-                'sentiment_indicators': self._detect_sentiment_indicators(content),
-                'urgency_level': self._assess_urgency(content),
-                'language': self._detect_language(content),
+                'extracted_data': self._extract_data(content, analysis),
+                'intent': self._detect_intent(content, matches),
+                'sentiment_indicators': self._detect_sentiment_indicators(content, matches),
+                'urgency_level': self._assess_urgency(content, matches),
+                'language': self._detect_language(content, matches),
                 'message_type': message_data.get('typeMessage', 'textMessage'),
                 'parsed_at': datetime.utcnow().isoformat()
             }
@@ -92,8 +127,11 @@ class MessageParser:
         
         return cleaned
     
-    def _extract_data(self, content: str) -> Dict[str, List[str]]:
+    def _extract_data(self, content: str, analysis: Optional[MessageAnalysis] = None) -> Dict[str, List[str]]:
         """Extract structured data from message content"""
+        if analysis is not None and analysis.describes(content) and self.patterns == ENTITY_PATTERNS:
+            return {data_type: list(found) for data_type, found in analysis.entities.items()}
+        
         extracted = {}
         
         for data_type, pattern in self.patterns.items():
@@ -103,14 +141,15 @@ class MessageParser:
         
         return extracted
     
-    def _detect_intent(self, content: str) -> str:
+    def _detect_intent(self, content: str, matches: Optional[KeywordMatches] = None) -> str:
         """Detect message intent based on keywords"""
-        content_lower = content.lower()
+        if matches is None:
+            matches = self.keyword_registry.scan(content)
         
         # Count keyword matches for each intent
         intent_scores = {}
-        for intent, keywords in self.intent_keywords.items():
-            score = sum(1 for keyword in keywords if keyword in content_lower)
+        for intent in self.intent_keywords:
+            score = matches.count(keyword_tag('message_parser.intent', intent))
             if score > 0:
                 intent_scores[intent] = score
         
@@ -119,6 +158,165 @@ class MessageParser:
             return max(intent_scores, key=intent_scores.get)
         
         return 'general'
+    
+    def _detect_sentiment_indicators(
+        self,
+        content: str,
+        matches: Optional[KeywordMatches] = None
+    ) -> Dict[str, List[str]]:
+        """Detect sentiment indicators in message"""
+        if matches is None:
+            matches = self.keyword_registry.scan(content)
+        
+        return {
+            polarity: matches.keywords(keyword_tag('message_parser.sentiment', polarity))
+            for polarity in self.sentiment_keywords
+        }
+    
+    def _assess_urgency(self, content: str, matches: Optional[KeywordMatches] = None) -> str:
+        """Assess message urgency level"""
+        if matches is None:
+            matches = self.keyword_registry.scan(content)
+        
+        # High urgency indicators
+        if matches.has(keyword_tag('message_parser.urgency', 'high')):
+            return 'high'
+        
+        # Medium urgency indicators
+        if matches.has(keyword_tag('message_parser.urgency', 'medium')):
+            return 'medium'
+        
+        # Check for multiple question marks or exclamation marks
+        if content.count('!') >= 3 or content.count('?') >= 2:
+            return 'medium'
+        
+        return 'low'
+    
+    def _detect_language(self, content: str, matches: Optional[KeywordMatches] = None) -> str:
+        """Detect message language (basic implementation)"""
+        # This is a very basic implementation
+        # In production, you might want to use a proper language detection library
+        if matches is None:
+            matches = self.keyword_registry.scan(content)
+        
+        # Common Spanish words, then common French words
+        for language in self.language_keywords:
+            if matches.has(keyword_tag('message_parser.language', language)):
+                return language
+        
+        # Default to English
+        return 'en'
+    
+    def _parse_media_message(self, message_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Parse media-specific message data"""
+        message_type = message_data.get('typeMessage', '')
+        parsed_media = {}
+        
+        if message_type == 'imageMessage':
+            image_data = message_data.get('imageMessageData', {})
+            parsed_media.update({
+                'media_type': 'image',
+                'caption': image_data.get('caption', ''),
+                'file_name': image_data.get('fileName', ''),
+                'mime_type': image_data.get('mimeType', ''),
+                'file_size': image_data.get('fileSize', 0)
+            })
+        
+        elif message_type == 'videoMessage':
+            video_data = message_data.get('videoMessageData', {})
+            parsed_media.update({
+                'media_type': 'video',
+                'caption': video_data.get('caption', ''),
+                'file_name': video_data.get('fileName', ''),
+                'mime_type': video_data.get('mimeType', ''),
+                'file_size': video_data.get('fileSize', 0)
+            })
+        
+        elif message_type == 'audioMessage':
+            audio_data = message_data.get('audioMessageData', {})
+            parsed_media.update({
+                'media_type': 'audio',
+                'file_name': audio_data.get('fileName', ''),
+                'mime_type': audio_data.get('mimeType', ''),
+                'file_size': audio_data.get('fileSize', 0)
+            })
+        
+        elif message_type == 'documentMessage':
+            doc_data = message_data.get('documentMessageData', {})
+            parsed_media.update({
+                'media_type': 'document',
+                'caption': doc_data.get('caption', ''),
+                'file_name': doc_data.get('fileName', ''),
+                'mime_type': doc_data.get('mimeType', ''),
+                'file_size': doc_data.get('fileSize', 0)
+            })
+        
+        elif message_type == 'locationMessage':
+            location_data = message_data.get('locationMessageData', {})
+            parsed_media.update({
+                'media_type': 'location',
+                'latitude': location_data.get('latitude'),
+                'longitude': location_data.get('longitude'),
+                'name': location_data.get('nameLocation', ''),
+                'address': location_data.get('address', '')
+            })
+        
+        elif message_type == 'contactMessage':
+            contact_data = message_data.get('contactMessageData', {})
+            parsed_media.update({
+                'media_type': 'contact',
+                'display_name': contact_data.get('displayName', ''),
+                'vcard': contact_data.get('vcard', '')
+            })
+        
+        return parsed_media
+    
+    def extract_booking_info(self, content: str) -> Optional[Dict[str, Any]]:
+        """Extract booking-related information from message"""
+        booking_info = {}
+        
+        # Extract booking reference
+        booking_refs = self.patterns['booking_ref'].findall(content)
+        if booking_refs:
+            booking_info['booking_reference'] = booking_refs[0]
+        
+        # Extract room number
+        room_matches = self.patterns['room_number'].findall(content)
+        if room_matches:
+            booking_info['room_number'] = room_matches[0]
+        
+        # Extract dates
+        dates = self.patterns['date'].findall(content)
+        if dates:
+            booking_info['dates'] = dates
+        
+        # Extract times
+        times = self.patterns['time'].findall(content)
+        if times:
+            booking_info['times'] = times
+        
+        return booking_info if booking_info else None
+    
+    def is_automated_message(self, content: str) -> bool:
+        """Check if message appears to be automated/bot-generated"""
+        matches = self.keyword_registry.scan(content)
+        return matches.has(keyword_tag('message_parser.automated', 'automated'))
+    
+    def extract_contact_info(self, content: str) -> Dict[str, List[str]]:
+        """Extract contact information from message"""
+        contact_info = {}
+        
+        # Extract emails
+        emails = self.patterns['email'].findall(content)
+        if emails:
+            contact_info['emails'] = emails
+        
+        # Extract phone numbers
+        phones = self.patterns['phone'].findall(content)
+        if phones:
+            contact_info['phones'] = phones
+        
+        return contact_info
 
 
 def parse_whatsapp_message(message_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -314,196 +512,29 @@ def clean_message_content(text: str) -> str:
     text = re.sub(r'[""''`]', '"', text)
 
     return text
-    
-    def _detect_sentiment_indicators(self, content: str) -> Dict[str, List[str]]:
-        """Detect sentiment indicators in message"""
-        content_lower = content.lower()
-        
-        positive_words = ['good', 'great', 'excellent', 'amazing', 'wonderful', 'perfect', 'love', 'fantastic', 'happy', 'satisfied']
-        negative_words = ['bad', 'terrible', 'awful', 'horrible', 'disappointed', 'angry', 'frustrated', 'upset', 'problem', 'issue']
-        
-        indicators = {
-            'positive': [word for word in positive_words if word in content_lower],
-            'negative': [word for word in negative_words if word in content_lower]
-        }
-        
-        return indicators
-    
-    def _assess_urgency(self, content: str) -> str:
-        """Assess message urgency level"""
-        content_lower = content.lower()
-        
-        # High urgency indicators
-        high_urgency = ['emergency', 'urgent', 'asap', 'immediately', 'fire', 'medical', 'police', 'help']
-        if any(word in content_lower for word in high_urgency):
-            return 'high'
-        
-        # Medium urgency indicators
-        medium_urgency = ['soon', 'quickly', 'problem', 'issue', 'broken', 'not working']
-        if any(word in content_lower for word in medium_urgency):
-            return 'medium'
-        
-        # Check for multiple question marks or exclamation marks
-        if content.count('!') >= 3 or content.count('?') >= 2:
-            return 'medium'
-        
-        return 'low'
-    
-    def _detect_language(self, content: str) -> str:
-        """Detect message language (basic implementation)"""
-        # This is a very basic implementation
-        # In production, you might want to use a proper language detection library
-        
-        # Common Spanish words
-        spanish_words = ['hola', 'gracias', 'por favor', 'sí', 'no', 'bueno', 'malo', 'habitación']
-        if any(word in content.lower() for word in spanish_words):
-            return 'es'
-        
-        # Common French words
-        french_words = ['bonjour', 'merci', 's\'il vous plaît', 'oui', 'non', 'bon', 'mauvais', 'chambre']
-        if any(word in content.lower() for word in french_words):
-            return 'fr'
-        
-        # Default to English
-        return 'en'
-    
-    def _parse_media_message(self, message_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Parse media-specific message data"""
-        message_type = message_data.get('typeMessage', '')
-        parsed_media = {}
-        
-        if message_type == 'imageMessage':
-            image_data = message_data.get('imageMessageData', {})
-            parsed_media.update({
-                'media_type': 'image',
-                'caption': image_data.get('caption', ''),
-                'file_name': image_data.get('fileName', ''),
-                'mime_type': image_data.get('mimeType', ''),
-                'file_size': image_data.get('fileSize', 0)
-            })
-        
-        elif message_type == 'videoMessage':
-            video_data = message_data.get('videoMessageData', {})
-            parsed_media.update({
-                'media_type': 'video',
-                'caption': video_data.get('caption', ''),
-                'file_name': video_data.get('fileName', ''),
-                'mime_type': video_data.get('mimeType', ''),
-                'file_size': video_data.get('fileSize', 0)
-            })
-        
-        elif message_type == 'audioMessage':
-            audio_data = message_data.get('audioMessageData', {})
-            parsed_media.update({
-                'media_type': 'audio',
-                'file_name': audio_data.get('fileName', ''),
-                'mime_type': audio_data.get('mimeType', ''),
-                'file_size': audio_data.get('fileSize', 0)
-            })
-        
-        elif message_type == 'documentMessage':
-            doc_data = message_data.get('documentMessageData', {})
-            parsed_media.update({
-                'media_type': 'document',
-                'caption': doc_data.get('caption', ''),
-                'file_name': doc_data.get('fileName', ''),
-                'mime_type': doc_data.get('mimeType', ''),
-                'file_size': doc_data.get('fileSize', 0)
-            })
-        
-        elif message_type == 'locationMessage':
-            location_data = message_data.get('locationMessageData', {})
-            parsed_media.update({
-                'media_type': 'location',
-                'latitude': location_data.get('latitude'),
-                'longitude': location_data.get('longitude'),
-                'name': location_data.get('nameLocation', ''),
-                'address': location_data.get('address', '')
-            })
-        
-        elif message_type == 'contactMessage':
-            contact_data = message_data.get('contactMessageData', {})
-            parsed_media.update({
-                'media_type': 'contact',
-                'display_name': contact_data.get('displayName', ''),
-                'vcard': contact_data.get('vcard', '')
-            })
-        
-        return parsed_media
-    
-    def extract_booking_info(self, content: str) -> Optional[Dict[str, Any]]:
-        """Extract booking-related information from message"""
-        booking_info = {}
-        
-        # Extract booking reference
-        booking_refs = self.patterns['booking_ref'].findall(content)
-        if booking_refs:
-            booking_info['booking_reference'] = booking_refs[0]
-        
-        # Extract room number
-        room_matches = self.patterns['room_number'].findall(content)
-        if room_matches:
-            booking_info['room_number'] = room_matches[0]
-        
-        # Extract dates
-        dates = self.patterns['date'].findall(content)
-        if dates:
-            booking_info['dates'] = dates
-        
-        # Extract times
-        times = self.patterns['time'].findall(content)
-        if times:
-            booking_info['times'] = times
-        
-        return booking_info if booking_info else None
-    
-    def is_automated_message(self, content: str) -> bool:
-        """Check if message appears to be automated/bot-generated"""
-        automated_indicators = [
-            'this is an automated message',
-            'do not reply',
-            'auto-generated',
-            'system message',
-            'confirmation number',
-            'booking confirmed'
-        ]
-        
-        content_lower = content.lower()
-        return any(indicator in content_lower for indicator in automated_indicators)
-    
-    def extract_contact_info(self, content: str) -> Dict[str, List[str]]:
-        """Extract contact information from message"""
-        contact_info = {}
-        
-        # Extract emails
-        emails = self.patterns['email'].findall(content)
-        if emails:
-            contact_info['emails'] = emails
-        
-        # Extract phone numbers
-        phones = self.patterns['phone'].findall(content)
-        if phones:
-            contact_info['phones'] = phones
-        
-        return contact_info
 
 
 # Global parser instance
 message_parser = MessageParser()
 
 
-def parse_whatsapp_message(content: str, message_data: Dict[str, Any]) -> Dict[str, Any]:
+def parse_whatsapp_message(
+    content: str,
+    message_data: Dict[str, Any],
+    analysis: Optional[MessageAnalysis] = None
+) -> Dict[str, Any]:
     """
     Parse WhatsApp message content
     
     Args:
         content: Message text content
         message_data: Raw message data from Green API
+        analysis: Shared analysis of content
         
     Returns:
         Dict with parsed information
     """
-    return message_parser.parse_message(content, message_data)
+    return message_parser.parse_message(content, message_data, analysis)
 
 
 def extract_message_intent(content: str) -> str:
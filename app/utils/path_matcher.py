@@ -0,0 +1,79 @@
+"""
+Compiled path pattern lookup
+
+Middlewares map path patterns to what a request needs (permissions,
+mostly) and used to try every pattern in turn on each request. A
+PathPatternMap compiles the patterns once into a single regular
+expression with one alternative per pattern, in the map's order, so a
+lookup is one regex match that returns the value of the first pattern
+that matches, exactly as the loops did.
+"""
+
+import re
+from typing import Dict, Generic, List, Mapping, Optional, TypeVar
+
+V = TypeVar("V")
+
+# Pattern syntaxes
+PREFIX = "prefix"      # the path starts with the pattern
+WILDCARD = "wildcard"  # '*' matches anything; without one the path equals the pattern
+
+
+def _pattern_regex(pattern: str, syntax: str) -> str:
+    """
+    Regex for one pattern, as lookaheads so that it matches the empty
+    string at the start of a matching path and can be combined
+    """
+    if syntax == PREFIX:
+        return "(?=%s)" % re.escape(pattern)
+
+    parts = pattern.split("*")
+    if len(parts) == 1:
+        return r"(?=%s\Z)" % re.escape(pattern)
+    # The path starts with the text before the first '*' and ends with
+    # the text after the last one; the two may overlap
+    regex = "(?=%s)" % re.escape(parts[0])
+    if parts[-1]:
+        regex += r"(?=.*%s\Z)" % re.escape(parts[-1])
+    return regex
+
+
+class PathPatternMap(Generic[V]):
+    """First-match lookup of path patterns compiled into one regex"""
+
+    def __init__(self, patterns: Mapping[str, V], syntax: str = WILDCARD):
+        """
+        Args:
+            patterns: Path patterns and their values, in match order
+            syntax: PREFIX or WILDCARD
+        """
+        if syntax not in (PREFIX, WILDCARD):
+            raise ValueError(f"Unknown path pattern syntax: {syntax}")
+
+        self.syntax = syntax
+        self.patterns: Dict[str, V] = dict(patterns)
+        self._values: List[V] = list(self.patterns.values())
+        alternatives = [
+            "(?P<p%d>%s)" % (index, _pattern_regex(pattern, syntax))
+            for index, pattern in enumerate(self.patterns)
+        ]
+        self._regex = re.compile("|".join(alternatives), re.DOTALL) if alternatives else None
+
+    def lookup(self, path: str) -> Optional[V]:
+        """Value of the first pattern matching the path, None if none does"""
+        if self._regex is None:
+            return None
+        match = self._regex.match(path)
+        if match is None:
+            return None
+        return self._values[int(match.lastgroup[1:])]
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+
+__all__ = [
+    'PREFIX',
+    'WILDCARD',
+    'PathPatternMap'
+]
@@ -0,0 +1,82 @@
+"""
+Permission bitsets for authorization checks
+
+Each permission enum gets one bit per member, and the role-to-permission
+table is compiled into one mask per role when the module is imported
+(role definitions live in code). A user's effective permissions are the
+OR of its role mask and its explicit permissions, computed once when the
+user is loaded, so checking a permission is a single AND.
+"""
+
+import enum
+from typing import Any, Callable, Dict, Iterable, List, Type
+
+from app.models.admin_user import AdminPermission, AdminRole, AdminUser
+from app.models.role import Role, UserPermission, UserRole
+
+
+class PermissionBitset:
+    """Bit assignment and compiled role masks for one permission enum"""
+
+    def __init__(
+        self,
+        permissions: Type[enum.Enum],
+        roles: Type[enum.Enum],
+        role_permissions: Callable[[Any], Iterable[str]]
+    ):
+        """
+        Args:
+            permissions: Permission enum; its members get bits in definition order
+            roles: Role enum
+            role_permissions: Default permission values of a role
+        """
+        self.bits: Dict[str, int] = {
+            permission.value: 1 << index for index, permission in enumerate(permissions)
+        }
+        self.all = (1 << len(self.bits)) - 1
+        self.roles = roles
+        self.role_permissions = role_permissions
+        self.role_masks: Dict[Any, int] = {}
+        self.compile_roles()
+
+    def compile_roles(self) -> None:
+        """(Re)compile the mask of every role from its default permissions"""
+        self.role_masks = {role: self.mask(self.role_permissions(role)) for role in self.roles}
+
+    def mask(self, permissions: Iterable[Any]) -> int:
+        """Mask of permissions given as enum members or values; unknown ones are ignored"""
+        mask = 0
+        for permission in permissions:
+            mask |= self.bits.get(getattr(permission, "value", permission), 0)
+        return mask
+
+    def role_mask(self, role: Any) -> int:
+        """Mask of a role, given as an enum member or its value"""
+        try:
+            return self.role_masks[self.roles(role)]
+        except (ValueError, KeyError):
+            return 0
+
+    def effective_mask(self, role: Any, permissions: Iterable[Any] = ()) -> int:
+        """Mask of a role's default permissions and explicit ones"""
+        return self.role_mask(role) | self.mask(permissions or ())
+
+    def names(self, mask: int) -> List[str]:
+        """Permission values set in a mask"""
+        return [value for value, bit in self.bits.items() if mask & bit]
+
+    @staticmethod
+    def allows(mask: int, required: int) -> bool:
+        """Whether a mask holds every required bit"""
+        return mask & required == required
+
+
+USER_PERMISSION_BITS = PermissionBitset(UserPermission, UserRole, Role.get_default_role_permissions)
+ADMIN_PERMISSION_BITS = PermissionBitset(AdminPermission, AdminRole, AdminUser.get_default_role_permissions)
+
+
+__all__ = [
+    'PermissionBitset',
+    'USER_PERMISSION_BITS',
+    'ADMIN_PERMISSION_BITS'
+]
@@ -5,13 +5,15 @@ This module provides utilities for checking user permissions and access control.
 """
 
 import uuid
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Union
 from fastapi import HTTPException, status, Depends, Request
 import structlog
 
 from app.models.user import User
 from app.models.role import UserRole, UserPermission
 from app.core.security import AuthorizationError
+from app.services.principal_cache import Principal
+from app.utils.permission_bits import USER_PERMISSION_BITS, PermissionBitset
 
 logger = structlog.get_logger(__name__)
 
@@ -19,9 +21,25 @@ logger = structlog.get_logger(__name__)
 class PermissionChecker:
     """Utility class for checking user permissions"""
     
+    @staticmethod
+    def get_permission_mask(user: Union[User, Principal]) -> int:
+        """
+        Get the effective permission mask of a user
+        
+        Args:
+            user: User, or its cached principal which carries the mask
+            
+        Returns:
+            int: Mask of the user's role and explicit permissions
+        """
+        mask = getattr(user, "permission_mask", None)
+        if mask is None:
+            mask = USER_PERMISSION_BITS.effective_mask(user.role, user.permissions)
+        return mask
+    
     @staticmethod
     def check_permission(
-        user: User,
+        user: Union[User, Principal],
         required_permission: UserPermission,
         hotel_id: Optional[uuid.UUID] = None
     ) -> bool:
@@ -29,7 +47,7 @@ class PermissionChecker:
         Check if user has required permission
         
         Args:
-            user: User to check
+            user: User to check, or its cached principal
             required_permission: Required permission
             hotel_id: Hotel ID being accessed (if applicable)
             
@@ -40,8 +58,9 @@ class PermissionChecker:
         if user.role == UserRole.SUPER_ADMIN:
             return True
         
-        # Check explicit permission
-        if not user.has_permission(required_permission):
+        # Check role and explicit permissions
+        required = USER_PERMISSION_BITS.bits.get(getattr(required_permission, "value", required_permission), 0)
+        if not required or not PermissionBitset.allows(PermissionChecker.get_permission_mask(user), required):
             return False
         
         # Check hotel access for hotel-specific operations
@@ -53,7 +72,7 @@ class PermissionChecker:
     
     @staticmethod
     def validate_user_access(
-        user: User,
+        user: Union[User, Principal],
         required_permission: UserPermission,
         target_hotel_id: Optional[uuid.UUID] = None
     ) -> bool:
@@ -200,9 +219,9 @@ def require_permission(permission: UserPermission, hotel_id_param: Optional[str]
                             detail="Invalid hotel ID format"
                         )
             
-            # Validate permission
+            # Validate permission, against the cached principal when there is one
             PermissionChecker.validate_user_access(
-                user=user,
+                user=getattr(request.state, 'principal', None) or user,
                 required_permission=permission,
                 target_hotel_id=target_hotel_id
             )
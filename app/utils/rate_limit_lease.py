@@ -0,0 +1,269 @@
+"""
+Local lease tier for distributed rate limiting
+
+A LeasedRateLimiter leases quota from the shared storage in chunks (a
+fraction of the rule's tightest window) and spends it in-process, so most
+requests are answered without a Redis round trip. Leased requests are
+recorded in Redis when leased, not when spent; because a lease is only
+spent for a short time, each process may admit at most one lease
+(max_lease_size requests) per key beyond the limit, and may hold back at
+most as much from other processes. Unused quota is returned when a lease
+expires and on shutdown.
+"""
+
+import asyncio
+import time
+import weakref
+from typing import Any, Dict, Optional, Tuple
+import structlog
+
+from app.core.metrics import track_rate_limit_decision, track_rate_limit_lease_tokens
+from app.core.rate_limit_config import RateLimitRule
+from app.utils.rate_limit_storage import RateLimitStorage, get_rule_windows
+
+logger = structlog.get_logger(__name__)
+
+# Leases tracked per process before expired ones are pruned
+MAX_TRACKED_LEASES = 10000
+
+# Live limiters, for returning leases on shutdown
+_limiters: "weakref.WeakSet[LeasedRateLimiter]" = weakref.WeakSet()
+
+
+class LocalLease:
+    """Quota leased for one rate limit key"""
+
+    __slots__ = ('rule', 'lease_id', 'tokens', 'expires_at', 'metadata')
+
+    def __init__(
+        self,
+        rule: RateLimitRule,
+        lease_id: str,
+        tokens: int,
+        expires_at: float,
+        metadata: Dict[str, Any]
+    ):
+        self.rule = rule
+        self.lease_id = lease_id
+        self.tokens = tokens
+        self.expires_at = expires_at
+        self.metadata = metadata
+
+    def view(self) -> Dict[str, Any]:
+        """Lease-time metadata with unspent local quota counted as remaining"""
+        return {
+            **self.metadata,
+            "checks": {
+                window: {**meta, "remaining": meta.get("remaining", 0) + self.tokens}
+                for window, meta in self.metadata.get("checks", {}).items()
+            },
+            "leased": True
+        }
+
+
+class LeasedRateLimiter:
+    """Token bucket per key, refilled by leasing quota from storage"""
+
+    def __init__(
+        self,
+        storage: RateLimitStorage,
+        lease_fraction: float = 0.1,
+        max_lease_size: int = 50,
+        max_lease_seconds: float = 5.0
+    ):
+        self.storage = storage
+        self.lease_fraction = lease_fraction
+        self.max_lease_size = max_lease_size
+        self.max_lease_seconds = max_lease_seconds
+        self._leases: Dict[str, LocalLease] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self.stats = {
+            'local': 0,
+            'redis': 0,
+            'denied': 0,
+            'fallback': 0
+        }
+        _limiters.add(self)
+
+    def lease_size(self, rule: RateLimitRule) -> int:
+        """Requests leased per round trip: a fraction of the tightest window"""
+        windows = get_rule_windows(rule)
+        if not windows:
+            return 1
+        tightest = min(limit for _, limit, _ in windows)
+        return max(1, min(self.max_lease_size, int(tightest * self.lease_fraction)))
+
+    def lease_seconds(self, rule: RateLimitRule) -> float:
+        """How long leased quota may be spent: the same fraction of the shortest window"""
+        windows = get_rule_windows(rule)
+        if not windows:
+            return self.max_lease_seconds
+        shortest = min(seconds for _, _, seconds in windows)
+        return min(self.max_lease_seconds, shortest * self.lease_fraction)
+
+    def _take_local(self, key: str, current_time: float) -> Optional[LocalLease]:
+        """Spend one request of a live lease"""
+        lease = self._leases.get(key)
+        if lease is None or lease.tokens <= 0 or current_time >= lease.expires_at:
+            return None
+        lease.tokens -= 1
+        self.stats['local'] += 1
+        track_rate_limit_decision("local")
+        return lease
+
+    async def acquire(
+        self,
+        key: str,
+        rule: RateLimitRule,
+        current_time: Optional[float] = None
+    ) -> Tuple[bool, Dict[str, Any]]:
+        """
+        Admit a request from the local lease, leasing more when it runs out
+
+        Args:
+            key: Rate limit key
+            rule: Rate limit rule
+            current_time: Current timestamp
+
+        Returns:
+            Tuple of (allowed, metadata)
+        """
+        if current_time is None:
+            current_time = time.time()
+
+        lease = self._take_local(key, current_time)
+        if lease is not None:
+            return True, lease.view()
+
+        lock = self._locks.get(key)
+        if lock is None:
+            if len(self._locks) >= MAX_TRACKED_LEASES:
+                self._prune(current_time)
+            lock = self._locks[key] = asyncio.Lock()
+
+        async with lock:
+            # Another request may have renewed the lease meanwhile
+            lease = self._take_local(key, current_time)
+            if lease is not None:
+                return True, lease.view()
+
+            await self._return_expired(key, current_time)
+
+            size = self.lease_size(rule)
+            granted, metadata = await self.storage.lease(key, rule, size, current_time)
+
+            if metadata.get("fallback"):
+                self.stats['fallback'] += 1
+                track_rate_limit_decision("fallback")
+                return granted > 0, metadata
+
+            if granted <= 0:
+                self.stats['denied'] += 1
+                track_rate_limit_decision("denied")
+                return False, metadata
+
+            self.stats['redis'] += 1
+            track_rate_limit_decision("redis")
+            track_rate_limit_lease_tokens("leased", granted)
+
+            lease = LocalLease(
+                rule=rule,
+                lease_id=metadata.get("lease_id", ""),
+                tokens=granted - 1,
+                expires_at=current_time + self.lease_seconds(rule),
+                metadata=metadata
+            )
+            if lease.tokens > 0:
+                self._leases[key] = lease
+            return True, lease.view()
+
+    async def refund(
+        self,
+        key: str,
+        rule: RateLimitRule,
+        metadata: Dict[str, Any],
+        current_time: Optional[float] = None
+    ) -> bool:
+        """
+        Give back a request admitted by acquire()
+
+        The request goes back into its local lease while the lease is live,
+        and to storage otherwise; fail-open results recorded nothing.
+
+        Returns:
+            bool: True if the request was given back
+        """
+        if current_time is None:
+            current_time = time.time()
+        lease_id = metadata.get("lease_id")
+        if metadata.get("fallback") or not lease_id:
+            return False
+
+        lease = self._leases.get(key)
+        if lease is not None and lease.lease_id == lease_id and current_time < lease.expires_at:
+            lease.tokens += 1
+            return True
+        return await self.storage.release(key, rule, 1, lease_id, current_time)
+
+    async def _return_expired(self, key: str, current_time: float) -> None:
+        """Give back the unspent quota of an expired lease"""
+        lease = self._leases.pop(key, None)
+        if lease is None or lease.tokens <= 0:
+            return
+        if await self.storage.release(key, lease.rule, lease.tokens, lease.lease_id, current_time):
+            track_rate_limit_lease_tokens("returned", lease.tokens)
+
+    def _prune(self, current_time: float) -> None:
+        """Forget expired leases and idle keys; expired quota ages out in Redis"""
+        for key in [k for k, lease in self._leases.items() if current_time >= lease.expires_at]:
+            lease = self._leases.pop(key)
+            track_rate_limit_lease_tokens("expired", lease.tokens)
+        for key in [k for k, lock in self._locks.items() if not lock.locked() and k not in self._leases]:
+            del self._locks[key]
+
+    async def release_all(self) -> int:
+        """
+        Return the unspent quota of all live leases
+
+        Returns:
+            int: Requests returned
+        """
+        current_time = time.time()
+        returned = 0
+        leases, self._leases = self._leases, {}
+        for key, lease in leases.items():
+            if lease.tokens <= 0 or current_time >= lease.expires_at:
+                continue
+            if await self.storage.release(key, lease.rule, lease.tokens, lease.lease_id, current_time):
+                returned += lease.tokens
+        track_rate_limit_lease_tokens("returned", returned)
+        return returned
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get lease statistics"""
+        decisions = sum(self.stats.values())
+        return {
+            **self.stats,
+            'leases': len(self._leases),
+            'local_hit_rate': self.stats['local'] / decisions if decisions else 0.0
+        }
+
+
+async def release_rate_limit_leases() -> int:
+    """Return unspent leased quota of every limiter in this process"""
+    returned = 0
+    for limiter in list(_limiters):
+        try:
+            returned += await limiter.release_all()
+        except Exception as e:
+            logger.warning("Failed to return rate limit leases", error=str(e))
+    if returned:
+        logger.info("Rate limit leases returned", requests=returned)
+    return returned
+
+
+__all__ = [
+    'LocalLease',
+    'LeasedRateLimiter',
+    'release_rate_limit_leases'
+]
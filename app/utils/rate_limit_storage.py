@@ -7,6 +7,7 @@ sliding window algorithms, token buckets, and distributed rate limiting.
 
 import time
 import json
+import uuid
 import asyncio
 from typing import Dict, List, Optional, Tuple, Any, Union
 from datetime import datetime, timedelta
@@ -19,6 +20,200 @@ from app.core.rate_limit_config import RateLimitAlgorithm, RateLimitRule
 
 logger = structlog.get_logger(__name__)
 
+# Window names, in the order windows are evaluated
+WINDOW_TYPES = ("second", "minute", "hour", "day", "burst")
+
+# KEYS: one key per window
+# ARGV: now, mode, member, count, then limit and window seconds for each key
+#
+# Modes:
+#   check    report whether one more request fits, record nothing
+#   acquire  record up to `count` requests, as many as every window allows
+#   lease    same as acquire; used for quota handed out in chunks
+#   hit      record `count` requests unconditionally
+#   release  give back `count` requests recorded under `member`
+#
+# Returns: granted, then current, reset time, retry time and allowed for
+#          each window; times are strings since Lua numbers would be
+#          truncated to integers on the way back
+SLIDING_WINDOW_SCRIPT = """
+local now = tonumber(ARGV[1])
+local mode = ARGV[2]
+local member = ARGV[3]
+local count = tonumber(ARGV[4])
+local limits, windows, counts = {}, {}, {}
+local available = count
+
+for i = 1, #KEYS do
+    limits[i] = tonumber(ARGV[3 + 2 * i])
+    windows[i] = tonumber(ARGV[4 + 2 * i])
+    redis.call('ZREMRANGEBYSCORE', KEYS[i], '-inf', now - windows[i])
+    if mode == 'release' then
+        for j = 1, count do
+            redis.call('ZREM', KEYS[i], member .. ':' .. j)
+        end
+    end
+    counts[i] = redis.call('ZCARD', KEYS[i])
+    available = math.min(available, limits[i] - counts[i])
+end
+if available < 0 then
+    available = 0
+end
+
+local record = 0
+if mode == 'hit' then
+    record = count
+elseif mode == 'acquire' or mode == 'lease' then
+    record = available
+end
+
+local granted = available
+if mode == 'hit' then
+    granted = count
+end
+local result = {granted}
+
+for i = 1, #KEYS do
+    local limit = limits[i]
+    local window = windows[i]
+    local current = counts[i]
+    local window_allowed = 0
+    if current < limit then
+        window_allowed = 1
+    end
+    if record > 0 then
+        for j = 1, record do
+            redis.call('ZADD', KEYS[i], now, member .. ':' .. j)
+        end
+        redis.call('EXPIRE', KEYS[i], math.ceil(window) + 60)
+        current = current + record
+    end
+
+    local reset = now + window
+    local retry = now
+    local oldest = redis.call('ZRANGE', KEYS[i], 0, 0, 'WITHSCORES')
+    if oldest[2] then
+        reset = tonumber(oldest[2]) + window
+        if current >= limit then
+            retry = reset
+        end
+    end
+
+    table.insert(result, current)
+    table.insert(result, tostring(reset))
+    table.insert(result, tostring(retry))
+    table.insert(result, window_allowed)
+end
+
+return result
+"""
+
+# Same contract as SLIDING_WINDOW_SCRIPT. Each window stores only its
+# theoretical arrival time (TAT): requests are spaced window/limit apart
+# and up to `limit` may arrive at once.
+GCRA_SCRIPT = """
+local now = tonumber(ARGV[1])
+local mode = ARGV[2]
+local count = tonumber(ARGV[4])
+local limits, windows, tats, rooms = {}, {}, {}, {}
+local available = count
+
+for i = 1, #KEYS do
+    limits[i] = tonumber(ARGV[3 + 2 * i])
+    windows[i] = tonumber(ARGV[4 + 2 * i])
+    local interval = windows[i] / limits[i]
+    local tat = tonumber(redis.call('GET', KEYS[i]) or now)
+    if mode == 'release' then
+        tat = tat - count * interval
+    end
+    if tat < now then
+        tat = now
+    end
+    tats[i] = tat
+    rooms[i] = math.floor((now + windows[i] - tat) / interval + 1e-9)
+    available = math.min(available, rooms[i])
+end
+if available < 0 then
+    available = 0
+end
+
+local record = 0
+if mode == 'hit' then
+    record = count
+elseif mode == 'acquire' or mode == 'lease' then
+    record = available
+end
+
+local granted = available
+if mode == 'hit' then
+    granted = count
+end
+local result = {granted}
+
+for i = 1, #KEYS do
+    local limit = limits[i]
+    local window = windows[i]
+    local interval = window / limit
+    local tat = tats[i] + record * interval
+    local window_allowed = 0
+    if rooms[i] > 0 then
+        window_allowed = 1
+    end
+    if record > 0 or mode == 'release' then
+        if tat > now then
+            redis.call('SET', KEYS[i], tostring(tat), 'PX', math.ceil((tat - now) * 1000))
+        else
+            redis.call('DEL', KEYS[i])
+        end
+    end
+
+    local used = math.ceil((tat - now) / interval - 1e-9)
+    local retry = now
+    local allow_at = tat + interval - window
+    if allow_at > now then
+        retry = allow_at
+    end
+
+    table.insert(result, used)
+    table.insert(result, tostring(tat))
+    table.insert(result, tostring(retry))
+    table.insert(result, window_allowed)
+end
+
+return result
+"""
+
+
+def get_rule_windows(rule: RateLimitRule) -> List[Tuple[str, int, int]]:
+    """
+    Get the (window type, limit, window seconds) triples a rule enforces
+
+    Args:
+        rule: Rate limit rule
+
+    Returns:
+        List of configured windows in WINDOW_TYPES order
+    """
+    windows = []
+    if rule.requests_per_second:
+        windows.append(("second", rule.requests_per_second, 1))
+    if rule.requests_per_minute:
+        windows.append(("minute", rule.requests_per_minute, 60))
+    if rule.requests_per_hour:
+        windows.append(("hour", rule.requests_per_hour, 3600))
+    if rule.requests_per_day:
+        windows.append(("day", rule.requests_per_day, 86400))
+    if rule.burst_limit:
+        windows.append(("burst", rule.burst_limit, rule.burst_window_seconds))
+    return windows
+
+
+def _script_algorithm(rule: RateLimitRule) -> str:
+    """Script used for a rule; anything but GCRA uses the sliding log"""
+    if rule.algorithm == RateLimitAlgorithm.GCRA:
+        return RateLimitAlgorithm.GCRA.value
+    return RateLimitAlgorithm.SLIDING_WINDOW.value
+
 
 class RateLimitStorageError(Exception):
     """Exception raised when rate limit storage operations fail"""
@@ -68,6 +263,78 @@ class RateLimitStorage(ABC):
         """
         pass
     
+    async def acquire(
+        self,
+        key: str,
+        rule: RateLimitRule,
+        current_time: Optional[float] = None
+    ) -> Tuple[bool, Dict[str, Any]]:
+        """
+        Check the rate limit and record the request if it is allowed
+
+        Backends that can do this atomically should override it; the
+        default is a check followed by an increment.
+
+        Returns:
+            Tuple of (allowed, metadata)
+        """
+        allowed, metadata = await self.check_rate_limit(key, rule, current_time)
+        if allowed:
+            await self.increment_counter(key, rule, current_time)
+        return allowed, metadata
+
+    async def lease(
+        self,
+        key: str,
+        rule: RateLimitRule,
+        count: int,
+        current_time: Optional[float] = None
+    ) -> Tuple[int, Dict[str, Any]]:
+        """
+        Record up to `count` requests at once for local use
+
+        The default grants a single request, which disables leasing for
+        backends without chunked acquisition.
+
+        Returns:
+            Tuple of (requests granted, metadata)
+        """
+        allowed, metadata = await self.acquire(key, rule, current_time)
+        return (1 if allowed else 0), metadata
+
+    async def release(
+        self,
+        key: str,
+        rule: RateLimitRule,
+        count: int,
+        lease_id: str,
+        current_time: Optional[float] = None
+    ) -> bool:
+        """Give back unused requests of a lease"""
+        return False
+
+    async def refund(
+        self,
+        key: str,
+        rule: RateLimitRule,
+        metadata: Dict[str, Any],
+        current_time: Optional[float] = None
+    ) -> bool:
+        """
+        Give back a request recorded by acquire()
+
+        Used when another rule denies the same request. The default gives
+        back requests whose metadata carries a "request_id" through
+        release(); fail-open results recorded nothing.
+
+        Returns:
+            bool: True if the request was given back
+        """
+        request_id = metadata.get("request_id")
+        if metadata.get("fallback") or not request_id:
+            return False
+        return await self.release(key, rule, 1, request_id, current_time)
+
     @abstractmethod
     async def get_stats(self, key: str) -> Dict[str, Any]:
         """Get rate limit statistics for key"""
@@ -80,13 +347,20 @@ class RateLimitStorage(ABC):
 
 
 class RedisRateLimitStorage(RateLimitStorage):
-    """Redis-based rate limit storage with sliding window support"""
+    """
+    Redis-based rate limit storage
+
+    All windows of a rule are checked and updated by one Lua script in a
+    single round trip. Sliding-window rules keep a sorted-set log per
+    window; GCRA rules keep one timestamp per window.
+    """
     
     def __init__(self, redis_url: Optional[str] = None, key_prefix: str = "rate_limit:"):
         self.redis_url = redis_url or settings.REDIS_URL
         self.key_prefix = key_prefix
         self.redis_client: Optional[redis.Redis] = None
         self._connection_lock = asyncio.Lock()
+        self._scripts: Dict[str, Any] = {}
     
     async def _get_redis_client(self) -> redis.Redis:
         """Get or create Redis client"""
@@ -113,10 +387,95 @@ class RedisRateLimitStorage(RateLimitStorage):
         return self.redis_client
     
     def _get_key(self, key: str, window_type: str = "") -> str:
-        """Generate Redis key with prefix"""
+        """
+        Generate Redis key with prefix
+
+        The rate limit key is a hash tag so all windows of one key map to
+        the same cluster slot and can be touched by one script.
+        """
         if window_type:
-            return f"{self.key_prefix}{key}:{window_type}"
-        return f"{self.key_prefix}{key}"
+            return f"{self.key_prefix}{{{key}}}:{window_type}"
+        return f"{self.key_prefix}{{{key}}}"
+
+    def _get_script(self, client: redis.Redis, algorithm: str) -> Any:
+        """Get the registered script for an algorithm (EVALSHA with EVAL fallback)"""
+        script = self._scripts.get(algorithm)
+        if script is None:
+            source = GCRA_SCRIPT if algorithm == RateLimitAlgorithm.GCRA.value else SLIDING_WINDOW_SCRIPT
+            script = client.register_script(source)
+            self._scripts[algorithm] = script
+        return script
+
+    async def _run_script(
+        self,
+        key: str,
+        rule: RateLimitRule,
+        mode: str,
+        current_time: float,
+        count: int = 1,
+        member: Optional[str] = None
+    ) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        Evaluate all windows of a rule in one round trip
+
+        Args:
+            key: Rate limit key
+            rule: Rate limit rule
+            mode: Script mode, see SLIDING_WINDOW_SCRIPT
+            current_time: Current timestamp
+            count: Number of requests to record or release
+            member: Log member prefix of recorded requests
+
+        Returns:
+            Tuple of (requests granted, per-window metadata)
+        """
+        client = await self._get_redis_client()
+        algorithm = _script_algorithm(rule)
+        windows = get_rule_windows(rule)
+        if not windows:
+            return count, []
+
+        suffix = "gcra:" if algorithm == RateLimitAlgorithm.GCRA.value else ""
+        keys = [self._get_key(key, f"{suffix}{window_type}") for window_type, _, _ in windows]
+        member = member or f"{current_time!r}:{uuid.uuid4().hex[:12]}"
+        args: List[Any] = [repr(current_time), mode, member, count]
+        for _, limit, window_seconds in windows:
+            args.extend([limit, window_seconds])
+
+        result = await self._get_script(client, algorithm)(keys=keys, args=args)
+
+        granted = int(result[0])
+        checks = []
+        for index, (window_type, limit, window_seconds) in enumerate(windows):
+            current, reset_time, retry_at, window_allowed = result[1 + index * 4:5 + index * 4]
+            current = int(current)
+            checks.append({
+                "window": window_type,
+                "limit": limit,
+                "current": current,
+                "remaining": max(0, limit - current),
+                "reset_time": float(reset_time),
+                "retry_at": float(retry_at),
+                "window_seconds": window_seconds,
+                "allowed": bool(int(window_allowed))
+            })
+        return granted, checks
+
+    def _build_metadata(
+        self,
+        rule: RateLimitRule,
+        allowed: bool,
+        checks: List[Dict[str, Any]],
+        current_time: float
+    ) -> Dict[str, Any]:
+        """Compile per-window results into check metadata"""
+        return {
+            "timestamp": current_time,
+            "rule_name": rule.name,
+            "algorithm": _script_algorithm(rule),
+            "checks": {meta.pop("window"): meta for meta in checks},
+            "overall_allowed": allowed
+        }
     
     async def check_rate_limit(
         self,
@@ -125,7 +484,7 @@ class RedisRateLimitStorage(RateLimitStorage):
         current_time: Optional[float] = None
     ) -> Tuple[bool, Dict[str, Any]]:
         """
-        Check rate limit using sliding window algorithm
+        Check rate limit without recording the request
         
         Args:
             key: Rate limit key
@@ -139,104 +498,120 @@ class RedisRateLimitStorage(RateLimitStorage):
             current_time = time.time()
         
         try:
-            client = await self._get_redis_client()
-            
-            # Check different time windows
-            checks = []
-            
-            if rule.requests_per_second:
-                allowed, meta = await self._check_sliding_window(
-                    client, key, rule.requests_per_second, 1, current_time, "second"
-                )
-                checks.append(("second", allowed, meta))
-            
-            if rule.requests_per_minute:
-                allowed, meta = await self._check_sliding_window(
-                    client, key, rule.requests_per_minute, 60, current_time, "minute"
-                )
-                checks.append(("minute", allowed, meta))
-            
-            if rule.requests_per_hour:
-                allowed, meta = await self._check_sliding_window(
-                    client, key, rule.requests_per_hour, 3600, current_time, "hour"
-                )
-                checks.append(("hour", allowed, meta))
-            
-            if rule.requests_per_day:
-                allowed, meta = await self._check_sliding_window(
-                    client, key, rule.requests_per_day, 86400, current_time, "day"
-                )
-                checks.append(("day", allowed, meta))
-            
-            # Check burst limit
-            burst_allowed = True
-            burst_meta = {}
-            if rule.burst_limit:
-                burst_allowed, burst_meta = await self._check_sliding_window(
-                    client, key, rule.burst_limit, rule.burst_window_seconds, current_time, "burst"
-                )
-                checks.append(("burst", burst_allowed, burst_meta))
-            
-            # Overall result - all checks must pass
-            overall_allowed = all(allowed for _, allowed, _ in checks)
-            
-            # Compile metadata
-            metadata = {
-                "timestamp": current_time,
-                "rule_name": rule.name,
-                "checks": {window: meta for window, allowed, meta in checks},
-                "overall_allowed": overall_allowed
-            }
-            
-            return overall_allowed, metadata
+            granted, checks = await self._run_script(key, rule, "check", current_time)
+            return granted > 0, self._build_metadata(rule, granted > 0, checks, current_time)
             
         except Exception as e:
             logger.error("Rate limit check failed", key=key, error=str(e))
             # In case of error, allow request but log warning
             return True, {"error": str(e), "fallback": True}
-    
-    async def _check_sliding_window(
+
+    async def acquire(
         self,
-        client: redis.Redis,
         key: str,
-        limit: int,
-        window_seconds: int,
-        current_time: float,
-        window_type: str
+        rule: RateLimitRule,
+        current_time: Optional[float] = None
     ) -> Tuple[bool, Dict[str, Any]]:
-        """Check sliding window rate limit"""
-        redis_key = self._get_key(key, window_type)
-        window_start = current_time - window_seconds
-        
-        # Use Redis pipeline for atomic operations
-        pipe = client.pipeline()
-        
-        # Remove old entries
-        pipe.zremrangebyscore(redis_key, 0, window_start)
-        
-        # Count current entries
-        pipe.zcard(redis_key)
-        
-        # Execute pipeline
-        results = await pipe.execute()
-        current_count = results[1]
-        
-        # Check if limit exceeded
-        allowed = current_count < limit
-        
-        # Calculate reset time
-        reset_time = current_time + window_seconds
-        
-        metadata = {
-            "limit": limit,
-            "current": current_count,
-            "remaining": max(0, limit - current_count),
-            "reset_time": reset_time,
-            "window_seconds": window_seconds,
-            "allowed": allowed
-        }
-        
-        return allowed, metadata
+        """
+        Atomically check all windows and record the request if allowed
+
+        Args:
+            key: Rate limit key
+            rule: Rate limit rule
+            current_time: Current timestamp
+
+        Returns:
+            Tuple of (allowed, metadata); counts include this request and
+            metadata["request_id"] identifies it for refund()
+        """
+        if current_time is None:
+            current_time = time.time()
+        request_id = f"{current_time!r}:{uuid.uuid4().hex[:12]}"
+
+        try:
+            granted, checks = await self._run_script(
+                key, rule, "acquire", current_time, member=request_id
+            )
+            metadata = self._build_metadata(rule, granted > 0, checks, current_time)
+            if granted > 0:
+                metadata["request_id"] = request_id
+            return granted > 0, metadata
+
+        except Exception as e:
+            logger.error("Rate limit acquire failed", key=key, error=str(e))
+            # In case of error, allow request but log warning
+            return True, {"error": str(e), "fallback": True}
+
+    async def lease(
+        self,
+        key: str,
+        rule: RateLimitRule,
+        count: int,
+        current_time: Optional[float] = None
+    ) -> Tuple[int, Dict[str, Any]]:
+        """
+        Record up to `count` requests at once for local use
+
+        Args:
+            key: Rate limit key
+            rule: Rate limit rule
+            count: Requests wanted
+            current_time: Current timestamp
+
+        Returns:
+            Tuple of (requests granted, metadata); metadata["lease_id"]
+            identifies the lease for release()
+        """
+        if current_time is None:
+            current_time = time.time()
+        lease_id = f"{current_time!r}:{uuid.uuid4().hex[:12]}"
+
+        try:
+            granted, checks = await self._run_script(
+                key, rule, "lease", current_time, count=count, member=lease_id
+            )
+            metadata = self._build_metadata(rule, granted > 0, checks, current_time)
+            metadata["lease_id"] = lease_id
+            return granted, metadata
+
+        except Exception as e:
+            logger.error("Rate limit lease failed", key=key, error=str(e))
+            # Admit this request only; nothing is leased
+            return 1, {"error": str(e), "fallback": True}
+
+    async def release(
+        self,
+        key: str,
+        rule: RateLimitRule,
+        count: int,
+        lease_id: str,
+        current_time: Optional[float] = None
+    ) -> bool:
+        """
+        Give back unused requests of a lease
+
+        Args:
+            key: Rate limit key
+            rule: Rate limit rule
+            count: Unused requests
+            lease_id: Lease identifier returned by lease()
+            current_time: Current timestamp
+
+        Returns:
+            bool: True if released
+        """
+        if current_time is None:
+            current_time = time.time()
+
+        try:
+            await self._run_script(
+                key, rule, "release", current_time, count=count, member=lease_id
+            )
+            return True
+
+        except Exception as e:
+            logger.error("Rate limit release failed", key=key, error=str(e))
+            return False
     
     async def increment_counter(
         self,
@@ -259,97 +634,32 @@ class RedisRateLimitStorage(RateLimitStorage):
             current_time = time.time()
         
         try:
-            client = await self._get_redis_client()
-            
-            # Increment counters for all applicable windows
-            increments = []
-            
-            if rule.requests_per_second:
-                meta = await self._increment_sliding_window(
-                    client, key, 1, current_time, "second"
-                )
-                increments.append(("second", meta))
-            
-            if rule.requests_per_minute:
-                meta = await self._increment_sliding_window(
-                    client, key, 60, current_time, "minute"
-                )
-                increments.append(("minute", meta))
-            
-            if rule.requests_per_hour:
-                meta = await self._increment_sliding_window(
-                    client, key, 3600, current_time, "hour"
-                )
-                increments.append(("hour", meta))
-            
-            if rule.requests_per_day:
-                meta = await self._increment_sliding_window(
-                    client, key, 86400, current_time, "day"
-                )
-                increments.append(("day", meta))
-            
-            if rule.burst_limit:
-                meta = await self._increment_sliding_window(
-                    client, key, rule.burst_window_seconds, current_time, "burst"
-                )
-                increments.append(("burst", meta))
-            
+            _, checks = await self._run_script(key, rule, "hit", current_time)
             return {
                 "timestamp": current_time,
                 "rule_name": rule.name,
-                "increments": {window: meta for window, meta in increments}
+                "increments": {
+                    meta["window"]: {
+                        "current_count": meta["current"],
+                        "window_seconds": meta["window_seconds"],
+                        "timestamp": current_time
+                    }
+                    for meta in checks
+                }
             }
             
         except Exception as e:
             logger.error("Rate limit increment failed", key=key, error=str(e))
             raise RateLimitStorageError(f"Failed to increment counter: {str(e)}")
     
-    async def _increment_sliding_window(
-        self,
-        client: redis.Redis,
-        key: str,
-        window_seconds: int,
-        current_time: float,
-        window_type: str
-    ) -> Dict[str, Any]:
-        """Increment sliding window counter"""
-        redis_key = self._get_key(key, window_type)
-        window_start = current_time - window_seconds
-        
-        # Use Redis pipeline for atomic operations
-        pipe = client.pipeline()
-        
-        # Remove old entries
-        pipe.zremrangebyscore(redis_key, 0, window_start)
-        
-        # Add current request
-        pipe.zadd(redis_key, {str(current_time): current_time})
-        
-        # Set expiration
-        pipe.expire(redis_key, window_seconds + 60)  # Extra buffer
-        
-        # Count current entries
-        pipe.zcard(redis_key)
-        
-        # Execute pipeline
-        results = await pipe.execute()
-        current_count = results[3]
-        
-        return {
-            "current_count": current_count,
-            "window_seconds": window_seconds,
-            "timestamp": current_time
-        }
-    
     async def get_stats(self, key: str) -> Dict[str, Any]:
         """Get rate limit statistics for key"""
         try:
             client = await self._get_redis_client()
             
             stats = {}
-            windows = ["second", "minute", "hour", "day", "burst"]
             
-            for window in windows:
+            for window in WINDOW_TYPES:
                 redis_key = self._get_key(key, window)
                 count = await client.zcard(redis_key)
                 if count > 0:
@@ -364,6 +674,10 @@ class RedisRateLimitStorage(RateLimitStorage):
                     }
                 else:
                     stats[window] = {"count": 0}
+
+                tat = await client.get(self._get_key(key, f"gcra:{window}"))
+                if tat is not None:
+                    stats[window]["theoretical_arrival_time"] = float(tat)
             
             return stats
             
@@ -376,8 +690,8 @@ class RedisRateLimitStorage(RateLimitStorage):
         try:
             client = await self._get_redis_client()
             
-            windows = ["second", "minute", "hour", "day", "burst"]
-            keys_to_delete = [self._get_key(key, window) for window in windows]
+            keys_to_delete = [self._get_key(key, window) for window in WINDOW_TYPES]
+            keys_to_delete.extend(self._get_key(key, f"gcra:{window}") for window in WINDOW_TYPES)
             
             deleted = await client.delete(*keys_to_delete)
             
@@ -393,6 +707,7 @@ class RedisRateLimitStorage(RateLimitStorage):
         if self.redis_client:
             await self.redis_client.close()
             self.redis_client = None
+            self._scripts.clear()
 
 
 class MemoryRateLimitStorage(RateLimitStorage):
@@ -457,6 +772,21 @@ class MemoryRateLimitStorage(RateLimitStorage):
                 "count": len(self.storage[key])
             }
     
+    async def refund(
+        self,
+        key: str,
+        rule: RateLimitRule,
+        metadata: Dict[str, Any],
+        current_time: Optional[float] = None
+    ) -> bool:
+        """Forget the request recorded at current_time"""
+        async with self._lock:
+            entries = self.storage.get(key, [])
+            if current_time in entries:
+                entries.remove(current_time)
+                return True
+            return False
+    
     async def _cleanup_old_entries(self, key: str, current_time: float):
         """Remove old entries from memory storage"""
         if key in self.storage:
@@ -511,5 +841,7 @@ __all__ = [
     'RedisRateLimitStorage',
     'MemoryRateLimitStorage',
     'RateLimitStorageError',
-    'create_rate_limit_storage'
+    'WINDOW_TYPES',
+    'create_rate_limit_storage',
+    'get_rule_windows'
 ]
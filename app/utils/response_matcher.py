@@ -8,6 +8,7 @@ from datetime import datetime
 import structlog
 
 from app.core.logging import get_logger
+from app.utils.keyword_matcher import get_keyword_registry
 
 logger = get_logger(__name__)
 
@@ -81,10 +82,9 @@ class ResponseMatcher:
         content = message_content if case_sensitive else message_content.lower()
         search_keywords = keywords if case_sensitive else [kw.lower() for kw in keywords]
 
-        matched = []
-        for keyword in search_keywords:
-            if keyword in content:
-                matched.append(keyword)
+        # One pass over the message for all keywords; the automaton is cached per keyword list
+        found = get_keyword_registry().keyword_automaton(search_keywords).find(content)
+        matched = [keyword for keyword in search_keywords if not keyword or keyword in found]
 
         if match_type == "all":
             success = len(matched) == len(keywords)
@@ -13,8 +13,13 @@ from typing import Optional, Dict, Any, Tuple, Set
 from datetime import datetime, timezone
 import structlog
 import redis
+import redis.asyncio as aioredis
 from app.core.config import settings
-from app.core.webhook_config import WebhookSecurityConfig, GreenAPIWebhookConfig
+from app.core.webhook_config import (
+    WebhookSecurityConfig,
+    GreenAPIWebhookConfig,
+    get_webhook_security_config
+)
 
 logger = structlog.get_logger(__name__)
 
@@ -39,9 +44,22 @@ class EnhancedSignatureValidator:
     
     def __init__(self, config: WebhookSecurityConfig):
         self.config = config
-        self.redis_client = self._create_redis_client()
         self.replay_cache_prefix = "webhook_replay:"
-        
+        # Both clients connect on first use: request handlers only need the
+        # async one, the sync one serves check_replay_attack callers
+        self._redis_client: Optional[redis.Redis] = None
+        self._redis_client_created = False
+        self.async_redis_client: Optional[aioredis.Redis] = None
+        self._async_redis_unavailable_until = 0.0
+    
+    @property
+    def redis_client(self) -> Optional[redis.Redis]:
+        """Sync Redis client for replay protection, None if unavailable"""
+        if not self._redis_client_created:
+            self._redis_client = self._create_redis_client()
+            self._redis_client_created = True
+        return self._redis_client
+    
     def _create_redis_client(self) -> Optional[redis.Redis]:
         """Create Redis client for replay protection"""
         if not self.config.enable_replay_protection:
@@ -189,34 +207,17 @@ class EnhancedSignatureValidator:
             return True
         
         try:
-            # Create unique request identifier
-            request_hash = hashlib.sha256(
-                f"{signature}:{timestamp}:{len(body)}".encode()
-            ).hexdigest()
+            cache_key, record = self._replay_record(signature, timestamp, body)
             
-            cache_key = f"{self.replay_cache_prefix}{request_hash}"
-            
-            # Check if request was already processed
-            if self.redis_client.exists(cache_key):
-                if self.config.log_replay_attempts:
-                    logger.warning(
-                        "Replay attack detected",
-                        request_hash=request_hash,
-                        timestamp=timestamp,
-                        signature_prefix=signature[:16] + "..."
-                    )
-                raise ReplayAttackError("Duplicate request detected")
-            
-            # Store request identifier with TTL
-            self.redis_client.setex(
+            # SET NX EX claims the request and reports a duplicate in one
+            # atomic round trip
+            if not self.redis_client.set(
                 cache_key,
-                self.config.replay_cache_ttl_seconds,
-                json.dumps({
-                    "timestamp": timestamp,
-                    "processed_at": int(time.time()),
-                    "signature_hash": hashlib.sha256(signature.encode()).hexdigest()
-                })
-            )
+                record,
+                nx=True,
+                ex=self.config.replay_cache_ttl_seconds
+            ):
+                self._replay_detected(cache_key, signature, timestamp)
             
             return True
             
@@ -231,6 +232,100 @@ class EnhancedSignatureValidator:
             logger.error("Unexpected error during replay check", error=str(e))
             return True
     
+    async def _get_async_redis(self) -> Optional[aioredis.Redis]:
+        if self.async_redis_client is None and time.monotonic() >= self._async_redis_unavailable_until:
+            try:
+                self.async_redis_client = aioredis.from_url(
+                    settings.REDIS_URL,
+                    socket_timeout=0.5,
+                    socket_connect_timeout=0.5
+                )
+            except Exception as e:
+                logger.warning("Webhook replay protection Redis unavailable", error=str(e))
+                self._async_redis_unavailable_until = time.monotonic() + 30
+        return self.async_redis_client
+    
+    async def check_replay_attack_async(
+        self,
+        signature: str,
+        timestamp: int,
+        body: bytes
+    ) -> bool:
+        """
+        Check for replay attacks without blocking the event loop
+        
+        Same check as check_replay_attack, on the async Redis client.
+        
+        Args:
+            signature: Request signature
+            timestamp: Request timestamp
+            body: Request body
+            
+        Returns:
+            bool: True if request is not a replay. Redis errors fail open.
+            
+        Raises:
+            ReplayAttackError: If replay attack is detected
+        """
+        if not self.config.enable_replay_protection:
+            return True
+        
+        client = await self._get_async_redis()
+        if client is None:
+            return True
+        
+        cache_key, record = self._replay_record(signature, timestamp, body)
+        try:
+            claimed = await client.set(
+                cache_key,
+                record,
+                nx=True,
+                ex=self.config.replay_cache_ttl_seconds
+            )
+        except Exception as e:
+            logger.warning("Replay protection unavailable due to Redis error", error=str(e))
+            return True
+        
+        if not claimed:
+            self._replay_detected(cache_key, signature, timestamp)
+        return True
+    
+    async def release_replay_claim(self, cache_key: str) -> None:
+        """Forget a request whose processing failed so that its redelivery is accepted"""
+        client = await self._get_async_redis()
+        if client is None:
+            return
+        try:
+            await client.delete(cache_key)
+        except Exception as e:
+            logger.warning("Failed to release webhook replay claim", error=str(e))
+    
+    def replay_cache_key(self, signature: str, timestamp: int, body: bytes) -> str:
+        """Cache key identifying a request for replay protection"""
+        request_hash = hashlib.sha256(
+            f"{signature}:{timestamp}:{len(body)}".encode()
+        ).hexdigest()
+        return f"{self.replay_cache_prefix}{request_hash}"
+    
+    def _replay_record(self, signature: str, timestamp: int, body: bytes) -> Tuple[str, str]:
+        """Cache key identifying a request, and the value stored under it"""
+        record = json.dumps({
+            "timestamp": timestamp,
+            "processed_at": int(time.time()),
+            "signature_hash": hashlib.sha256(signature.encode()).hexdigest()
+        })
+        return self.replay_cache_key(signature, timestamp, body), record
+    
+    def _replay_detected(self, cache_key: str, signature: str, timestamp: int) -> None:
+        if self.config.log_replay_attempts:
+            logger.warning(
+                "Replay attack detected",
+                request_hash=cache_key[len(self.replay_cache_prefix):],
+                timestamp=timestamp,
+                signature_prefix=signature[:16] + "..."
+            )
+        raise ReplayAttackError("Duplicate request detected")
+    
     def comprehensive_validation(
         self,
         body: bytes,
@@ -255,42 +350,10 @@ class EnhancedSignatureValidator:
             TimestampValidationError: If timestamp validation fails
             ReplayAttackError: If replay attack is detected
         """
-        results = {
-            'signature_valid': False,
-            'timestamp_valid': False,
-            'replay_check_passed': False,
-            'validation_errors': [],
-            'security_warnings': []
-        }
+        results = self._new_results()
         
         try:
-            # Extract signature from headers
-            signature = headers.get(self.config.signature_header)
-            if not signature:
-                raise SignatureValidationError(f"Missing {self.config.signature_header} header")
-            
-            # Validate signature
-            results['signature_valid'] = self.validate_signature(
-                body=body,
-                signature=signature,
-                secret=secret,
-                algorithm=self.config.signature_algorithm
-            )
-            
-            # Extract and validate timestamp
-            timestamp_str = headers.get(self.config.timestamp_header)
-            timestamp = None
-            
-            if timestamp_str:
-                try:
-                    timestamp = int(timestamp_str)
-                    results['timestamp_valid'] = self.validate_timestamp(timestamp)
-                except ValueError:
-                    raise TimestampValidationError("Invalid timestamp format")
-            elif self.config.require_timestamp:
-                raise TimestampValidationError(f"Missing {self.config.timestamp_header} header")
-            else:
-                results['timestamp_valid'] = True
+            signature, timestamp = self._validate_signature_and_timestamp(body, headers, secret, results)
             
             # Check for replay attacks
             if timestamp and results['signature_valid']:
@@ -302,41 +365,144 @@ class EnhancedSignatureValidator:
             else:
                 results['replay_check_passed'] = True
             
-            # Overall validation result
-            results['is_valid'] = (
-                results['signature_valid'] and
-                results['timestamp_valid'] and
-                results['replay_check_passed']
-            )
+            return self._finish_results(results, timestamp, body)
+            
+        except Exception as e:
+            raise self._validation_failed(results, headers, e)
+    
+    async def comprehensive_validation_async(
+        self,
+        body: bytes,
+        headers: Dict[str, str],
+        secret: str
+    ) -> Dict[str, Any]:
+        """
+        Perform comprehensive webhook validation from a request handler
+        
+        Same checks as comprehensive_validation, with the replay check on
+        the async Redis client. The results carry the claimed 'replay_key'
+        for release_replay_claim.
+        
+        Args:
+            body: Raw request body
+            headers: Request headers
+            secret: Webhook secret
+            
+        Returns:
+            Dict containing validation results
+            
+        Raises:
+            SignatureValidationError: If signature validation fails
+            TimestampValidationError: If timestamp validation fails
+            ReplayAttackError: If replay attack is detected
+        """
+        results = self._new_results()
+        
+        try:
+            signature, timestamp = self._validate_signature_and_timestamp(body, headers, secret, results)
             
-            if results['is_valid']:
-                logger.debug(
-                    "Webhook validation successful",
-                    signature_algorithm=self.config.signature_algorithm,
+            # Only a request with a valid signature and timestamp may claim a
+            # replay key, so a replay is always a correctly signed redelivery
+            if timestamp and results['signature_valid'] and results['timestamp_valid']:
+                results['replay_check_passed'] = await self.check_replay_attack_async(
+                    signature=signature,
                     timestamp=timestamp,
-                    body_size=len(body)
+                    body=body
                 )
+                results['replay_key'] = self.replay_cache_key(signature, timestamp, body)
+            else:
+                results['replay_check_passed'] = True
             
-            return results
+            return self._finish_results(results, timestamp, body)
             
-        except (SignatureValidationError, TimestampValidationError, ReplayAttackError) as e:
-            results['validation_errors'].append(str(e))
-            results['is_valid'] = False
+        except Exception as e:
+            raise self._validation_failed(results, headers, e)
+    
+    def _new_results(self) -> Dict[str, Any]:
+        return {
+            'signature_valid': False,
+            'timestamp_valid': False,
+            'replay_check_passed': False,
+            'validation_errors': [],
+            'security_warnings': []
+        }
+    
+    def _validate_signature_and_timestamp(
+        self,
+        body: bytes,
+        headers: Dict[str, str],
+        secret: str,
+        results: Dict[str, Any]
+    ) -> Tuple[str, Optional[int]]:
+        """Validate the signature and timestamp headers, recording the outcome in results"""
+        # Extract signature from headers
+        signature = headers.get(self.config.signature_header)
+        if not signature:
+            raise SignatureValidationError(f"Missing {self.config.signature_header} header")
+        
+        # Validate signature
+        results['signature_valid'] = self.validate_signature(
+            body=body,
+            signature=signature,
+            secret=secret,
+            algorithm=self.config.signature_algorithm
+        )
+        
+        # Extract and validate timestamp
+        timestamp_str = headers.get(self.config.timestamp_header)
+        timestamp = None
+        
+        if timestamp_str:
+            try:
+                timestamp = int(timestamp_str)
+            except ValueError:
+                raise TimestampValidationError("Invalid timestamp format")
+            results['timestamp_valid'] = self.validate_timestamp(timestamp)
+        elif self.config.require_timestamp:
+            raise TimestampValidationError(f"Missing {self.config.timestamp_header} header")
+        else:
+            results['timestamp_valid'] = True
+        
+        return signature, timestamp
+    
+    def _finish_results(self, results: Dict[str, Any], timestamp: Optional[int], body: bytes) -> Dict[str, Any]:
+        # Overall validation result
+        results['is_valid'] = (
+            results['signature_valid'] and
+            results['timestamp_valid'] and
+            results['replay_check_passed']
+        )
+        
+        if results['is_valid']:
+            logger.debug(
+                "Webhook validation successful",
+                signature_algorithm=self.config.signature_algorithm,
+                timestamp=timestamp,
+                body_size=len(body)
+            )
+        
+        return results
+    
+    def _validation_failed(self, results: Dict[str, Any], headers: Dict[str, str], error: Exception) -> Exception:
+        """Record a validation failure in results and return the exception to raise"""
+        results['is_valid'] = False
+        
+        if isinstance(error, (SignatureValidationError, TimestampValidationError, ReplayAttackError)):
+            results['validation_errors'].append(str(error))
             
             if self.config.alert_on_security_violations:
                 logger.error(
                     "Webhook security validation failed",
-                    error=str(e),
-                    error_type=type(e).__name__,
+                    error=str(error),
+                    error_type=type(error).__name__,
                     headers=self._sanitize_headers(headers)
                 )
             
-            raise
-        except Exception as e:
-            results['validation_errors'].append(f"Unexpected validation error: {str(e)}")
-            results['is_valid'] = False
-            logger.error("Unexpected webhook validation error", error=str(e))
-            raise SignatureValidationError(f"Validation failed: {str(e)}")
+            return error
+        
+        results['validation_errors'].append(f"Unexpected validation error: {str(error)}")
+        logger.error("Unexpected webhook validation error", error=str(error))
+        return SignatureValidationError(f"Validation failed: {str(error)}")
     
     def _sanitize_headers(self, headers: Dict[str, str]) -> Dict[str, str]:
         """Sanitize headers for logging (remove sensitive data)"""
@@ -354,6 +520,33 @@ class EnhancedSignatureValidator:
         return sanitized
 
 
+# Shared Green API validator, so its Redis connections are reused
+_green_api_validator: Optional[EnhancedSignatureValidator] = None
+
+
+def get_green_api_signature_validator() -> EnhancedSignatureValidator:
+    """Get the global Green API signature validator, configured for the environment"""
+    global _green_api_validator
+    if _green_api_validator is None:
+        config = get_webhook_security_config(settings.ENVIRONMENT).providers.green_api
+        _green_api_validator = EnhancedSignatureValidator(config)
+    return _green_api_validator
+
+
+def signature_headers(
+    config: WebhookSecurityConfig,
+    signature: Optional[str],
+    timestamp: Optional[int]
+) -> Dict[str, str]:
+    """Headers carrying a signature and timestamp, as comprehensive_validation reads them"""
+    headers = {}
+    if signature:
+        headers[config.signature_header] = signature
+    if timestamp:
+        headers[config.timestamp_header] = str(timestamp)
+    return headers
+
+
 # Convenience functions for backward compatibility
 def validate_green_api_webhook_enhanced(
     body: bytes,
@@ -376,16 +569,13 @@ def validate_green_api_webhook_enhanced(
         bool: True if webhook is valid
     """
     if config is None:
-        config = GreenAPIWebhookConfig()
-    
-    validator = EnhancedSignatureValidator(config)
+        validator = get_green_api_signature_validator()
+        config = validator.config
+    else:
+        validator = EnhancedSignatureValidator(config)
     
     try:
-        headers = {}
-        if signature:
-            headers[config.signature_header] = signature
-        if timestamp:
-            headers[config.timestamp_header] = str(timestamp)
+        headers = signature_headers(config, signature, timestamp)
         
         result = validator.comprehensive_validation(
             body=body,
@@ -406,5 +596,7 @@ __all__ = [
     'SignatureValidationError',
     'TimestampValidationError', 
     'ReplayAttackError',
+    'get_green_api_signature_validator',
+    'signature_headers',
     'validate_green_api_webhook_enhanced'
 ]
@@ -0,0 +1,218 @@
+"""
+Single-flight request coalescing
+
+Concurrent calls for the same key share one execution. Within a process,
+callers arriving while a call is in flight await the same task, so
+cancelling one caller does not cancel the call for the others. With a
+Redis client, processes coordinate too: the first to take a short lock
+runs the call and publishes its encoded result on a per-key channel,
+which the other processes subscribed to before trying the lock. A
+process that hears nothing before the lock would have expired (its
+holder died) runs the call itself.
+"""
+
+import asyncio
+import functools
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import structlog
+from redis.exceptions import RedisError
+
+from app.core.metrics import track_single_flight
+
+logger = structlog.get_logger(__name__)
+
+# Lua: delete the lock only if it still holds our token
+RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+# Published result payloads: status, separator, encoded result
+RESULT_OK = 'ok'
+RESULT_ERROR = 'error'
+
+
+class SingleFlightError(Exception):
+    """The shared call failed in another process"""
+    pass
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key into one"""
+
+    def __init__(
+        self,
+        name: str,
+        redis_client: Optional[Any] = None,
+        lock_ttl: float = 30.0,
+        key_prefix: str = 'singleflight:'
+    ):
+        """
+        Args:
+            name: Name of the coalesced operation, for keys and metrics
+            redis_client: Async Redis client for coordinating processes;
+                None coalesces within this process only
+            lock_ttl: Seconds the leader may take before others run the call
+            key_prefix: Prefix of lock keys and result channels
+        """
+        self.name = name
+        self.redis_client = redis_client
+        self.lock_ttl = lock_ttl
+        self.key_prefix = f"{key_prefix}{name}:"
+        self._flights: Dict[str, asyncio.Task] = {}
+        self.stats = {
+            'leader': 0,
+            'coalesced': 0,
+            'remote': 0,
+            'fallback': 0
+        }
+
+    async def do(
+        self,
+        key: str,
+        fn: Callable[[], Awaitable[Any]],
+        encode: Optional[Callable[[Any], str]] = None,
+        decode: Optional[Callable[[str], Any]] = None
+    ) -> Any:
+        """
+        Run fn once for all concurrent callers with the same key
+
+        Args:
+            key: Identity of the call, e.g. its cache key
+            fn: Coroutine function performing the call
+            encode: Serializes the result for other processes; without
+                encode and decode, calls are coalesced in-process only
+            decode: Deserializes a result published by another process
+
+        Returns:
+            The result of fn, or of the call it was coalesced with
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = asyncio.ensure_future(self._execute(key, fn, encode, decode))
+            self._flights[key] = flight
+            flight.add_done_callback(functools.partial(self._landed, key))
+        else:
+            self._count('coalesced')
+
+        return await asyncio.shield(flight)
+
+    def _landed(self, key: str, flight: asyncio.Task) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if not flight.cancelled():
+            flight.exception()  # retrieved, even if every caller gave up
+
+    def _count(self, result: str) -> None:
+        self.stats[result] += 1
+        track_single_flight(self.name, result)
+
+    async def _execute(
+        self,
+        key: str,
+        fn: Callable[[], Awaitable[Any]],
+        encode: Optional[Callable[[Any], str]],
+        decode: Optional[Callable[[str], Any]]
+    ) -> Any:
+        if self.redis_client is None or encode is None or decode is None:
+            self._count('leader')
+            return await fn()
+
+        lock_key = f"{self.key_prefix}lock:{key}"
+        channel = f"{self.key_prefix}result:{key}"
+        token = uuid.uuid4().hex
+
+        try:
+            leader, payload = await self._elect(lock_key, channel, token)
+        except (RedisError, OSError) as e:
+            logger.warning("Single-flight coordination failed, calling directly",
+                          flight=self.name,
+                          error=str(e))
+            self._count('fallback')
+            return await fn()
+
+        if not leader:
+            if payload is None:
+                # The leader died or overran its lock
+                self._count('fallback')
+                return await fn()
+
+            status, _, data = payload.partition(':')
+            self._count('remote')
+            if status != RESULT_OK:
+                raise SingleFlightError(f"{self.name} call failed in another process")
+            return decode(data)
+
+        self._count('leader')
+        try:
+            result = await fn()
+        except Exception:
+            await self._publish(lock_key, channel, token, f"{RESULT_ERROR}:")
+            raise
+        await self._publish(lock_key, channel, token, f"{RESULT_OK}:{encode(result)}")
+        return result
+
+    async def _elect(self, lock_key: str, channel: str, token: str) -> Tuple[bool, Optional[str]]:
+        """Take the lock, or wait for its holder's result; (leader, payload)"""
+        pubsub = self.redis_client.pubsub()
+        try:
+            # Subscribe first so a result published once the lock is seen taken is not missed
+            await pubsub.subscribe(channel)
+            acquired = await self.redis_client.set(
+                lock_key, token, nx=True, px=int(self.lock_ttl * 1000)
+            )
+            if acquired:
+                return True, None
+            return False, await self._await_result(pubsub)
+        finally:
+            await pubsub.reset()
+
+    async def _await_result(self, pubsub: Any) -> Optional[str]:
+        deadline = time.monotonic() + self.lock_ttl
+        remaining = self.lock_ttl
+        while remaining > 0:
+            message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=remaining)
+            if message is not None and message.get('type') == 'message':
+                data = message['data']
+                return data.decode('utf-8') if isinstance(data, bytes) else data
+            remaining = deadline - time.monotonic()
+        return None
+
+    async def _publish(self, lock_key: str, channel: str, token: str, payload: str) -> None:
+        """Publish the result and release the lock atomically"""
+        try:
+            async with self.redis_client.pipeline(transaction=True) as pipe:
+                pipe.publish(channel, payload)
+                pipe.eval(RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+                await pipe.execute()
+        except (RedisError, OSError) as e:
+            # Waiting processes fall back once the lock expires
+            logger.warning("Failed to publish single-flight result",
+                          flight=self.name,
+                          error=str(e))
+
+    def in_flight(self) -> int:
+        """Number of calls currently in flight in this process"""
+        return len(self._flights)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get coalescing statistics"""
+        calls = self.stats['leader'] + self.stats['fallback']
+        saved = self.stats['coalesced'] + self.stats['remote']
+        requests = calls + saved
+        return {
+            **self.stats,
+            'in_flight': self.in_flight(),
+            'coalesced_percent': round(saved / requests * 100, 2) if requests else 0
+        }
+
+
+__all__ = [
+    'SingleFlight',
+    'SingleFlightError'
+]
@@ -0,0 +1,108 @@
+"""
+Sentence and paragraph chunking of streamed text
+
+A streamed completion arrives a few characters at a time. To send a long
+answer as a series of WhatsApp messages while it is still being generated,
+the text is cut where a reader would expect a break: always at a blank
+line, and at the end of a sentence once the chunk is long enough to be
+worth a message of its own. A sentence end is only recognized once the
+whitespace after it has arrived, so decimals ("3.5") and a period split
+across deltas do not cut early.
+"""
+
+import re
+from typing import AsyncIterable, AsyncIterator, List, Optional
+
+# Paragraph break: a blank line, possibly with trailing spaces
+PARAGRAPH_BREAK = re.compile(r'\n[ \t]*\n\s*')
+
+# Sentence end: terminal punctuation, optional closing quote/bracket, whitespace
+SENTENCE_END = re.compile(r'[.!?…]+["\')\]»]*\s+')
+
+# Abbreviations whose period does not end a sentence
+ABBREVIATIONS = frozenset({
+    'mr', 'mrs', 'ms', 'dr', 'st', 'no', 'approx', 'e.g', 'i.e', 'etc', 'vs', 'p.m', 'a.m'
+})
+
+
+class SentenceChunker:
+    """Incrementally cuts streamed text into sentence or paragraph chunks"""
+
+    def __init__(self, min_chars: int = 80, max_chars: int = 1000):
+        """
+        Args:
+            min_chars: Sentences are held back until the chunk reaches this
+                length; paragraph breaks cut regardless
+            max_chars: A chunk without any boundary is cut at the last space
+                once it grows past this length
+        """
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self._buffer = ''
+
+    def feed(self, delta: str) -> List[str]:
+        """Add streamed text; returns the chunks it completed"""
+        # Leading whitespace never belongs to a chunk; dropping it keeps
+        # every boundary found by _find_cut preceded by text
+        self._buffer = (self._buffer + delta).lstrip()
+        chunks = []
+        while True:
+            cut = self._find_cut()
+            if cut is None:
+                break
+            chunk, self._buffer = self._buffer[:cut].strip(), self._buffer[cut:].lstrip()
+            if chunk:
+                chunks.append(chunk)
+        return chunks
+
+    def flush(self) -> Optional[str]:
+        """The remaining text once the stream has ended"""
+        chunk, self._buffer = self._buffer.strip(), ''
+        return chunk or None
+
+    def _find_cut(self) -> Optional[int]:
+        paragraph = PARAGRAPH_BREAK.search(self._buffer)
+        if paragraph:
+            return paragraph.end()
+
+        cut = None
+        for match in SENTENCE_END.finditer(self._buffer):
+            if match.start() + 1 < self.min_chars:
+                continue
+            if self._is_abbreviation(match.start()):
+                continue
+            cut = match.end()
+            break
+
+        if cut is None and len(self._buffer) > self.max_chars:
+            space = self._buffer.rfind(' ', 0, self.max_chars)
+            cut = space + 1 if space > 0 else self.max_chars
+        return cut
+
+    def _is_abbreviation(self, end: int) -> bool:
+        if self._buffer[end] != '.':
+            return False
+        start = end
+        while start > 0 and not self._buffer[start - 1].isspace():
+            start -= 1
+        return self._buffer[start:end].lower().lstrip('("\'') in ABBREVIATIONS
+
+
+async def chunk_stream(
+    deltas: AsyncIterable[str],
+    chunker: Optional[SentenceChunker] = None
+) -> AsyncIterator[str]:
+    """Re-chunk a stream of text deltas at sentence and paragraph boundaries"""
+    chunker = chunker or SentenceChunker()
+    async for delta in deltas:
+        for chunk in chunker.feed(delta):
+            yield chunk
+    tail = chunker.flush()
+    if tail:
+        yield tail
+
+
+__all__ = [
+    'SentenceChunker',
+    'chunk_stream'
+]
@@ -3,9 +3,14 @@ Template renderer for WhatsApp Hotel Bot application
 """
 
 import re
-from typing import Dict, Any, List, Optional, Set, Union, TYPE_CHECKING
-from datetime import datetime
-from jinja2 import Environment, BaseLoader, TemplateSyntaxError, UndefinedError, select_autoescape
+import sys
+import time
+import uuid
+from collections import OrderedDict
+from decimal import Decimal
+from typing import Dict, Any, FrozenSet, Hashable, List, Optional, Set, Tuple, Union, TYPE_CHECKING
+from datetime import date, datetime
+from jinja2 import Environment, BaseLoader, Template, TemplateSyntaxError, UndefinedError, meta, select_autoescape
 from jinja2.sandbox import SandboxedEnvironment
 import structlog
 import hashlib
@@ -19,6 +24,18 @@ if TYPE_CHECKING:
 
 logger = get_logger(__name__)
 
+# Rendered output cache bounds
+RENDERED_CACHE_MAX_ENTRIES = 1000
+RENDERED_CACHE_MAX_BYTES = 4 * 1024 * 1024
+
+# Compiled templates are keyed by content and never go stale
+COMPILED_CACHE_MAX_ENTRIES = 256
+
+# Defaults injected by _prepare_context that change on every render
+TIME_DEPENDENT_VARIABLES = frozenset({'now', 'today'})
+
+_SCALAR_TYPES = (str, int, float, bool, type(None), datetime, date, uuid.UUID, Decimal)
+
 
 class TemplateRendererError(Exception):
     """Base exception for template renderer errors"""
@@ -35,22 +52,166 @@ class TemplateRenderingError(TemplateRendererError):
     pass
 
 
+class _Uncacheable(Exception):
+    """Raised when a context value cannot be part of a cache key"""
+    pass
+
+
+def _freeze(value: Any) -> Hashable:
+    """
+    Convert a context value into a hashable cache key component
+
+    Only plain data is accepted; arbitrary objects may render differently
+    with an equal repr, so they make the render uncacheable.
+    """
+    if isinstance(value, _SCALAR_TYPES):
+        # Keep 1, 1.0 and True apart: they hash equal but render differently
+        return (type(value).__name__, value)
+    if isinstance(value, dict):
+        return ('dict', tuple(sorted(
+            ((str(k), _freeze(v)) for k, v in value.items()),
+            key=lambda item: item[0]
+        )))
+    if isinstance(value, (list, tuple)):
+        return ('list', tuple(_freeze(v) for v in value))
+    raise _Uncacheable(type(value).__name__)
+
+
+class CompiledTemplate:
+    """Validated, compiled template with the root variables it references"""
+
+    __slots__ = ('key', 'template', 'variables', 'time_dependent')
+
+    def __init__(self, key: str, template: Template, variables: FrozenSet[str]):
+        self.key = key
+        self.template = template
+        # Sorted so cache keys are built in a stable order
+        self.variables: Tuple[str, ...] = tuple(sorted(variables))
+        self.time_dependent = bool(variables & TIME_DEPENDENT_VARIABLES)
+
+
+class RenderCache:
+    """
+    LRU cache bounded by entry count and total size, with per-entry TTL
+
+    Entries live in an OrderedDict ordered by recency, so lookups, inserts
+    and evictions are O(1).
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        max_bytes: Optional[int] = None,
+        ttl_seconds: Optional[float] = None
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        # key -> (value, size_bytes, expires_at)
+        self._entries: "OrderedDict[Hashable, Tuple[Any, int, Optional[float]]]" = OrderedDict()
+        self.size_bytes = 0
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'expirations': 0
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Get a live value and mark it most recently used"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats['misses'] += 1
+            return None
+
+        value, size, expires_at = entry
+        if expires_at is not None and time.monotonic() >= expires_at:
+            del self._entries[key]
+            self.size_bytes -= size
+            self.stats['expirations'] += 1
+            self.stats['misses'] += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.stats['hits'] += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, size_bytes: int = 0) -> bool:
+        """
+        Store a value, evicting least recently used entries to fit
+
+        Returns:
+            bool: False if the value alone exceeds the byte limit
+        """
+        if self.max_bytes is not None and size_bytes > self.max_bytes:
+            return False
+
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.size_bytes -= previous[1]
+
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds else None
+        self._entries[key] = (value, size_bytes, expires_at)
+        self.size_bytes += size_bytes
+
+        while len(self._entries) > self.max_entries or (
+            self.max_bytes is not None and self.size_bytes > self.max_bytes
+        ):
+            _, (_, evicted_size, _) = self._entries.popitem(last=False)
+            self.size_bytes -= evicted_size
+            self.stats['evictions'] += 1
+        return True
+
+    def clear(self) -> None:
+        """Drop all entries; statistics are kept"""
+        self._entries.clear()
+        self.size_bytes = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        lookups = self.stats['hits'] + self.stats['misses']
+        return {
+            **self.stats,
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'size_bytes': self.size_bytes,
+            'max_bytes': self.max_bytes,
+            'hit_rate': self.stats['hits'] / lookups if lookups else 0.0
+        }
+
+
 class TemplateRenderer:
     """Renders Jinja2 templates with security sandboxing and caching"""
 
-    def __init__(self, cache_enabled: bool = True, cache_ttl: int = 3600):
+    def __init__(
+        self,
+        cache_enabled: bool = True,
+        cache_ttl: int = 3600,
+        max_cache_entries: int = RENDERED_CACHE_MAX_ENTRIES,
+        max_cache_bytes: int = RENDERED_CACHE_MAX_BYTES
+    ):
         """
         Initialize template renderer with sandboxed environment
 
         Args:
             cache_enabled: Whether to enable template caching
             cache_ttl: Cache time-to-live in seconds
+            max_cache_entries: Maximum number of rendered results kept
+            max_cache_bytes: Maximum total size of rendered results kept
         """
         self.logger = logger.bind(service="template_renderer")
         self.cache_enabled = cache_enabled
         self.cache_ttl = cache_ttl
-        self._template_cache: Dict[str, Dict[str, Any]] = {}
-        self._rendered_cache: Dict[str, Dict[str, Any]] = {}
+        self._template_cache = RenderCache(max_entries=COMPILED_CACHE_MAX_ENTRIES)
+        self._rendered_cache = RenderCache(
+            max_entries=max_cache_entries,
+            max_bytes=max_cache_bytes,
+            ttl_seconds=cache_ttl
+        )
+        self._uncacheable_renders = 0
 
         # Create sandboxed Jinja2 environment for security
         self.env = SandboxedEnvironment(
@@ -107,40 +268,40 @@ class TemplateRenderer:
         self.env.filters['capitalize_name'] = capitalize_name
         self.env.filters['truncate'] = truncate_text
 
-    def _generate_cache_key(self, template_string: str, context: Dict[str, Any]) -> str:
+    def _generate_cache_key(
+        self,
+        compiled: CompiledTemplate,
+        context: Dict[str, Any]
+    ) -> Optional[Hashable]:
         """
         Generate cache key for template and context combination
 
-        Args:
-            template_string: Template content
-            context: Context variables
-
-        Returns:
-            str: Cache key
-        """
-        # Create a hash of template content and context
-        content_hash = hashlib.md5(template_string.encode()).hexdigest()
-        context_hash = hashlib.md5(json.dumps(context, sort_keys=True).encode()).hexdigest()
-        return f"{content_hash}_{context_hash}"
-
-    def _is_cache_valid(self, cache_entry: Dict[str, Any]) -> bool:
-        """
-        Check if cache entry is still valid
+        Only the root variables the template references take part, so
+        unrelated context such as event timestamps does not defeat caching.
 
         Args:
-            cache_entry: Cache entry to check
+            compiled: Compiled template
+            context: Context variables
 
         Returns:
-            bool: True if cache is valid
+            Optional[Hashable]: Cache key, or None if the render cannot be cached
         """
         if not self.cache_enabled:
-            return False
-
-        cache_time = cache_entry.get('timestamp', 0)
-        current_time = datetime.utcnow().timestamp()
-        return (current_time - cache_time) < self.cache_ttl
+            return None
 
-    def _get_from_cache(self, cache_key: str) -> Optional[str]:
+        values = []
+        for name in compiled.variables:
+            if name in context:
+                try:
+                    values.append((name, _freeze(context[name])))
+                except _Uncacheable:
+                    return None
+            elif name in TIME_DEPENDENT_VARIABLES:
+                # Falls back to the current time in _prepare_context
+                return None
+        return (compiled.key, tuple(values))
+
+    def _get_from_cache(self, cache_key: Optional[Hashable]) -> Optional[str]:
         """
         Get rendered template from cache
 
@@ -150,17 +311,11 @@ class TemplateRenderer:
         Returns:
             Optional[str]: Cached rendered template or None
         """
-        if not self.cache_enabled:
+        if cache_key is None:
             return None
+        return self._rendered_cache.get(cache_key)
 
-        cache_entry = self._rendered_cache.get(cache_key)
-        if cache_entry and self._is_cache_valid(cache_entry):
-            self.logger.debug("Template cache hit", cache_key=cache_key)
-            return cache_entry['content']
-
-        return None
-
-    def _store_in_cache(self, cache_key: str, content: str) -> None:
+    def _store_in_cache(self, cache_key: Optional[Hashable], content: str) -> None:
         """
         Store rendered template in cache
 
@@ -168,21 +323,43 @@ class TemplateRenderer:
             cache_key: Cache key
             content: Rendered content
         """
-        if not self.cache_enabled:
+        if cache_key is None:
             return
+        self._rendered_cache.set(cache_key, content, sys.getsizeof(content))
 
-        self._rendered_cache[cache_key] = {
-            'content': content,
-            'timestamp': datetime.utcnow().timestamp()
-        }
+    async def _get_compiled_template(self, template_string: str) -> CompiledTemplate:
+        """
+        Get a validated, compiled template, compiling it on first use
 
-        # Clean up old cache entries (simple LRU-like cleanup)
-        if len(self._rendered_cache) > 1000:  # Max cache size
-            oldest_key = min(
-                self._rendered_cache.keys(),
-                key=lambda k: self._rendered_cache[k]['timestamp']
+        Args:
+            template_string: Template content
+
+        Returns:
+            CompiledTemplate: Compiled template
+
+        Raises:
+            TemplateValidationError: If validation fails
+        """
+        compiled = self._template_cache.get(template_string)
+        if compiled is not None:
+            return compiled
+
+        validation = await self.validate_template(template_string)
+        if not validation.is_valid:
+            raise TemplateValidationError(
+                f"Template validation failed: {', '.join(validation.errors)}"
             )
-            del self._rendered_cache[oldest_key]
+
+        parsed = self.env.parse(template_string)
+        compiled = CompiledTemplate(
+            key=hashlib.md5(template_string.encode()).hexdigest(),
+            template=self.env.from_string(parsed),
+            # Unlike _extract_template_variables this also sees variables
+            # used only in tags such as {% if %} and {% for %}
+            variables=frozenset(meta.find_undeclared_variables(parsed))
+        )
+        self._template_cache.set(template_string, compiled)
+        return compiled
 
     def clear_cache(self) -> None:
         """Clear all cached templates"""
@@ -190,6 +367,21 @@ class TemplateRenderer:
         self._rendered_cache.clear()
         self.logger.info("Template cache cleared")
 
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """
+        Get hit/miss statistics of the compiled and rendered caches
+
+        Returns:
+            Dict[str, Any]: Cache statistics
+        """
+        return {
+            'enabled': self.cache_enabled,
+            'ttl_seconds': self.cache_ttl,
+            'compiled': self._template_cache.get_stats(),
+            'rendered': self._rendered_cache.get_stats(),
+            'uncacheable_renders': self._uncacheable_renders
+        }
+
     async def render_template(
         self,
         template_string: str,
@@ -209,27 +401,22 @@ class TemplateRenderer:
             TemplateRenderingError: If rendering fails
         """
         try:
+            # Validated and compiled once per distinct template
+            compiled = await self._get_compiled_template(template_string)
+
             # Check cache first
-            cache_key = self._generate_cache_key(template_string, context)
+            cache_key = self._generate_cache_key(compiled, context)
             cached_result = self._get_from_cache(cache_key)
             if cached_result is not None:
                 return cached_result
-
-            # Validate template first
-            validation = await self.validate_template(template_string)
-            if not validation.is_valid:
-                raise TemplateValidationError(
-                    f"Template validation failed: {', '.join(validation.errors)}"
-                )
-
-            # Create template object
-            template = self.env.from_string(template_string)
+            if cache_key is None and self.cache_enabled:
+                self._uncacheable_renders += 1
 
             # Add safe defaults to context
             safe_context = self._prepare_context(context)
             
             # Render template
-            rendered = template.render(**safe_context)
+            rendered = compiled.template.render(**safe_context)
 
             # Clean up whitespace
             rendered = self._clean_rendered_text(rendered)
@@ -241,7 +428,7 @@ class TemplateRenderer:
                 "Template rendered successfully",
                 template_length=len(template_string),
                 rendered_length=len(rendered),
-                cache_key=cache_key
+                cached=cache_key is not None
             )
 
             return rendered
@@ -515,6 +702,8 @@ class TemplateRenderer:
 
 # Export renderer and exceptions
 __all__ = [
+    'CompiledTemplate',
+    'RenderCache',
     'TemplateRenderer',
     'TemplateRendererError',
     'TemplateValidationError',
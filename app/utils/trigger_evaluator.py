@@ -4,15 +4,27 @@ Trigger condition evaluator for WhatsApp Hotel Bot application
 
 import re
 from datetime import datetime, time, timedelta
-from typing import Dict, Any, List, Union, Optional
+from typing import Callable, Dict, Any, List, Union, Optional
 import structlog
 
 from app.models.trigger import TriggerType
 from app.core.logging import get_logger
-from app.utils.cron_parser import CronParser
+from app.utils.cron_parser import CronParser, compile_cron_expression
+from app.utils.message_analysis import MessageAnalysis
 
 logger = get_logger(__name__)
 
+# Compiled trigger conditions: context -> should the trigger fire
+ConditionPredicate = Callable[[Dict[str, Any]], bool]
+
+
+def _never(context: Dict[str, Any]) -> bool:
+    return False
+
+
+def _always(context: Dict[str, Any]) -> bool:
+    return True
+
 
 class TriggerEvaluatorError(Exception):
     """Base exception for trigger evaluator errors"""
@@ -63,6 +75,182 @@ class TriggerEvaluator:
             )
             return False
     
+    def compile_conditions(
+        self,
+        trigger_type: TriggerType,
+        conditions: Dict[str, Any]
+    ) -> ConditionPredicate:
+        """
+        Compile trigger conditions into a predicate over the context
+        
+        Everything that does not depend on the context (cron expressions,
+        ISO times, field paths, operators, regexes) is parsed once here, so
+        evaluating the predicate only reads the context. Semantics match
+        evaluate_conditions; errors evaluate to False.
+        
+        Args:
+            trigger_type: Type of trigger
+            conditions: Trigger conditions
+            
+        Returns:
+            ConditionPredicate: Callable returning True if conditions are met
+        """
+        try:
+            conditions = conditions or {}
+            if trigger_type == TriggerType.TIME_BASED:
+                predicate = self._compile_time_based(conditions.get('time_based', {}))
+            elif trigger_type == TriggerType.CONDITION_BASED:
+                predicate = self._compile_condition_based(conditions.get('condition_based', {}))
+            elif trigger_type == TriggerType.EVENT_BASED:
+                predicate = self._compile_event_based(conditions.get('event_based', {}))
+            else:
+                self.logger.warning(f"Unknown trigger type: {trigger_type}")
+                return _never
+        except Exception as e:
+            self.logger.error(
+                "Error compiling trigger conditions",
+                trigger_type=getattr(trigger_type, 'value', trigger_type),
+                error=str(e)
+            )
+            return _never
+        
+        if predicate in (_never, _always):
+            return predicate
+        
+        def guarded(context: Dict[str, Any]) -> bool:
+            try:
+                return predicate(context)
+            except Exception as e:
+                self.logger.error(
+                    "Error evaluating compiled trigger conditions",
+                    trigger_type=trigger_type.value,
+                    error=str(e)
+                )
+                return False
+        return guarded
+    
+    def _compile_time_based(self, time_conditions: Dict[str, Any]) -> ConditionPredicate:
+        """Compile time-based conditions"""
+        schedule_type = time_conditions.get('schedule_type')
+        
+        if schedule_type in ('hours_after_checkin', 'days_after_checkin'):
+            if schedule_type == 'hours_after_checkin':
+                delay = timedelta(hours=time_conditions.get('hours_after', 0))
+            else:
+                delay = timedelta(days=time_conditions.get('days_after', 0))
+            
+            def after_reference(context: Dict[str, Any]) -> bool:
+                current_time = datetime.utcnow()
+                reference_time = context.get('reference_time', current_time)
+                if isinstance(reference_time, str):
+                    reference_time = datetime.fromisoformat(reference_time.replace('Z', '+00:00'))
+                return current_time >= reference_time + delay
+            return after_reference
+        
+        if schedule_type == 'specific_time':
+            specific_time = time_conditions.get('specific_time')
+            if not specific_time:
+                return _never
+            target_time = (
+                time.fromisoformat(specific_time) if isinstance(specific_time, str) else specific_time
+            )
+            return lambda context: datetime.utcnow().time() >= target_time
+        
+        if schedule_type == 'immediate':
+            return _always
+        
+        if schedule_type == 'cron_expression':
+            cron_expr = time_conditions.get('cron_expression')
+            if not cron_expr:
+                return _never
+            try:
+                schedule = compile_cron_expression(cron_expr)
+            except Exception as e:
+                self.logger.error(
+                    "Error evaluating cron expression",
+                    cron_expr=cron_expr,
+                    error=str(e)
+                )
+                return _never
+            return lambda context: schedule.matches(datetime.utcnow())
+        
+        return _never
+    
+    def _compile_condition_based(self, condition_data: Dict[str, Any]) -> ConditionPredicate:
+        """Compile condition-based conditions"""
+        condition_list = condition_data.get('conditions', [])
+        logic = condition_data.get('logic', 'AND')
+        
+        if not condition_list:
+            return _always
+        if logic not in ('AND', 'OR'):
+            self.logger.warning(f"Unknown logic operator: {logic}")
+            return _never
+        
+        checks = []
+        for condition in condition_list:
+            operator = condition.get('operator')
+            check = self._operator_check(operator, condition.get('value'))
+            if check is None:
+                self.logger.warning(f"Unknown operator: {operator}")
+                check = _never
+            field_path = condition.get('field')
+            path = tuple(field_path.split('.')) if isinstance(field_path, str) else None
+            # Substring checks can read the message's shared analysis instead of re-lowering it
+            accepts_analysis = operator in ('contains', 'not_contains')
+            checks.append((path, check, accepts_analysis))
+        
+        def evaluate(context: Dict[str, Any]) -> bool:
+            analysis = context.get('message_analysis')
+            
+            def value_at(path: Optional[tuple], accepts_analysis: bool) -> Any:
+                value = self._get_path_value(context, path)
+                if (accepts_analysis and isinstance(analysis, MessageAnalysis)
+                        and isinstance(value, str) and analysis.describes(value)):
+                    return analysis
+                return value
+            
+            results = (check(value_at(path, accepts_analysis)) for path, check, accepts_analysis in checks)
+            return all(results) if logic == 'AND' else any(results)
+        return evaluate
+    
+    def _compile_event_based(self, event_conditions: Dict[str, Any]) -> ConditionPredicate:
+        """Compile event-based conditions"""
+        expected_event_type = event_conditions.get('event_type')
+        delay = timedelta(minutes=event_conditions.get('delay_minutes', 0))
+        event_filters = tuple(event_conditions.get('event_filters', {}).items())
+        
+        def evaluate(context: Dict[str, Any]) -> bool:
+            if context.get('event_type') != expected_event_type:
+                return False
+            
+            if delay:
+                event_time = context.get('event_time')
+                if event_time:
+                    if isinstance(event_time, str):
+                        event_time = datetime.fromisoformat(event_time.replace('Z', '+00:00'))
+                    if datetime.utcnow() < event_time + delay:
+                        return False
+            
+            for filter_key, filter_value in event_filters:
+                if context.get(filter_key) != filter_value:
+                    return False
+            return True
+        return evaluate
+    
+    @staticmethod
+    def _get_path_value(data: Dict[str, Any], keys: Optional[tuple]) -> Any:
+        """Like _get_nested_value for a pre-split path"""
+        if keys is None:
+            return None
+        current = data
+        for key in keys:
+            if isinstance(current, dict) and key in current:
+                current = current[key]
+            else:
+                return None
+        return current
+    
     async def _evaluate_time_based_conditions(
         self,
         conditions: Dict[str, Any],
@@ -118,8 +306,7 @@ class TriggerEvaluator:
                 if cron_expr:
                     # Check if current time matches cron expression
                     try:
-                        parsed_cron = self.cron_parser.parse_cron_expression(cron_expr)
-                        return self.cron_parser._time_matches_cron(current_time, parsed_cron)
+                        return self.cron_parser.matches(cron_expr, current_time)
                     except Exception as e:
                         self.logger.error(
                             "Error evaluating cron expression",
@@ -291,59 +478,11 @@ class TriggerEvaluator:
             bool: True if condition is met
         """
         try:
-            if operator == 'equals':
-                return actual_value == expected_value
-            
-            elif operator == 'not_equals':
-                return actual_value != expected_value
-            
-            elif operator == 'greater_than':
-                return self._safe_numeric_compare(actual_value, expected_value, lambda a, b: a > b)
-            
-            elif operator == 'less_than':
-                return self._safe_numeric_compare(actual_value, expected_value, lambda a, b: a < b)
-            
-            elif operator == 'greater_equal':
-                return self._safe_numeric_compare(actual_value, expected_value, lambda a, b: a >= b)
-            
-            elif operator == 'less_equal':
-                return self._safe_numeric_compare(actual_value, expected_value, lambda a, b: a <= b)
-            
-            elif operator == 'contains':
-                if isinstance(actual_value, str) and isinstance(expected_value, str):
-                    return expected_value.lower() in actual_value.lower()
-                elif isinstance(actual_value, (list, tuple)):
-                    return expected_value in actual_value
-                return False
-            
-            elif operator == 'not_contains':
-                if isinstance(actual_value, str) and isinstance(expected_value, str):
-                    return expected_value.lower() not in actual_value.lower()
-                elif isinstance(actual_value, (list, tuple)):
-                    return expected_value not in actual_value
-                return True
-            
-            elif operator == 'in':
-                if isinstance(expected_value, (list, tuple)):
-                    return actual_value in expected_value
-                return False
-            
-            elif operator == 'not_in':
-                if isinstance(expected_value, (list, tuple)):
-                    return actual_value not in expected_value
-                return True
-            
-            elif operator == 'regex':
-                if isinstance(actual_value, str) and isinstance(expected_value, str):
-                    try:
-                        return bool(re.search(expected_value, actual_value))
-                    except re.error:
-                        return False
-                return False
-            
-            else:
+            check = self._operator_check(operator, expected_value)
+            if check is None:
                 self.logger.warning(f"Unknown operator: {operator}")
                 return False
+            return check(actual_value)
                 
         except Exception as e:
             self.logger.error(
@@ -353,6 +492,65 @@ class TriggerEvaluator:
             )
             return False
     
+    def _operator_check(self, operator: str, expected_value: Any) -> Optional[Callable[[Any], bool]]:
+        """
+        Bind an operator to its expected value
+        
+        Returns:
+            Optional[Callable[[Any], bool]]: Check over the actual value,
+                or None for an unknown operator
+        """
+        if operator == 'equals':
+            return lambda actual: actual == expected_value
+        
+        if operator == 'not_equals':
+            return lambda actual: actual != expected_value
+        
+        comparisons = {
+            'greater_than': lambda a, b: a > b,
+            'less_than': lambda a, b: a < b,
+            'greater_equal': lambda a, b: a >= b,
+            'less_equal': lambda a, b: a <= b
+        }
+        if operator in comparisons:
+            compare = comparisons[operator]
+            return lambda actual: self._safe_numeric_compare(actual, expected_value, compare)
+        
+        if operator in ('contains', 'not_contains'):
+            negate = operator == 'not_contains'
+            needle = expected_value.lower() if isinstance(expected_value, str) else None
+            
+            def contains(actual: Any) -> bool:
+                if isinstance(actual, MessageAnalysis):
+                    return (needle is not None and needle in actual.lower) != negate
+                if isinstance(actual, str) and needle is not None:
+                    return (needle in actual.lower()) != negate
+                if isinstance(actual, (list, tuple)):
+                    return (expected_value in actual) != negate
+                return negate
+            return contains
+        
+        if operator == 'in':
+            if isinstance(expected_value, (list, tuple)):
+                return lambda actual: actual in expected_value
+            return _never
+        
+        if operator == 'not_in':
+            if isinstance(expected_value, (list, tuple)):
+                return lambda actual: actual not in expected_value
+            return _always
+        
+        if operator == 'regex':
+            if not isinstance(expected_value, str):
+                return _never
+            try:
+                pattern = re.compile(expected_value)
+            except re.error:
+                return _never
+            return lambda actual: isinstance(actual, str) and bool(pattern.search(actual))
+        
+        return None
+    
     def _safe_numeric_compare(
         self,
         actual_value: Any,
@@ -397,5 +595,6 @@ class TriggerEvaluator:
 # Export evaluator and exceptions
 __all__ = [
     'TriggerEvaluator',
-    'TriggerEvaluatorError'
+    'TriggerEvaluatorError',
+    'ConditionPredicate'
 ]
@@ -0,0 +1,142 @@
+"""
+Webhook request bodies, read, verified and parsed once per request
+
+The webhook security stage reads the body, parses and sanitizes it,
+verifies its signature and claims its replay key, then leaves the result
+in request state. A correctly signed delivery whose replay key is already
+claimed is a redelivery, not an attack: it is marked replayed. Incoming
+messages are then answered through message deduplication, so Green API
+retries of a delivery that failed are still processed; other webhook types
+are acknowledged without being processed again. The webhook endpoints pick
+it up from there instead of reading and parsing the body again, and skip
+the checks the stage already made. When the stage did not run (webhook security disabled) the endpoint
+reads the payload through the same function, still once.
+"""
+
+import uuid
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from fastapi import Request
+
+from app.utils import fast_json
+from app.utils.signature_validator import (
+    EnhancedSignatureValidator, ReplayAttackError, signature_headers
+)
+from app.validators.security_validators import validate_safe_json
+
+# Attribute of request.state holding the WebhookPayload
+WEBHOOK_PAYLOAD_STATE = "webhook_payload"
+
+
+@dataclass
+class WebhookPayload:
+    """A webhook request's body, its parsed data and what has been verified"""
+
+    body: bytes
+    data: Any
+    # Hotel whose webhook token verified the signature, None if not verified
+    verified_hotel_id: Optional[uuid.UUID] = None
+    # Replay protection key claimed for this delivery
+    replay_key: Optional[str] = None
+    # Verified, but an earlier delivery of the same request claimed the key
+    replayed: bool = False
+
+    def verified_for(self, hotel_id: uuid.UUID) -> bool:
+        """Whether the signature was verified with the given hotel's token"""
+        return self.verified_hotel_id is not None and self.verified_hotel_id == hotel_id
+
+    def timestamp(self, header_value: Optional[str] = None) -> Optional[Any]:
+        """Delivery timestamp, from its header or else from the payload"""
+        if header_value:
+            return header_value
+        if isinstance(self.data, dict):
+            return self.data.get("timestamp")
+        return None
+
+
+def parse_webhook_body(body: bytes) -> Any:
+    """
+    Parse and sanitize a webhook body
+
+    Raises:
+        ValueError: If the body is not valid JSON or fails sanitization
+    """
+    return validate_safe_json(fast_json.loads(body))
+
+
+async def read_webhook_payload(request: Request) -> WebhookPayload:
+    """
+    The request's webhook payload, read and parsed on first use
+
+    Raises:
+        ValueError: If the body is not valid JSON or fails sanitization
+    """
+    payload = getattr(request.state, WEBHOOK_PAYLOAD_STATE, None)
+    if payload is None:
+        body = await request.body()
+        payload = WebhookPayload(body=body, data=parse_webhook_body(body))
+        setattr(request.state, WEBHOOK_PAYLOAD_STATE, payload)
+    return payload
+
+
+async def verify_webhook_payload(
+    payload: WebhookPayload,
+    validator: EnhancedSignatureValidator,
+    hotel_id: uuid.UUID,
+    secret: str,
+    signature: Optional[str],
+    timestamp_header: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Verify a payload's signature, timestamp and replay key for a hotel
+
+    On success the payload records the hotel and the claimed replay key;
+    a verified redelivery is valid and marked replayed.
+
+    Args:
+        payload: Webhook payload
+        validator: Signature validator for the webhook provider
+        hotel_id: Hotel the webhook is for
+        secret: The hotel's webhook token
+        signature: Signature header value
+        timestamp_header: Timestamp header value; the payload's timestamp is used without it
+
+    Returns:
+        Dict containing validation results
+
+    Raises:
+        SignatureValidationError: If signature validation fails
+        TimestampValidationError: If timestamp validation fails
+    """
+    headers = signature_headers(validator.config, signature, payload.timestamp(timestamp_header))
+    try:
+        result = await validator.comprehensive_validation_async(
+            body=payload.body,
+            headers=headers,
+            secret=secret
+        )
+    except ReplayAttackError as e:
+        # Replay keys are only checked once signature and timestamp passed
+        payload.verified_hotel_id = hotel_id
+        payload.replayed = True
+        return {
+            'is_valid': True,
+            'replayed': True,
+            'validation_errors': [],
+            'security_warnings': [str(e)]
+        }
+
+    if result['is_valid']:
+        payload.verified_hotel_id = hotel_id
+        payload.replay_key = result.get('replay_key')
+    return result
+
+
+__all__ = [
+    'WEBHOOK_PAYLOAD_STATE',
+    'WebhookPayload',
+    'parse_webhook_body',
+    'read_webhook_payload',
+    'verify_webhook_payload'
+]
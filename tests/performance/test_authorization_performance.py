@@ -0,0 +1,128 @@
+"""
+Authorization cost per request: permission lists and pattern loops versus
+compiled path maps and permission bitsets
+
+The list version is what AdminPermissionMiddleware and
+HotelPermissionMiddleware did per request before their permission maps
+were compiled: try every pattern in turn, then look each required
+permission up in the user's permission list. The compiled version does
+one regex match and one AND of masks.
+"""
+
+import statistics
+import time
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from app.middleware.admin_auth_middleware import AdminPermissionMiddleware
+from app.middleware.tenant_middleware import HotelPermissionMiddleware
+from app.models.admin_user import AdminPermission, AdminRole, AdminUser
+from app.services.principal_cache import Principal
+from app.utils.path_matcher import PREFIX, WILDCARD, PathPatternMap
+from app.utils.permission_bits import ADMIN_PERMISSION_BITS
+
+
+CHECKS = 20000
+ROUNDS = 5
+PATHS = [
+    "/api/v1/admin/analytics/overview",
+    "/api/v1/admin/users/42",
+    "/api/v1/admin/settings",
+    "/api/v1/admin/reports/monthly",
+    "/api/v1/admin/monitoring/health",
+    "/api/v1/admin/hotels/42",
+    "/api/v1/admin/dashboard"
+]
+HOTEL_PATHS = [
+    "/api/v1/hotels/42/messages",
+    "/api/v1/hotels/42/export",
+    "/api/v1/hotels/42/guests"
+]
+
+
+def make_admin():
+    permissions = AdminUser.get_default_role_permissions(AdminRole.HOTEL_ADMIN)
+    return SimpleNamespace(
+        id=uuid.uuid4(),
+        role=AdminRole.HOTEL_ADMIN,
+        permissions=permissions,
+        hotel_id=uuid.uuid4(),
+        is_active=True,
+        locked_until=None
+    )
+
+
+def legacy_path_matches(path, pattern):
+    parts = pattern.split('*')
+    if len(parts) == 1:
+        return path == pattern
+    if not path.startswith(parts[0]):
+        return False
+    if parts[-1] and not path.endswith(parts[-1]):
+        return False
+    return True
+
+
+def legacy_authorize(admin, admin_map, hotel_map, path, hotel_path):
+    allowed = True
+    for pattern, permissions in admin_map.items():
+        if path.startswith(pattern):
+            for permission in permissions:
+                if admin.role != AdminRole.SUPER_ADMIN and permission.value not in admin.permissions:
+                    allowed = False
+            break
+    for pattern, permissions in hotel_map.items():
+        if legacy_path_matches(hotel_path, pattern):
+            break
+    return allowed
+
+
+def compiled_authorize(principal, admin_required, hotel_required, path, hotel_path):
+    required = admin_required.lookup(path)
+    allowed = required is None or principal.allows(required[1])
+    hotel_required.lookup(hotel_path)
+    return allowed
+
+
+def per_check(fn, *args):
+    """Median seconds per authorization over several rounds"""
+    rounds = []
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        for i in range(CHECKS):
+            fn(*args, PATHS[i % len(PATHS)], HOTEL_PATHS[i % len(HOTEL_PATHS)])
+        rounds.append((time.perf_counter() - started) / CHECKS)
+    return statistics.median(rounds)
+
+
+@pytest.mark.performance
+@pytest.mark.benchmark
+class TestAuthorizationPerformance:
+    """Authorization cost per request"""
+
+    def test_compiled_authorization_is_cheaper(self):
+        """Compiled path maps and bitsets authorize faster than lists and loops"""
+        admin = make_admin()
+        principal = Principal.from_admin_user(admin)
+        admin_map = AdminPermissionMiddleware._default_permission_map(None)
+        hotel_map = HotelPermissionMiddleware(None).permission_map
+        admin_required = PathPatternMap(
+            {pattern: (permissions, ADMIN_PERMISSION_BITS.mask(permissions)) for pattern, permissions in admin_map.items()},
+            syntax=PREFIX
+        )
+        hotel_required = PathPatternMap(hotel_map, syntax=WILDCARD)
+
+        for i, path in enumerate(PATHS):
+            hotel_path = HOTEL_PATHS[i % len(HOTEL_PATHS)]
+            assert (
+                legacy_authorize(admin, admin_map, hotel_map, path, hotel_path)
+                == compiled_authorize(principal, admin_required, hotel_required, path, hotel_path)
+            )
+
+        legacy = per_check(legacy_authorize, admin, admin_map, hotel_map)
+        compiled = per_check(compiled_authorize, principal, admin_required, hotel_required)
+
+        print(f"\nauthorization per request: lists {legacy * 1e9:.0f}ns, compiled {compiled * 1e9:.0f}ns")
+        assert compiled < legacy
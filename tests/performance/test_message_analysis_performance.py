@@ -0,0 +1,90 @@
+"""
+CPU per incoming message with and without a shared MessageAnalysis
+
+Runs the text-processing steps of the incoming pipeline (parsing, language
+detection, token estimate, rule-based intent, escalation keyword checks)
+over a corpus of distinct messages. "Unshared" disables the keyword scan
+cache and passes no analysis, so each step scans the text itself as before;
+"shared" creates one analysis per message and hands it to every step.
+"""
+
+import random
+import time
+from unittest.mock import Mock
+
+import pytest
+
+from app.services.token_optimizer import TokenOptimizer
+from app.utils.escalation_rules import EscalationRuleEngine
+from app.utils.intent_classifier import IntentClassifier
+from app.utils.keyword_matcher import get_keyword_registry
+from app.utils.language_detector import LanguageDetector
+from app.utils.message_analysis import MessageAnalysis
+from app.utils.message_parser import MessageParser
+
+
+WORDS = (
+    "hello please room wifi broken booking cancel refund thank you great terrible "
+    "help urgent towels breakfast pool check-in tomorrow manager not working the a is"
+).split()
+
+
+def make_corpus(size: int):
+    """Distinct guest-like messages"""
+    rng = random.Random(42)
+    return [
+        f"{' '.join(rng.choice(WORDS) for _ in range(rng.randint(5, 40)))} #{i} room {rng.randint(100, 999)}"
+        for i in range(size)
+    ]
+
+
+@pytest.mark.performance
+@pytest.mark.benchmark
+class TestMessageAnalysisPerformance:
+    """Per-message CPU before and after sharing the analysis"""
+
+    @pytest.fixture
+    def steps(self):
+        """Pipeline steps that read the message text"""
+        return {
+            'parser': MessageParser(),
+            'detector': LanguageDetector(),
+            'optimizer': TokenOptimizer(),
+            'classifier': IntentClassifier(Mock()),
+            'escalation': EscalationRuleEngine()
+        }
+
+    @staticmethod
+    def run_pipeline(steps, text, analysis=None):
+        steps['parser'].parse_message(text, {}, analysis)
+        steps['detector'].detect_language(text, analysis=analysis)
+        steps['optimizer'].estimate_tokens(text, analysis)
+        matches = analysis.keyword_matches if analysis else None
+        steps['classifier']._classify_with_rules(text, matches)
+        steps['escalation'].check_complaint_keywords(text)
+        steps['escalation'].check_emergency_keywords(text)
+
+    def test_shared_analysis_reduces_cpu_per_message(self, steps):
+        """Sharing one analysis costs less CPU per message than rescanning"""
+        corpus = make_corpus(2000)
+        registry = get_keyword_registry()
+        cache_size = registry.scan_cache_size
+
+        try:
+            registry.scan_cache_size = 0
+            registry._scans.clear()
+            started = time.process_time()
+            for text in corpus:
+                self.run_pipeline(steps, text)
+            unshared = (time.process_time() - started) / len(corpus)
+        finally:
+            registry.scan_cache_size = cache_size
+
+        registry._scans.clear()
+        started = time.process_time()
+        for text in corpus:
+            self.run_pipeline(steps, text, MessageAnalysis(text))
+        shared = (time.process_time() - started) / len(corpus)
+
+        print(f"\nCPU per message: unshared {unshared * 1e6:.1f}µs, shared {shared * 1e6:.1f}µs")
+        assert shared < unshared
@@ -3,7 +3,7 @@ Integration tests for conversation handler system
 """
 
 import pytest
-from unittest.mock import Mock, AsyncMock, patch
+from unittest.mock import Mock, AsyncMock, MagicMock, patch
 from uuid import uuid4
 from datetime import datetime, timedelta
 
@@ -289,12 +289,15 @@ class TestConversationIntegration:
         
         # Setup memory service with mock Redis
         with patch('app.services.conversation_memory.redis') as mock_redis:
-            mock_redis_client = Mock()
+            mock_redis_client = AsyncMock()
             mock_redis_client.setex.return_value = True
             mock_redis_client.get.return_value = None
-            mock_redis_client.keys.return_value = []
             mock_redis_client.delete.return_value = 1
-            mock_redis_client.ping.return_value = True
+            mock_redis_client.pipeline = MagicMock()
+            pipe = mock_redis_client.pipeline.return_value.__aenter__.return_value
+            pipe.hset = Mock()
+            pipe.expire = Mock()
+            pipe.execute = AsyncMock(return_value=[2, True])
             mock_redis.from_url.return_value = mock_redis_client
             
             memory_service = ConversationMemory()
@@ -5,7 +5,7 @@ Performance tests for conversation handler system
 import pytest
 import asyncio
 import time
-from unittest.mock import Mock, AsyncMock
+from unittest.mock import Mock, AsyncMock, MagicMock
 from uuid import uuid4
 from datetime import datetime
 import statistics
@@ -346,12 +346,13 @@ class TestConversationPerformance:
         
         # Mock Redis for performance testing
         with patch('app.services.conversation_memory.redis') as mock_redis:
-            mock_redis_client = Mock()
-            mock_redis_client.setex.return_value = True
-            mock_redis_client.get.return_value = '{"test": "data"}'
-            mock_redis_client.keys.return_value = [f"key_{i}" for i in range(10)]
-            mock_redis_client.delete.return_value = 1
-            mock_redis_client.ping.return_value = True
+            mock_redis_client = AsyncMock()
+            mock_redis_client.hget.return_value = '{"test": "data"}'
+            mock_redis_client.pipeline = MagicMock()
+            pipe = mock_redis_client.pipeline.return_value.__aenter__.return_value
+            pipe.hset = Mock()
+            pipe.expire = Mock()
+            pipe.execute = AsyncMock(return_value=[1, True])
             mock_redis.from_url.return_value = mock_redis_client
             
             from app.services.conversation_memory import ConversationMemory
@@ -0,0 +1,183 @@
+"""
+Unit tests for per-tenant bulkheads
+"""
+
+import asyncio
+
+import pytest
+
+from app.utils.bulkhead import Bulkhead, FairLimiter, is_provider_failure
+from app.utils.circuit_breaker import (
+    CircuitBreakerConfig,
+    CircuitBreakerOpenException,
+    CircuitState,
+    get_all_circuit_breakers
+)
+
+
+class StatusError(Exception):
+    """Error carrying an HTTP status, like httpx and openai errors"""
+
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+def make_config():
+    return CircuitBreakerConfig(
+        failure_threshold=2,
+        recovery_timeout=60.0,
+        success_threshold=1,
+        timeout=1.0,
+        window_size=4,
+        minimum_requests=2
+    )
+
+
+@pytest.fixture
+def bulkhead(request):
+    """Bulkhead with a small failure window and its own shared breaker"""
+    bulkhead = Bulkhead(
+        f"test_provider_{request.node.name}",
+        make_config(),
+        max_concurrency_per_tenant=2,
+        max_concurrency=3
+    )
+    bulkhead.provider_breaker.reset()
+    return bulkhead
+
+
+async def fail_with(error):
+    raise error
+
+
+async def succeed():
+    return 'ok'
+
+
+class TestFailureClassification:
+    """Test telling provider failures from tenant failures"""
+
+    def test_status_classification(self):
+        """5xx and errors without a status point at the provider"""
+        assert is_provider_failure(StatusError(503))
+        assert is_provider_failure(ConnectionError("refused"))
+        assert not is_provider_failure(StatusError(401))
+        assert not is_provider_failure(StatusError(466))
+
+
+class TestBulkheadIsolation:
+    """Test that one tenant's failures stay in its compartment"""
+
+    @pytest.mark.asyncio
+    async def test_failing_tenant_trips_only_its_breaker(self, bulkhead):
+        """A banned instance opens its own breaker; other hotels keep sending"""
+        for _ in range(2):
+            with pytest.raises(StatusError):
+                await bulkhead.call('hotel-a', fail_with, StatusError(403))
+
+        with pytest.raises(CircuitBreakerOpenException):
+            await bulkhead.call('hotel-a', succeed)
+
+        assert await bulkhead.call('hotel-b', succeed) == 'ok'
+        assert bulkhead.provider_breaker.state == CircuitState.CLOSED
+        assert bulkhead.get_tenant_state('hotel-a')['state'] == 'open'
+        assert bulkhead.get_stats()['open_tenants'] == ['hotel-a']
+
+    @pytest.mark.asyncio
+    async def test_provider_failures_from_one_tenant_stay_local(self, bulkhead):
+        """Provider-looking errors from a single tenant do not open the shared breaker"""
+        for _ in range(2):
+            with pytest.raises(StatusError):
+                await bulkhead.call('hotel-a', fail_with, StatusError(502))
+
+        assert bulkhead.provider_breaker.state == CircuitState.CLOSED
+        assert bulkhead.get_stats()['provider_failures'] == 0
+
+    @pytest.mark.asyncio
+    async def test_outage_across_tenants_opens_shared_breaker(self, bulkhead):
+        """Provider failures seen by several tenants trip the shared breaker for all"""
+        for tenant_id in ('hotel-a', 'hotel-b', 'hotel-c'):
+            with pytest.raises(StatusError):
+                await bulkhead.call(tenant_id, fail_with, StatusError(503))
+
+        assert bulkhead.provider_breaker.state == CircuitState.OPEN
+        with pytest.raises(CircuitBreakerOpenException):
+            await bulkhead.call('hotel-d', succeed)
+
+    @pytest.mark.asyncio
+    async def test_tenant_breakers_not_registered_globally(self, bulkhead):
+        """Per-tenant breakers stay out of the global registry used by health checks"""
+        await bulkhead.call('hotel-a', succeed)
+
+        assert not any(name.endswith(':hotel-a') for name in get_all_circuit_breakers())
+
+    @pytest.mark.asyncio
+    async def test_idle_tenants_evicted(self, bulkhead):
+        """Unused tenants with closed breakers are dropped"""
+        bulkhead.idle_ttl = 0.01
+        await bulkhead.call('hotel-a', succeed)
+        await asyncio.sleep(0.02)
+
+        await bulkhead.call('hotel-b', succeed)
+
+        assert 'hotel-a' not in bulkhead._tenants
+        assert bulkhead.get_stats()['evicted'] == 1
+
+
+class TestFairLimiter:
+    """Test per-tenant caps and round-robin slot grants"""
+
+    @pytest.mark.asyncio
+    async def test_per_tenant_cap(self):
+        """A tenant at its cap waits while others still get free slots"""
+        limiter = FairLimiter(capacity=4, per_tenant=2)
+        await limiter.acquire('noisy')
+        await limiter.acquire('noisy')
+
+        waiting = asyncio.ensure_future(limiter.acquire('noisy'))
+        await asyncio.sleep(0)
+        await asyncio.wait_for(limiter.acquire('quiet'), timeout=0.1)
+
+        assert not waiting.done()
+        limiter.release('noisy')
+        await asyncio.wait_for(waiting, timeout=0.1)
+        assert limiter.in_flight('noisy') == 2
+
+    @pytest.mark.asyncio
+    async def test_slots_granted_round_robin(self):
+        """A noisy tenant's backlog does not delay a quiet tenant's request"""
+        limiter = FairLimiter(capacity=1, per_tenant=10)
+        await limiter.acquire('noisy')
+        order = []
+
+        async def request(tenant_id):
+            await limiter.acquire(tenant_id)
+            order.append(tenant_id)
+
+        tasks = [asyncio.ensure_future(request('noisy')) for _ in range(3)]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.ensure_future(request('quiet')))
+        await asyncio.sleep(0)
+
+        for _ in range(4):
+            limiter.release(order[-1] if order else 'noisy')
+            await asyncio.sleep(0)
+        await asyncio.gather(*tasks)
+
+        assert order[:2] == ['noisy', 'quiet']
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_does_not_leak_slot(self):
+        """Cancelling a queued request leaves the slot count intact"""
+        limiter = FairLimiter(capacity=1, per_tenant=1)
+        await limiter.acquire('hotel-a')
+        waiting = asyncio.ensure_future(limiter.acquire('hotel-b'))
+        await asyncio.sleep(0)
+
+        waiting.cancel()
+        await asyncio.gather(waiting, return_exceptions=True)
+        limiter.release('hotel-a')
+
+        assert limiter.in_flight() == 0
+        assert limiter.queued() == 0
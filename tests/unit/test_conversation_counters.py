@@ -0,0 +1,77 @@
+"""
+Unit tests for denormalized conversation counters
+"""
+
+import uuid
+from datetime import datetime
+
+from sqlalchemy.dialects import postgresql
+
+from app.models.message import Conversation, MessageType
+from app.services.conversation_counters import (
+    batch_incoming_params, message_added_stmt, message_read_stmt, negative_sentiment_stmt
+)
+
+
+def compile_sql(stmt) -> str:
+    return str(stmt.compile(dialect=postgresql.dialect()))
+
+
+class TestConversationCounters:
+    """Test counter statements and the rolling negative window"""
+
+    def test_incoming_message_increments_unread(self):
+        """Incoming messages raise message, incoming and unread counts atomically"""
+        sql = compile_sql(message_added_stmt(uuid.uuid4(), MessageType.INCOMING, uuid.uuid4()))
+
+        assert "message_count=(conversations.message_count +" in sql
+        assert "incoming_count=(conversations.incoming_count +" in sql
+        assert "unread_count=(conversations.unread_count +" in sql
+        assert "RETURNING" in sql
+
+    def test_outgoing_message_resets_unread(self):
+        """A reply from the hotel clears the unread count"""
+        sql = compile_sql(message_added_stmt(uuid.uuid4(), "outgoing", uuid.uuid4()))
+
+        assert "incoming_count" not in sql.split("RETURNING")[0]
+        assert "unread_count=%(unread_count)s" in sql
+
+    def test_read_never_goes_negative(self):
+        """Read receipts decrement the unread count with a floor of zero"""
+        sql = compile_sql(message_read_stmt(uuid.uuid4()))
+
+        assert "CASE WHEN (conversations.unread_count >" in sql
+
+    def test_batch_params_grouped_per_conversation(self):
+        """Batched messages collapse to one counter update per conversation"""
+        first, second = uuid.uuid4(), uuid.uuid4()
+        messages = [(first, uuid.uuid4()), (second, uuid.uuid4()), (first, uuid.uuid4())]
+
+        params = batch_incoming_params(messages)
+
+        assert len(params) == 2
+        by_id = {p['b_id']: p for p in params}
+        assert by_id[first]['b_count'] == 2
+        assert by_id[first]['b_last_message_id'] == messages[2][1]
+        assert by_id[second]['b_count'] == 1
+
+    def test_negative_sentiment_updates_stored_buckets(self):
+        """Negatives are counted against the stored row, pruning old buckets in SQL"""
+        at = datetime(2026, 1, 1, 12)
+        stmt = negative_sentiment_stmt(uuid.uuid4(), at)
+        sql = compile_sql(stmt)
+        params = stmt.compile(dialect=postgresql.dialect()).params
+        hour = int(at.timestamp() // 3600)
+
+        assert sql.lstrip().startswith("UPDATE conversations")
+        assert "jsonb_each(COALESCE(conversations.negative_buckets::jsonb" in sql
+        assert "conversations.negative_buckets::jsonb ->>" in sql
+        assert params['hour'] == str(hour)
+        assert params['oldest'] == hour - 24
+
+    def test_negative_window_ignores_old_buckets(self):
+        """Only negatives from the last 24 hours are counted"""
+        hour = int(datetime.now().timestamp() // 3600)
+        conversation = Conversation(negative_buckets={str(hour - 30): 4, str(hour): 2})
+
+        assert conversation.negative_count_24h == 2
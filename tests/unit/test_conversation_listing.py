@@ -0,0 +1,51 @@
+"""
+Unit tests for the conversations list query and keyset cursors
+"""
+
+import uuid
+import pytest
+from datetime import datetime
+from fastapi import HTTPException
+from sqlalchemy.dialects import postgresql
+
+from app.api.v1.endpoints.conversations import (
+    _encode_cursor, _decode_cursor, _conversation_list_query
+)
+
+
+class TestConversationListing:
+    """Test single-query listing and cursor pagination helpers"""
+
+    def test_cursor_round_trip(self):
+        """Cursors decode back to the same keyset position"""
+        timestamp = datetime(2024, 5, 1, 12, 30, 15, 123456)
+        conversation_id = uuid.uuid4()
+
+        cursor = _encode_cursor(timestamp, conversation_id)
+
+        assert _decode_cursor(cursor) == (timestamp, conversation_id)
+
+    def test_invalid_cursor_rejected(self):
+        """Malformed cursors are a client error"""
+        with pytest.raises(HTTPException) as exc_info:
+            _decode_cursor("not-a-cursor")
+
+        assert exc_info.value.status_code == 400
+
+    def test_listing_is_a_single_statement(self):
+        """Guest, last message and unread count come from one query"""
+        query = _conversation_list_query(str(uuid.uuid4()), "active")
+        sql = str(query.compile(dialect=postgresql.dialect()))
+
+        assert "JOIN guests" in sql
+        assert "messages.id = conversations.last_message_id" in sql
+        assert "conversations.unread_count" in sql
+        assert "OFFSET" not in sql
+
+    def test_listing_does_not_aggregate_messages(self):
+        """Counters are read from the conversation row, not recomputed"""
+        query = _conversation_list_query(str(uuid.uuid4()), None)
+        sql = str(query.compile(dialect=postgresql.dialect()))
+
+        assert "count(" not in sql.lower()
+        assert "LATERAL" not in sql
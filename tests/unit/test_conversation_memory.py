@@ -0,0 +1,236 @@
+"""
+Unit tests for hash-backed conversation memory
+"""
+
+import fnmatch
+
+import pytest
+
+from app.services.conversation_memory import ConversationMemory
+
+
+class FakeRedis:
+    """In-memory stand-in for the async Redis client, counting round trips"""
+
+    def __init__(self):
+        self.data = {}
+        self.ttls = {}
+        self.round_trips = 0
+        self.commands = []
+
+    # Commands
+
+    def _hash(self, key):
+        value = self.data.setdefault(key, {})
+        if not isinstance(value, dict):
+            raise TypeError("WRONGTYPE")
+        return value
+
+    def _hget(self, key, field):
+        value = self.data.get(key)
+        return value.get(field) if isinstance(value, dict) else None
+
+    def _hgetall(self, key):
+        return dict(self.data.get(key) or {})
+
+    def _hset(self, key, mapping):
+        self._hash(key).update(mapping)
+        return len(mapping)
+
+    def _hsetnx(self, key, field, value):
+        return int(self._hash(key).setdefault(field, value) == value)
+
+    def _hdel(self, key, field):
+        value = self.data.get(key)
+        return int(isinstance(value, dict) and value.pop(field, None) is not None)
+
+    def _get(self, key):
+        value = self.data.get(key)
+        if isinstance(value, dict):
+            raise TypeError("WRONGTYPE")
+        return value
+
+    def _set(self, key, value, nx=False, ex=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        if ex is not None:
+            self.ttls[key] = ex
+        return True
+
+    def _expire(self, key, ttl):
+        self.ttls[key] = ttl
+        return key in self.data
+
+    def _delete(self, *keys):
+        for key in keys:
+            self.ttls.pop(key, None)
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    def _run(self, name, *args, **kwargs):
+        self.commands.append(name)
+        return getattr(self, f"_{name}")(*args, **kwargs)
+
+    def __getattr__(self, name):
+        if not hasattr(type(self), f"_{name}"):
+            raise AttributeError(name)
+
+        async def command(*args, **kwargs):
+            self.round_trips += 1
+            return self._run(name, *args, **kwargs)
+        return command
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    async def scan_iter(self, match=None, count=None):
+        self.commands.append('scan')
+        for key in list(self.data):
+            if fnmatch.fnmatchcase(key, match):
+                yield key
+
+
+class FakePipeline:
+    """Queues commands and runs them in one round trip"""
+
+    def __init__(self, client):
+        self.client = client
+        self.queued = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.queued.append((name, args, kwargs))
+        return queue
+
+    async def execute(self, raise_on_error=True):
+        self.client.round_trips += 1
+        results = []
+        for name, args, kwargs in self.queued:
+            try:
+                results.append(self.client._run(name, *args, **kwargs))
+            except TypeError as e:
+                if raise_on_error:
+                    raise
+                results.append(e)
+        self.queued = []
+        return results
+
+
+@pytest.fixture
+def redis_client():
+    """Fake async Redis client"""
+    return FakeRedis()
+
+
+@pytest.fixture
+def memory(redis_client):
+    """Conversation memory with legacy fallback enabled"""
+    memory = ConversationMemory(redis_client)
+    memory.legacy_fallback = True
+    return memory
+
+
+class TestConversationMemory:
+    """Test one-round-trip context storage"""
+
+    @pytest.mark.asyncio
+    async def test_context_stored_in_one_hash(self, memory, redis_client):
+        """Each operation on a conversation's context is one round trip"""
+        assert await memory.update_context('c1', {'step': 2, 'info': {'name': 'Ann'}}) is True
+        assert await memory.store_context('c1', 'language', 'en') is True
+        assert redis_client.round_trips == 2
+
+        assert await memory.get_context('c1') == {'step': 2, 'info': {'name': 'Ann'}, 'language': 'en'}
+        assert await memory.get_context('c1', 'info') == {'name': 'Ann'}
+        assert redis_client.round_trips == 4
+        assert sorted(redis_client.data) == ['conv_context:c1', 'conv_context_migrated:c1']
+        assert redis_client.ttls['conv_context:c1'] == memory.default_ttl
+
+        assert await memory.delete_context('c1') is True
+        assert await memory.get_context('c1') == {}
+        assert 'keys' not in redis_client.commands
+
+    @pytest.mark.asyncio
+    async def test_delete_single_key(self, memory):
+        """Deleting one key leaves the rest of the context"""
+        await memory.update_context('c1', {'a': 1, 'b': 2})
+
+        assert await memory.delete_context('c1', 'a') is True
+        assert await memory.get_context('c1') == {'b': 2}
+        assert await memory.get_context('c1', 'a', default='none') == 'none'
+
+    @pytest.mark.asyncio
+    async def test_legacy_value_read_through(self, memory, redis_client):
+        """A key written by an earlier version is moved into the hash on read"""
+        redis_client.data['conv_context:c1:guest_id'] = '"g-1"'
+
+        assert await memory.get_context('c1', 'guest_id') == 'g-1'
+        assert 'conv_context:c1:guest_id' not in redis_client.data
+        assert redis_client.data['conv_context:c1'] == {'guest_id': '"g-1"'}
+
+    @pytest.mark.asyncio
+    async def test_legacy_values_merged_into_full_context(self, memory, redis_client):
+        """Reading all context includes and moves legacy keys, keeping newer hash values"""
+        redis_client.data.update({
+            'conv_context:c1:step': '1',
+            'conv_context:c1:language': 'ru',
+            'conv_context:c2:step': '3'
+        })
+        await memory.store_context('c1', 'step', 2)
+
+        assert await memory.get_context('c1') == {'step': 2, 'language': 'ru'}
+        assert sorted(redis_client.data) == ['conv_context:c1', 'conv_context:c2:step', 'conv_context_migrated:c1']
+
+        assert await memory.delete_context('c2') is True
+        assert await memory.get_context('c2') == {}
+
+    @pytest.mark.asyncio
+    async def test_legacy_scan_runs_once_per_conversation(self, memory, redis_client):
+        """Later reads and deletes of all context take one round trip without scanning"""
+        redis_client.data['conv_context:c1:step'] = '1'
+
+        assert await memory.get_context('c1') == {'step': 1}
+        redis_client.commands.clear()
+        redis_client.round_trips = 0
+
+        assert await memory.get_context('c1') == {'step': 1}
+        assert await memory.delete_context('c1') is True
+        assert await memory.get_context('c1') == {}
+        assert redis_client.round_trips == 3
+        assert 'scan' not in redis_client.commands
+
+    @pytest.mark.asyncio
+    async def test_legacy_values_ignored_without_fallback(self, memory, redis_client):
+        """With the fallback off only the hash is read"""
+        memory.legacy_fallback = False
+        redis_client.data['conv_context:c1:step'] = '1'
+
+        assert await memory.get_context('c1') == {}
+        assert 'scan' not in redis_client.commands
+
+    @pytest.mark.asyncio
+    async def test_migrate_legacy_context(self, memory, redis_client):
+        """Migration scans legacy keys and keeps newer hash values"""
+        redis_client.data.update({
+            'conv_context:c1:step': '1',
+            'conv_context:c1:language': 'ru',
+            'conv_context:c2:step': '3',
+            'guest_pref:g1': '{}'
+        })
+        await memory.store_context('c1', 'step', 2)
+
+        stats = await memory.migrate_legacy_context(batch_size=2)
+
+        assert stats == {'keys_scanned': 3, 'keys_migrated': 3}
+        assert await memory.get_context('c1') == {'step': 2, 'language': 'ru'}
+        assert await memory.get_context('c2') == {'step': 3}
+        assert sorted(redis_client.data) == [
+            'conv_context:c1', 'conv_context:c2',
+            'conv_context_migrated:c1', 'conv_context_migrated:c2', 'guest_pref:g1'
+        ]
@@ -0,0 +1,84 @@
+"""
+Unit tests for cron expression parsing and next-fire computation
+"""
+
+import pytest
+from datetime import datetime, timedelta
+
+from app.utils.cron_parser import (
+    CronParser, CronParserError, compile_cron_expression
+)
+
+
+class TestCronParser:
+    """Test closed-form next execution computation"""
+
+    @pytest.fixture
+    def parser(self):
+        """Create cron parser"""
+        return CronParser()
+
+    def brute_force_next(self, parser, cron_expr, from_time):
+        """Reference implementation: step one minute at a time"""
+        parsed = parser.parse_cron_expression(cron_expr)
+        next_time = from_time.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        for _ in range(366 * 24 * 60):
+            if parser._time_matches_cron(next_time, parsed):
+                return next_time
+            next_time += timedelta(minutes=1)
+        return None
+
+    @pytest.mark.parametrize("cron_expr", [
+        "*/15 * * * *",
+        "0 9 * * 0-4",
+        "30 22,23 1 * *",
+        "5 */5 28-31 * *",
+        "0 0 1-15 */3 6",
+        "10-20 9 * 12 5,6",
+    ])
+    def test_matches_brute_force(self, parser, cron_expr):
+        """Field-wise search agrees with minute-by-minute scanning"""
+        from_time = datetime(2024, 11, 30, 23, 47, 12)
+
+        assert parser.get_next_execution_time(cron_expr, from_time) == \
+            self.brute_force_next(parser, cron_expr, from_time)
+
+    def test_sparse_leap_day_expression(self, parser):
+        """Leap-day schedules are found beyond a one-year horizon"""
+        next_time = parser.get_next_execution_time("0 9 29 2 *", datetime(2025, 3, 1))
+
+        assert next_time == datetime(2028, 2, 29, 9, 0)
+
+    def test_impossible_expression_returns_none(self, parser):
+        """Dates that never exist yield no execution time"""
+        assert parser.get_next_execution_time("0 0 31 2 *", datetime(2025, 1, 1)) is None
+
+    def test_next_time_is_strictly_after_from_time(self, parser):
+        """A from_time that matches exactly is not returned again"""
+        from_time = datetime(2025, 1, 6, 9, 0)
+
+        assert parser.get_next_execution_time("0 9 * * *", from_time) == datetime(2025, 1, 7, 9, 0)
+
+    def test_next_n_executions(self, parser):
+        """Batch API returns consecutive execution times"""
+        executions = parser.next_n_executions("*/15 9 * * 0-4", 5, datetime(2025, 1, 3, 9, 50))
+
+        assert executions == [
+            datetime(2025, 1, 6, 9, 0),
+            datetime(2025, 1, 6, 9, 15),
+            datetime(2025, 1, 6, 9, 30),
+            datetime(2025, 1, 6, 9, 45),
+            datetime(2025, 1, 7, 9, 0),
+        ]
+
+    def test_compiled_expressions_are_cached(self):
+        """Equivalent expressions share one compiled schedule"""
+        assert compile_cron_expression("0 9 * * 1") is compile_cron_expression(" 0  9 * * 1 ")
+
+    def test_invalid_expression_raises(self, parser):
+        """Invalid expressions raise from matches() and return None from next time"""
+        with pytest.raises(CronParserError):
+            parser.matches("61 * * * *", datetime(2025, 1, 1))
+
+        assert parser.get_next_execution_time("61 * * * *") is None
+        assert parser.next_n_executions("61 * * * *", 3) == []
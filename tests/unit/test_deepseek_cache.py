@@ -0,0 +1,270 @@
+"""
+Unit tests for the indexed DeepSeek cache
+"""
+
+import fnmatch
+from unittest.mock import patch
+
+import pytest
+
+from app.schemas.deepseek import ResponseGenerationResult, SentimentAnalysisResult, SentimentType
+from app.services.deepseek_cache import DeepSeekCacheService
+
+
+class FakeRedis:
+    """In-memory stand-in for the async Redis client, counting round trips"""
+
+    def __init__(self):
+        self.strings = {}
+        self.ttls = {}
+        self.zsets = {}
+        self.round_trips = 0
+        self.commands = []
+
+    # Commands
+
+    def _get(self, key):
+        return self.strings.get(key)
+
+    def _setex(self, key, ttl, value):
+        self.strings[key] = value
+        self.ttls[key] = ttl
+        return True
+
+    def _incr(self, key):
+        self.strings[key] = str(int(self.strings.get(key, 0)) + 1)
+        return int(self.strings[key])
+
+    def _expire(self, key, ttl):
+        self.ttls[key] = ttl
+        return True
+
+    def _ttl(self, key):
+        return self.ttls.get(key, -1) if key in self.strings else -2
+
+    def _strlen(self, key):
+        return len(self.strings.get(key, ''))
+
+    def _unlink(self, *keys):
+        return sum(
+            self.strings.pop(key, None) is not None or self.zsets.pop(key, None) is not None
+            for key in keys
+        )
+
+    def _zadd(self, name, mapping):
+        self.zsets.setdefault(name, {}).update(mapping)
+        return len(mapping)
+
+    def _zrem(self, name, *members):
+        zset = self.zsets.get(name, {})
+        return sum(zset.pop(member, None) is not None for member in members)
+
+    def _zremrangebyscore(self, name, min, max):
+        zset = self.zsets.get(name, {})
+        expired = [member for member, score in zset.items() if score <= max]
+        return self._zrem(name, *expired)
+
+    def _zrange(self, name, start, end):
+        members = sorted(self.zsets.get(name, {}).items(), key=lambda item: item[1])
+        return [member for member, _ in members][start:end + 1]
+
+    def _zrevrangebyscore(self, name, max, min, start=0, num=None):
+        members = sorted(self.zsets.get(name, {}).items(), key=lambda item: -item[1])
+        live = [member for member, score in members if score >= min]
+        return live[start:start + num]
+
+    def _zcount(self, name, min, max):
+        return sum(score >= min for score in self.zsets.get(name, {}).values())
+
+    def _zrandmember(self, key, count=None):
+        return list(self.zsets.get(key, {}))[:count]
+
+    def _info(self):
+        return {'used_memory_human': '1M'}
+
+    def _run(self, name, *args, **kwargs):
+        self.commands.append(name)
+        return getattr(self, f"_{name}")(*args, **kwargs)
+
+    def __getattr__(self, name):
+        if not hasattr(type(self), f"_{name}"):
+            raise AttributeError(name)
+
+        async def command(*args, **kwargs):
+            self.round_trips += 1
+            return self._run(name, *args, **kwargs)
+        return command
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    async def scan_iter(self, match=None, count=None):
+        self.commands.append('scan')
+        for key in list(self.strings):
+            if fnmatch.fnmatchcase(key, match):
+                yield key
+
+
+class FakePipeline:
+    """Queues commands and runs them in one round trip"""
+
+    def __init__(self, client):
+        self.client = client
+        self.queued = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.queued.append((name, args, kwargs))
+        return queue
+
+    async def execute(self, raise_on_error=True):
+        self.client.round_trips += 1
+        results = [self.client._run(name, *args, **kwargs) for name, args, kwargs in self.queued]
+        self.queued = []
+        return results
+
+
+@pytest.fixture
+def redis_client():
+    """Fake async Redis client"""
+    return FakeRedis()
+
+
+@pytest.fixture
+def cache(redis_client):
+    """Cache service on the fake client"""
+    with patch.object(DeepSeekCacheService, '_create_redis_client', return_value=redis_client):
+        cache = DeepSeekCacheService()
+    cache.cache_enabled = True
+    return cache
+
+
+async def fill(cache, count):
+    """Cache count sentiment results through the service"""
+    metadata = {'sentiment_type': 'positive', 'confidence': 0.9}
+    for i in range(count):
+        key = cache._create_cache_key('sentiment', f"message {i}")
+        await cache._store_entry('sentiment', key, f'{{"n": {i}}}', metadata, 600)
+
+
+class TestDeepSeekCacheIndex:
+    """Test index-backed introspection and clearing"""
+
+    @pytest.mark.asyncio
+    async def test_store_is_one_round_trip(self, cache, redis_client):
+        """Value, metadata and index entry are written together"""
+        await fill(cache, 1)
+
+        assert redis_client.round_trips == 1
+        assert len(redis_client.zsets['deepseek:index:sentiment']) == 1
+
+    @pytest.mark.asyncio
+    async def test_keys_info_in_two_round_trips(self, cache, redis_client):
+        """Listing entries costs the same however many there are"""
+        await fill(cache, 30)
+        await cache._record_hit(cache._create_cache_key('sentiment', "message 3"))
+        redis_client.round_trips = 0
+
+        keys_info = await cache.get_cache_keys_info(limit=10)
+
+        assert redis_client.round_trips == 2
+        assert len(keys_info) == 10
+        assert {info['operation_type'] for info in keys_info} == {'sentiment'}
+        assert keys_info[0]['ttl_seconds'] == 600
+        assert keys_info[0]['metadata']['confidence'] == 0.9
+        assert 'keys' not in redis_client.commands
+
+    @pytest.mark.asyncio
+    async def test_clear_uses_index(self, cache, redis_client):
+        """Clearing deletes indexed entries with their metadata, without SCAN"""
+        await fill(cache, 7)
+        cache.CLEAR_BATCH_SIZE = 3
+
+        deleted = await cache.clear_cache()
+
+        assert deleted == 14
+        assert redis_client.strings == {}
+        assert redis_client.zsets.get('deepseek:index:sentiment', {}) == {}
+        assert 'scan' not in redis_client.commands
+
+    @pytest.mark.asyncio
+    async def test_clear_by_pattern_scans(self, cache, redis_client):
+        """Pattern clears walk the keyspace with SCAN"""
+        await fill(cache, 2)
+        redis_client.strings['other:key'] = 'x'
+
+        assert await cache.clear_cache('deepseek:sentiment:*') == 4
+        assert list(redis_client.strings) == ['other:key']
+
+    @pytest.mark.asyncio
+    async def test_stats_sampled(self, cache, redis_client):
+        """Entry counts come from the index and sizes from a sample"""
+        await fill(cache, 5)
+
+        stats = await cache.get_cache_stats(sample_size=2)
+
+        assert stats['entries']['sentiment'] == {
+            'entries': 5,
+            'sampled': 2,
+            'avg_size_bytes': 8,
+            'estimated_size_bytes': 40
+        }
+        assert stats['entries']['response']['entries'] == 0
+
+
+class TestNearDuplicateCache:
+    """Test the near-duplicate tier behind exact-text lookups"""
+
+    @pytest.fixture
+    def result(self):
+        """Sentiment result to cache"""
+        return SentimentAnalysisResult(sentiment=SentimentType.NEUTRAL, score=0.0, confidence=0.9)
+
+    @pytest.mark.asyncio
+    async def test_normalized_text_shared_within_hotel(self, cache, result):
+        """Differently written copies of a message share an entry, per hotel"""
+        await cache.set_sentiment_cache("Where's the pool??", result, hotel_id='h1')
+
+        assert await cache.get_sentiment_cache("where is the pool", hotel_id='h1') is not None
+        assert await cache.get_sentiment_cache("where is the pool", hotel_id='h2') is None
+        assert cache.semantic_cache.stats['normalized_hits'] == 1
+
+    @pytest.mark.asyncio
+    async def test_paraphrase_only_shadowed(self, cache, result):
+        """In shadow mode a paraphrase is compared with the fresh result, not served"""
+        await cache.set_sentiment_cache("What time is breakfast served?", result, hotel_id='h1')
+
+        assert await cache.get_sentiment_cache("when is breakfast served", hotel_id='h1') is None
+        await cache.set_sentiment_cache("when is breakfast served", result, hotel_id='h1')
+
+        stats = cache.semantic_cache.get_stats()
+        assert stats['shadow_matches'] == 1
+        assert stats['shadow_agreed'] == 1
+
+    @pytest.mark.asyncio
+    async def test_paraphrase_served(self, cache, result):
+        """In serve mode a paraphrase above the threshold is served"""
+        cache.semantic_cache.mode = 'serve'
+        await cache.set_sentiment_cache("What time is breakfast served?", result, hotel_id='h1')
+
+        cached = await cache.get_sentiment_cache("when is breakfast served", hotel_id='h1')
+
+        assert cached.sentiment == SentimentType.NEUTRAL
+        assert cache.semantic_cache.stats['semantic_hits'] == 1
+
+    @pytest.mark.asyncio
+    async def test_responses_not_shared_across_contexts(self, cache):
+        """A reply personalized for one conversation is never served to another"""
+        cache.semantic_cache.mode = 'serve'
+        reply = ResponseGenerationResult(response="Welcome back, Anna!", confidence=0.9)
+        await cache.set_response_cache("Hi!", 'context-a', reply, hotel_id='h1')
+
+        assert await cache.get_response_cache("hi", 'context-a', hotel_id='h1') is not None
+        assert await cache.get_response_cache("hi", 'context-b', hotel_id='h1') is None
+        assert await cache.get_response_cache("hello there", 'context-b', hotel_id='h1') is None
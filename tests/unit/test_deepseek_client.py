@@ -4,11 +4,16 @@ Unit tests for DeepSeek API client
 
 import pytest
 import asyncio
+import json
 from unittest.mock import AsyncMock, MagicMock, patch
 from datetime import datetime
 
+from aiohttp import web
+
 from app.services.deepseek_client import DeepSeekClient, RateLimiter
+from app.exceptions.custom_exceptions import DeepSeekAPIError
 from app.core.deepseek_config import DeepSeekConfig, DeepSeekModel
+from app.core.deepseek_logging import get_deepseek_logger
 from app.schemas.deepseek import (
     ChatMessage,
     MessageRole,
@@ -352,5 +357,143 @@ class TestGlobalClientFunctions:
             assert app.services.deepseek_client._global_client is None
 
 
+class FakeDeepSeekServer:
+    """Local server answering chat completions with an SSE stream"""
+    
+    def __init__(self, deltas, usage=None, error_after=None):
+        self.deltas = deltas
+        self.usage = usage
+        self.error_after = error_after
+        self.requests = []
+        self.runner = None
+        self.base_url = None
+    
+    @staticmethod
+    def event(payload):
+        return f"data: {json.dumps(payload)}\n\n".encode()
+    
+    @staticmethod
+    def chunk(choices):
+        return {
+            "id": "chatcmpl-test",
+            "object": "chat.completion.chunk",
+            "created": 1234567890,
+            "model": "deepseek-chat",
+            "choices": choices
+        }
+    
+    async def handle(self, request):
+        self.requests.append(await request.json())
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        
+        for i, delta in enumerate(self.deltas):
+            if i == self.error_after:
+                await response.write(self.event({"error": {"message": "upstream overloaded"}}))
+                return response
+            await response.write(self.event(self.chunk([
+                {"index": 0, "delta": {"role": "assistant", "content": delta}, "finish_reason": None}
+            ])))
+        
+        if self.usage:
+            await response.write(self.event({**self.chunk([]), "usage": self.usage}))
+        await response.write(b"data: [DONE]\n\n")
+        return response
+    
+    async def __aenter__(self):
+        app = web.Application()
+        app.router.add_post("/chat/completions", self.handle)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, "127.0.0.1", 0).start()
+        host, port = self.runner.addresses[0][:2]
+        self.base_url = f"http://{host}:{port}"
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        await self.runner.cleanup()
+
+
+class TestStreamingCompletion:
+    """Test streaming chat completions against a local SSE server"""
+    
+    @staticmethod
+    def make_client(base_url):
+        client = DeepSeekClient(DeepSeekConfig(
+            api_key="test-api-key",
+            base_url=base_url,
+            default_model=DeepSeekModel.CHAT,
+            max_tokens=256,
+            temperature=0.7,
+            timeout=10,
+            max_requests_per_minute=50,
+            max_tokens_per_minute=100000
+        ), tenant_id="hotel-1")
+        client.circuit_breaker.reset()
+        client.bulkhead._tenants.clear()
+        return client
+    
+    @pytest.mark.asyncio
+    async def test_stream_yields_deltas_and_logs_usage(self):
+        """Deltas arrive as generated; the final usage event is logged"""
+        usage = {"prompt_tokens": 42, "completion_tokens": 7, "total_tokens": 49}
+        async with FakeDeepSeekServer(["Hello", " Alice.", " Welcome!"], usage=usage) as server:
+            client = self.make_client(server.base_url)
+            
+            deltas = [delta async for delta in client.stream_chat_completion(
+                messages=[ChatMessage(role=MessageRole.USER, content="Hi")],
+                correlation_id="stream-test"
+            )]
+            
+            await client.close()
+        
+        assert deltas == ["Hello", " Alice.", " Welcome!"]
+        assert server.requests[0]["stream"] is True
+        assert server.requests[0]["stream_options"] == {"include_usage": True}
+        log_entry = get_deepseek_logger().get_recent_logs(1)[0]
+        assert log_entry.correlation_id == "stream-test"
+        assert log_entry.tokens_used == 49
+        assert log_entry.success is True
+        assert client.circuit_breaker.get_metrics().successful_requests == 1
+        assert client.bulkhead.get_tenant_state("hotel-1")["in_flight"] == 0
+    
+    @pytest.mark.asyncio
+    async def test_stream_error_counts_against_circuit_breaker(self):
+        """A stream failing mid-answer raises after its earlier deltas and records a failure on the hotel's breaker"""
+        async with FakeDeepSeekServer(["Your room", " is", " ready."], error_after=1) as server:
+            client = self.make_client(server.base_url)
+            received = []
+            
+            with pytest.raises(DeepSeekAPIError):
+                async for delta in client.stream_chat_completion(
+                    messages=[ChatMessage(role=MessageRole.USER, content="Is my room ready?")]
+                ):
+                    received.append(delta)
+            
+            await client.close()
+        
+        assert received == ["Your room"]
+        assert get_deepseek_logger().get_recent_logs(1)[0].success is False
+        assert client.bulkhead._tenants["hotel-1"].breaker.get_metrics().failed_requests == 1
+        assert client.circuit_breaker.get_metrics().failed_requests == 0
+    
+    @pytest.mark.asyncio
+    async def test_stream_refused_while_circuit_open(self):
+        """An open circuit fails fast without opening a stream"""
+        async with FakeDeepSeekServer(["Hello"]) as server:
+            client = self.make_client(server.base_url)
+            
+            with patch.object(client.circuit_breaker, '_can_attempt_request', return_value=False):
+                with pytest.raises(DeepSeekAPIError):
+                    async for _ in client.stream_chat_completion(
+                        messages=[ChatMessage(role=MessageRole.USER, content="Hi")]
+                    ):
+                        pass
+            
+            await client.close()
+        
+        assert server.requests == []
+
+
 if __name__ == "__main__":
     pytest.main([__file__])
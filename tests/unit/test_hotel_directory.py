@@ -0,0 +1,185 @@
+"""
+Unit tests for the in-process hotel directory
+"""
+
+import uuid
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+import pytest
+
+from app.services.hotel_directory import HotelDirectory, HotelSnapshot
+
+
+NOW = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def make_hotel(instance_id="1101000001", is_active=True, updated_at=NOW, **kwargs):
+    """Hotel row as loaded from the database"""
+    return SimpleNamespace(
+        id=kwargs.pop("id", uuid.uuid4()),
+        name=kwargs.pop("name", "Grand Hotel"),
+        whatsapp_number=kwargs.pop("whatsapp_number", "+79001234567"),
+        green_api_instance_id=instance_id,
+        green_api_token="token",
+        green_api_webhook_token="webhook-secret",
+        settings=kwargs.pop("settings", {"notifications": {"email_enabled": True}, "languages": ["en"]}),
+        is_active=is_active,
+        created_at=NOW,
+        updated_at=updated_at
+    )
+
+
+class FakeSession:
+    """AsyncSession stand-in returning fixed hotels and counting queries"""
+
+    def __init__(self, hotels):
+        self.hotels = hotels
+        self.queries = 0
+
+    async def execute(self, statement):
+        self.queries += 1
+        result = Mock()
+        result.scalars.return_value.all.return_value = list(self.hotels)
+        return result
+
+
+def make_directory(hotels=()):
+    directory = HotelDirectory(
+        redis_url="redis://localhost:1/0",
+        refresh_interval=60,
+        full_reload_interval=3600,
+        negative_ttl=5
+    )
+
+    async def fetch(statement, db):
+        session = db or FakeSession(directory.rows)
+        result = await session.execute(statement)
+        return [HotelSnapshot.from_hotel(hotel) for hotel in result.scalars().all()]
+
+    directory.rows = list(hotels)
+    directory._fetch = fetch
+    directory.invalidations.publish = Mock()
+    return directory
+
+
+class TestHotelSnapshot:
+    """Test snapshots of hotel rows"""
+
+    def test_snapshot_is_immutable(self):
+        """Snapshots and their settings cannot be changed"""
+        snapshot = HotelSnapshot.from_hotel(make_hotel())
+
+        with pytest.raises(Exception):
+            snapshot.name = "Other"
+        with pytest.raises(TypeError):
+            snapshot.settings["notifications"]["email_enabled"] = False
+        assert snapshot.settings["languages"] == ("en",)
+
+    def test_context_matches_tenant_manager_shape(self):
+        """The context carries what HotelTenantManager.load_hotel_context returned"""
+        hotel = make_hotel()
+        context = HotelSnapshot.from_hotel(hotel).to_context()
+
+        assert context["hotel_id"] == hotel.id
+        assert context["hotel_name"] == "Grand Hotel"
+        assert context["is_operational"] is True
+        assert context["updated_at"] == NOW.isoformat()
+
+    def test_to_hotel_is_detached_and_independent(self):
+        """The Hotel built from a snapshot is detached and has its own settings"""
+        snapshot = HotelSnapshot.from_hotel(make_hotel())
+        hotel = snapshot.to_hotel()
+
+        hotel.settings["languages"].append("ru")
+
+        assert hotel.id == snapshot.id
+        assert hotel.green_api_webhook_token == "webhook-secret"
+        assert snapshot.settings["languages"] == ("en",)
+
+
+class TestHotelDirectory:
+    """Test lookups, refreshes and invalidation"""
+
+    @pytest.mark.asyncio
+    async def test_lookups_after_bulk_load_cost_no_query(self):
+        """Loaded hotels resolve by ID and instance without a database round trip"""
+        hotel = make_hotel()
+        directory = make_directory([hotel])
+        await directory.load_all()
+        session = FakeSession([])
+
+        by_instance = await directory.resolve_instance("1101000001", session)
+        by_id = await directory.resolve(str(hotel.id), session)
+
+        assert by_instance is by_id
+        assert by_id.id == hotel.id
+        assert session.queries == 0
+
+    @pytest.mark.asyncio
+    async def test_inactive_hotel_not_resolved_by_instance(self):
+        """Webhooks only resolve active hotels; tenant lookups still see inactive ones"""
+        hotel = make_hotel(is_active=False)
+        directory = make_directory([hotel])
+        await directory.load_all()
+
+        assert await directory.resolve_instance("1101000001", FakeSession([])) is None
+        assert directory.get(hotel.id).is_active is False
+
+    @pytest.mark.asyncio
+    async def test_miss_loads_once_and_unknown_keys_are_remembered(self):
+        """A miss queries once; an unknown instance is not queried again right away"""
+        hotel = make_hotel(instance_id="2202000002")
+        directory = make_directory()
+
+        session = FakeSession([hotel])
+        assert (await directory.resolve_instance("2202000002", session)).id == hotel.id
+        assert (await directory.resolve_instance("2202000002", session)).id == hotel.id
+        assert session.queries == 1
+
+        empty = FakeSession([])
+        assert await directory.resolve_instance("9999999999", empty) is None
+        assert await directory.resolve_instance("9999999999", empty) is None
+        assert empty.queries == 1
+
+    @pytest.mark.asyncio
+    async def test_refresh_picks_up_changed_hotels(self):
+        """An incremental refresh replaces changed snapshots and re-indexes instances"""
+        hotel = make_hotel()
+        directory = make_directory([hotel])
+        await directory.load_all()
+
+        changed = make_hotel(id=hotel.id, instance_id="3303000003", updated_at=NOW + timedelta(minutes=1))
+        directory.rows = [changed]
+        assert await directory.refresh() == 1
+
+        assert directory.get_by_instance_id("1101000001") is None
+        assert directory.get_by_instance_id("3303000003").id == hotel.id
+        assert directory._high_water == NOW + timedelta(minutes=1)
+
+    @pytest.mark.asyncio
+    async def test_invalidation_evicts_and_publishes(self):
+        """Invalidating evicts locally and tells the other workers"""
+        hotel = make_hotel()
+        directory = make_directory([hotel])
+        await directory.load_all()
+
+        directory.invalidate(hotel.id)
+
+        assert directory.get(hotel.id) is None
+        assert directory.get_by_instance_id("1101000001") is None
+        directory.invalidations.publish.assert_called_once_with(str(hotel.id))
+
+    @pytest.mark.asyncio
+    async def test_remote_invalidation_evicts(self):
+        """A hotel ID published by another worker is evicted here"""
+        hotel = make_hotel()
+        directory = make_directory([hotel])
+        await directory.load_all()
+
+        directory.apply_invalidation(str(hotel.id))
+        directory.apply_invalidation("not-a-uuid")
+
+        assert directory.get(hotel.id) is None
+        assert directory.get_stats()['remote_invalidations'] == 1
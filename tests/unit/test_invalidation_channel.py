@@ -0,0 +1,50 @@
+"""
+Unit tests for cache invalidation between workers
+"""
+
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from app.utils.invalidation_channel import InvalidationChannel
+
+
+def make_channel():
+    return InvalidationChannel("test:invalidate", Mock(), redis_url="redis://localhost:1/0")
+
+
+class TestInvalidationChannel:
+    """Test publishing invalidated keys"""
+
+    @pytest.mark.asyncio
+    async def test_publish_from_event_loop(self):
+        """Keys published on the event loop are sent by a background task"""
+        channel = make_channel()
+        channel._publish_async = AsyncMock()
+
+        channel.publish("key")
+        await channel.flush()
+
+        channel._publish_async.assert_awaited_once_with("key")
+
+    def test_publish_without_event_loop(self):
+        """Synchronous callers (Celery tasks) publish without an event loop"""
+        channel = make_channel()
+        channel._sync_client = Mock()
+
+        channel.publish("key")
+
+        channel._sync_client.publish.assert_called_once_with("test:invalidate", "key")
+        assert channel.get_stats()['published'] == 1
+
+    def test_failure_backs_off(self):
+        """After a failed publish, publishing is skipped until Redis may be back"""
+        channel = make_channel()
+        channel._sync_client = Mock()
+        channel._sync_client.publish.side_effect = ConnectionError("refused")
+
+        channel.publish("key")
+        channel.publish("key")
+
+        assert channel.get_stats()['errors'] == 1
+        assert channel._sync_client is None
@@ -0,0 +1,83 @@
+"""
+Unit tests for the shared keyword matcher
+"""
+
+import random
+
+import pytest
+
+from app.utils.keyword_matcher import KeywordAutomaton, KeywordRegistry, keyword_tag
+
+
+@pytest.fixture
+def registry():
+    """Registry with two namespaces sharing keywords"""
+    registry = KeywordRegistry()
+    registry.register('intent', {
+        'complaint': ['problem', 'bad', 'not working'],
+        'emergency': ['fire', 'help', 'emergency'],
+    })
+    registry.register('urgency', {'high': ['urgent', 'help', 'asap']})
+    return registry
+
+
+class TestKeywordAutomaton:
+    """Test Aho-Corasick matching"""
+
+    def test_matches_substring_semantics(self):
+        """Hits agree with `keyword in text` for overlapping keywords"""
+        keywords = ['he', 'she', 'his', 'hers', 'a', 'ab', 'bab', 'bc', 'bca', 'c', 'caa', 'no', 'non']
+        automaton = KeywordAutomaton(('tag', kw) for kw in keywords)
+        rng = random.Random(7)
+
+        for _ in range(500):
+            text = ''.join(rng.choice('abchenorsi ') for _ in range(rng.randint(0, 30)))
+            assert automaton.find(text) == {kw for kw in keywords if kw in text}
+
+    def test_keywords_reported_in_registration_order(self):
+        """Hits of a tag come back in the order the tag lists them"""
+        automaton = KeywordAutomaton([('t', 'zeta'), ('t', 'alpha'), ('t', 'mid')])
+
+        matches = automaton.scan("Alpha, mid and ZETA")
+
+        assert matches.keywords('t') == ['zeta', 'alpha', 'mid']
+        assert matches.count('t') == 3
+
+
+class TestKeywordRegistry:
+    """Test the shared vocabulary"""
+
+    def test_one_scan_serves_all_namespaces(self, registry):
+        """A keyword shared by categories is reported for each of them"""
+        matches = registry.scan("HELP, the heating is not working")
+
+        assert matches.keywords(keyword_tag('intent', 'complaint')) == ['not working']
+        assert matches.has(keyword_tag('intent', 'emergency'))
+        assert matches.has(keyword_tag('urgency', 'high'))
+        assert not matches.has(keyword_tag('intent', 'missing'))
+
+    def test_scan_results_shared_by_text(self, registry):
+        """Repeated scans of one text reuse the first result"""
+        first = registry.scan("fire in room 12")
+        second = registry.scan("fire in room 12")
+
+        assert first is second
+        assert registry.get_stats()['scan_cache_hits'] == 1
+
+    def test_reregistration_only_rebuilds_on_change(self, registry):
+        """Identical vocabularies keep the compiled automaton"""
+        automaton = registry.automaton
+        registry.register('urgency', {'high': ['urgent', 'help', 'asap']})
+        assert registry.automaton is automaton
+
+        registry.register('urgency', {'high': ['urgent', 'now']})
+        assert registry.automaton is not automaton
+        assert registry.scan("right now").has(keyword_tag('urgency', 'high'))
+
+    def test_hotel_automaton_cached_per_vocabulary(self, registry):
+        """Hotel automatons are reused until the hotel's keywords change"""
+        first = registry.hotel_automaton('hotel-1', {'rule-a': ['wifi']})
+
+        assert registry.hotel_automaton('hotel-1', {'rule-a': ['wifi']}) is first
+        assert registry.hotel_automaton('hotel-1', {'rule-a': ['pool']}) is not first
+        assert registry.hotel_automaton('hotel-1', {'rule-a': ['pool']}).scan("POOL hours?").has('rule-a')
@@ -0,0 +1,117 @@
+"""
+Unit tests for language detection
+"""
+
+import random
+import re
+from unittest.mock import patch
+
+import pytest
+
+from app.utils.language_detector import SHORT_TEXT_WORDS, LanguageDetector
+from app.utils.message_analysis import WORD_PATTERN
+
+
+@pytest.fixture
+def detector():
+    """Fresh detector with empty caches"""
+    return LanguageDetector()
+
+
+def reference_score(text, patterns):
+    """Per-language score as computed before scoring was single-pass"""
+    words = WORD_PATTERN.findall(text)
+    score = 0.0
+    total_checks = 0
+    if words:
+        score += sum(1 for word in words if word in patterns['common_words']) / len(words) * 0.6
+        total_checks += 0.6
+    if any(re.search(pattern, text, re.IGNORECASE) for pattern in patterns['patterns']):
+        score += 0.4
+        total_checks += 0.4
+    return score / total_checks if total_checks > 0 else 0.0
+
+
+class TestLanguageDetector:
+    """Test single-pass language scoring"""
+
+    def test_scores_match_per_language_scoring(self, detector):
+        """One pass gives the same scores as scoring each language in turn"""
+        vocabulary = sorted({
+            word for patterns in detector.language_patterns.values()
+            for word in patterns['common_words'] if word.isascii()
+        }) + ['wifi', 'broken', 'good morning', 'buenos dias', 'guten tag', 'xyz']
+        rng = random.Random(13)
+
+        for _ in range(300):
+            text = ' '.join(rng.choice(vocabulary) for _ in range(rng.randint(SHORT_TEXT_WORDS + 1, 15)))
+            scores = detector._score_languages(text, WORD_PATTERN.findall(text))
+            for language, patterns in detector.language_patterns.items():
+                assert scores[language] == pytest.approx(reference_score(text, patterns))
+
+    @pytest.mark.parametrize("text,language", [
+        ("Hola, necesito ayuda con la reserva", 'es'),
+        ("Hello, the wifi is not working", 'en'),
+        ("Guten Morgen, das Zimmer ist kalt", 'de'),
+        ("Кондиционер сломался", 'ru'),
+        ("สวัสดีครับ", 'th'),
+        ("chambre sale", 'fr'),
+    ])
+    def test_detects_language(self, detector, text, language):
+        """Common words, scripts and trigrams each identify a language"""
+        assert detector.detect_language(text)[0] == language
+
+    def test_short_text_scored_by_trigrams(self, detector):
+        """A short message with no common word is recognised by its spelling"""
+        language, confidence = detector.detect_language("habitaciones limpias")
+
+        assert language == 'es'
+        assert confidence >= 0.3
+
+    def test_unknown_text_falls_back_to_default(self, detector):
+        """Low confidence returns the default language"""
+        assert detector.detect_language("ok") == ('en', 0.0)
+        assert detector.detect_language("   ") == ('en', 0.0)
+
+    def test_results_cached_by_text(self, detector):
+        """Repeated messages are not scored again"""
+        with patch.object(detector, '_score_languages', wraps=detector._score_languages) as score:
+            detector.detect_language("Merci pour la chambre")
+            detector.detect_language("merci pour la chambre ")
+
+        assert score.call_count == 1
+        assert detector.get_stats()['result_cache_hits'] == 1
+
+
+class TestGuestLanguage:
+    """Test the per-guest language cache"""
+
+    def test_confident_language_remembered_per_guest(self, detector):
+        """Later messages from a guest skip detection"""
+        assert detector.detect_guest_language("+7 900 123-45-67", "Привет, где пляж?")[0] == 'ru'
+
+        with patch.object(detector, 'detect_language') as detect:
+            assert detector.detect_guest_language("79001234567@c.us", "ok")[0] == 'ru'
+        detect.assert_not_called()
+
+    def test_unconfident_language_not_remembered(self, detector):
+        """A guest is detected again until their language is clear"""
+        detector.detect_guest_language("15550001111", "ok")
+        assert detector.detect_guest_language("15550001111", "Gracias por la ayuda")[0] == 'es'
+
+    def test_forget_guest_language(self, detector):
+        """Forgotten guests are detected afresh"""
+        detector.detect_guest_language("15550001111", "Gracias por la ayuda")
+        detector.forget_guest_language("+1 555 000 1111")
+
+        assert detector.detect_guest_language("15550001111", "Thank you for the help")[0] == 'en'
+
+    def test_remembered_language_expires(self):
+        """After the TTL a guest's language is detected afresh"""
+        detector = LanguageDetector(guest_language_ttl=60)
+        with patch('app.utils.language_detector.time.monotonic', return_value=1000.0):
+            detector.detect_guest_language("15550001111", "Gracias por la ayuda")
+        with patch('app.utils.language_detector.time.monotonic', return_value=1030.0):
+            assert detector.detect_guest_language("15550001111", "Thank you for the help")[0] == 'es'
+        with patch('app.utils.language_detector.time.monotonic', return_value=1061.0):
+            assert detector.detect_guest_language("15550001111", "Thank you for the help")[0] == 'en'
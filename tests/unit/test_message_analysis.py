@@ -0,0 +1,87 @@
+"""
+Unit tests for the parse-once message analysis
+"""
+
+import pytest
+
+from app.models.trigger import TriggerType
+from app.utils.language_detector import LanguageDetector
+from app.utils.message_analysis import MessageAnalysis, estimate_token_count
+from app.utils.message_parser import MessageParser
+from app.utils.trigger_evaluator import TriggerEvaluator
+
+
+MESSAGE = "Hello!  The WiFi in room 412 is not working, please help ASAP (booking AB12CD34)"
+
+
+class TestMessageAnalysis:
+    """Test lazy, shared views of a message"""
+
+    def test_views_computed_on_first_use_only(self):
+        """Nothing is computed until asked for, and then only once"""
+        analysis = MessageAnalysis(MESSAGE)
+        assert analysis._values == {}
+
+        tokens = analysis.tokens
+        assert analysis.tokens is tokens
+        assert set(analysis._values) == {'lower', 'tokens'}
+
+    def test_read_only(self):
+        """Analyses cannot be modified once created"""
+        analysis = MessageAnalysis(MESSAGE)
+
+        with pytest.raises(AttributeError):
+            analysis.text = "other"
+
+    def test_of_reuses_matching_analysis(self):
+        """An analysis is only reused for the text it describes"""
+        analysis = MessageAnalysis(MESSAGE)
+
+        assert MessageAnalysis.of(MESSAGE, analysis) is analysis
+        assert MessageAnalysis.of("other", analysis) is not analysis
+        assert MessageAnalysis.of(None).text == ""
+
+    def test_token_estimate(self):
+        """Token estimate matches the optimizer's formula"""
+        assert MessageAnalysis("").token_estimate == 0
+        assert MessageAnalysis("  a   b  ").token_estimate == estimate_token_count("a b") == 1
+        assert MessageAnalysis("x" * 40).token_estimate == 11
+
+
+class TestSharedConsumers:
+    """Consumers give the same answers with and without a shared analysis"""
+
+    def test_parser(self):
+        """Parsing with an analysis matches parsing without one"""
+        parser = MessageParser()
+        analysis = MessageAnalysis(MESSAGE)
+
+        shared = parser.parse_message(MESSAGE, {}, analysis)
+        alone = parser.parse_message(MESSAGE, {})
+
+        for key in ('extracted_data', 'intent', 'sentiment_indicators', 'urgency_level', 'language'):
+            assert shared[key] == alone[key]
+        assert 'entities' in analysis._values
+
+    def test_language_detector(self):
+        """Language detection reuses the analysis tokens"""
+        detector = LanguageDetector()
+        analysis = MessageAnalysis("Hola, necesito ayuda con la reserva")
+
+        assert detector.detect_language(analysis.text, analysis=analysis) == detector.detect_language(analysis.text)
+        assert 'tokens' in analysis._values
+
+    def test_trigger_contains_reads_analysis(self):
+        """Compiled substring conditions see the analysed message"""
+        evaluator = TriggerEvaluator()
+        predicate = evaluator.compile_conditions(TriggerType.CONDITION_BASED, {
+            'condition_based': {
+                'logic': 'AND',
+                'conditions': [{'field': 'message_content', 'operator': 'contains', 'value': 'WIFI'}]
+            }
+        })
+        analysis = MessageAnalysis(MESSAGE)
+
+        assert predicate({'message_content': MESSAGE, 'message_analysis': analysis}) is True
+        assert 'lower' in analysis._values
+        assert predicate({'message_content': MESSAGE}) is True
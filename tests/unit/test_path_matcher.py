@@ -0,0 +1,55 @@
+"""
+Unit tests for compiled path pattern lookup
+"""
+
+import pytest
+
+from app.utils.path_matcher import PREFIX, WILDCARD, PathPatternMap
+
+
+HOTEL_PATTERNS = {
+    "/api/v1/hotels/*/messages": ["can_send_messages"],
+    "/api/v1/hotels/*/settings": ["can_modify_settings"],
+    "/api/v1/hotels/*": ["can_view"],
+    "/api/v1/health": ["none"]
+}
+
+
+class TestPathPatternMap:
+    """Test first-match lookups"""
+
+    @pytest.mark.parametrize("path,expected", [
+        ("/api/v1/hotels/42/messages", ["can_send_messages"]),
+        ("/api/v1/hotels/42/settings", ["can_modify_settings"]),
+        ("/api/v1/hotels/42/guests", ["can_view"]),
+        ("/api/v1/health", ["none"]),
+        ("/api/v1/health/db", None),
+        ("/api/v1/triggers", None),
+    ])
+    def test_wildcard_lookup(self, path, expected):
+        """'*' matches anything; patterns without one match the whole path"""
+        assert PathPatternMap(HOTEL_PATTERNS, syntax=WILDCARD).lookup(path) == expected
+
+    def test_first_pattern_wins(self):
+        """Patterns are tried in the map's order"""
+        patterns = PathPatternMap({"/api/v1/hotels/*": "any", "/api/v1/hotels/*/messages": "messages"})
+
+        assert patterns.lookup("/api/v1/hotels/42/messages") == "any"
+
+    def test_prefix_and_suffix_may_overlap(self):
+        """The text around '*' may overlap, as with startswith/endswith checks"""
+        patterns = PathPatternMap({"/api/v1/hotels/*/messages": "messages"})
+
+        assert patterns.lookup("/api/v1/hotels/messages") == "messages"
+
+    def test_prefix_lookup(self):
+        """With prefix syntax a pattern matches every path under it, literally"""
+        patterns = PathPatternMap({"/api/v1/admin/users": "users", "/api/v1/admin/*": "star"}, syntax=PREFIX)
+
+        assert patterns.lookup("/api/v1/admin/users/42") == "users"
+        assert patterns.lookup("/api/v1/admin/reports") is None
+        assert patterns.lookup("/api/v1/admin/*/x") == "star"
+
+    def test_empty_map(self):
+        """An empty map matches nothing"""
+        assert PathPatternMap({}).lookup("/") is None
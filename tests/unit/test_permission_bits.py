@@ -0,0 +1,48 @@
+"""
+Unit tests for permission bitsets
+"""
+
+from app.models.admin_user import AdminPermission, AdminRole, AdminUser
+from app.models.role import Role, UserPermission, UserRole
+from app.utils.permission_bits import ADMIN_PERMISSION_BITS, USER_PERMISSION_BITS, PermissionBitset
+
+
+class TestPermissionBitset:
+    """Test permission masks"""
+
+    def test_one_bit_per_permission(self):
+        """Every permission has its own bit and the full mask covers them all"""
+        bits = list(USER_PERMISSION_BITS.bits.values())
+
+        assert len(set(bits)) == len(UserPermission)
+        assert all(bit & (bit - 1) == 0 for bit in bits)
+        assert USER_PERMISSION_BITS.mask(UserPermission) == USER_PERMISSION_BITS.all
+
+    def test_role_masks_match_role_definitions(self):
+        """Compiled role masks hold exactly the role's default permissions"""
+        for role in UserRole:
+            mask = USER_PERMISSION_BITS.role_masks[role]
+            assert set(USER_PERMISSION_BITS.names(mask)) == set(Role.get_default_role_permissions(role))
+        for role in AdminRole:
+            mask = ADMIN_PERMISSION_BITS.role_masks[role]
+            assert set(ADMIN_PERMISSION_BITS.names(mask)) == set(AdminUser.get_default_role_permissions(role))
+
+    def test_effective_mask(self):
+        """The effective mask is the role's plus explicit permissions; unknown values are ignored"""
+        mask = USER_PERMISSION_BITS.effective_mask(
+            "viewer",
+            [UserPermission.EXPORT_DATA, "not_a_permission"]
+        )
+
+        assert PermissionBitset.allows(mask, USER_PERMISSION_BITS.mask([UserPermission.VIEW_ANALYTICS]))
+        assert PermissionBitset.allows(mask, USER_PERMISSION_BITS.mask(["export_data"]))
+        assert not PermissionBitset.allows(mask, USER_PERMISSION_BITS.mask([UserPermission.MANAGE_SYSTEM]))
+        assert USER_PERMISSION_BITS.effective_mask("unknown_role", None) == 0
+
+    def test_allows_requires_every_bit(self):
+        """A check against several permissions needs all of them"""
+        mask = ADMIN_PERMISSION_BITS.role_masks[AdminRole.VIEWER]
+        required = ADMIN_PERMISSION_BITS.mask([AdminPermission.VIEW_ANALYTICS, AdminPermission.EXPORT_DATA])
+
+        assert not PermissionBitset.allows(mask, required)
+        assert PermissionBitset.allows(ADMIN_PERMISSION_BITS.all, required)
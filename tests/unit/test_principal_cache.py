@@ -0,0 +1,224 @@
+"""
+Unit tests for the authenticated principal cache
+"""
+
+import asyncio
+import json
+import time
+import uuid
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from app.models.role import UserPermission, UserRole
+from app.services.principal_cache import (
+    PRINCIPAL_ADMIN,
+    PRINCIPAL_USER,
+    Principal,
+    PrincipalCache,
+    TokenRevokedError,
+    token_version
+)
+
+
+def make_user(user_id=None, permissions=("export_data",), is_active=True, locked_until=None):
+    """User row as loaded from the database"""
+    return SimpleNamespace(
+        id=user_id or uuid.uuid4(),
+        role=UserRole.VIEWER,
+        permissions=list(permissions),
+        hotel_id=uuid.uuid4(),
+        is_active=is_active,
+        locked_until=locked_until
+    )
+
+
+class CountingLoader:
+    """Loader returning fixed users and counting database loads"""
+
+    def __init__(self, *users):
+        self.users = {user.id: user for user in users}
+        self.loads = 0
+
+    async def __call__(self, user_id):
+        self.loads += 1
+        await asyncio.sleep(0)
+        user = self.users.get(user_id)
+        return Principal.from_user(user) if user else None
+
+
+def make_cache(**kwargs):
+    cache = PrincipalCache(
+        ttl=kwargs.pop("ttl", 30),
+        negative_ttl=kwargs.pop("negative_ttl", 10),
+        max_size=kwargs.pop("max_size", 100),
+        redis_url="redis://localhost:1/0"
+    )
+    # No Redis: revocations are checked in memory only
+    cache._redis_unavailable_until = float("inf")
+    cache.invalidations.publish = Mock()
+    return cache
+
+
+class TestPrincipal:
+    """Test principals built from user rows"""
+
+    def test_permissions_and_lock_state(self):
+        """Role and explicit permissions are resolved once; the lock is checked against the current time"""
+        principal = Principal.from_user(make_user(locked_until=datetime.utcnow() + timedelta(minutes=5)))
+
+        assert principal.has_permission(UserPermission.VIEW_CONVERSATIONS)
+        assert principal.has_permission("export_data")
+        assert not principal.has_permission(UserPermission.MANAGE_SYSTEM)
+        assert not principal.has_permission("not_a_permission")
+        assert principal.permissions == {"view_conversations", "view_analytics", "export_data"}
+        assert principal.is_locked
+
+    def test_token_version(self):
+        """Tokens are told apart by jti, else by issue time"""
+        assert token_version({"jti": "abc", "iat": 1}) == "abc"
+        assert token_version({"iat": 1700000000}) == "1700000000"
+        assert token_version({}) is None
+
+
+class TestPrincipalCache:
+    """Test lookups, invalidation and revocation"""
+
+    @pytest.mark.asyncio
+    async def test_repeated_requests_load_once(self):
+        """Requests with the same token after the first cost no database load"""
+        user = make_user()
+        loader = CountingLoader(user)
+        cache = make_cache()
+
+        for _ in range(5):
+            principal = await cache.resolve(PRINCIPAL_USER, user.id, "1", loader)
+
+        assert principal.user_id == user.id
+        assert loader.loads == 1
+        assert cache.get_stats()['hits'] == 4
+
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_share_one_load(self):
+        """Concurrent requests for an uncached principal load it once"""
+        user = make_user()
+        loader = CountingLoader(user)
+        cache = make_cache()
+
+        results = await asyncio.gather(*[
+            cache.resolve(PRINCIPAL_USER, user.id, "1", loader) for _ in range(10)
+        ])
+
+        assert all(result is results[0] for result in results)
+        assert loader.loads == 1
+
+    @pytest.mark.asyncio
+    async def test_unknown_user_cached_until_negative_ttl(self, monkeypatch):
+        """A missing user is remembered for the negative TTL only"""
+        loader = CountingLoader()
+        cache = make_cache(negative_ttl=10)
+        user_id = uuid.uuid4()
+
+        assert await cache.resolve(PRINCIPAL_USER, user_id, "1", loader) is None
+        assert await cache.resolve(PRINCIPAL_USER, user_id, "1", loader) is None
+        assert loader.loads == 1
+
+        now = time.monotonic()
+        monkeypatch.setattr("app.services.principal_cache.time.monotonic", lambda: now + 11)
+        assert await cache.resolve(PRINCIPAL_USER, user_id, "1", loader) is None
+        assert loader.loads == 2
+
+    @pytest.mark.asyncio
+    async def test_invalidate_evicts_user_and_publishes(self):
+        """Invalidating a user drops all of its tokens' entries, and only those"""
+        user, other = make_user(), make_user()
+        loader = CountingLoader(user, other)
+        cache = make_cache()
+        await cache.resolve(PRINCIPAL_USER, user.id, "1", loader)
+        await cache.resolve(PRINCIPAL_USER, user.id, "2", loader)
+        await cache.resolve(PRINCIPAL_USER, other.id, "1", loader)
+
+        loader.users[user.id] = make_user(user_id=user.id, is_active=False)
+        cache.invalidate(PRINCIPAL_USER, user.id)
+
+        assert not (await cache.resolve(PRINCIPAL_USER, user.id, "1", loader)).is_active
+        await cache.resolve(PRINCIPAL_USER, other.id, "1", loader)
+        assert loader.loads == 4
+        message = json.loads(cache.invalidations.publish.call_args[0][0])
+        assert message == {"kind": PRINCIPAL_USER, "user_id": str(user.id)}
+
+    @pytest.mark.asyncio
+    async def test_invalidation_during_load_is_not_overwritten(self):
+        """A load started before an invalidation does not cache what it read"""
+        user = make_user()
+        cache = make_cache()
+
+        async def loader(user_id):
+            cache.invalidate(PRINCIPAL_USER, user_id)
+            return Principal.from_user(user)
+
+        assert await cache.resolve(PRINCIPAL_USER, user.id, "1", loader) is not None
+        assert cache.get_stats()['size'] == 0
+
+    @pytest.mark.asyncio
+    async def test_remote_invalidation_of_a_kind(self):
+        """Invalidations published by other workers evict users of that kind only"""
+        user = make_user()
+        loader = CountingLoader(user)
+        cache = make_cache()
+        await cache.resolve(PRINCIPAL_USER, user.id, "1", loader)
+        await cache.resolve(PRINCIPAL_ADMIN, user.id, "1", loader)
+
+        cache.apply_invalidation(json.dumps({"kind": PRINCIPAL_USER, "user_id": None}))
+        cache.apply_invalidation("not json")
+
+        assert cache.get_stats()['size'] == 1
+        assert cache.get_stats()['remote_invalidations'] == 1
+
+    @pytest.mark.asyncio
+    async def test_revoked_token_rejected_from_memory(self):
+        """A revoked token is rejected without a load; the user's other tokens still work"""
+        user = make_user()
+        loader = CountingLoader(user)
+        cache = make_cache()
+        await cache.resolve(PRINCIPAL_USER, user.id, "1", loader)
+
+        await cache.revoke_token(PRINCIPAL_USER, user.id, "1", time.time() + 600)
+
+        with pytest.raises(TokenRevokedError):
+            await cache.resolve(PRINCIPAL_USER, user.id, "1", loader)
+        assert (await cache.resolve(PRINCIPAL_USER, user.id, "2", loader)).user_id == user.id
+        assert loader.loads == 2
+
+    @pytest.mark.asyncio
+    async def test_token_revoked_in_redis_rejected(self):
+        """A token revoked by another worker is found in Redis on a miss"""
+        user = make_user()
+        loader = CountingLoader(user)
+        cache = make_cache()
+        cache._redis_client = Mock(get=AsyncMock(return_value=str(time.time() + 600).encode()))
+
+        with pytest.raises(TokenRevokedError):
+            await cache.resolve(PRINCIPAL_USER, user.id, "1", loader)
+        with pytest.raises(TokenRevokedError):
+            await cache.resolve(PRINCIPAL_USER, user.id, "1", loader)
+
+        assert loader.loads == 0
+        cache._redis_client.get.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_size_is_bounded(self):
+        """The least recently used principals are evicted beyond max_size"""
+        users = [make_user() for _ in range(3)]
+        loader = CountingLoader(*users)
+        cache = make_cache(max_size=2)
+
+        for user in users:
+            await cache.resolve(PRINCIPAL_USER, user.id, "1", loader)
+
+        assert cache.get_stats()['size'] == 2
+        assert cache.get_stats()['evicted'] == 1
+        await cache.resolve(PRINCIPAL_USER, users[0].id, "1", loader)
+        assert loader.loads == 4
@@ -0,0 +1,132 @@
+"""
+Unit tests for the local rate limit lease tier
+"""
+
+import pytest
+from unittest.mock import AsyncMock, Mock
+
+from app.core.rate_limit_config import RateLimitRule, RateLimitScope
+from app.utils.rate_limit_lease import LeasedRateLimiter
+
+
+@pytest.fixture
+def rule():
+    """Rule whose tightest window allows 100 requests"""
+    return RateLimitRule(
+        name="global",
+        scope=RateLimitScope.GLOBAL,
+        requests_per_minute=100,
+        requests_per_hour=1000
+    )
+
+
+@pytest.fixture
+def storage():
+    """Storage granting every lease in full"""
+    storage = Mock()
+    storage.lease = AsyncMock(side_effect=lambda key, rule, count, current_time: (
+        count,
+        {"checks": {"minute": {"limit": 100, "remaining": 50}}, "lease_id": f"lease-{current_time}"}
+    ))
+    storage.release = AsyncMock(return_value=True)
+    return storage
+
+
+@pytest.fixture
+def limiter(storage):
+    """Limiter leasing 10% of the tightest window"""
+    return LeasedRateLimiter(storage, lease_fraction=0.1, max_lease_size=50, max_lease_seconds=5.0)
+
+
+class TestLeasedRateLimiter:
+    """Test local admission from leased quota"""
+
+    def test_lease_size_and_duration(self, limiter, rule):
+        """Leases cover a fraction of the tightest window, capped by config"""
+        assert limiter.lease_size(rule) == 10
+        assert limiter.lease_seconds(rule) == 5.0
+
+        limiter.max_lease_size = 4
+        assert limiter.lease_size(rule) == 4
+
+    @pytest.mark.asyncio
+    async def test_most_requests_answered_locally(self, limiter, storage, rule):
+        """Only one request per lease reaches storage"""
+        for i in range(100):
+            allowed, _ = await limiter.acquire("global:global", rule, current_time=1000.0 + i * 0.01)
+            assert allowed is True
+
+        assert storage.lease.await_count == 10
+        assert limiter.get_stats()['local_hit_rate'] == 0.9
+
+    @pytest.mark.asyncio
+    async def test_local_metadata_counts_unspent_quota(self, limiter, rule):
+        """Headers reflect quota still held locally"""
+        await limiter.acquire("key", rule, current_time=1000.0)
+        _, metadata = await limiter.acquire("key", rule, current_time=1000.1)
+
+        assert metadata["checks"]["minute"]["remaining"] == 50 + 8
+
+    @pytest.mark.asyncio
+    async def test_denied_when_nothing_granted(self, limiter, storage, rule):
+        """An exhausted limit denies without creating a lease"""
+        storage.lease = AsyncMock(return_value=(0, {"checks": {}, "lease_id": "x"}))
+
+        allowed, _ = await limiter.acquire("key", rule, current_time=1000.0)
+
+        assert allowed is False
+        assert limiter.get_stats()['leases'] == 0
+
+    @pytest.mark.asyncio
+    async def test_expired_lease_returns_unspent_quota(self, limiter, storage, rule):
+        """Quota left when a lease expires is given back before leasing again"""
+        await limiter.acquire("key", rule, current_time=1000.0)
+        await limiter.acquire("key", rule, current_time=1010.0)
+
+        storage.release.assert_awaited_once_with("key", rule, 9, "lease-1000.0", 1010.0)
+        assert storage.lease.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_release_all_on_shutdown(self, limiter, storage, rule):
+        """Unspent quota of live leases is returned"""
+        import time
+        now = time.time()
+        await limiter.acquire("a", rule, current_time=now)
+        await limiter.acquire("a", rule, current_time=now)
+
+        returned = await limiter.release_all()
+
+        assert returned == 8
+        assert limiter.get_stats()['leases'] == 0
+
+    @pytest.mark.asyncio
+    async def test_refund_returns_token_to_live_lease(self, limiter, storage, rule):
+        """A refunded request can be admitted again from the same lease"""
+        await limiter.acquire("key", rule, current_time=1000.0)
+        _, metadata = await limiter.acquire("key", rule, current_time=1000.1)
+
+        assert await limiter.refund("key", rule, metadata, current_time=1000.2) is True
+        _, metadata = await limiter.acquire("key", rule, current_time=1000.3)
+
+        assert metadata["checks"]["minute"]["remaining"] == 50 + 8
+        storage.release.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_refund_without_live_lease_releases_to_storage(self, limiter, storage, rule):
+        """Requests from a lease that is gone are given back to storage"""
+        _, metadata = await limiter.acquire("key", rule, current_time=1000.0)
+
+        await limiter.refund("key", rule, metadata, current_time=1010.0)
+
+        storage.release.assert_awaited_once_with("key", rule, 1, "lease-1000.0", 1010.0)
+
+    @pytest.mark.asyncio
+    async def test_storage_fallback_is_not_leased(self, limiter, storage, rule):
+        """Fail-open results admit the request without caching quota"""
+        storage.lease = AsyncMock(return_value=(1, {"error": "down", "fallback": True}))
+
+        allowed, _ = await limiter.acquire("key", rule, current_time=1000.0)
+        await limiter.acquire("key", rule, current_time=1000.1)
+
+        assert allowed is True
+        assert storage.lease.await_count == 2
@@ -0,0 +1,144 @@
+"""
+Unit tests for Redis rate limit storage
+"""
+
+import pytest
+from unittest.mock import AsyncMock, Mock
+
+from app.core.rate_limit_config import RateLimitAlgorithm, RateLimitRule, RateLimitScope
+from app.utils.rate_limit_storage import (
+    GCRA_SCRIPT, SLIDING_WINDOW_SCRIPT, RedisRateLimitStorage, get_rule_windows
+)
+
+
+@pytest.fixture
+def rule():
+    """Rule with a minute, an hour and a burst window"""
+    return RateLimitRule(
+        name="api",
+        scope=RateLimitScope.PER_IP,
+        requests_per_minute=10,
+        requests_per_hour=100,
+        burst_limit=3,
+        burst_window_seconds=5
+    )
+
+
+@pytest.fixture
+def script():
+    """Registered Lua script returning one allowed result per window"""
+    return AsyncMock(return_value=[
+        1,
+        4, "1060.0", "1000.0", 1,
+        4, "4600.0", "1000.0", 1,
+        3, "1005.0", "1005.0", 1
+    ])
+
+
+@pytest.fixture
+def storage(script):
+    """Storage with a mocked Redis client"""
+    storage = RedisRateLimitStorage(redis_url="redis://localhost:6379/0")
+    client = Mock()
+    client.register_script = Mock(return_value=script)
+    storage._get_redis_client = AsyncMock(return_value=client)
+    return storage
+
+
+class TestRedisRateLimitStorage:
+    """Test single-round-trip multi-window rate limiting"""
+
+    def test_rule_windows(self, rule):
+        """Configured windows are returned in evaluation order"""
+        assert get_rule_windows(rule) == [
+            ("minute", 10, 60),
+            ("hour", 100, 3600),
+            ("burst", 3, 5)
+        ]
+
+    @pytest.mark.asyncio
+    async def test_acquire_runs_one_script(self, storage, script, rule):
+        """All windows are checked and recorded in a single script call"""
+        allowed, metadata = await storage.acquire("api:ip:1.2.3.4", rule, current_time=1000.0)
+
+        assert allowed is True
+        script.assert_awaited_once()
+        call = script.await_args.kwargs
+        assert call["keys"] == [
+            "rate_limit:{api:ip:1.2.3.4}:minute",
+            "rate_limit:{api:ip:1.2.3.4}:hour",
+            "rate_limit:{api:ip:1.2.3.4}:burst"
+        ]
+        assert call["args"][:2] == ["1000.0", "acquire"]
+        assert call["args"][3:] == [1, 10, 60, 100, 3600, 3, 5]
+
+        burst = metadata["checks"]["burst"]
+        assert burst["current"] == 3
+        assert burst["remaining"] == 0
+        assert burst["retry_at"] == 1005.0
+
+    @pytest.mark.asyncio
+    async def test_refund_releases_acquired_request(self, storage, script, rule):
+        """A refund removes the request recorded by acquire"""
+        _, metadata = await storage.acquire("key", rule, current_time=1000.0)
+        member = script.await_args.kwargs["args"][2]
+
+        assert metadata["request_id"] == member
+        assert await storage.refund("key", rule, metadata, current_time=1000.0) is True
+        assert script.await_args.kwargs["args"][1:4] == ["release", member, 1]
+
+    @pytest.mark.asyncio
+    async def test_check_does_not_record(self, storage, script, rule):
+        """Read-only checks run the script in check mode"""
+        await storage.check_rate_limit("key", rule, current_time=1000.0)
+
+        assert script.await_args.kwargs["args"][1] == "check"
+
+    @pytest.mark.asyncio
+    async def test_denied_window_reported(self, storage, script, rule):
+        """A denied window denies the whole rule"""
+        script.return_value = [
+            0,
+            10, "1030.0", "1030.0", 0,
+            50, "4600.0", "1000.0", 1,
+            2, "1004.0", "1000.0", 1
+        ]
+
+        allowed, metadata = await storage.acquire("key", rule, current_time=1000.0)
+
+        assert allowed is False
+        assert metadata["overall_allowed"] is False
+        assert metadata["checks"]["minute"]["allowed"] is False
+        assert metadata["checks"]["hour"]["allowed"] is True
+
+    @pytest.mark.asyncio
+    async def test_gcra_uses_own_script_and_keys(self, storage, rule):
+        """GCRA rules keep one timestamp per window under separate keys"""
+        rule.algorithm = RateLimitAlgorithm.GCRA
+        client = await storage._get_redis_client()
+
+        await storage.acquire("key", rule, current_time=1000.0)
+
+        client.register_script.assert_called_once_with(GCRA_SCRIPT)
+        keys = client.register_script.return_value.await_args.kwargs["keys"]
+        assert keys[0] == "rate_limit:{key}:gcra:minute"
+
+    @pytest.mark.asyncio
+    async def test_script_registered_once(self, storage, rule):
+        """Scripts are registered once and reused via EVALSHA"""
+        client = await storage._get_redis_client()
+
+        await storage.acquire("a", rule, current_time=1000.0)
+        await storage.acquire("b", rule, current_time=1001.0)
+
+        client.register_script.assert_called_once_with(SLIDING_WINDOW_SCRIPT)
+
+    @pytest.mark.asyncio
+    async def test_redis_failure_allows_request(self, storage, script, rule):
+        """Storage errors fail open"""
+        script.side_effect = ConnectionError("redis down")
+
+        allowed, metadata = await storage.acquire("key", rule, current_time=1000.0)
+
+        assert allowed is True
+        assert metadata["fallback"] is True
@@ -0,0 +1,215 @@
+"""
+Unit tests for the single-frame ASGI request pipeline
+"""
+
+import asyncio
+
+import pytest
+from starlette.exceptions import HTTPException
+from starlette.responses import JSONResponse, PlainTextResponse
+
+from app.middleware.pipeline import SKIP, PathPrefixTable, PipelineStage, RequestPipeline
+
+
+class RecordingStage(PipelineStage):
+    """Stage that records its hooks and can answer, skip or fail"""
+
+    def __init__(self, name, events, answer=None, error_answer=None, raises=None, **kwargs):
+        super().__init__(**kwargs)
+        self.name = name
+        self.events = events
+        self.answer = answer
+        self.error_answer = error_answer
+        self.raises = raises
+
+    async def before(self, ctx):
+        self.events.append(f"{self.name}:before")
+        if self.raises:
+            raise self.raises
+        return self.answer
+
+    def on_start(self, ctx, headers):
+        self.events.append(f"{self.name}:start")
+        headers[f"X-{self.name}"] = "1"
+
+    async def on_error(self, ctx, error):
+        self.events.append(f"{self.name}:error")
+        return self.error_answer
+
+    async def after(self, ctx):
+        self.events.append(f"{self.name}:after:{ctx.status_code}:{type(ctx.error).__name__}")
+
+
+async def echo_app(scope, receive, send):
+    """Answers with the request body"""
+    body = b""
+    more_body = True
+    while more_body:
+        message = await receive()
+        body += message.get("body", b"")
+        more_body = message.get("more_body", False)
+    await PlainTextResponse(body or b"ok")(scope, receive, send)
+
+
+async def failing_app(scope, receive, send):
+    raise RuntimeError("handler failed")
+
+
+async def call(app, path="/api/v1/things", body=b""):
+    """Run one HTTP request through an ASGI app; returns (status, headers, body)"""
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": path,
+        "query_string": b"",
+        "headers": [(b"content-length", str(len(body)).encode())],
+        "client": ("10.0.0.1", 1234)
+    }
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    sent = []
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    await app(scope, receive, send)
+    start = sent[0]
+    return (
+        start["status"],
+        {key.decode(): value.decode() for key, value in start["headers"]},
+        b"".join(message.get("body", b"") for message in sent[1:])
+    )
+
+
+class TestPathPrefixTable:
+    """Test compiled path tables"""
+
+    def test_prefix_and_exact_matches(self):
+        """Prefixes match below them; exact paths only themselves"""
+        table = PathPrefixTable(["/api/v1/webhooks"], exact=["/health"])
+
+        assert table.matches("/api/v1/webhooks/green-api")
+        assert table.matches("/health")
+        assert not table.matches("/health/db")
+        assert not table.matches("/api/v1/hotels")
+        assert not PathPrefixTable()
+
+
+class TestRequestPipeline:
+    """Test stage ordering, short-circuits and errors"""
+
+    @pytest.mark.asyncio
+    async def test_hooks_run_in_stack_order(self):
+        """Stages run outermost first on the way in and innermost first on the way out"""
+        events = []
+        pipeline = RequestPipeline(echo_app, [RecordingStage("outer", events), RecordingStage("inner", events)])
+
+        status, headers, body = await call(pipeline)
+
+        assert status == 200
+        assert body == b"ok"
+        assert headers["x-outer"] == headers["x-inner"] == "1"
+        assert events == [
+            "outer:before", "inner:before",
+            "inner:start", "outer:start",
+            "inner:after:200:NoneType", "outer:after:200:NoneType"
+        ]
+
+    @pytest.mark.asyncio
+    async def test_stage_answer_skips_inner_stages_and_app(self):
+        """A stage answering the request stops the pipeline; outer stages still see the response"""
+        events = []
+        pipeline = RequestPipeline(failing_app, [
+            RecordingStage("outer", events),
+            RecordingStage("auth", events, answer=JSONResponse({"error": "denied"}, status_code=401)),
+            RecordingStage("inner", events)
+        ])
+
+        status, headers, _ = await call(pipeline)
+
+        assert status == 401
+        assert "x-outer" in headers
+        assert "x-auth" not in headers
+        assert events == ["outer:before", "auth:before", "outer:start", "outer:after:401:NoneType"]
+
+    @pytest.mark.asyncio
+    async def test_http_exception_in_stage_becomes_response(self):
+        """HTTPException raised by a stage answers with its status"""
+        events = []
+        pipeline = RequestPipeline(echo_app, [
+            RecordingStage("webhook", events, raises=HTTPException(status_code=413, detail="Payload too large"))
+        ])
+
+        status, _, body = await call(pipeline)
+
+        assert status == 413
+        assert b"Payload too large" in body
+
+    @pytest.mark.asyncio
+    async def test_innermost_error_answer_wins(self):
+        """An application error is answered by the innermost stage that handles it"""
+        events = []
+        pipeline = RequestPipeline(failing_app, [
+            RecordingStage("monitoring", events, error_answer=PlainTextResponse("outer", status_code=500)),
+            RecordingStage("circuit_breaker", events, error_answer=PlainTextResponse("inner", status_code=503))
+        ])
+
+        status, _, body = await call(pipeline)
+
+        assert (status, body) == (503, b"inner")
+        assert events[-2:] == [
+            "circuit_breaker:after:503:RuntimeError",
+            "monitoring:after:503:RuntimeError"
+        ]
+        assert "monitoring:error" not in events
+
+    @pytest.mark.asyncio
+    async def test_skipped_and_excluded_stages_do_not_run(self):
+        """Stages skip by path table or by returning SKIP"""
+        events = []
+        pipeline = RequestPipeline(echo_app, [
+            RecordingStage("webhook", events, include=PathPrefixTable(["/webhooks"])),
+            RecordingStage("green_api", events, answer=SKIP)
+        ])
+
+        status, headers, _ = await call(pipeline, path="/health")
+
+        assert status == 200
+        assert events == ["green_api:before"]
+        assert "x-green_api" not in headers
+        assert pipeline.plan("/health") == (pipeline.stages[1],)
+
+    @pytest.mark.asyncio
+    async def test_body_read_by_stage_is_replayed_to_app(self):
+        """The application gets the body a stage already read"""
+        class BodyReader(PipelineStage):
+            async def before(self, ctx):
+                ctx.data["body"] = await ctx.request.body()
+
+        pipeline = RequestPipeline(echo_app, [BodyReader()])
+
+        _, _, body = await call(pipeline, body=b'{"typeWebhook": "incomingMessageReceived"}')
+
+        assert body == b'{"typeWebhook": "incomingMessageReceived"}'
+
+    @pytest.mark.asyncio
+    async def test_timeout_set_by_stage_bounds_the_app(self):
+        """A stage's timeout cancels a slow handler and is reported as an error"""
+        class Deadline(PipelineStage):
+            async def before(self, ctx):
+                ctx.timeout = 0.01
+
+            async def on_error(self, ctx, error):
+                if isinstance(error, asyncio.TimeoutError):
+                    return PlainTextResponse("timeout", status_code=504)
+
+        async def slow_app(scope, receive, send):
+            await asyncio.sleep(1)
+
+        status, _, _ = await call(RequestPipeline(slow_app, [Deadline()]))
+
+        assert status == 504
@@ -205,6 +205,83 @@ class TestResponseGenerator:
                 assert result.confidence == 0.6
                 mock_fallback.assert_called_once()
     
+    @pytest.mark.asyncio
+    async def test_stream_response_yields_sentence_chunks(
+        self,
+        response_generator,
+        mock_message,
+        mock_hotel,
+        mock_guest
+    ):
+        """Test streamed response is cut into chunks and cached once complete"""
+        from app.schemas.deepseek import ResponseGenerationRequest
+        
+        request = ResponseGenerationRequest(
+            message=mock_message.content,
+            hotel_id=str(mock_hotel.id),
+            guest_id=str(mock_guest.id)
+        )
+        
+        async def deltas():
+            for delta in ["Of course, Alice. ", "Your reservation ", "is confirmed.\n\n", "See you ", "soon!"]:
+                yield delta
+        
+        mock_client = MagicMock()
+        mock_client.stream_chat_completion.return_value = deltas()
+        response_generator.config = response_generator.config.copy(update={'stream_min_chunk_chars': 20})
+        response_generator.cache_service = MagicMock()
+        response_generator.cache_service.get_response_cache = AsyncMock(return_value=None)
+        response_generator.cache_service.set_response_cache = AsyncMock()
+        
+        with patch.object(response_generator, '_prepare_generation', new_callable=AsyncMock) as mock_prepare:
+            with patch('app.services.response_generator.get_deepseek_client', new_callable=AsyncMock) as mock_get_client:
+                mock_prepare.return_value = (mock_hotel, mock_guest, request, ResponseType.HELPFUL, "context-hash")
+                mock_get_client.return_value = mock_client
+                
+                chunks = [chunk async for chunk in response_generator.stream_response(mock_message)]
+        
+        assert chunks == ["Of course, Alice. Your reservation is confirmed.", "See you soon!"]
+        cached = response_generator.cache_service.set_response_cache.call_args.kwargs['result']
+        assert cached.response == "Of course, Alice. Your reservation is confirmed.\n\nSee you soon!"
+    
+    @pytest.mark.asyncio
+    async def test_stream_response_falls_back_before_first_chunk(
+        self,
+        response_generator,
+        mock_message,
+        mock_hotel,
+        mock_guest
+    ):
+        """Test fallback response is sent when the stream fails before any chunk"""
+        from app.schemas.deepseek import ResponseGenerationRequest
+        
+        request = ResponseGenerationRequest(
+            message=mock_message.content,
+            hotel_id=str(mock_hotel.id),
+            guest_id=str(mock_guest.id)
+        )
+        
+        async def failing_deltas():
+            raise Exception("API Error")
+            yield
+        
+        mock_client = MagicMock()
+        mock_client.stream_chat_completion.return_value = failing_deltas()
+        response_generator.cache_service = MagicMock()
+        response_generator.cache_service.get_response_cache = AsyncMock(return_value=None)
+        response_generator.cache_service.set_response_cache = AsyncMock()
+        
+        with patch.object(response_generator, '_prepare_generation', new_callable=AsyncMock) as mock_prepare:
+            with patch('app.services.response_generator.get_deepseek_client', new_callable=AsyncMock) as mock_get_client:
+                mock_prepare.return_value = (mock_hotel, mock_guest, request, ResponseType.HELPFUL, "context-hash")
+                mock_get_client.return_value = mock_client
+                
+                chunks = [chunk async for chunk in response_generator.stream_response(mock_message)]
+        
+        assert len(chunks) == 1
+        assert "Grand Test Hotel" in chunks[0]
+        response_generator.cache_service.set_response_cache.assert_not_called()
+    
     def test_extract_suggested_actions(self, response_generator):
         """Test suggested actions extraction"""
         # Test complaint resolution
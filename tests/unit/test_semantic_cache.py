@@ -0,0 +1,92 @@
+"""
+Unit tests for near-duplicate matching of cached DeepSeek results
+"""
+
+import json
+
+import pytest
+
+from app.services.semantic_cache import (
+    SemanticCache, SemanticIndex, cosine_similarity, embed_text, normalize_text
+)
+
+
+def similarity(a, b):
+    return cosine_similarity(embed_text(normalize_text(a)), embed_text(normalize_text(b)))
+
+
+class TestNormalization:
+    """Test text normalization and embeddings"""
+
+    @pytest.mark.parametrize("text,normalized", [
+        ("Where's the pool??", "where is the pool"),
+        ("  WHAT is the   WiFi password? 🙏", "what is the wifi password"),
+        ("I can't open the door!!!", "i can not open the door"),
+        ("check-out_time", "check out time"),
+    ])
+    def test_normalize_text(self, text, normalized):
+        """Case, punctuation, emoji and whitespace are normalized away"""
+        assert normalize_text(text) == normalized
+
+    def test_paraphrases_closer_than_other_questions(self):
+        """Paraphrases clear the default threshold; other topics and negations do not"""
+        threshold = SemanticCache().similarity_threshold
+
+        assert similarity("What time is breakfast served?", "when is breakfast served") >= threshold
+        assert similarity("Where is the pool?", "Where is the gym?") < threshold
+        assert similarity("The pool is clean", "The pool is not clean") < threshold
+
+
+class TestSemanticIndex:
+    """Test the inverted nearest-neighbour index"""
+
+    def test_nearest_and_eviction(self):
+        """The most similar entry is found; the least recently used is evicted"""
+        index = SemanticIndex(max_entries=2)
+        index.add('pool', embed_text("where is the pool"))
+        index.add('gym', embed_text("where is the gym"))
+
+        assert index.nearest(embed_text("where is the swimming pool"))[0] == 'pool'
+
+        index.add('spa', embed_text("book a spa massage"))
+        assert len(index) == 2
+        assert index.nearest(embed_text("gym opening hours")) is None
+
+    def test_remove(self):
+        """Removed entries are no longer matched"""
+        index = SemanticIndex(max_entries=10)
+        index.add('pool', embed_text("where is the pool"))
+        index.remove('pool')
+
+        assert index.nearest(embed_text("where is the pool")) is None
+
+
+class TestSemanticCache:
+    """Test scopes and shadow agreement"""
+
+    def test_scopes_are_isolated(self):
+        """A hotel only matches its own cached texts"""
+        cache = SemanticCache()
+        cache.add(('sentiment', 'hotel-1'), 'key-1', "what time is breakfast served")
+
+        assert cache.nearest(('sentiment', 'hotel-1'), "when is breakfast served")[0] == 'key-1'
+        assert cache.nearest(('sentiment', 'hotel-2'), "when is breakfast served") is None
+
+    def test_shadow_agreement(self):
+        """Shadow matches are compared with the fresh result cached under the same key"""
+        cache = SemanticCache(mode='shadow')
+        positive = json.dumps({'sentiment': 'positive', 'requires_attention': False})
+        negative = json.dumps({'sentiment': 'negative', 'requires_attention': True})
+
+        cache.record_shadow('sentiment', 'key-a', positive, 0.9)
+        cache.record_shadow('sentiment', 'key-b', positive, 0.9)
+
+        assert cache.settle_shadow('key-a', positive) is True
+        assert cache.settle_shadow('key-b', negative) is False
+        assert cache.settle_shadow('key-c', positive) is None
+        assert cache.get_stats()['shadow_agreement_percent'] == 50.0
+
+    def test_unknown_mode_rejected(self):
+        """Misconfigured modes fail loudly"""
+        with pytest.raises(ValueError):
+            SemanticCache(mode='on')
@@ -261,6 +261,50 @@ class TestSentimentAnalyzer:
         assert result["sentiment"] == "neutral"
         assert result["confidence"] == 0.5
     
+    def test_parse_batch_sentiment_response(self, sentiment_analyzer):
+        """Test mapping batched results back to messages by index"""
+        response = 'Results: [{"index": 2, "sentiment": "negative"}, {"index": 0, "sentiment": "positive"}, {"index": 7}]'
+        
+        items = sentiment_analyzer._parse_batch_sentiment_response(response, 3)
+        
+        assert items[0]["sentiment"] == "positive"
+        assert items[1] is None
+        assert items[2]["sentiment"] == "negative"
+        assert sentiment_analyzer._parse_batch_sentiment_response("No JSON here", 2) == [None, None]
+    
+    @pytest.mark.asyncio
+    async def test_request_sentiment_batch(self, sentiment_analyzer):
+        """Test one prompt analyzing several messages"""
+        from app.schemas.deepseek import MessageRole, SentimentAnalysisRequest
+        
+        requests = [
+            SentimentAnalysisRequest(text=text, hotel_id=str(uuid.uuid4()), guest_id=str(uuid.uuid4()))
+            for text in ["Lovely pool!", "The shower is broken"]
+        ]
+        
+        mock_client = AsyncMock()
+        mock_response = MagicMock()
+        mock_response.choices = [MagicMock()]
+        mock_response.choices[0].message.content = (
+            '[{"index": 1, "sentiment": "negative", "score": -0.6, "confidence": 0.9, "requires_attention": false},'
+            ' {"index": 0, "sentiment": "positive", "score": 0.8, "confidence": 0.9, "requires_attention": false}]'
+        )
+        mock_client.chat_completion.return_value = mock_response
+        
+        with patch('app.services.sentiment_analyzer.get_deepseek_client', new_callable=AsyncMock) as mock_get_client:
+            mock_get_client.return_value = mock_client
+            
+            results = await sentiment_analyzer._request_sentiment_batch(requests, "test-correlation-id")
+        
+        assert [result.sentiment for result in results] == [SentimentType.POSITIVE, SentimentType.NEGATIVE]
+        mock_client.chat_completion.assert_called_once()
+        user_prompt = next(
+            message.content for message in mock_client.chat_completion.call_args.kwargs['messages']
+            if message.role == MessageRole.USER
+        )
+        assert '[0] "Lovely pool!"' in user_prompt
+        assert '[1] "The shower is broken"' in user_prompt
+    
     def test_validate_sentiment_result(self, sentiment_analyzer):
         """Test sentiment result validation"""
         # Test positive sentiment with negative score (should be corrected)
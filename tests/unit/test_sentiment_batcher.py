@@ -0,0 +1,110 @@
+"""
+Unit tests for micro-batched sentiment analysis
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.sentiment_batcher import SentimentBatchCollector, SentimentBatchError
+
+
+class FakeAnalyzer:
+    """Sentiment analyzer recording the prompts it would send"""
+
+    def __init__(self):
+        self.token_optimizer = SimpleNamespace(estimate_tokens=lambda text: len(text.split()))
+        self.batches = []
+        self.singles = []
+
+    async def _request_sentiment(self, request, correlation_id):
+        self.singles.append(request.text)
+        await asyncio.sleep(0)
+        return f"sentiment of {request.text}"
+
+    async def _request_sentiment_batch(self, requests, correlation_id):
+        self.batches.append([request.text for request in requests])
+        await asyncio.sleep(0)
+        return [
+            None if request.text == 'unparseable' else f"sentiment of {request.text}"
+            for request in requests
+        ]
+
+
+def make_request(text, context=None):
+    return SimpleNamespace(text=text, context=context or {}, language='en', hotel_id='h1')
+
+
+@pytest.fixture
+def analyzer():
+    """Fake analyzer"""
+    return FakeAnalyzer()
+
+
+class TestSentimentBatchCollector:
+    """Test packing requests into batched prompts"""
+
+    @pytest.mark.asyncio
+    async def test_results_mapped_back_per_message(self, analyzer):
+        """Full batches are sent at once and each caller gets its own result"""
+        batcher = SentimentBatchCollector(analyzer, max_messages=4, max_wait_ms=5)
+        texts = [f"message {i}" for i in range(10)]
+
+        results = await asyncio.gather(*(batcher.submit(make_request(text), 'c1') for text in texts))
+
+        assert results == [f"sentiment of {text}" for text in texts]
+        assert [len(batch) for batch in analyzer.batches] == [4, 4, 2]
+        stats = batcher.get_stats()
+        assert stats['flush_size'] == 2
+        assert stats['flush_deadline'] == 1
+
+    @pytest.mark.asyncio
+    async def test_flush_on_token_budget(self, analyzer):
+        """A message that would overflow the token budget starts a new batch"""
+        batcher = SentimentBatchCollector(analyzer, max_messages=10, max_tokens=6, max_wait_ms=5)
+
+        await asyncio.gather(*(
+            batcher.submit(make_request(text), 'c1')
+            for text in ["one two three", "four five", "six seven", "eight"]
+        ))
+
+        assert analyzer.batches == [["one two three", "four five"], ["six seven", "eight"]]
+        assert batcher.get_stats()['flush_tokens'] == 1
+
+    @pytest.mark.asyncio
+    async def test_lone_message_sent_after_deadline(self, analyzer):
+        """A message nobody joins is sent on its own prompt"""
+        batcher = SentimentBatchCollector(analyzer, max_messages=10, max_wait_ms=5)
+
+        assert await batcher.submit(make_request("hello"), 'c1') == "sentiment of hello"
+        assert analyzer.singles == ["hello"]
+        assert analyzer.batches == []
+
+    @pytest.mark.asyncio
+    async def test_long_and_contextual_messages_sent_alone(self, analyzer):
+        """Long messages and messages with context do not wait for a batch"""
+        batcher = SentimentBatchCollector(analyzer, max_message_tokens=3, max_wait_ms=5)
+
+        await batcher.submit(make_request("a rather long complaint about the room"), 'c1')
+        await batcher.submit(make_request("noisy", context={'room': '12'}), 'c1')
+
+        assert len(analyzer.singles) == 2
+        assert batcher.get_stats()['single_messages'] == 2
+
+    @pytest.mark.asyncio
+    async def test_missing_result_fails_only_its_message(self, analyzer):
+        """A message without a valid result raises; the rest of the batch succeeds"""
+        batcher = SentimentBatchCollector(analyzer, max_messages=3, max_wait_ms=5)
+
+        results = await asyncio.gather(
+            batcher.submit(make_request("great stay"), 'c1'),
+            batcher.submit(make_request("unparseable"), 'c1'),
+            batcher.submit(make_request("cold room"), 'c1'),
+            return_exceptions=True
+        )
+
+        assert results[0] == "sentiment of great stay"
+        assert isinstance(results[1], SentimentBatchError)
+        assert results[2] == "sentiment of cold room"
+        assert batcher.get_stats()['failed_messages'] == 1
@@ -0,0 +1,124 @@
+"""
+Unit tests for webhook signature validation and replay protection
+"""
+
+import hashlib
+import hmac
+import time
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from app.core.webhook_config import GreenAPIWebhookConfig
+from app.utils.signature_validator import (
+    EnhancedSignatureValidator,
+    ReplayAttackError,
+    SignatureValidationError,
+    signature_headers
+)
+
+
+SECRET = "webhook-secret"
+BODY = b'{"typeWebhook": "incomingMessageReceived"}'
+
+
+def sign(body, secret=SECRET):
+    return hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+@pytest.fixture
+def validator():
+    """Validator with a mock async Redis client and no sync client"""
+    validator = EnhancedSignatureValidator(GreenAPIWebhookConfig())
+    validator.async_redis_client = AsyncMock()
+    validator.async_redis_client.set.return_value = True
+    return validator
+
+
+class TestReplayProtection:
+    """Test replay checks on Redis"""
+
+    def test_no_connection_until_used(self):
+        """Building a validator opens no Redis connection"""
+        validator = EnhancedSignatureValidator(GreenAPIWebhookConfig())
+
+        assert validator._redis_client_created is False
+        assert validator.async_redis_client is None
+
+    @pytest.mark.asyncio
+    async def test_first_delivery_claims_key_atomically(self, validator):
+        """A new request is claimed with a single SET NX EX"""
+        timestamp = int(time.time())
+
+        assert await validator.check_replay_attack_async("sig", timestamp, BODY) is True
+
+        call = validator.async_redis_client.set.await_args
+        assert call.args[0] == validator.replay_cache_key("sig", timestamp, BODY)
+        assert call.kwargs == {"nx": True, "ex": 3600}
+        validator.async_redis_client.exists.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_replay_detected(self, validator):
+        """SET NX failing means the request was already seen"""
+        validator.async_redis_client.set.return_value = None
+
+        with pytest.raises(ReplayAttackError):
+            await validator.check_replay_attack_async("sig", int(time.time()), BODY)
+
+    @pytest.mark.asyncio
+    async def test_redis_error_fails_open(self, validator):
+        """Requests are accepted when Redis cannot be reached"""
+        validator.async_redis_client.set.side_effect = ConnectionError("down")
+
+        assert await validator.check_replay_attack_async("sig", int(time.time()), BODY) is True
+
+    def test_sync_check_uses_set_nx(self):
+        """The sync check claims the key in one SET NX EX as well"""
+        validator = EnhancedSignatureValidator(GreenAPIWebhookConfig())
+        validator._redis_client = Mock()
+        validator._redis_client_created = True
+        validator._redis_client.set.return_value = None
+
+        with pytest.raises(ReplayAttackError):
+            validator.check_replay_attack("sig", int(time.time()), BODY)
+
+        assert validator._redis_client.set.call_args.kwargs == {"nx": True, "ex": 3600}
+        validator._redis_client.exists.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_release_claim(self, validator):
+        """A released claim is deleted so a redelivery is accepted"""
+        await validator.release_replay_claim("webhook_replay:abc")
+
+        validator.async_redis_client.delete.assert_awaited_once_with("webhook_replay:abc")
+
+
+class TestAsyncValidation:
+    """Test comprehensive validation on the async path"""
+
+    @pytest.mark.asyncio
+    async def test_valid_request(self, validator):
+        """A signed, fresh request passes and reports its replay key"""
+        timestamp = int(time.time())
+        headers = signature_headers(validator.config, sign(BODY), timestamp)
+
+        result = await validator.comprehensive_validation_async(BODY, headers, SECRET)
+
+        assert result['is_valid']
+        assert result['replay_key'] == validator.replay_cache_key(sign(BODY), timestamp, BODY)
+
+    @pytest.mark.asyncio
+    async def test_bad_signature_claims_nothing(self, validator):
+        """A request with a wrong signature never claims a replay key"""
+        headers = signature_headers(validator.config, sign(BODY, "other"), int(time.time()))
+
+        result = await validator.comprehensive_validation_async(BODY, headers, SECRET)
+
+        assert not result['is_valid']
+        validator.async_redis_client.set.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_missing_signature(self, validator):
+        """A request without a signature is rejected"""
+        with pytest.raises(SignatureValidationError):
+            await validator.comprehensive_validation_async(BODY, {}, SECRET)
@@ -0,0 +1,229 @@
+"""
+Unit tests for single-flight request coalescing
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from app.services.cache_service import EnhancedCacheService
+from app.utils.single_flight import SingleFlight, SingleFlightError
+
+
+class FakeRedis:
+    """In-memory stand-in for the async Redis client's locks and pub/sub"""
+
+    def __init__(self):
+        self.data = {}
+        self.subscribers = {}
+
+    async def set(self, key, value, nx=False, px=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    def pubsub(self):
+        return FakePubSub(self)
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def publish(self, channel, payload):
+        for queue in self.subscribers.get(channel, []):
+            queue.put_nowait({'type': 'message', 'channel': channel, 'data': payload})
+        return len(self.subscribers.get(channel, []))
+
+    def release(self, key, token):
+        if self.data.get(key) == token:
+            del self.data[key]
+            return 1
+        return 0
+
+
+class FakePubSub:
+    """Subscription delivering published messages"""
+
+    def __init__(self, client):
+        self.client = client
+        self.queue = asyncio.Queue()
+        self.channels = []
+
+    async def subscribe(self, channel):
+        self.channels.append(channel)
+        self.client.subscribers.setdefault(channel, []).append(self.queue)
+
+    async def get_message(self, ignore_subscribe_messages=False, timeout=None):
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def reset(self):
+        for channel in self.channels:
+            self.client.subscribers[channel].remove(self.queue)
+        self.channels = []
+
+
+class FakePipeline:
+    """Transaction running publish and the lock release script"""
+
+    def __init__(self, client):
+        self.client = client
+        self.queued = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    def publish(self, channel, payload):
+        self.queued.append(lambda: self.client.publish(channel, payload))
+
+    def eval(self, script, numkeys, key, token):
+        self.queued.append(lambda: self.client.release(key, token))
+
+    async def execute(self):
+        return [command() for command in self.queued]
+
+
+class SlowCall:
+    """Call that takes a while and counts how often it ran"""
+
+    def __init__(self, result='value', error=None, delay=0.01):
+        self.result = result
+        self.error = error
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class TestSingleFlightInProcess:
+    """Test coalescing within one process"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_share_one_execution(self):
+        """Concurrent callers of one key get the result of a single call"""
+        flight = SingleFlight('test')
+        call = SlowCall()
+
+        results = await asyncio.gather(*(flight.do('key', call) for _ in range(10)))
+
+        assert results == ['value'] * 10
+        assert call.calls == 1
+        assert flight.get_stats()['coalesced'] == 9
+        assert flight.in_flight() == 0
+
+    @pytest.mark.asyncio
+    async def test_different_keys_not_coalesced(self):
+        """Each key has its own call"""
+        flight = SingleFlight('test')
+        call = SlowCall()
+
+        await asyncio.gather(flight.do('a', call), flight.do('b', call))
+
+        assert call.calls == 2
+
+    @pytest.mark.asyncio
+    async def test_errors_shared(self):
+        """Every coalesced caller sees the call's error"""
+        flight = SingleFlight('test')
+        call = SlowCall(error=ValueError("boom"))
+
+        results = await asyncio.gather(
+            *(flight.do('key', call) for _ in range(3)), return_exceptions=True
+        )
+
+        assert all(isinstance(result, ValueError) for result in results)
+        assert call.calls == 1
+
+    @pytest.mark.asyncio
+    async def test_cancelled_caller_does_not_cancel_call(self):
+        """The call completes for the others when its first caller gives up"""
+        flight = SingleFlight('test')
+        call = SlowCall(delay=0.05)
+
+        first = asyncio.ensure_future(flight.do('key', call))
+        await asyncio.sleep(0)
+        second = asyncio.ensure_future(flight.do('key', call))
+        await asyncio.sleep(0.01)
+        first.cancel()
+
+        assert await second == 'value'
+        assert call.calls == 1
+
+
+class TestSingleFlightAcrossProcesses:
+    """Test coordination of processes through Redis"""
+
+    @pytest.fixture
+    def redis_client(self):
+        """Fake Redis shared by the simulated processes"""
+        return FakeRedis()
+
+    @pytest.mark.asyncio
+    async def test_result_published_to_other_process(self, redis_client):
+        """Only the lock holder calls; the other process decodes its result"""
+        worker_a = SingleFlight('test', redis_client)
+        worker_b = SingleFlight('test', redis_client)
+        call = SlowCall(result={'sentiment': 'positive'}, delay=0.02)
+
+        results = await asyncio.gather(
+            worker_a.do('key', call, encode=json.dumps, decode=json.loads),
+            worker_b.do('key', call, encode=json.dumps, decode=json.loads)
+        )
+
+        assert results == [{'sentiment': 'positive'}] * 2
+        assert call.calls == 1
+        assert worker_b.stats['remote'] == 1
+        assert redis_client.data == {}
+
+    @pytest.mark.asyncio
+    async def test_error_published_to_other_process(self, redis_client):
+        """A failed call is reported to waiting processes instead of repeated"""
+        call = SlowCall(error=RuntimeError("API down"), delay=0.02)
+
+        results = await asyncio.gather(
+            SingleFlight('test', redis_client).do('key', call, encode=json.dumps, decode=json.loads),
+            SingleFlight('test', redis_client).do('key', call, encode=json.dumps, decode=json.loads),
+            return_exceptions=True
+        )
+
+        assert isinstance(results[0], RuntimeError)
+        assert isinstance(results[1], SingleFlightError)
+        assert call.calls == 1
+
+    @pytest.mark.asyncio
+    async def test_abandoned_lock_falls_back(self, redis_client):
+        """A process calls itself when the lock holder never publishes"""
+        redis_client.data['singleflight:test:lock:key'] = 'dead-worker'
+        flight = SingleFlight('test', redis_client, lock_ttl=0.02)
+        call = SlowCall()
+
+        assert await flight.do('key', call, encode=json.dumps, decode=json.loads) == 'value'
+        assert flight.stats['fallback'] == 1
+
+
+class TestCacheServiceLoader:
+    """Test stampede protection of EnhancedCacheService.get"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_load_once(self):
+        """An expired hot key is loaded once, then served from the cache"""
+        cache = EnhancedCacheService()
+        load = SlowCall(result={'rooms': 12})
+
+        results = await asyncio.gather(*(cache.get('hotel:1', loader=load) for _ in range(20)))
+
+        assert results == [{'rooms': 12}] * 20
+        assert load.calls == 1
+        assert await cache.get('hotel:1', loader=load) == {'rooms': 12}
+        assert load.calls == 1
@@ -0,0 +1,81 @@
+"""
+Unit tests for sentence and paragraph chunking of streamed text
+"""
+
+import pytest
+
+from app.utils.stream_chunker import SentenceChunker, chunk_stream
+
+
+def feed_in_pieces(chunker, text, size=3):
+    """Feed text the way a stream delivers it, a few characters at a time"""
+    chunks = []
+    for i in range(0, len(text), size):
+        chunks.extend(chunker.feed(text[i:i + size]))
+    tail = chunker.flush()
+    if tail:
+        chunks.append(tail)
+    return chunks
+
+
+class TestSentenceChunker:
+    """Test cutting streamed text at natural boundaries"""
+
+    def test_cuts_at_sentence_end_once_long_enough(self):
+        """Short sentences are joined until the chunk reaches min_chars"""
+        chunker = SentenceChunker(min_chars=30)
+
+        chunks = feed_in_pieces(chunker, "Hi there. Breakfast is served until ten. The pool opens at eight.")
+
+        assert chunks == ["Hi there. Breakfast is served until ten.", "The pool opens at eight."]
+
+    def test_paragraph_break_always_cuts(self):
+        """A blank line ends the chunk regardless of its length"""
+        chunker = SentenceChunker(min_chars=200)
+
+        chunks = feed_in_pieces(chunker, "Dear guest,\n\nYour room is ready.\n\nEnjoy your stay!")
+
+        assert chunks == ["Dear guest,", "Your room is ready.", "Enjoy your stay!"]
+
+    def test_leading_paragraph_break_does_not_stop_cutting(self):
+        """A stream starting with a blank line still cuts at every later one"""
+        chunker = SentenceChunker(min_chars=200)
+
+        chunks = feed_in_pieces(chunker, "\n\nFirst para has text.\n\nSecond para.\n\nThird")
+
+        assert chunks == ["First para has text.", "Second para.", "Third"]
+
+    def test_decimals_and_abbreviations_do_not_cut(self):
+        """Periods inside numbers and after titles are not sentence ends"""
+        chunker = SentenceChunker(min_chars=5)
+
+        chunks = feed_in_pieces(chunker, "Mr. Smith, checkout is at 11.30 today. Thanks!")
+
+        assert chunks == ["Mr. Smith, checkout is at 11.30 today.", "Thanks!"]
+
+    def test_sentence_end_waits_for_following_whitespace(self):
+        """A period at the end of a delta is not a boundary yet"""
+        chunker = SentenceChunker(min_chars=1)
+
+        assert chunker.feed("The spa opens at 9.") == []
+        assert chunker.feed("30 daily. ") == ["The spa opens at 9.30 daily."]
+
+    def test_long_text_without_boundary_cut_at_space(self):
+        """Text with no boundary is cut at the last space before max_chars"""
+        chunker = SentenceChunker(min_chars=10, max_chars=20)
+
+        chunks = feed_in_pieces(chunker, "one two three four five six seven eight")
+
+        assert all(len(chunk) <= 20 for chunk in chunks)
+        assert " ".join(chunks) == "one two three four five six seven eight"
+
+    @pytest.mark.asyncio
+    async def test_chunk_stream(self):
+        """Deltas from an async stream are re-chunked, with the tail flushed"""
+        async def deltas():
+            for delta in ["Your taxi ", "is booked. ", "It arrives ", "at noon"]:
+                yield delta
+
+        chunks = [chunk async for chunk in chunk_stream(deltas(), SentenceChunker(min_chars=10))]
+
+        assert chunks == ["Your taxi is booked.", "It arrives at noon"]
@@ -0,0 +1,106 @@
+"""
+Unit tests for template renderer caching
+"""
+
+import pytest
+from datetime import datetime
+
+from app.utils.template_renderer import (
+    RenderCache, TemplateRenderer, TemplateValidationError
+)
+
+
+class TestRenderCache:
+    """Test the bounded LRU cache"""
+
+    def test_evicts_least_recently_used(self):
+        """Touching an entry protects it from eviction"""
+        cache = RenderCache(max_entries=2)
+        cache.set('a', 'A')
+        cache.set('b', 'B')
+        cache.get('a')
+        cache.set('c', 'C')
+
+        assert cache.get('b') is None
+        assert cache.get('a') == 'A'
+        assert cache.stats['evictions'] == 1
+
+    def test_byte_limit(self):
+        """Total size stays within the byte limit and oversized values are refused"""
+        cache = RenderCache(max_entries=100, max_bytes=100)
+        for key in range(5):
+            cache.set(key, 'x', size_bytes=30)
+
+        assert cache.size_bytes <= 100
+        assert len(cache) == 3
+        assert cache.set('huge', 'x', size_bytes=101) is False
+
+    def test_ttl_expiry(self, monkeypatch):
+        """Expired entries count as misses and are dropped"""
+        clock = [1000.0]
+        monkeypatch.setattr('app.utils.template_renderer.time.monotonic', lambda: clock[0])
+        cache = RenderCache(max_entries=10, ttl_seconds=60)
+        cache.set('a', 'A', size_bytes=10)
+
+        clock[0] += 61
+
+        assert cache.get('a') is None
+        assert cache.stats['expirations'] == 1
+        assert cache.size_bytes == 0
+
+
+class TestTemplateRendererCache:
+    """Test compiled and rendered template caching"""
+
+    @pytest.fixture
+    def renderer(self):
+        """Create template renderer"""
+        return TemplateRenderer()
+
+    @pytest.mark.asyncio
+    async def test_unreferenced_context_does_not_affect_key(self, renderer):
+        """Contexts differing only in unused variables share a rendered result"""
+        template = "Hello {{ guest.name }}!"
+
+        first = await renderer.render_template(
+            template, {'guest': {'name': 'Anna'}, 'event_time': datetime(2025, 1, 1, 10, 0)}
+        )
+        second = await renderer.render_template(
+            template, {'guest': {'name': 'Anna'}, 'event_time': datetime(2025, 1, 1, 10, 5)}
+        )
+
+        stats = renderer.get_cache_stats()
+        assert first == second == "Hello Anna!"
+        assert stats['rendered']['hits'] == 1
+        assert stats['compiled']['misses'] == 1
+        assert stats['compiled']['hits'] == 1
+
+    @pytest.mark.asyncio
+    async def test_tag_variables_are_part_of_key(self, renderer):
+        """Variables used only in control tags still distinguish renders"""
+        template = "{% if is_vip %}Welcome back{% else %}Welcome{% endif %}, {{ guest.name }}"
+
+        vip = await renderer.render_template(template, {'guest': {'name': 'Anna'}, 'is_vip': True})
+        regular = await renderer.render_template(template, {'guest': {'name': 'Anna'}, 'is_vip': False})
+
+        assert vip == "Welcome back, Anna"
+        assert regular == "Welcome, Anna"
+
+    @pytest.mark.asyncio
+    async def test_time_dependent_template_not_cached(self, renderer):
+        """Templates reading the injected current time are rendered every time"""
+        await renderer.render_template("Today is {{ today }}", {})
+        await renderer.render_template("Today is {{ today }}", {})
+
+        stats = renderer.get_cache_stats()
+        assert stats['rendered']['entries'] == 0
+        assert stats['uncacheable_renders'] == 2
+
+    @pytest.mark.asyncio
+    async def test_invalid_template_not_cached(self, renderer):
+        """Validation failures are raised on every render"""
+        for _ in range(2):
+            with pytest.raises(TemplateValidationError):
+                await renderer.render_template("   ", {})
+
+        assert renderer.get_cache_stats()['compiled']['entries'] == 0
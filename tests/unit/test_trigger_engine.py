@@ -87,9 +87,10 @@ class TestTriggerEngine:
         mock_query.order_by.return_value = mock_query
         mock_query.all.return_value = [sample_trigger]
         mock_db.query.return_value = mock_query
+        mock_db.get.return_value = sample_trigger
         
-        # Mock evaluator
-        trigger_engine.evaluator.evaluate_conditions = AsyncMock(return_value=True)
+        # Mock compiled conditions
+        trigger_engine.evaluator.compile_conditions = Mock(return_value=lambda context: True)
         
         context = {
             "reference_time": datetime.utcnow(),
@@ -116,8 +117,8 @@ class TestTriggerEngine:
         mock_query.all.return_value = [sample_trigger]
         mock_db.query.return_value = mock_query
         
-        # Mock evaluator returns False
-        trigger_engine.evaluator.evaluate_conditions = AsyncMock(return_value=False)
+        # Mock compiled conditions never match
+        trigger_engine.evaluator.compile_conditions = Mock(return_value=lambda context: False)
         
         context = {"reference_time": datetime.utcnow()}
         
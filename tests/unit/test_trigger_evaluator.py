@@ -414,3 +414,67 @@ class TestTriggerEvaluator:
         # Invalid conversions
         assert evaluator._safe_numeric_compare("abc", "5", lambda a, b: a > b) is False
         assert evaluator._safe_numeric_compare(10, "abc", lambda a, b: a > b) is False
+
+
+class TestCompiledConditions:
+    """Compiled predicates agree with evaluate_conditions"""
+    
+    @pytest.fixture
+    def evaluator(self):
+        """TriggerEvaluator instance"""
+        return TriggerEvaluator()
+    
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("trigger_type,conditions,context", [
+        (
+            TriggerType.CONDITION_BASED,
+            {"condition_based": {"logic": "AND", "conditions": [
+                {"field": "guest.preferences.room_type", "operator": "equals", "value": "suite"},
+                {"field": "booking.nights", "operator": "greater_than", "value": "2"}
+            ]}},
+            {"guest": {"preferences": {"room_type": "suite"}}, "booking": {"nights": 3}}
+        ),
+        (
+            TriggerType.CONDITION_BASED,
+            {"condition_based": {"logic": "OR", "conditions": [
+                {"field": "guest.email", "operator": "regex", "value": r".*@.*\.com"},
+                {"field": "guest.tags", "operator": "contains", "value": "vip"}
+            ]}},
+            {"guest": {"email": "invalid", "tags": ["regular"]}}
+        ),
+        (
+            TriggerType.EVENT_BASED,
+            {"event_based": {"event_type": "check_in", "event_filters": {"room": "101"}}},
+            {"event_type": "check_in", "room": "101"}
+        ),
+        (
+            TriggerType.EVENT_BASED,
+            {"event_based": {"event_type": "check_in"}},
+            {"event_type": "check_out"}
+        ),
+        (
+            TriggerType.TIME_BASED,
+            {"time_based": {"schedule_type": "hours_after_checkin", "hours_after": 2}},
+            {"reference_time": datetime.utcnow() - timedelta(hours=3)}
+        ),
+        (
+            TriggerType.TIME_BASED,
+            {"time_based": {"schedule_type": "cron_expression", "cron_expression": "61 * * * *"}},
+            {}
+        ),
+    ])
+    async def test_compiled_matches_interpreted(self, evaluator, trigger_type, conditions, context):
+        """Compiling conditions does not change their outcome"""
+        predicate = evaluator.compile_conditions(trigger_type, conditions)
+        
+        assert predicate(context) == await evaluator.evaluate_conditions(trigger_type, conditions, context)
+    
+    def test_unknown_operator_never_matches(self, evaluator):
+        """Unknown operators compile to a predicate that is always False"""
+        conditions = {"condition_based": {"conditions": [
+            {"field": "guest.name", "operator": "sounds_like", "value": "John"}
+        ]}}
+        
+        predicate = evaluator.compile_conditions(TriggerType.CONDITION_BASED, conditions)
+        
+        assert predicate({"guest": {"name": "John"}}) is False
@@ -0,0 +1,154 @@
+"""
+Unit tests for the compiled per-hotel trigger index
+"""
+
+import uuid
+import pytest
+from unittest.mock import Mock, patch
+
+from app.models.trigger import Trigger, TriggerType
+from app.services.trigger_index import TriggerIndexCache
+from app.utils.trigger_evaluator import TriggerEvaluator
+
+
+class FakeRedis:
+    """Shared version stamps, as seen by every process using the same Redis"""
+
+    def __init__(self):
+        self.data = {}
+        self.available = True
+
+    def get(self, key):
+        if not self.available:
+            raise ConnectionError("redis down")
+        return self.data.get(key)
+
+    def incr(self, key):
+        if not self.available:
+            raise ConnectionError("redis down")
+        self.data[key] = self.data.get(key, 0) + 1
+        return self.data[key]
+
+
+def make_trigger(hotel_id, trigger_type, conditions, priority=1, name="Trigger"):
+    """Build an active trigger"""
+    return Trigger(
+        id=uuid.uuid4(),
+        hotel_id=hotel_id,
+        name=name,
+        trigger_type=trigger_type,
+        message_template="Hello {{ guest.name }}",
+        conditions=conditions,
+        is_active=True,
+        priority=priority
+    )
+
+
+class TestTriggerIndex:
+    """Test trigger grouping, candidate selection and invalidation"""
+
+    @pytest.fixture
+    def hotel_id(self):
+        """Hotel ID"""
+        return uuid.uuid4()
+
+    @pytest.fixture
+    def triggers(self, hotel_id):
+        """Triggers in priority order"""
+        return [
+            make_trigger(hotel_id, TriggerType.EVENT_BASED,
+                         {"event_based": {"event_type": "check_in"}}, priority=1, name="check-in"),
+            make_trigger(hotel_id, TriggerType.CONDITION_BASED,
+                         {"condition_based": {"conditions": []}}, priority=2, name="always"),
+            make_trigger(hotel_id, TriggerType.EVENT_BASED,
+                         {"event_based": {"event_type": "check_out"}}, priority=3, name="check-out"),
+        ]
+
+    @pytest.fixture
+    def redis_client(self):
+        """Fake Redis holding the shared version stamps"""
+        return FakeRedis()
+
+    @pytest.fixture
+    def cache(self, redis_client):
+        """Fresh index cache"""
+        return TriggerIndexCache(ttl_seconds=60, redis_client=redis_client)
+
+    def test_event_candidates_only_include_subscribers(self, cache, hotel_id, triggers):
+        """An event touches only the triggers subscribed to it"""
+        index = cache.build(hotel_id, triggers, TriggerEvaluator(), cache.version(hotel_id))
+
+        event_names = [c.name for c in index.candidates(TriggerType.EVENT_BASED, "check_out")]
+        all_names = [c.name for c in index.candidates(None, "check_in")]
+
+        assert event_names == ["check-out"]
+        assert all_names == ["check-in", "always"]
+
+    def test_index_keeps_no_orm_instances(self, cache, hotel_id, triggers):
+        """Compiled entries are snapshots, safe to share across sessions"""
+        index = cache.build(hotel_id, triggers, TriggerEvaluator(), cache.version(hotel_id))
+
+        assert [entry.trigger_id for entry in index.triggers] == [t.id for t in triggers]
+        assert not any(isinstance(getattr(entry, slot), Trigger)
+                       for entry in index.triggers for slot in entry.__slots__)
+
+    def test_invalidate_bumps_version(self, cache, hotel_id, triggers):
+        """Trigger CRUD makes the cached index stale"""
+        cache.build(hotel_id, triggers, TriggerEvaluator(), cache.version(hotel_id))
+        assert cache.get(hotel_id) is not None
+
+        cache.invalidate(hotel_id)
+
+        assert cache.get(hotel_id) is None
+        assert cache.version(hotel_id) == (1, 1)
+
+    def test_invalidation_reaches_other_processes(self, cache, redis_client, hotel_id, triggers):
+        """CRUD in the API process makes a worker's cached index stale"""
+        worker = TriggerIndexCache(ttl_seconds=60, redis_client=redis_client)
+        worker.build(hotel_id, triggers, TriggerEvaluator(), worker.version(hotel_id))
+        assert worker.get(hotel_id) is not None
+
+        cache.invalidate(hotel_id)
+
+        assert worker.get(hotel_id) is None
+
+    def test_no_cached_index_while_redis_down(self, cache, redis_client, hotel_id, triggers):
+        """Without the shared stamp a cached index cannot be trusted"""
+        cache.build(hotel_id, triggers, TriggerEvaluator(), cache.version(hotel_id))
+        redis_client.available = False
+
+        assert cache.get(hotel_id) is None
+        assert cache.get_stats()['errors'] == 1
+
+    def test_index_built_during_crud_is_stale(self, cache, hotel_id, triggers):
+        """An index loaded before a concurrent update is not served"""
+        version = cache.version(hotel_id)
+        cache.invalidate(hotel_id)
+
+        cache.build(hotel_id, triggers, TriggerEvaluator(), version)
+
+        assert cache.get(hotel_id) is None
+
+    @pytest.mark.asyncio
+    async def test_engine_queries_triggers_once(self, cache, hotel_id, triggers):
+        """Repeated events are served from the compiled index"""
+        from app.services.trigger_engine import TriggerEngine
+
+        db = Mock()
+        query = db.query.return_value
+        query.filter.return_value = query
+        query.order_by.return_value = query
+        query.all.return_value = triggers
+        by_id = {trigger.id: trigger for trigger in triggers}
+        db.get.side_effect = lambda model, trigger_id: by_id[trigger_id]
+
+        with patch('app.services.trigger_engine.MessageSender'), \
+             patch('app.services.trigger_engine.get_trigger_index_cache', return_value=cache):
+            engine = TriggerEngine(db)
+            first = await engine.evaluate_triggers(hotel_id, {"event_type": "check_in"})
+            second = await engine.evaluate_triggers(hotel_id, {"event_type": "check_in"})
+
+        assert db.query.call_count == 1
+        assert db.get.call_count == 4
+        assert [r['trigger'].name for r in first] == ["check-in", "always"]
+        assert [r['trigger'].name for r in second] == ["check-in", "always"]
@@ -0,0 +1,139 @@
+"""
+Unit tests for the micro-batched webhook writer
+"""
+
+import uuid
+import pytest
+from contextlib import asynccontextmanager
+from unittest.mock import Mock, AsyncMock, patch
+
+from app.services.webhook_batch_writer import WebhookBatchWriter
+from app.schemas.green_api import (
+    IncomingMessageWebhook, WebhookType, MessageType,
+    WebhookMessageData, WebhookSenderData
+)
+
+
+def make_webhook(chat_id: str = "1234567890@c.us", text: str = "Hello!", id_message: str = None):
+    """Build an incoming message webhook"""
+    return IncomingMessageWebhook(
+        typeWebhook=WebhookType.INCOMING_MESSAGE,
+        instanceData={"idInstance": "1234567890"},
+        timestamp=1640995200,
+        idMessage=id_message or f"msg-{uuid.uuid4()}",
+        senderData=WebhookSenderData(
+            chatId=chat_id,
+            chatName="Test Guest",
+            sender=chat_id,
+            senderName="Test Guest"
+        ),
+        messageData=WebhookMessageData(
+            typeMessage=MessageType.TEXT,
+            textMessageData={"textMessage": text}
+        )
+    )
+
+
+class TestWebhookBatchWriter:
+    """Test batching, flushing and per-item error isolation"""
+
+    @pytest.fixture
+    def mock_session(self):
+        """Create mock async session with savepoint support"""
+        session = Mock()
+        session.commit = AsyncMock()
+        session.rollback = AsyncMock()
+
+        @asynccontextmanager
+        async def begin_nested():
+            yield
+
+        session.begin_nested = begin_nested
+        return session
+
+    @pytest.fixture
+    def writer(self, mock_session):
+        """Create writer with a large delay so tests flush explicitly"""
+        @asynccontextmanager
+        async def factory():
+            yield mock_session
+
+        return WebhookBatchWriter(
+            session_factory=factory,
+            max_batch_size=50,
+            max_delay_ms=10_000,
+            max_pending=100
+        )
+
+    @pytest.fixture
+    def mock_hotel(self):
+        """Create mock hotel"""
+        hotel = Mock()
+        hotel.id = uuid.uuid4()
+        return hotel
+
+    @pytest.mark.asyncio
+    async def test_batch_resolves_futures_after_commit(self, writer, mock_session, mock_hotel):
+        """All items are written in one batch and resolve with their message IDs"""
+        with patch.object(writer, '_write_rows', new_callable=AsyncMock) as write_rows, \
+             patch('app.services.webhook_batch_writer.queue_message_processing') as queue_processing:
+            first = await writer.submit(mock_hotel, make_webhook())
+            second = await writer.submit(mock_hotel, make_webhook("1987654321@c.us"))
+            assert not first.done()
+
+            await writer.flush()
+
+            write_rows.assert_awaited_once()
+            assert len(write_rows.await_args.args[1]) == 2
+            mock_session.commit.assert_awaited_once()
+            assert isinstance(first.result(), uuid.UUID)
+            assert isinstance(second.result(), uuid.UUID)
+            assert queue_processing.call_count == 2
+
+        assert writer.get_stats()['batches'] == 1
+        assert writer.get_stats()['written'] == 2
+
+    @pytest.mark.asyncio
+    async def test_full_batch_flushes_without_waiting(self, mock_session, mock_hotel):
+        """Reaching max_batch_size triggers a flush immediately"""
+        @asynccontextmanager
+        async def factory():
+            yield mock_session
+
+        writer = WebhookBatchWriter(session_factory=factory, max_batch_size=2, max_delay_ms=10_000)
+        with patch.object(writer, '_write_rows', new_callable=AsyncMock) as write_rows, \
+             patch('app.services.webhook_batch_writer.queue_message_processing'):
+            await writer.submit(mock_hotel, make_webhook())
+            second = await writer.submit(mock_hotel, make_webhook())
+            await second
+
+            write_rows.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_failed_batch_isolates_bad_item(self, writer, mock_session, mock_hotel):
+        """A failing batch is retried per item and only the bad item fails"""
+        with patch.object(writer, '_write_rows', new_callable=AsyncMock) as write_rows, \
+             patch('app.services.webhook_batch_writer.queue_message_processing') as queue_processing:
+            write_rows.side_effect = [RuntimeError("batch failed"), None, ValueError("bad row")]
+            good = await writer.submit(mock_hotel, make_webhook())
+            bad = await writer.submit(mock_hotel, make_webhook())
+
+            await writer.flush()
+
+            mock_session.rollback.assert_awaited_once()
+            assert isinstance(good.result(), uuid.UUID)
+            with pytest.raises(ValueError):
+                bad.result()
+            queue_processing.assert_called_once()
+
+        assert writer.get_stats()['isolated_batches'] == 1
+
+    @pytest.mark.asyncio
+    async def test_invalid_webhook_rejected_before_batching(self, writer, mock_hotel):
+        """Invalid phone numbers fail their own future without entering a batch"""
+        future = await writer.submit(mock_hotel, make_webhook(chat_id="not-a-phone@g.us"))
+
+        assert future.done()
+        with pytest.raises(ValueError):
+            future.result()
+        assert writer.get_stats()['buffered'] == 0
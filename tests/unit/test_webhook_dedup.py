@@ -0,0 +1,83 @@
+"""
+Unit tests for webhook delivery deduplication
+"""
+
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from app.services.webhook_dedup import WebhookDeduplicator
+
+
+class TestWebhookDeduplicator:
+    """Test local and Redis-backed deduplication"""
+
+    @pytest.fixture
+    def redis_client(self):
+        """Mock async Redis client"""
+        client = AsyncMock()
+        client.set.return_value = True
+        return client
+
+    @pytest.fixture
+    def deduplicator(self, redis_client):
+        """Deduplicator wired to the mock Redis client"""
+        dedup = WebhookDeduplicator(redis_url="redis://test", ttl_seconds=60, local_cache_size=2)
+        dedup.redis_client = redis_client
+        return dedup
+
+    @pytest.mark.asyncio
+    async def test_first_delivery_is_claimed(self, deduplicator, redis_client):
+        """The first delivery claims the ID atomically in Redis"""
+        assert await deduplicator.claim("hotel-1", "msg-1") is True
+
+        redis_client.set.assert_awaited_once_with(
+            "webhook:dedup:hotel-1:msg-1", 1, nx=True, ex=60
+        )
+
+    @pytest.mark.asyncio
+    async def test_repeat_delivery_dropped_locally(self, deduplicator, redis_client):
+        """A redelivery to the same worker never reaches Redis"""
+        await deduplicator.claim("hotel-1", "msg-1")
+        assert await deduplicator.claim("hotel-1", "msg-1") is False
+
+        assert redis_client.set.await_count == 1
+        assert deduplicator.get_stats()['duplicates_local'] == 1
+
+    @pytest.mark.asyncio
+    async def test_delivery_claimed_by_other_worker(self, deduplicator, redis_client):
+        """SET NX failing means another worker already took the delivery"""
+        redis_client.set.return_value = None
+
+        assert await deduplicator.claim("hotel-1", "msg-1") is False
+        assert deduplicator.get_stats()['duplicates_redis'] == 1
+
+    @pytest.mark.asyncio
+    async def test_same_id_different_hotels(self, deduplicator):
+        """Message IDs are scoped per hotel"""
+        assert await deduplicator.claim("hotel-1", "msg-1") is True
+        assert await deduplicator.claim("hotel-2", "msg-1") is True
+
+    @pytest.mark.asyncio
+    async def test_redis_error_fails_open(self, deduplicator, redis_client):
+        """Redis outages do not drop webhooks"""
+        redis_client.set.side_effect = ConnectionError("redis down")
+
+        assert await deduplicator.claim("hotel-1", "msg-1") is True
+        assert deduplicator.get_stats()['redis_errors'] == 1
+
+    @pytest.mark.asyncio
+    async def test_release_allows_redelivery(self, deduplicator, redis_client):
+        """Released claims are accepted again"""
+        await deduplicator.claim("hotel-1", "msg-1")
+        await deduplicator.release("hotel-1", "msg-1")
+
+        redis_client.delete.assert_awaited_once_with("webhook:dedup:hotel-1:msg-1")
+        assert await deduplicator.claim("hotel-1", "msg-1") is True
+
+    @pytest.mark.asyncio
+    async def test_local_cache_is_bounded(self, deduplicator):
+        """The in-process LRU keeps at most local_cache_size IDs"""
+        for i in range(5):
+            await deduplicator.claim("hotel-1", f"msg-{i}")
+
+        assert deduplicator.get_stats()['local_entries'] == 2
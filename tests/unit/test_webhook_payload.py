@@ -0,0 +1,248 @@
+"""
+Unit tests for single-pass webhook payload reading and verification
+"""
+
+import hashlib
+import hmac
+import json
+import time
+import uuid
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from app.api.v1.endpoints.webhooks import receive_green_api_webhook_with_instance
+from app.middleware.webhook_security import WebhookSecurityMiddleware
+from app.services.webhook_dedup import WebhookDeduplicator
+from app.utils.webhook_payload import (
+    WEBHOOK_PAYLOAD_STATE,
+    WebhookPayload,
+    parse_webhook_body,
+    read_webhook_payload
+)
+
+
+SECRET = "webhook-secret"
+
+
+def make_request(data, path="/api/v1/webhooks/green-api", signature=None, timestamp=None):
+    """Request whose body can be read from the client once, with a count of reads"""
+    body = data if isinstance(data, bytes) else json.dumps(data).encode()
+    headers = [(b"content-type", b"application/json")]
+    if signature is not None:
+        headers.append((b"x-green-api-signature", signature.encode()))
+    if timestamp is not None:
+        headers.append((b"x-green-api-timestamp", str(timestamp).encode()))
+    reads = []
+
+    async def receive():
+        reads.append(1)
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    scope = {"type": "http", "method": "POST", "path": path, "headers": headers, "query_string": b""}
+    return Request(scope, receive), reads
+
+
+def sign(body):
+    return hmac.new(SECRET.encode(), body, hashlib.sha256).hexdigest()
+
+
+def webhook(instance_id="1101000001"):
+    return {
+        "typeWebhook": "incomingMessageReceived",
+        "instanceData": {"idInstance": instance_id},
+        "timestamp": int(time.time())
+    }
+
+
+class TestReadWebhookPayload:
+    """Test reading and parsing the body once"""
+
+    @pytest.mark.asyncio
+    async def test_body_read_and_parsed_once(self):
+        """Later readers get the payload from request state"""
+        request, reads = make_request(webhook())
+
+        first = await read_webhook_payload(request)
+        second = await read_webhook_payload(request)
+
+        assert second is first
+        assert first.data["typeWebhook"] == "incomingMessageReceived"
+        assert getattr(request.state, WEBHOOK_PAYLOAD_STATE) is first
+        assert len(reads) == 1
+
+    def test_invalid_json(self):
+        """Invalid bodies raise ValueError"""
+        with pytest.raises(ValueError):
+            parse_webhook_body(b"{not json")
+
+    def test_timestamp_prefers_header(self):
+        """The timestamp header wins over the payload's timestamp"""
+        payload = WebhookPayload(body=b"", data={"timestamp": 1})
+
+        assert payload.timestamp("2") == "2"
+        assert payload.timestamp() == 1
+
+
+class TestWebhookSecurityStage:
+    """Test the middleware's single pass over a webhook"""
+
+    @pytest.fixture
+    def hotel(self):
+        return SimpleNamespace(id=uuid.uuid4(), green_api_webhook_token=SECRET)
+
+    @pytest.fixture
+    def directory(self, hotel):
+        """Hotel directory knowing a single hotel"""
+        directory = Mock(resolve_instance=AsyncMock(return_value=hotel))
+        with patch("app.middleware.webhook_security.get_hotel_directory", return_value=directory):
+            yield directory
+
+    @pytest.fixture
+    def middleware(self, directory):
+        middleware = WebhookSecurityMiddleware(None, environment="production")
+        validator = middleware.validators['green_api']
+        validator.async_redis_client = AsyncMock()
+        validator.async_redis_client.set.return_value = True
+        return middleware
+
+    @pytest.mark.asyncio
+    async def test_verified_payload_left_for_endpoint(self, middleware, hotel):
+        """A valid webhook is verified for its hotel and its replay key claimed once"""
+        body = json.dumps(webhook()).encode()
+        request, reads = make_request(body, signature=sign(body), timestamp=int(time.time()))
+        validator = middleware.validators['green_api']
+
+        await middleware._validate_webhook_security(request, validator, "green_api")
+        payload = await read_webhook_payload(request)
+
+        assert payload.verified_for(hotel.id)
+        assert payload.replay_key is not None
+        assert len(reads) == 1
+        validator.async_redis_client.set.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_signed_replay_passed_to_dedup(self, middleware, hotel):
+        """A correctly signed redelivery is verified and marked replayed, not rejected"""
+        body = json.dumps(webhook()).encode()
+        request, _ = make_request(body, signature=sign(body), timestamp=int(time.time()))
+        validator = middleware.validators['green_api']
+        validator.async_redis_client.set.return_value = None
+
+        await middleware._validate_webhook_security(request, validator, "green_api")
+        payload = await read_webhook_payload(request)
+
+        assert payload.verified_for(hotel.id)
+        assert payload.replayed
+
+    @pytest.mark.asyncio
+    async def test_unsigned_replay_rejected(self, middleware):
+        """A wrongly signed delivery is rejected without claiming a replay key"""
+        body = json.dumps(webhook()).encode()
+        request, _ = make_request(body, signature=sign(b"other"), timestamp=int(time.time()))
+        validator = middleware.validators['green_api']
+
+        with pytest.raises(HTTPException) as exc_info:
+            await middleware._validate_webhook_security(request, validator, "green_api")
+        assert exc_info.value.status_code == 401
+        validator.async_redis_client.set.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_instance_from_path(self, middleware, directory):
+        """The instance in a /green-api/{instance_id} URL selects the hotel"""
+        body = json.dumps(webhook("ignored")).encode()
+        request, _ = make_request(
+            body,
+            path="/api/v1/webhooks/green-api/1101000002",
+            signature=sign(body),
+            timestamp=int(time.time())
+        )
+
+        await middleware._validate_webhook_security(request, middleware.validators['green_api'], "green_api")
+
+        directory.resolve_instance.assert_awaited_once_with("1101000002")
+
+
+class TestWebhookRedelivery:
+    """Test Green API retries of a delivery that failed"""
+
+    @pytest.mark.asyncio
+    async def test_retry_after_500_is_processed(self):
+        """A retry of a delivery that failed with 500 is queued, then acknowledged as duplicate"""
+        hotel = SimpleNamespace(id=uuid.uuid4(), green_api_webhook_token=SECRET)
+        data = {
+            **webhook("1101000001"),
+            "idMessage": "msg-1",
+            "senderData": {"chatId": "79001234567@c.us"},
+            "messageData": {"typeMessage": "textMessage", "textMessageData": {"textMessage": "Hi"}}
+        }
+        body = json.dumps(data).encode()
+        timestamp = int(time.time())
+
+        validator = WebhookSecurityMiddleware(None, environment="production").validators['green_api']
+        validator.async_redis_client = AsyncMock()
+        # The first delivery claims the replay key, every retry finds it taken
+        validator.async_redis_client.set.side_effect = [True, None, None]
+        deduplicator = WebhookDeduplicator(redis_url="redis://test", ttl_seconds=60, local_cache_size=10)
+        deduplicator.redis_client = AsyncMock()
+        deduplicator.redis_client.set.return_value = True
+        queue = Mock(submit_webhook=Mock(side_effect=[RuntimeError("queue down"), True]))
+
+        async def deliver():
+            request, _ = make_request(body, signature=sign(body), timestamp=timestamp)
+            return await receive_green_api_webhook_with_instance(
+                "1101000001", request, db=None, x_green_api_signature=sign(body)
+            )
+
+        endpoints = "app.api.v1.endpoints.webhooks"
+        with patch(f"{endpoints}.get_hotel_by_instance_id", AsyncMock(return_value=hotel)), \
+             patch(f"{endpoints}.get_green_api_signature_validator", return_value=validator), \
+             patch(f"{endpoints}.get_webhook_deduplicator", return_value=deduplicator), \
+             patch(f"{endpoints}.get_webhook_queue", return_value=queue):
+            with pytest.raises(HTTPException) as exc_info:
+                await deliver()
+            assert exc_info.value.status_code == 500
+
+            retried = await deliver()
+            assert retried.status_code == 200
+            assert json.loads(retried.body)["status"] == "received"
+
+            duplicate = await deliver()
+            assert duplicate.status_code == 200
+            assert json.loads(duplicate.body)["status"] == "duplicate"
+
+        assert queue.submit_webhook.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_replayed_status_webhook_not_queued(self):
+        """Replays of webhooks without a message to deduplicate are acknowledged only"""
+        hotel = SimpleNamespace(id=uuid.uuid4(), green_api_webhook_token=SECRET)
+        data = {**webhook("1101000001"), "typeWebhook": "stateInstanceChanged", "stateInstance": "authorized"}
+        body = json.dumps(data).encode()
+        timestamp = int(time.time())
+
+        validator = WebhookSecurityMiddleware(None, environment="production").validators['green_api']
+        validator.async_redis_client = AsyncMock()
+        validator.async_redis_client.set.side_effect = [True, None]
+        queue = Mock(submit_webhook=Mock(return_value=True))
+
+        async def deliver():
+            request, _ = make_request(body, signature=sign(body), timestamp=timestamp)
+            return await receive_green_api_webhook_with_instance(
+                "1101000001", request, db=None, x_green_api_signature=sign(body)
+            )
+
+        endpoints = "app.api.v1.endpoints.webhooks"
+        with patch(f"{endpoints}.get_hotel_by_instance_id", AsyncMock(return_value=hotel)), \
+             patch(f"{endpoints}.get_green_api_signature_validator", return_value=validator), \
+             patch(f"{endpoints}.get_webhook_queue", return_value=queue):
+            first = await deliver()
+            replayed = await deliver()
+
+        assert json.loads(first.body)["status"] == "received"
+        assert replayed.status_code == 200
+        assert json.loads(replayed.body)["status"] == "duplicate"
+        assert queue.submit_webhook.call_count == 1
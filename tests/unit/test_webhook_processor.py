@@ -5,7 +5,7 @@ Unit tests for webhook processor
 import pytest
 from unittest.mock import Mock, AsyncMock, patch
 from datetime import datetime
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.services.webhook_processor import WebhookProcessor
 from app.schemas.green_api import (
@@ -19,13 +19,26 @@ from app.models.message import Message, Conversation, MessageType as DBMessageTy
 from app.models.notification import StaffNotification
 
 
+def scalar_result(value):
+    """Build a mock execute() result whose scalar_one_or_none returns value"""
+    result = Mock()
+    result.scalar_one_or_none.return_value = value
+    return result
+
+
 class TestWebhookProcessor:
     """Test webhook processor functionality"""
     
     @pytest.fixture
     def mock_db(self):
-        """Create mock database session"""
-        return Mock(spec=Session)
+        """Create mock async database session"""
+        db = Mock(spec=AsyncSession)
+        db.add = Mock()
+        db.execute = AsyncMock(return_value=scalar_result(None))
+        db.flush = AsyncMock()
+        db.commit = AsyncMock()
+        db.rollback = AsyncMock()
+        return db
     
     @pytest.fixture
     def processor(self, mock_db):
@@ -131,10 +144,10 @@ class TestWebhookProcessor:
     ):
         """Test processing incoming message from new guest"""
         # Mock database queries
-        processor.db.query.return_value.filter.return_value.first.return_value = None  # No existing guest
+        processor.db.execute.return_value = scalar_result(None)  # No existing guest
         processor.db.add = Mock()
-        processor.db.flush = Mock()
-        processor.db.commit = Mock()
+        processor.db.flush = AsyncMock()
+        processor.db.commit = AsyncMock()
         
         # Mock guest and conversation creation
         mock_guest = Mock(spec=Guest)
@@ -146,9 +159,10 @@ class TestWebhookProcessor:
         mock_conversation.guest_id = mock_guest.id
         mock_conversation.guest = mock_guest
         
-        with patch.object(processor, '_get_or_create_guest', return_value=mock_guest):
-            with patch.object(processor, '_get_or_create_conversation', return_value=mock_conversation):
-                with patch('app.tasks.process_incoming.process_incoming_message_task') as mock_task:
+        with patch.object(processor, '_get_or_create_guest', new_callable=AsyncMock, return_value=mock_guest):
+            with patch.object(processor, '_get_or_create_conversation', new_callable=AsyncMock, return_value=mock_conversation):
+                with patch('app.tasks.process_incoming.process_incoming_message_task') as mock_task, \
+                     patch('app.services.webhook_processor.record_message', new_callable=AsyncMock) as mock_counters:
                     mock_task.delay = Mock()
                     
                     await processor._process_incoming_message(mock_hotel, incoming_message_webhook)
@@ -157,6 +171,10 @@ class TestWebhookProcessor:
                     processor.db.add.assert_called()
                     processor.db.commit.assert_called()
                     
+                    # Verify conversation counters were updated before the commit
+                    mock_counters.assert_awaited_once()
+                    assert mock_counters.await_args.args[1] is mock_conversation
+                    
                     # Verify async task was queued
                     mock_task.delay.assert_called_once()
     
@@ -171,11 +189,12 @@ class TestWebhookProcessor:
     ):
         """Test processing incoming message from existing guest"""
         processor.db.add = Mock()
-        processor.db.commit = Mock()
+        processor.db.commit = AsyncMock()
         
-        with patch.object(processor, '_get_or_create_guest', return_value=mock_guest):
-            with patch.object(processor, '_get_or_create_conversation', return_value=mock_conversation):
-                with patch('app.tasks.process_incoming.process_incoming_message_task') as mock_task:
+        with patch.object(processor, '_get_or_create_guest', new_callable=AsyncMock, return_value=mock_guest):
+            with patch.object(processor, '_get_or_create_conversation', new_callable=AsyncMock, return_value=mock_conversation):
+                with patch('app.tasks.process_incoming.process_incoming_message_task') as mock_task, \
+                     patch('app.services.webhook_processor.record_message', new_callable=AsyncMock):
                     mock_task.delay = Mock()
                     
                     await processor._process_incoming_message(mock_hotel, incoming_message_webhook)
@@ -184,6 +203,23 @@ class TestWebhookProcessor:
                     processor.db.add.assert_called()
                     processor.db.commit.assert_called()
     
+    @pytest.mark.asyncio
+    async def test_process_incoming_message_duplicate_ignored(
+        self,
+        processor,
+        mock_hotel,
+        incoming_message_webhook
+    ):
+        """Test redelivered idMessage is not stored or processed again"""
+        processor.db.execute.return_value = scalar_result("existing-message-id")
+        
+        with patch.object(processor, '_get_or_create_guest', new_callable=AsyncMock) as mock_get_guest:
+            await processor._process_incoming_message(mock_hotel, incoming_message_webhook)
+            
+            mock_get_guest.assert_not_called()
+            processor.db.add.assert_not_called()
+            processor.db.commit.assert_not_called()
+    
     @pytest.mark.asyncio
     async def test_process_message_status_existing_message(
         self,
@@ -198,8 +234,8 @@ class TestWebhookProcessor:
         mock_message.hotel_id = mock_hotel.id
         mock_message.set_metadata = Mock()
         
-        processor.db.query.return_value.filter.return_value.first.return_value = mock_message
-        processor.db.commit = Mock()
+        processor.db.execute.return_value = scalar_result(mock_message)
+        processor.db.commit = AsyncMock()
         
         with patch('app.tasks.send_message.update_message_status_task') as mock_task:
             mock_task.delay = Mock()
@@ -213,6 +249,30 @@ class TestWebhookProcessor:
             # Verify async task was queued
             mock_task.delay.assert_called_once()
     
+    @pytest.mark.asyncio
+    async def test_process_message_status_read_decrements_unread(
+        self,
+        processor,
+        mock_hotel,
+        message_status_webhook
+    ):
+        """Test read status on an incoming message lowers the unread counter"""
+        mock_message = Mock(spec=Message)
+        mock_message.id = "msg-456"
+        mock_message.conversation_id = "conv-123"
+        mock_message.message_type = DBMessageType.INCOMING
+        mock_message.get_metadata = Mock(return_value=MessageStatus.DELIVERED)
+        mock_message.set_metadata = Mock()
+        message_status_webhook.status = MessageStatus.READ
+        
+        processor.db.execute.return_value = scalar_result(mock_message)
+        
+        with patch('app.tasks.send_message.update_message_status_task'), \
+             patch('app.services.webhook_processor.record_message_read', new_callable=AsyncMock) as mock_read:
+            await processor._process_message_status(mock_hotel, message_status_webhook)
+            
+            mock_read.assert_awaited_once_with(processor.db, "conv-123")
+    
     @pytest.mark.asyncio
     async def test_process_message_status_missing_message(
         self,
@@ -222,7 +282,7 @@ class TestWebhookProcessor:
     ):
         """Test processing message status for non-existent message"""
         # Mock no existing message
-        processor.db.query.return_value.filter.return_value.first.return_value = None
+        processor.db.execute.return_value = scalar_result(None)
         
         # Should not raise exception, just log warning
         await processor._process_message_status(mock_hotel, message_status_webhook)
@@ -236,7 +296,7 @@ class TestWebhookProcessor:
     ):
         """Test processing normal state change"""
         mock_hotel.set_setting = Mock()
-        processor.db.commit = Mock()
+        processor.db.commit = AsyncMock()
         
         await processor._process_state_change(mock_hotel, state_instance_webhook)
         
@@ -261,7 +321,7 @@ class TestWebhookProcessor:
         
         mock_hotel.set_setting = Mock()
         processor.db.add = Mock()
-        processor.db.commit = Mock()
+        processor.db.commit = AsyncMock()
         
         await processor._process_state_change(mock_hotel, critical_webhook)
         
@@ -269,29 +329,31 @@ class TestWebhookProcessor:
         processor.db.add.assert_called()
         processor.db.commit.assert_called()
     
-    def test_get_or_create_guest_existing(self, processor):
+    @pytest.mark.asyncio
+    async def test_get_or_create_guest_existing(self, processor):
         """Test getting existing guest"""
         mock_guest = Mock(spec=Guest)
         mock_guest.id = "existing-guest"
         
-        processor.db.query.return_value.filter.return_value.first.return_value = mock_guest
+        processor.db.execute.return_value = scalar_result(mock_guest)
         
         mock_hotel = Mock()
         mock_sender_data = Mock()
         mock_sender_data.chatId = "1234567890@c.us"
         mock_sender_data.senderName = "Test Guest"
         
-        result = processor._get_or_create_guest(mock_hotel, "1234567890", mock_sender_data)
+        result = await processor._get_or_create_guest(mock_hotel, "1234567890", mock_sender_data)
         
         assert result == mock_guest
         processor.db.add.assert_not_called()
     
-    def test_get_or_create_guest_new(self, processor):
+    @pytest.mark.asyncio
+    async def test_get_or_create_guest_new(self, processor):
         """Test creating new guest"""
         # Mock no existing guest
-        processor.db.query.return_value.filter.return_value.first.return_value = None
+        processor.db.execute.return_value = scalar_result(None)
         processor.db.add = Mock()
-        processor.db.flush = Mock()
+        processor.db.flush = AsyncMock()
         
         mock_hotel = Mock()
         mock_hotel.id = "hotel-123"
@@ -300,33 +362,35 @@ class TestWebhookProcessor:
         mock_sender_data.chatId = "1234567890@c.us"
         mock_sender_data.senderName = "Test Guest"
         
-        result = processor._get_or_create_guest(mock_hotel, "1234567890", mock_sender_data)
+        result = await processor._get_or_create_guest(mock_hotel, "1234567890", mock_sender_data)
         
         # Verify new guest was created
         processor.db.add.assert_called()
         processor.db.flush.assert_called()
-        assert result.phone_number == "1234567890"
+        assert result.phone == "+1234567890"
         assert result.hotel_id == mock_hotel.id
     
-    def test_get_or_create_conversation_existing(self, processor, mock_hotel, mock_guest):
+    @pytest.mark.asyncio
+    async def test_get_or_create_conversation_existing(self, processor, mock_hotel, mock_guest):
         """Test getting existing conversation"""
         mock_conversation = Mock(spec=Conversation)
         
-        processor.db.query.return_value.filter.return_value.first.return_value = mock_conversation
+        processor.db.execute.return_value = scalar_result(mock_conversation)
         
-        result = processor._get_or_create_conversation(mock_hotel, mock_guest)
+        result = await processor._get_or_create_conversation(mock_hotel, mock_guest)
         
         assert result == mock_conversation
         processor.db.add.assert_not_called()
     
-    def test_get_or_create_conversation_new(self, processor, mock_hotel, mock_guest):
+    @pytest.mark.asyncio
+    async def test_get_or_create_conversation_new(self, processor, mock_hotel, mock_guest):
         """Test creating new conversation"""
         # Mock no existing conversation
-        processor.db.query.return_value.filter.return_value.first.return_value = None
+        processor.db.execute.return_value = scalar_result(None)
         processor.db.add = Mock()
-        processor.db.flush = Mock()
+        processor.db.flush = AsyncMock()
         
-        result = processor._get_or_create_conversation(mock_hotel, mock_guest)
+        result = await processor._get_or_create_conversation(mock_hotel, mock_guest)
         
         # Verify new conversation was created
         processor.db.add.assert_called()
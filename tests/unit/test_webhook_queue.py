@@ -0,0 +1,86 @@
+"""
+Unit tests for the webhook ingestion work queue
+"""
+
+import asyncio
+import uuid
+import pytest
+from contextlib import asynccontextmanager
+from unittest.mock import Mock, AsyncMock, patch
+
+from app.services.webhook_queue import WebhookWorkQueue, WebhookJobType
+
+
+class TestWebhookWorkQueue:
+    """Test bounded webhook queue behaviour"""
+
+    @pytest.fixture
+    def mock_session(self):
+        """Create mock async session"""
+        session = Mock()
+        session.merge = AsyncMock(side_effect=lambda obj, load=False: obj)
+        return session
+
+    @pytest.fixture
+    def session_factory(self, mock_session):
+        """Session factory yielding the mock session"""
+        @asynccontextmanager
+        async def factory():
+            yield mock_session
+        return factory
+
+    @pytest.fixture
+    def mock_hotel(self):
+        """Create mock hotel"""
+        hotel = Mock()
+        hotel.id = uuid.uuid4()
+        return hotel
+
+    @pytest.mark.asyncio
+    async def test_submit_rejects_when_full(self, session_factory, mock_hotel):
+        """Submissions beyond max_size are rejected without blocking"""
+        queue = WebhookWorkQueue(max_size=2, workers=1, session_factory=session_factory)
+        queue._queue = asyncio.Queue(maxsize=2)
+        queue._running = True  # no workers draining
+
+        assert queue.submit_webhook(mock_hotel, Mock()) is True
+        assert queue.submit_webhook(mock_hotel, Mock()) is True
+        assert queue.submit_webhook(mock_hotel, Mock()) is False
+
+        stats = queue.get_stats()
+        assert stats['submitted'] == 2
+        assert stats['rejected'] == 1
+
+    @pytest.mark.asyncio
+    async def test_webhook_job_runs_processor(self, session_factory, mock_session, mock_hotel):
+        """Ingest jobs are handed to WebhookProcessor with the worker session"""
+        queue = WebhookWorkQueue(max_size=10, workers=2, session_factory=session_factory)
+        webhook = Mock()
+
+        with patch('app.services.webhook_processor.WebhookProcessor') as processor_cls:
+            processor_cls.return_value.process_webhook = AsyncMock()
+            await queue.start()
+            assert queue.submit_webhook(mock_hotel, webhook)
+            await queue.stop()
+
+            processor_cls.assert_called_once_with(mock_session, work_queue=queue)
+            processor_cls.return_value.process_webhook.assert_awaited_once_with(mock_hotel, webhook)
+
+        assert queue.get_stats()['completed'] == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_job_does_not_stop_worker(self, session_factory, mock_hotel):
+        """A failing job is counted and the worker keeps draining"""
+        queue = WebhookWorkQueue(max_size=10, workers=1, session_factory=session_factory)
+
+        with patch.object(queue, '_process_message', new_callable=AsyncMock) as process:
+            process.side_effect = [RuntimeError("db down"), None]
+            await queue.start()
+            queue.submit_message_processing(mock_hotel, uuid.uuid4())
+            queue.submit_message_processing(mock_hotel, uuid.uuid4())
+            await queue.stop()
+
+        stats = queue.get_stats()
+        assert stats['failed'] == 1
+        assert stats['completed'] == 1
+        assert stats['running'] is False